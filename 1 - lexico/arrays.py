@@ -0,0 +1,174 @@
+'''
+Almacenamiento de los arrays de B-Minor en tiempo de ejecución.
+
+Una lista de Python guarda un puntero a un objeto por elemento, así que
+un 'array [N] boolean' ocupa 8 bytes por elemento (y un 'integer' o un
+'float' además su objeto). Los arrays se guardan en memoria contigua
+según el tipo de sus elementos, como en el runtime de C:
+
+    integer  -> array('q')   enteros de 64 bits
+    float    -> array('d')   doubles
+    char     -> list         referencias a los strings de un carácter
+    boolean  -> list         referencias a True y False
+    string   -> list         referencias a los strings
+
+Los char y los boolean no tienen un typecode de array.array que se lea
+como el valor de Python ('u' está obsoleto y un bytearray retorna
+enteros), pero sus valores son objetos compartidos: la lista sólo guarda
+un puntero por elemento. Con la opción 'bits' de los motores
+(interp.Options, 'interp.py --bits') los boolean se guardan en un
+BitArray, un bit por elemento. Los motores closure, vm y python leen y
+escriben el bit en línea (bits[i >> 3] >> (i & 7) & 1) en los accesos a
+arrays de boolean de un programa verificado, sin llamar a los métodos
+de BitArray: la criba de bench.py arrays tarda entre lo mismo y un 40%
+más que con una lista.
+
+Todos soportan len(), arr[i] y arr[i] = v con índices 0 <= i < len, así
+que los motores los indexan igual que a una lista; los límites y el
+tipo del índice se siguen verificando en interp.array_load/array_store.
+Guardar un valor que el almacenamiento no acepta (un entero que no cabe
+en 64 bits, o un valor de otro tipo en un programa sin verificar)
+lanza OverflowError o TypeError, que array_store reporta como error de
+ejecución.
+
+Un array de arrays con todos sus tamaños declarados ('array [N] array
+[M] float') es un solo buffer de N*M elementos en orden por filas,
+envuelto en un Strided con sus dimensiones y pasos. a[i] es una vista
+de la fila i sobre el mismo buffer (sin copiar), y a[i][j] se puede
+leer directamente en data[offset + i*M + j] (interp.strided_load).
+'''
+from array import array
+
+
+class BitArray:
+    '''
+    Array de booleans con un bit por elemento (sobre un bytearray).
+    '''
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) >> 3)
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self.bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def __setitem__(self, i, value):
+        if value is True:
+            self.bits[i >> 3] |= 1 << (i & 7)
+        elif value is False:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        else:
+            raise TypeError(f'un BitArray sólo guarda booleans, no {type(value).__name__}')
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Strided:
+    '''
+    Array de arrays sobre un buffer plano: el elemento (i, j, ...) está
+    en data[offset + i*strides[0] + j*strides[1] + ...].
+    '''
+    __slots__ = ('data', 'dims', 'strides', 'offset')
+
+    def __init__(self, data, dims, strides, offset=0):
+        self.data = data
+        self.dims = dims
+        self.strides = strides
+        self.offset = offset
+
+    def __len__(self):
+        return self.dims[0]
+
+    def __getitem__(self, i):
+        if len(self.dims) == 1:
+            return self.data[self.offset + i]
+        # Vista de la fila i (comparte el buffer)
+        return Strided(self.data, self.dims[1:], self.strides[1:],
+                       self.offset + i * self.strides[0])
+
+    def __setitem__(self, i, value):
+        start = self.offset + i * self.strides[0]
+        if len(self.dims) == 1:
+            self.data[start] = value
+            return
+        # a[i] = fila: se copia de una vez sobre el buffer
+        if value.__class__ is Strided:
+            if value.dims != self.dims[1:]:
+                raise TypeError('fila de otra forma')
+            value = value.data[value.offset:value.offset + self.strides[0]]
+        elif len(self.dims) != 2 or len(value) != self.dims[1]:
+            raise TypeError('fila de otra forma')
+        if value.__class__ is self.data.__class__ and value.__class__ is not BitArray:
+            self.data[start:start + self.strides[0]] = value
+        else:
+            for k, v in enumerate(value):
+                self.data[start + k] = v
+
+    def __iter__(self):
+        for i in range(self.dims[0]):
+            yield self[i]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+# Clases de los valores array (para los isinstance y los __class__ in
+# de los caminos rápidos de los motores)
+ARRAYS = (list, array, BitArray, Strided)
+
+# Código de array.array de cada tipo de elemento
+_TYPECODES = {'integer': 'q', 'float': 'd'}
+
+
+def allocate(elem, size, default, bits=False):
+    '''
+    Array de 'size' elementos del tipo simple 'elem' (su nombre), todos
+    con el valor 'default'. Con 'bits' un array de boolean es un BitArray.
+    '''
+    code = _TYPECODES.get(elem)
+    if code is not None:
+        return array(code, [default]) * size
+    if elem == 'boolean' and bits:
+        return BitArray(size)
+    return [default] * size
+
+
+def strided(data, dims):
+    '''Vista de 'data' como un array de arrays de dimensiones 'dims'.'''
+    strides = [1] * len(dims)
+    for k in range(len(dims) - 2, -1, -1):
+        strides[k] = strides[k + 1] * dims[k + 1]
+    return Strided(data, tuple(dims), tuple(strides))
+
+
+def from_values(elem, values, bits=False):
+    '''Array del tipo simple 'elem' con los valores dados (un inicializador).'''
+    code = _TYPECODES.get(elem)
+    if code is not None:
+        return array(code, values)
+    if elem == 'boolean' and bits:
+        arr = BitArray(len(values))
+        for i, value in enumerate(values):
+            arr[i] = value
+        return arr
+    return list(values)
+
+
+def nbytes(arr):
+    '''Bytes que ocupan los elementos del array (sin el objeto que lo envuelve).'''
+    if isinstance(arr, Strided):
+        return nbytes(arr.data)
+    if isinstance(arr, array):
+        return arr.itemsize * len(arr)
+    if isinstance(arr, BitArray):
+        return len(arr.bits)
+    return 8 * len(arr)
@@ -0,0 +1,845 @@
+'''
+Generación de ensamblador x86-64 (System V) a partir del AST verificado.
+
+A diferencia de cgen.py, aquí no se pasa por C: el programa verificado
+por el checker se traduce directamente a ensamblador en tres etapas.
+
+  1. Lowering y optimización (ir.py): cada función se traduce a
+     instrucciones de tres direcciones sobre registros virtuales (VReg)
+     de dos clases: 'i' (enteros, booleanos, chars, strings y arrays, en
+     registros de 64 bits) y 'f' (floats, en registros xmm), agrupadas
+     en bloques básicos. El pass manager aplica el pipeline de -O<n> y
+     los bloques se vuelven a poner en orden lineal.
+
+  2. Asignación de registros con linear scan (Poletto y Sarkar): a
+     partir de la vida de cada registro virtual (calculada con análisis
+     de liveness sobre los saltos) se obtiene un intervalo, y los
+     intervalos se recorren en orden asignando registros físicos. Los
+     valores que siguen vivos después de una llamada sólo pueden usar
+     registros callee-saved; si no hay registro libre, el intervalo que
+     termina más tarde va a la pila (spill).
+
+  3. Emisión: cada instrucción se traduce a x86-64 (sintaxis Intel de
+     GNU as) según la ubicación de sus operandos. Los accesos a arrays
+     verifican límites en línea; los errores saltan a stubs al final de
+     la función que llaman al runtime.
+
+Las llamadas siguen la convención System V, de modo que el programa se
+enlaza con el mismo runtime de cgen.py (runtime/bminor.c: print, arrays
+y las funciones read_*) y con libc para los prototipos externos. Los
+elementos de los arrays ocupan 8 bytes, cualquiera sea su tipo.
+
+usage:
+    python3 asmgen.py <filename> [-o ejecutable] [--emit] [-O N] [--time-passes] [--dump-ir PASADA]
+'''
+import os
+import struct
+import sys
+
+from model   import *
+from cgen    import CodegenError, compile_c, build
+from ir      import (VReg, Instr, Function, JUMPS, imm32, lower, optimize, linearize,
+                     add_ir_arguments)
+
+_CALL_CLOBBERS = {'call'}
+
+# =====================================================================
+# Asignación de registros (linear scan)
+# =====================================================================
+GPR_CALLER = ['rsi', 'rdi', 'r8', 'r9', 'r10']
+GPR_CALLEE = ['rbx', 'r12', 'r13', 'r14', 'r15']
+XMM_REGS   = [f'xmm{i}' for i in range(14)]
+
+# rax, rcx, rdx, r11, xmm14 y xmm15 quedan libres para la emisión
+INT_ARGS   = ['rdi', 'rsi', 'rdx', 'rcx', 'r8', 'r9']
+FLOAT_ARGS = [f'xmm{i}' for i in range(8)]
+
+
+def liveness(code):
+    '''Conjuntos live-in y live-out de cada instrucción.'''
+    labels = {ins.args[0]: i for i, ins in enumerate(code) if ins.op == 'label'}
+    succs = []
+    for i, ins in enumerate(code):
+        if ins.op in ('ret', 'fail'):
+            succs.append(())
+        elif ins.op == 'jmp':
+            succs.append((labels[ins.args[0]],))
+        elif ins.op in JUMPS:
+            succs.append((i + 1, labels[ins.args[-1]]))
+        else:
+            succs.append((i + 1,) if i + 1 < len(code) else ())
+
+    uses = [set(ins.uses()) for ins in code]
+    defs = [set(ins.defs()) for ins in code]
+    live_in = [set() for _ in code]
+    live_out = [set() for _ in code]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(code) - 1, -1, -1):
+            out = set()
+            for s in succs[i]:
+                out |= live_in[s]
+            inn = uses[i] | (out - defs[i])
+            if out != live_out[i] or inn != live_in[i]:
+                live_out[i], live_in[i] = out, inn
+                changed = True
+    return live_in, live_out
+
+
+class Interval:
+    __slots__ = ('reg', 'start', 'end', 'crosses', 'loc')
+
+    def __init__(self, reg, pos):
+        self.reg = reg
+        self.start = self.end = pos
+        self.crosses = False
+        self.loc = None
+
+
+def intervals(code):
+    '''Intervalo de vida [start, end] de cada registro virtual.'''
+    live_in, live_out = liveness(code)
+    result = {}
+    for i, ins in enumerate(code):
+        for r in live_in[i] | live_out[i] | set(ins.defs()) | set(ins.uses()):
+            iv = result.get(r)
+            if iv is None:
+                result[r] = Interval(r, i)
+            else:
+                iv.end = i
+    calls = [i for i, ins in enumerate(code) if ins.op in _CALL_CLOBBERS]
+    for iv in result.values():
+        # Vivo después de una llamada: no puede usar registros caller-saved
+        iv.crosses = any(iv.start < p < iv.end for p in calls)
+    return sorted(result.values(), key=lambda iv: iv.start)
+
+
+def linear_scan(ivs, caller, callee):
+    '''
+    Asigna a cada intervalo un registro físico (iv.loc) o lo marca para
+    la pila (iv.loc = None). Retorna los registros callee-saved usados.
+    '''
+    free = set(caller) | set(callee)
+    order = caller + callee
+    active = []
+    used = set()
+    for iv in ivs:
+        for old in [a for a in active if a.end < iv.start]:
+            active.remove(old)
+            free.add(old.loc)
+        allowed = callee if iv.crosses else order
+        reg = next((r for r in allowed if r in free), None)
+        if reg is None:
+            victims = [a for a in active if a.loc in allowed]
+            victim = max(victims, key=lambda a: a.end, default=None)
+            if victim is None or victim.end <= iv.end:
+                continue            # spill del intervalo actual
+            reg, victim.loc = victim.loc, None
+            active.remove(victim)
+        else:
+            free.remove(reg)
+        iv.loc = reg
+        active.append(iv)
+        if reg in callee:
+            used.add(reg)
+    return [r for r in callee if r in used]
+
+
+# =====================================================================
+# Emisión de código
+# =====================================================================
+_CC = {'<': 'l', '<=': 'le', '>': 'g', '>=': 'ge', '==': 'e', '!=': 'ne'}
+
+_REGS = set(GPR_CALLER + GPR_CALLEE + INT_ARGS + XMM_REGS + FLOAT_ARGS +
+            ['rax', 'r11', 'xmm14', 'xmm15'])
+
+
+def _is_reg(loc):
+    return loc in _REGS
+
+
+def _is_mem(loc):
+    return isinstance(loc, str) and 'PTR' in loc
+
+
+class Emitter:
+    def __init__(self, strings):
+        self.lines = []
+        self.floats = {}            # bits -> etiqueta
+        self.strings = strings
+        self.nlabels = 0
+
+    def out(self, line):
+        self.lines.append('    ' + line)
+
+    def label(self):
+        self.nlabels += 1
+        return f'.LE{self.nlabels}'
+
+    def float_label(self, value):
+        bits = struct.unpack('<Q', struct.pack('<d', value))[0]
+        if bits not in self.floats:
+            self.floats[bits] = f'.LF{len(self.floats)}'
+        return self.floats[bits]
+
+    def string(self, value):
+        if value not in self.strings:
+            self.strings[value] = f'.LS{len(self.strings)}'
+        return self.strings[value]
+
+    # -----------------------------------------------------------------
+    # Función
+    # -----------------------------------------------------------------
+    def function(self, func: Function):
+        code = func.code
+        ivs = intervals(code)
+        saved = linear_scan([iv for iv in ivs if iv.reg.cls == 'i'], GPR_CALLER, GPR_CALLEE)
+        linear_scan([iv for iv in ivs if iv.reg.cls == 'f'], XMM_REGS, [])
+
+        self.loc = {}
+        nslots = 0
+        base = 8 * len(saved)
+        for iv in ivs:
+            if iv.loc is None:
+                nslots += 1
+                iv.loc = f'QWORD PTR [rbp-{base + 8 * nslots}]'
+            self.loc[iv.reg] = iv.loc
+        frame = 8 * nslots
+        if (base + frame) % 16:
+            frame += 8
+
+        self.func = func
+        self.stubs = {}
+        self.epilogue = f'.Lret_{func.name}'
+        self.lines.append(f'{func.name}:')
+        self.out('push rbp')
+        self.out('mov rbp, rsp')
+        for r in saved:
+            self.out(f'push {r}')
+        if frame:
+            self.out(f'sub rsp, {frame}')
+
+        for ins in code:
+            getattr(self, 'op_' + ins.op)(ins)
+
+        self.lines.append(f'{self.epilogue}:')
+        if saved:
+            self.out(f'lea rsp, [rbp-{base}]')
+            for r in reversed(saved):
+                self.out(f'pop {r}')
+        else:
+            self.out('mov rsp, rbp')
+        self.out('pop rbp')
+        self.out('ret')
+        for label, body in self.stubs.items():
+            self.lines.append(f'{label}:')
+            for line in body:
+                self.out(line)
+
+    def stub(self, name, *body):
+        '''Código de error (no retorna) compartido dentro de la función.'''
+        label = f'.L{name}_{self.func.name}'
+        self.stubs.setdefault(label, list(body) + ['ud2'])
+        return label
+
+    def error_stub(self, message, fn='bm_error'):
+        label = self.string(message)
+        return self.stub(f'err{label[3:]}', f'lea rdi, {label}[rip]', f'call {fn}@PLT')
+
+    # -----------------------------------------------------------------
+    # Operandos y movimientos
+    # -----------------------------------------------------------------
+    def L(self, v):
+        if isinstance(v, VReg):
+            return self.loc[v]
+        if isinstance(v, float):
+            return f'QWORD PTR {self.float_label(v)}[rip]'
+        return str(int(v))
+
+    def mov(self, dst, src):
+        if dst == src:
+            return
+        if _is_mem(dst) and (_is_mem(src) or not src.lstrip('-').isdigit() and not _is_reg(src)):
+            self.out(f'mov r11, {src}')
+            src = 'r11'
+        elif _is_mem(dst) and src.lstrip('-').isdigit() and not imm32(int(src)):
+            self.out(f'mov r11, {src}')
+            src = 'r11'
+        self.out(f'mov {dst}, {src}')
+
+    def fmov(self, dst, src):
+        if dst == src:
+            return
+        if _is_reg(dst) and _is_reg(src):
+            self.out(f'movapd {dst}, {src}')
+        elif _is_mem(dst) and _is_mem(src):
+            self.out(f'movsd xmm15, {src}')
+            self.out(f'movsd {dst}, xmm15')
+        else:
+            self.out(f'movsd {dst}, {src}')
+
+    def move(self, cls, dst, src):
+        (self.fmov if cls == 'f' else self.mov)(dst, src)
+
+    def parallel_move(self, moves, cls):
+        '''Copia simultánea de ubicaciones: [(destino, origen), ...].'''
+        tmp = 'xmm14' if cls == 'f' else 'rax'
+        moves = [(d, s) for d, s in moves if d != s]
+        while moves:
+            for i, (d, s) in enumerate(moves):
+                if not any(s2 == d for _, s2 in moves):
+                    self.move(cls, d, s)
+                    moves.pop(i)
+                    break
+            else:
+                # Ciclo: se guarda un destino en el temporal
+                d = moves[0][0]
+                self.move(cls, tmp, d)
+                moves = [(d2, tmp if s2 == d else s2) for d2, s2 in moves]
+
+    def int_reg(self, v, scratch):
+        '''Ubicación de v como registro entero (lo carga en scratch si hace falta).'''
+        loc = self.L(v)
+        if _is_reg(loc):
+            return loc
+        self.out(f'mov {scratch}, {loc}')
+        return scratch
+
+    def xmm_reg(self, v, scratch):
+        loc = self.L(v)
+        if _is_reg(loc):
+            return loc
+        self.out(f'movsd {scratch}, {loc}')
+        return scratch
+
+    # -----------------------------------------------------------------
+    # Instrucciones
+    # -----------------------------------------------------------------
+    def op_params(self, ins):
+        ints = [r for r in ins.dst if r.cls == 'i']
+        floats = [r for r in ins.dst if r.cls == 'f']
+        moves = {'i': list(zip(INT_ARGS, ints)), 'f': list(zip(FLOAT_ARGS, floats))}
+        # Los argumentos que no caben en registros están en la pila, en el
+        # orden de los parámetros
+        stack = ints[len(INT_ARGS):] + floats[len(FLOAT_ARGS):]
+        stack = [r for r in ins.dst if r in stack]
+        for k, r in enumerate(stack):
+            moves[r.cls].append((f'QWORD PTR [rbp+{16 + 8 * k}]', r))
+        for cls, pairs in moves.items():
+            self.parallel_move([(self.loc[r], src) for src, r in pairs if r in self.loc], cls)
+
+    def op_label(self, ins):
+        self.lines.append(f'{ins.args[0]}:')
+
+    def op_jmp(self, ins):
+        self.out(f'jmp {ins.args[0]}')
+
+    def op_const(self, ins):
+        if ins.dst not in self.loc:
+            return
+        if ins.dst.cls == 'f':
+            self.fmov(self.L(ins.dst), self.L(float(ins.args[0])))
+        else:
+            self.mov(self.L(ins.dst), str(ins.args[0]))
+
+    def op_str(self, ins):
+        if ins.dst not in self.loc:
+            return
+        dst = self.L(ins.dst)
+        reg = dst if _is_reg(dst) else 'rax'
+        self.out(f'lea {reg}, {ins.args[0]}[rip]')
+        self.mov(dst, reg)
+
+    def op_mov(self, ins):
+        if ins.dst in self.loc:
+            self.move(ins.dst.cls, self.L(ins.dst), self.L(ins.args[0]))
+
+    def op_gload(self, ins):
+        if ins.dst not in self.loc:
+            return
+        dst, sym = self.L(ins.dst), f'QWORD PTR {ins.args[0]}[rip]'
+        if ins.dst.cls == 'f':
+            reg = dst if _is_reg(dst) else 'xmm15'
+            self.out(f'movsd {reg}, {sym}')
+            self.fmov(dst, reg)
+        else:
+            reg = dst if _is_reg(dst) else 'rax'
+            self.out(f'mov {reg}, {sym}')
+            self.mov(dst, reg)
+
+    def op_gstore(self, ins):
+        sym, v = ins.args
+        mem = f'QWORD PTR {sym}[rip]'
+        if isinstance(v, float) or (isinstance(v, VReg) and v.cls == 'f'):
+            self.out(f'movsd {mem}, {self.xmm_reg(v, "xmm15")}')
+        elif isinstance(v, int):
+            self.out(f'mov {mem}, {v}')
+        else:
+            self.out(f'mov {mem}, {self.int_reg(v, "rax")}')
+
+    def _arith(self, ins, op, commutative):
+        if ins.dst not in self.loc:
+            return
+        a, b = ins.args
+        dst, A, B = self.L(ins.dst), self.L(a), self.L(b)
+        if commutative and dst == B and dst != A:
+            A, B = B, A
+        if _is_reg(dst) and dst != B:
+            self.mov(dst, A)
+            acc = dst
+        else:
+            self.out(f'mov rax, {A}')
+            acc = 'rax'
+        if op == 'imul' and not _is_reg(B) and not _is_mem(B):
+            self.out(f'imul {acc}, {acc}, {B}')
+        else:
+            self.out(f'{op} {acc}, {B}')
+        self.mov(dst, acc)
+
+    def op_add(self, ins):
+        self._arith(ins, 'add', True)
+
+    def op_sub(self, ins):
+        self._arith(ins, 'sub', False)
+
+    def op_mul(self, ins):
+        self._arith(ins, 'imul', True)
+
+    def op_and(self, ins):
+        self._arith(ins, 'and', True)
+
+    def _shift(self, ins, op):
+        if ins.dst not in self.loc:
+            return
+        a, b = ins.args
+        self.out(f'mov rax, {self.L(a)}')
+        if isinstance(b, int):
+            self.out(f'{op} rax, {b}')
+        else:
+            self.out(f'mov rcx, {self.L(b)}')
+            self.out(f'{op} rax, cl')
+        self.mov(self.L(ins.dst), 'rax')
+
+    def op_shl(self, ins):
+        self._shift(ins, 'shl')
+
+    def op_sar(self, ins):
+        self._shift(ins, 'sar')
+
+    def _divmod(self, ins, mod):
+        a, b = ins.args
+        self.out(f'mov rax, {self.L(a)}')
+        self.out(f'mov rcx, {self.L(b)}')
+        done, neg = self.label(), self.label()
+        if not (isinstance(b, int) and b != 0):
+            self.out('test rcx, rcx')
+            self.out(f'jz {self.error_stub("Módulo por cero" if mod else "División por cero")}')
+        # x / -1 puede desbordar en idiv
+        self.out('cmp rcx, -1')
+        self.out(f'je {neg}')
+        self.out('cqo')
+        self.out('idiv rcx')
+        # Redondeo hacia abajo: resto distinto de cero y de signo distinto al divisor
+        self.out('test rdx, rdx')
+        self.out(f'jz {done}')
+        self.out('mov r11, rdx')
+        self.out('xor r11, rcx')
+        self.out(f'jns {done}')
+        self.out('add rdx, rcx' if mod else 'sub rax, 1')
+        self.out(f'jmp {done}')
+        self.lines.append(f'{neg}:')
+        self.out('xor edx, edx' if mod else 'neg rax')
+        self.lines.append(f'{done}:')
+        if ins.dst in self.loc:
+            self.mov(self.L(ins.dst), 'rdx' if mod else 'rax')
+
+    def op_div(self, ins):
+        self._divmod(ins, False)
+
+    def op_mod(self, ins):
+        self._divmod(ins, True)
+
+    def _compare(self, a, b):
+        A, B = self.L(a), self.L(b)
+        if not _is_reg(A) and not (_is_mem(A) and (_is_reg(B) or not _is_mem(B))):
+            self.out(f'mov rax, {A}')
+            A = 'rax'
+        self.out(f'cmp {A}, {B}')
+
+    def op_cmp(self, ins):
+        op, a, b = ins.args
+        self._compare(a, b)
+        self.out(f'set{_CC[op]} al')
+        self.out('movzx eax, al')
+        if ins.dst in self.loc:
+            self.mov(self.L(ins.dst), 'rax')
+
+    def op_cjump(self, ins):
+        op, a, b, label = ins.args
+        self._compare(a, b)
+        self.out(f'j{_CC[op]} {label}')
+
+    def _truth(self, v):
+        loc = self.L(v)
+        if _is_reg(loc):
+            self.out(f'test {loc}, {loc}')
+        elif _is_mem(loc):
+            self.out(f'cmp {loc}, 0')
+        else:
+            self.out(f'mov rax, {loc}')
+            self.out('test rax, rax')
+
+    def op_jz(self, ins):
+        self._truth(ins.args[0])
+        self.out(f'jz {ins.args[1]}')
+
+    def op_jnz(self, ins):
+        self._truth(ins.args[0])
+        self.out(f'jnz {ins.args[1]}')
+
+    def op_not(self, ins):
+        if ins.dst in self.loc:
+            self.out(f'mov rax, {self.L(ins.args[0])}')
+            self.out('xor eax, 1')
+            self.mov(self.L(ins.dst), 'rax')
+
+    def op_neg(self, ins):
+        if ins.dst in self.loc:
+            self.out(f'mov rax, {self.L(ins.args[0])}')
+            self.out('neg rax')
+            self.mov(self.L(ins.dst), 'rax')
+
+    # Floats
+    def _farith(self, ins, op, commutative):
+        if ins.dst not in self.loc:
+            return
+        a, b = ins.args
+        dst, A, B = self.L(ins.dst), self.L(a), self.L(b)
+        if commutative and dst == B and dst != A:
+            A, B = B, A
+        acc = dst if _is_reg(dst) and dst != B else 'xmm15'
+        self.fmov(acc, A)
+        self.out(f'{op} {acc}, {B}')
+        self.fmov(dst, acc)
+
+    def op_fadd(self, ins):
+        self._farith(ins, 'addsd', True)
+
+    def op_fsub(self, ins):
+        self._farith(ins, 'subsd', False)
+
+    def op_fmul(self, ins):
+        self._farith(ins, 'mulsd', True)
+
+    def op_fdiv(self, ins):
+        a, b = ins.args
+        self.fmov('xmm14', self.L(b))
+        if not (isinstance(b, float) and b != 0):
+            ok = self.label()
+            self.out('pxor xmm15, xmm15')
+            self.out('ucomisd xmm14, xmm15')
+            self.out(f'jp {ok}')
+            self.out(f'je {self.error_stub("División por cero")}')
+            self.lines.append(f'{ok}:')
+        self.fmov('xmm15', self.L(a))
+        self.out('divsd xmm15, xmm14')
+        if ins.dst in self.loc:
+            self.fmov(self.L(ins.dst), 'xmm15')
+
+    def op_fneg(self, ins):
+        if ins.dst in self.loc:
+            self.fmov('xmm15', self.L(ins.args[0]))
+            self.out('movq rax, xmm15')
+            self.out('btc rax, 63')
+            self.out('movq xmm15, rax')
+            self.fmov(self.L(ins.dst), 'xmm15')
+
+    def op_i2f(self, ins):
+        if ins.dst not in self.loc:
+            return
+        dst = self.L(ins.dst)
+        src = self.int_reg(ins.args[0], 'rax')
+        reg = dst if _is_reg(dst) else 'xmm15'
+        self.out(f'pxor {reg}, {reg}')
+        self.out(f'cvtsi2sd {reg}, {src}')
+        self.fmov(dst, reg)
+
+    def _fcompare(self, op, a, b):
+        '''ucomisd con los operandos ordenados para usar '>' o '>='.'''
+        if op in ('<', '<='):
+            a, b = b, a
+            op = '>' if op == '<' else '>='
+        A = self.xmm_reg(a, 'xmm15')
+        self.out(f'ucomisd {A}, {self.L(b)}')
+        return op
+
+    def op_fcmp(self, ins):
+        op, a, b = ins.args
+        op = self._fcompare(op, a, b)
+        if op == '>':
+            self.out('seta al')
+        elif op == '>=':
+            self.out('setae al')
+        elif op == '==':
+            self.out('sete al')
+            self.out('setnp cl')
+            self.out('and al, cl')
+        else:
+            self.out('setne al')
+            self.out('setp cl')
+            self.out('or al, cl')
+        self.out('movzx eax, al')
+        if ins.dst in self.loc:
+            self.mov(self.L(ins.dst), 'rax')
+
+    def op_fcjump(self, ins):
+        op, a, b, sense, label = ins.args
+        op = self._fcompare(op, a, b)
+        if op in ('>', '>='):
+            jump = {('>', True): 'ja', ('>=', True): 'jae',
+                    ('>', False): 'jbe', ('>=', False): 'jb'}[op, sense]
+            self.out(f'{jump} {label}')
+        elif (op == '==') == sense:
+            # Igualdad: ZF=1 y PF=0 (los operandos no son NaN)
+            skip = self.label()
+            self.out(f'jp {skip}')
+            self.out(f'je {label}')
+            self.lines.append(f'{skip}:')
+        else:
+            self.out(f'jp {label}')
+            self.out(f'jne {label}')
+
+    # Arrays
+    def _index(self, arr, idx, null, check):
+        '''Deja en rcx los datos del array y en rdx el índice verificado.'''
+        self.out(f'mov rcx, {self.L(arr)}')
+        self.out('test rcx, rcx')
+        self.out(f'jz {null}')
+        self.out(f'mov rdx, {self.L(idx)}')
+        check()
+        self.out('mov rcx, QWORD PTR [rcx+8]')
+
+    def op_load(self, ins):
+        arr, idx = ins.args
+        null = self.error_stub('Base de acceso a array no es un array')
+        bad = self.stub('load_range', 'mov rdi, rdx', 'mov rsi, QWORD PTR [rcx]',
+                        'call bm_load_range@PLT')
+
+        def check():
+            self.out('cmp rdx, QWORD PTR [rcx]')
+            self.out(f'jae {bad}')
+
+        self._index(arr, idx, null, check)
+        if ins.dst not in self.loc:
+            return
+        dst, elem = self.L(ins.dst), 'QWORD PTR [rcx+rdx*8]'
+        if ins.dst.cls == 'f':
+            reg = dst if _is_reg(dst) else 'xmm15'
+            self.out(f'movsd {reg}, {elem}')
+            self.fmov(dst, reg)
+        else:
+            reg = dst if _is_reg(dst) else 'rax'
+            self.out(f'mov {reg}, {elem}')
+            self.mov(dst, reg)
+
+    def op_store(self, ins):
+        arr, idx, value, lineno = ins.args
+        null = self.stub(f'store_base{lineno[3:]}', f'lea rdi, {lineno}[rip]',
+                         'call bm_store_base@PLT')
+        bad = self.stub('store_range', 'mov rdi, rdx', 'call bm_store_range@PLT')
+
+        def check():
+            self.out('cmp rdx, QWORD PTR [rcx]')
+            self.out(f'jae {bad}')
+
+        self._index(arr, idx, null, check)
+        elem = 'QWORD PTR [rcx+rdx*8]'
+        if isinstance(value, float) or (isinstance(value, VReg) and value.cls == 'f'):
+            self.out(f'movsd {elem}, {self.xmm_reg(value, "xmm15")}')
+        elif isinstance(value, int):
+            self.out(f'mov {elem}, {value}')
+        else:
+            self.out(f'mov {elem}, {self.int_reg(value, "rax")}')
+
+    def op_incidx(self, ins):
+        arr, idx, delta = ins.args
+        null = self.error_stub('Base no es array')
+        bad = self.error_stub('list index out of range', 'bm_internal')
+
+        def check():
+            # Índices negativos cuentan desde el final (listas de Python)
+            ok = self.label()
+            self.out('test rdx, rdx')
+            self.out(f'jns {ok}')
+            self.out('add rdx, QWORD PTR [rcx]')
+            self.lines.append(f'{ok}:')
+            self.out('cmp rdx, QWORD PTR [rcx]')
+            self.out(f'jae {bad}')
+
+        self._index(arr, idx, null, check)
+        elem = 'QWORD PTR [rcx+rdx*8]'
+        if ins.dst.cls == 'f':
+            self.out(f'movsd xmm15, {elem}')
+            self.out(f'addsd xmm15, {self.L(float(delta))}')
+            self.out(f'movsd {elem}, xmm15')
+            if ins.dst in self.loc:
+                self.fmov(self.L(ins.dst), 'xmm15')
+        else:
+            self.out(f'mov rax, {elem}')
+            self.out(f'add rax, {delta}')
+            self.out(f'mov {elem}, rax')
+            if ins.dst in self.loc:
+                self.mov(self.L(ins.dst), 'rax')
+
+    # Llamadas
+    def op_call(self, ins):
+        target, kind, ret, *args = ins.args
+        ints, floats, stack = [], [], []
+        for a in args:
+            cls = 'f' if isinstance(a, float) or (isinstance(a, VReg) and a.cls == 'f') else 'i'
+            group, regs = (floats, FLOAT_ARGS) if cls == 'f' else (ints, INT_ARGS)
+            if len(group) < len(regs):
+                group.append(a)
+            else:
+                stack.append((cls, a))
+
+        pad = 8 if len(stack) % 2 else 0
+        if pad:
+            self.out('sub rsp, 8')
+        for cls, a in reversed(stack):
+            if isinstance(a, str):
+                # Etiqueta de un string del programa
+                self.out(f'lea rax, {a}[rip]')
+                self.out('push rax')
+                continue
+            loc = self.L(a)
+            if cls == 'f' and _is_reg(loc):
+                self.out('sub rsp, 8')
+                self.out(f'movsd QWORD PTR [rsp], {loc}')
+            else:
+                self.out(f'push {loc}')
+
+        # Las direcciones de strings se cargan al final: no son origen de
+        # ningún otro movimiento
+        moves = list(zip(INT_ARGS, ints))
+        self.parallel_move([(r, self.L(a)) for r, a in moves if not isinstance(a, str)], 'i')
+        self.parallel_move([(r, self.L(a)) for r, a in zip(FLOAT_ARGS, floats)], 'f')
+        for r, a in moves:
+            if isinstance(a, str):
+                self.out(f'lea {r}, {a}[rip]')
+
+        self.out(f'call {target}' if kind == 'user' else f'call {target}@PLT')
+        if stack or pad:
+            self.out(f'add rsp, {8 * len(stack) + pad}')
+
+        if ins.dst is None:
+            return
+        if kind != 'user' and ret == 'boolean':
+            self.out('movzx eax, al')
+        elif kind != 'user' and ret == 'char':
+            self.out('movsxd rax, eax')
+        if ins.dst in self.loc:
+            if ins.dst.cls == 'f':
+                self.fmov(self.L(ins.dst), 'xmm0')
+            else:
+                self.mov(self.L(ins.dst), 'rax')
+
+    def op_ret(self, ins):
+        if ins.args:
+            v = ins.args[0]
+            if isinstance(v, float) or (isinstance(v, VReg) and v.cls == 'f'):
+                self.fmov('xmm0', self.L(v))
+            else:
+                self.mov('rax', self.L(v))
+        self.out(f'jmp {self.epilogue}')
+
+    def op_fail(self, ins):
+        self.out(f'lea rdi, {ins.args[0]}[rip]')
+        self.out('call bm_internal@PLT')
+
+
+def _bytes(value):
+    return ', '.join(str(b) for b in value.encode('utf-8') + b'\0')
+
+
+class AsmGenerator:
+    '''Traduce un programa verificado a ensamblador x86-64 (GNU as, sintaxis Intel).'''
+
+    def generate(self, program: Program, level=2, timing=False, dump=()):
+        functions, lowering = lower(program)
+        optimize(functions, level, timing, dump)
+        emitter = Emitter(lowering.strings)
+
+        emitter.lines += ['    .intel_syntax noprefix', '    .text']
+        for func in functions:
+            func.code = linearize(func)
+            emitter.function(func)
+            emitter.lines.append('')
+
+        main = lowering.funcs.get('main')
+        emitter.lines += ['    .globl main', 'main:']
+        emitter.out('push rbp')
+        emitter.out('mov rbp, rsp')
+        emitter.out('call bm_init')
+        if main is not None:
+            if main.params:
+                msg = (f"La función 'main' debe definirse sin argumentos "
+                       f"(esperado 0, pero tiene {len(main.params)})")
+                emitter.out(f'lea rdi, {emitter.string(msg)}[rip]')
+                emitter.out('call bm_error@PLT')
+            else:
+                emitter.out('call b_main')
+        emitter.out('xor eax, eax')
+        emitter.out('pop rbp')
+        emitter.out('ret')
+
+        out = emitter.lines
+        out.append('    .section .rodata')
+        for value, label in emitter.strings.items():
+            out.append(f'{label}:')
+            out.append(f'    .byte {_bytes(value)}')
+        out.append('    .align 8')
+        for bits, label in emitter.floats.items():
+            out.append(f'{label}:')
+            out.append(f'    .quad {bits:#x}')
+        out.append('    .bss')
+        out.append('    .align 8')
+        for sym, _ in lowering.globals.values():
+            out.append(f'{sym}:')
+            out.append('    .zero 8')
+        out.append('    .section .note.GNU-stack,"",@progbits')
+        return '\n'.join(out) + '\n'
+
+
+def generate(program: Program, level=2, timing=False, dump=()):
+    '''
+    Verifica el programa, lo optimiza con el pipeline de -O<level> (ver
+    ir.py) y retorna su traducción a ensamblador. Lanza CodegenError si
+    el checker reporta errores.
+    '''
+    return AsmGenerator().generate(program, level, timing, dump)
+
+
+if __name__ == '__main__':
+    import argparse
+    from parser import parse
+
+    argparser = argparse.ArgumentParser(description='bminor x86-64 backend')
+    argparser.add_argument('file', help='programa a compilar')
+    argparser.add_argument('-o', dest='output', help='ejecutable a generar')
+    argparser.add_argument('--emit', action='store_true',
+                           help='mostrar el ensamblador en lugar de compilarlo')
+    add_ir_arguments(argparser)
+    args = argparser.parse_args()
+
+    ast = parse(open(args.file, encoding='utf-8').read())
+    try:
+        source = generate(ast, args.level, args.time_passes, args.dump_ir)
+        if args.emit:
+            sys.stdout.write(source)
+        else:
+            output = args.output or os.path.splitext(os.path.basename(args.file))[0]
+            compile_c(source, output, lang='s')
+    except CodegenError as e:
+        raise SystemExit(f'asmgen: {e}')
@@ -0,0 +1,266 @@
+'''
+Recorridos y predicados sobre el AST que comparten las pasadas.
+
+Las pasadas de optimización (fold.py, licm.py, cse.py, ...), los
+análisis que usan los motores (ranges.py, loops.py, escape.py, ...) y
+los back-ends nativos necesitan las mismas preguntas sobre el AST: qué
+nodos tiene un cuerpo, qué variable asigna una expresión, si evaluarla
+tiene efectos, cuál es el paso de un ciclo 'for'. Se definen aquí, una
+sola vez, para que ninguna pasada dependa de los detalles internos de
+otra.
+'''
+from model import *
+
+INT_MIN, INT_MAX = -2**63, 2**63 - 1
+
+# =====================================================================
+# Recorridos
+# =====================================================================
+
+def subexpressions(n):
+    '''Subexpresiones de una expresión.'''
+    if isinstance(n, (BinOper, LogicalOpExpr, Assign)):
+        return [e for e in (n.left, n.right) if e is not None]
+    if isinstance(n, (UnaryOper, PreInc, PreDec)):
+        return [n.expr]
+    if isinstance(n, ArrayAccess):
+        return [n.array, n.pos]
+    if isinstance(n, Call):
+        return n.args
+    return []
+
+
+def walk(body):
+    '''Todas las sentencias y expresiones (anidadas) de una lista de sentencias.'''
+    stack = list(body if isinstance(body, list) else [body])
+    while stack:
+        n = stack.pop()
+        if n is None:
+            continue
+        yield n
+        if isinstance(n, IfStmt):
+            stack += [n.cond] + n.then_branch + (n.else_branch or [])
+        elif isinstance(n, WhileStmt):
+            stack += [n.cond] + n.body
+        elif isinstance(n, DoWhileStmt):
+            stack += [n.body, n.cond]
+        elif isinstance(n, ForStmt):
+            stack += [n.init, n.cond, n.step] + n.body
+        elif isinstance(n, (Block, FuncDecl)):
+            stack += n.body
+        elif isinstance(n, (PrintStmt, ExprStmt, ReturnStmt)):
+            stack.append(n.expr)
+        elif isinstance(n, VarDeclInit):
+            stack += n.init if isinstance(n.init, list) else [n.init]
+            stack.append(n.type)
+        elif isinstance(n, VarDecl):
+            stack.append(n.type)
+        elif isinstance(n, ArrayType):
+            stack.append(n.size)
+        else:
+            stack += subexpressions(n)
+
+
+# Hijos que pueden contener llamadas, de cada clase de nodo (para las
+# pasadas que reescriben el árbol campo por campo)
+CHILD_FIELDS = {
+    BinOper: ('left', 'right'),
+    LogicalOpExpr: ('left', 'right'),
+    UnaryOper: ('expr',),
+    Assign: ('left', 'right'),
+    PreInc: ('expr',),
+    PreDec: ('expr',),
+    PostInc: ('expr',),
+    PostDec: ('expr',),
+    ArrayAccess: ('array', 'pos'),
+    Call: ('args',),
+    VarDecl: ('type',),
+    VarDeclInit: ('type', 'init'),
+    ArrayType: ('size',),
+    PrintStmt: ('expr',),
+    ExprStmt: ('expr',),
+    ReturnStmt: ('expr',),
+    Block: ('body',),
+    IfStmt: ('cond', 'then_branch', 'else_branch'),
+    WhileStmt: ('cond', 'body'),
+    DoWhileStmt: ('body', 'cond'),
+    ForStmt: ('init', 'cond', 'step', 'body'),
+}
+
+
+# =====================================================================
+# Variables que se leen y se escriben
+# =====================================================================
+
+def assigned_name(n):
+    '''Nombre de la variable que modifica la expresión n (o None).'''
+    if isinstance(n, Assign) and isinstance(n.left, Identifier):
+        return n.left.name
+    if isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, Identifier):
+        return n.expr.name
+    return None
+
+
+# Marca de written_names: la expresión llama a una función, que puede
+# modificar cualquier variable global
+CALL = object()
+
+def written_names(n):
+    '''Variables que la evaluación de n puede modificar.'''
+    out = set()
+    if isinstance(n, Call):
+        out.add(CALL)
+    elif isinstance(n, Assign) and isinstance(n.left, Identifier):
+        out.add(n.left.name)
+    elif isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, Identifier):
+        out.add(n.expr.name)
+    for child in subexpressions(n):
+        out |= written_names(child)
+    return out
+
+
+def read_names(n):
+    '''Variables que lee la expresión n.'''
+    if isinstance(n, Identifier):
+        return {n.name}
+    out = set()
+    for child in subexpressions(n):
+        out |= read_names(child)
+    return out
+
+
+def function_locals(func):
+    '''Nombres de los parámetros y variables locales de una función.'''
+    names = {p.name for p in func.params}
+    names |= {n.name for n in walk(func.body) if isinstance(n, (VarDecl, VarDeclInit))}
+    return names
+
+
+# =====================================================================
+# Expresiones sin efectos
+# =====================================================================
+
+# Operaciones sin efectos que se pueden reutilizar ('^' no)
+PURE_OPERS = {'+', '-', '*', '/', '%', '<', '<=', '>', '>=', '==', '!='}
+COMMUTATIVE = {'+', '*', '==', '!='}
+SCALARS = {'integer', 'float', 'boolean', 'char', 'string'}
+
+# Funciones built-in sin efectos
+PURE_BUILTINS = {'array_length'}
+
+
+def is_scalar(typ):
+    '''True si typ es un tipo simple con valor (no void).'''
+    return isinstance(typ, SimpleType) and typ.name != 'void'
+
+
+def is_quiet(n):
+    '''True si evaluar n no tiene efectos ni puede fallar.'''
+    if isinstance(n, (Literal, Identifier)):
+        return True
+    if isinstance(n, UnaryOper):
+        return n.oper in ('-', '!') and is_quiet(n.expr)
+    if isinstance(n, LogicalOpExpr):
+        return is_quiet(n.left) and is_quiet(n.right)
+    if isinstance(n, BinOper) and n.oper in PURE_OPERS:
+        if n.oper in ('/', '%') and not (isinstance(n.right, Literal) and n.right.value != 0):
+            return False
+        return is_quiet(n.left) and is_quiet(n.right)
+    return False
+
+
+def key_names(key):
+    '''Variables que lee la subexpresión con forma canónica 'key' (cse.py, licm.py).'''
+    if key[0] == 'id':
+        return {key[1]}
+    if key[0] == 'lit':
+        return set()
+    out = set()
+    for part in key[1:]:
+        out |= key_names(part)
+    return out
+
+
+def make_literal(value, typ, lineno):
+    '''Literal del tipo 'typ' con el valor dado, o None si no es representable.'''
+    if isinstance(value, bool):
+        lit = Boolean(value)
+    elif isinstance(value, int):
+        if not INT_MIN <= value <= INT_MAX:
+            return None
+        lit = Integer(value)
+    elif isinstance(value, float):
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        lit = Float(value)
+    elif typ == 'char':
+        lit = Char(value)
+    else:
+        lit = String(value)
+    lit.lineno = lineno
+    return lit
+
+
+# =====================================================================
+# Ciclos 'for'
+# =====================================================================
+
+# Comparación con la variable a la derecha -> con la variable a la izquierda
+FLIP = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+
+def loop_operand(n, name):
+    '''True si n puede ser el límite o el paso de un ciclo sobre 'name'.'''
+    if isinstance(n, Integer) and n.value.__class__ is int:
+        return True
+    return isinstance(n, Identifier) and n.name != name
+
+
+def for_step(n):
+    '''(variable, paso, signo) del paso de un for, o None.'''
+    if isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, Identifier):
+        return n.expr, Integer(1), 1 if isinstance(n, PreInc) else -1
+    if not (isinstance(n, Assign) and isinstance(n.left, Identifier)):
+        return None
+    var, value = n.left, n.right
+    if not isinstance(value, BinOper) or value.oper not in ('+', '-'):
+        return None
+    if isinstance(value.left, Identifier) and value.left.name == var.name:
+        step = value.right
+    elif value.oper == '+' and isinstance(value.right, Identifier) and value.right.name == var.name:
+        step = value.left
+    else:
+        return None
+    if not loop_operand(step, var.name):
+        return None
+    return var, step, 1 if value.oper == '+' else -1
+
+
+# =====================================================================
+# Reportes
+# =====================================================================
+
+def expr_text(n):
+    '''Texto de una expresión (para los reportes de las pasadas).'''
+    if isinstance(n, Identifier):
+        return n.name
+    if isinstance(n, String):
+        return f'"{n.value}"'
+    if isinstance(n, Char):
+        return f"'{n.value}'"
+    if isinstance(n, Boolean):
+        return 'true' if n.value else 'false'
+    if isinstance(n, Literal):
+        return str(n.value)
+    if isinstance(n, UnaryOper):
+        return f'{n.oper}{expr_text(n.expr)}'
+    if isinstance(n, Call):
+        return f'{n.func.name}({", ".join(expr_text(a) for a in n.args)})'
+    if isinstance(n, BinOper):
+        left, right = expr_text(n.left), expr_text(n.right)
+        if isinstance(n.left, BinOper):
+            left = f'({left})'
+        if isinstance(n.right, BinOper):
+            right = f'({right})'
+        return f'{left} {n.oper} {right}'
+    return type(n).__name__
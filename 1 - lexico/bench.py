@@ -0,0 +1,791 @@
+'''
+Benchmarks del intérprete de B-Minor.
+
+Cada benchmark ejecuta un programa de test/bench dentro de este mismo
+proceso, de modo que se puede medir tanto el tiempo como la memoria
+(RSS) que consume el intérprete.
+
+usage:
+    python3 bench.py recursion [--calls N] [--limit MB]
+    python3 bench.py calls [--fib N] [--gcd N] [--engine NAME]
+    python3 bench.py engines [--engine NAME ...]
+    python3 bench.py depth [--depth N] [--engine NAME]
+    python3 bench.py tail [--depth N] [--engine NAME ...]
+    python3 bench.py memo [--n N] [--k K] [--size N] [--engine NAME ...]
+    python3 bench.py dce [--functions N ...]
+    python3 bench.py loops [--outer N] [--inner M] [--engine NAME ...]
+    python3 bench.py arrays [--n N] [--engine NAME ...]
+    python3 bench.py matrix [--n N] [--engine NAME ...]
+    python3 bench.py pool [--n N] [--m M] [--engine NAME ...]
+    python3 bench.py overflow [--n N] [--k K] [--engine NAME ...]
+    python3 bench.py native [--ref NAME] [--backend c|asm] [-O N]
+    python3 bench.py fold [--engine NAME]
+    python3 bench.py cse [--engine NAME]
+    python3 bench.py inline [--engine NAME]
+    python3 bench.py peval [--engine NAME]
+    python3 bench.py licm [--engine NAME]
+    python3 bench.py bounds [--engine NAME]
+    python3 bench.py power [--n N] [--engine NAME ...]
+    python3 bench.py specialize [--engine NAME]
+    python3 bench.py super
+'''
+import argparse
+import contextlib
+import glob
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from parser import parse
+from interp import ENGINES, make_engine
+from checker import Check
+from errors  import errors_detected
+from fold    import ConstantFolder
+from astutil import walk
+from cse     import CommonSubexpressions
+from licm    import LoopInvariants
+from inline  import Inliner
+from peval   import PartialEvaluator
+from strength import StrengthReducer
+from bounds  import BoundsChecks
+from ranges  import mark as mark_ranges
+from specialize import Specializer
+from memo    import Memoizer, memoize
+from dce     import DeadCode, eliminate
+
+# Pasadas sobre el AST verificado (--pass): nombre -> función que
+# transforma el programa y retorna sus estadísticas
+AST_PASSES = {
+    'fold': ConstantFolder.fold,
+    'inline': Inliner.inline,
+    'peval': PartialEvaluator.evaluate,
+    'strength': StrengthReducer.reduce,
+    'bounds': BoundsChecks.eliminate,
+    'cse': CommonSubexpressions.eliminate,
+    'licm': LoopInvariants.hoist,
+    'memo': Memoizer.memoize,
+    'dce': DeadCode.eliminate,
+}
+
+TEST_DIR  = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test')
+BENCH_DIR = os.path.join(TEST_DIR, 'bench')
+
+
+def peak_rss():
+    '''RSS máximo alcanzado por el proceso, en bytes.'''
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS reporta bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def load(name):
+    with open(os.path.join(BENCH_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def run(source, stdin='', engine='tree', check=False, passes=(), generic=False):
+    '''
+    Interpreta 'source' con el motor 'engine' (un nombre de ENGINES o un
+    motor ya creado) usando 'stdin' como entrada estándar. Retorna la salida del programa y el tiempo de ejecución
+    (incluida la compilación del motor) en segundos. Con 'check' el
+    programa pasa antes por el checker, como en el back-end de C, y
+    'passes' son los nombres de las pasadas de AST_PASSES que se le
+    aplican después. Con 'generic' las operaciones del programa
+    verificado no se especializan por tipo.
+    '''
+    ast = parse(source)
+    if check or passes:
+        Check.checker(ast)
+    if passes and not errors_detected():
+        for name in passes:
+            AST_PASSES[name](ast)
+    if generic:
+        ast.checked = False
+    out = io.StringIO()
+    old_stdin, sys.stdin = sys.stdin, io.StringIO(stdin)
+    try:
+        with contextlib.redirect_stdout(out):
+            start = time.perf_counter()
+            (make_engine(engine) if isinstance(engine, str) else engine).interpret(ast)
+            elapsed = time.perf_counter() - start
+    finally:
+        sys.stdin = old_stdin
+    return out.getvalue(), elapsed
+
+
+def compare(option, source, stdin='', engine='tree', check=False):
+    '''
+    Ejecuta 'source' con el motor 'engine' sin y con la opción 'option'
+    de los motores (interp.Options). Retorna las dos salidas, los dos
+    tiempos y el motor de la ejecución con la opción.
+    '''
+    outputs, times = [], []
+    for enabled in (False, True):
+        instance = make_engine(engine, **{option: enabled})
+        out, elapsed = run(source, stdin, instance, check=check)
+        outputs.append(out)
+        times.append(elapsed)
+    return outputs, times, instance
+
+
+def bench_recursion(args):
+    '''
+    Ejecuta millones de llamadas recursivas y verifica que el RSS
+    se mantenga acotado: el pico de memoria de la ejecución larga no
+    debe superar en más de 'limit' MB al de una ejecución corta.
+    '''
+    source = load('recursion.bminor')
+    per_iter = 21       # depth(20) realiza 21 llamadas
+    iters = max(args.calls // per_iter, 1)
+
+    run(source, f'{max(iters // 10, 1)}\n', args.engine)
+    base = peak_rss()
+
+    out, elapsed = run(source, f'{iters}\n', args.engine)
+    growth = peak_rss() - base
+
+    calls = int(out.strip())
+    print(f'recursion: {calls} llamadas en {elapsed:.2f}s '
+          f'({calls / elapsed:,.0f} llamadas/s)')
+    print(f'recursion: crecimiento de RSS {growth / 2**20:.1f} MB '
+          f'(límite {args.limit} MB)')
+    if growth > args.limit * 2**20:
+        raise SystemExit('recursion: FALLO, la memoria crece con el número de llamadas')
+    print('recursion: ok')
+
+
+def bench_calls(args):
+    '''
+    Programas dominados por llamadas a funciones: cada llamada paga el
+    frame, el paso de argumentos y el 'return'.
+    '''
+    for name, n in (('fib.bminor', args.fib), ('gcd.bminor', args.gcd)):
+        out, elapsed = run(load(name), f'{n}\n', args.engine)
+        calls = int(out.split()[-1])
+        print(f'{name}: n={n}, {calls} llamadas en {elapsed:.2f}s '
+              f'({calls / elapsed:,.0f} llamadas/s)')
+
+
+def bench_depth(args):
+    '''
+    Recursión lineal muy profunda. Sólo los motores que no usan la pila
+    de Python para las llamadas de B-Minor (vm) la completan.
+    '''
+    out, elapsed = run(load('deep.bminor'), f'{args.depth}\n', args.engine)
+    expected = str(args.depth * (args.depth + 1) // 2)
+    print(f'depth: profundidad {args.depth} en {elapsed:.2f}s')
+    if out.strip() != expected:
+        raise SystemExit(f'depth: FALLO, se esperaba {expected}')
+    print('depth: ok')
+
+
+def bench_tail(args):
+    '''
+    Recursión en posición de cola de profundidad 'args.depth' con y sin
+    tailcall.py. Con las llamadas en posición de cola ejecutadas como un
+    ciclo todos los motores la completan; sin ellas sólo la VM, que no
+    usa la pila de Python (y su pila de llamadas crece con la recursión).
+    '''
+    source = load('tail.bminor')
+    expected = f'{args.depth * (args.depth + 1) // 2} 111 {2 * args.depth}'
+    print(f'tail: profundidad {args.depth:,}')
+    print(f"{'motor':<10}{'sin tailcall':>14}{'con tailcall':>14}")
+    failed = []
+    for engine in args.engine:
+        # Sin tailcall los motores que usan la pila de Python terminan con
+        # un RecursionError (reportado en stderr)
+        with contextlib.redirect_stderr(io.StringIO()):
+            outputs, times, _ = compare('tailcalls', source, f'{args.depth}\n', engine)
+        row = f'{engine:<10}'
+        for enabled, out, elapsed in zip((False, True), outputs, times):
+            if out.strip() == expected:
+                row += f'{elapsed:>13.2f}s'
+            else:
+                row += f"{'falla':>14}"
+                if enabled:
+                    failed.append(engine)
+        print(row)
+    if failed:
+        raise SystemExit(f"tail: FALLO con {', '.join(failed)}, se esperaba {expected!r}")
+    print('tail: ok')
+
+
+def bench_memo(args):
+    '''
+    Funciones puras recursivas (fib y binomial) con y sin memorización
+    (memo.py), con un cache de 'args.size' entradas por función.
+    '''
+    source = load('memo.bminor')
+    stdin = f'{args.n}\n{args.k}\n'
+    print(f'memo: fib({args.n}) y binomial({args.n}, {args.k}), '
+          f'cache de {args.size} entradas por función')
+    print(f"{'motor':<10}{'sin memo':>10}{'con memo':>16}")
+    for engine in args.engine:
+        expected, base = run(source, stdin, engine, check=True)
+        ast = parse(source)
+        stats = memoize(ast, args.size)
+        out = io.StringIO()
+        old_stdin, sys.stdin = sys.stdin, io.StringIO(stdin)
+        try:
+            with contextlib.redirect_stdout(out):
+                start = time.perf_counter()
+                make_engine(engine).interpret(ast)
+                elapsed = time.perf_counter() - start
+        finally:
+            sys.stdin = old_stdin
+        if out.getvalue() != expected:
+            raise SystemExit(f'memo: FALLO con {engine}, se esperaba {expected.strip()!r}')
+        print(f'{engine:<10}{base:>9.2f}s{elapsed:>9.3f}s {base / elapsed:>5.0f}x')
+    for cache in stats.caches:
+        print(f'  {cache}')
+
+
+def dead_module(functions):
+    '''
+    Módulo B-Minor generado con 'functions' funciones de las que main
+    sólo alcanza una de cada diez. Todas tienen una rama con condición
+    constante y una sentencia después del 'return'.
+    '''
+    lines = ['// Generado por bench.py dce', '']
+    for i in range(functions):
+        if i % 10 == 0:
+            callee = f'f{i - 10}(x - 1)' if i >= 10 else '0'
+        else:
+            callee = f'f{i - 1}(x)'
+        lines += [
+            f'f{i}: function integer (x: integer) = {{',
+            f'    y: integer = x * {i % 7 + 1} + {i};',
+            '    if (y > 1000) {',
+            '        y = y % 1000;',
+            '    } else {',
+            '        y = y + 1;',
+            '    }',
+            '    if (false) {',
+            f'        print "f{i}";',
+            '    }',
+            f'    return y + {callee};',
+            '    print "inalcanzable";',
+            '}',
+            '',
+        ]
+    last = (functions - 1) // 10 * 10
+    lines += ['main: function void () = {', f'    print f{last}(3);', '    print "\\n";', '}', '']
+    return '\n'.join(lines)
+
+
+def bench_dce(args):
+    '''
+    Módulos generados con muchas funciones inalcanzables: nodos, bytes
+    del C generado y tiempo del checker y de la carga en la VM
+    (resolución y compilación) con y sin dce.py antes del checker.
+    '''
+    import cgen
+
+    print(f"{'funciones':<12}{'':<5}{'nodos':>9}{'bytes C':>10}{'dce':>9}{'checker':>10}{'carga':>9}{'total':>9}")
+    for functions in args.functions:
+        source = dead_module(functions)
+        outputs = []
+        times = []
+        for shake in (False, True):
+            ast = parse(source)
+            start = time.perf_counter()
+            if shake:
+                stats = eliminate(ast)
+            shaken = time.perf_counter()
+            Check.checker(ast)
+            checked = time.perf_counter()
+            make_engine('vm').load(ast)
+            end = time.perf_counter()
+            nodes = sum(1 for _ in walk(ast.body))
+
+            code = parse(source)
+            if shake:
+                eliminate(code)
+            size = len(cgen.generate(code))
+            out, _ = run(source, engine='vm', check=True, passes=['dce'] if shake else [])
+            outputs.append(out)
+            times.append(end - start)
+            label = 'con' if shake else 'sin'
+            print(f'{functions:<12}{label:<5}{nodes:>9}{size:>10}{shaken - start:>8.3f}s'
+                  f'{checked - shaken:>9.3f}s{end - checked:>8.3f}s{end - start:>8.3f}s')
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f'dce: FALLO con {functions} funciones, salidas diferentes')
+        print(f"{'':<17}{stats.nodes} nodos y {len(stats.functions)} funciones eliminados, "
+              f'{times[0] / times[1]:.1f}x más rápido')
+
+
+def bench_loops(args):
+    '''
+    Dos ciclos 'for' anidados (outer * inner iteraciones) ejecutados con
+    y sin el reconocimiento de ciclos contados (loops.py).
+    '''
+    n, m = args.outer, args.inner
+    expected = f'{n * (m * (m - 1) // 2)} {n} {m}'
+    print(f'loops: {n} x {m} = {n * m:,} iteraciones')
+    print(f"{'motor':<10}{'normal':>10}{'contado':>16}")
+    for engine in args.engine:
+        outputs, times, _ = compare('counted', load('loops.bminor'), f'{n}\n{m}\n', engine)
+        for out in outputs:
+            if out.strip() != expected:
+                raise SystemExit(f'loops: FALLO con {engine}, se esperaba {expected!r} y se obtuvo {out.strip()!r}')
+        print(f'{engine:<10}{times[0]:>9.2f}s{times[1]:>9.2f}s {times[0] / times[1]:>5.1f}x')
+
+
+def bench_arrays(args):
+    '''
+    Criba de Eratóstenes (test/bench/sieve.bminor) con un array [n]
+    boolean guardado como lista de Python (el almacenamiento por defecto)
+    y como BitArray, un bit por elemento (Options.bits). Cada ejecución
+    corre en un proceso aparte para medir su RSS máximo.
+    '''
+    if args.child:
+        engine = make_engine(args.engine[0], bits=args.bits)
+        out, elapsed = run(load('sieve.bminor'), f'{args.n}\n', engine, check=True)
+        print(out.strip(), elapsed, peak_rss())
+        return
+
+    print(f'arrays: criba de {args.n:,} elementos')
+    print(f"{'motor':<10}{'lista':>22}{'BitArray':>30}")
+    for engine in args.engine:
+        results = []
+        for bits in (False, True):
+            cmd = [sys.executable, os.path.abspath(__file__), 'arrays', '--child',
+                   '--n', str(args.n), '--engine', engine] + (['--bits'] if bits else [])
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode:
+                raise SystemExit(f'arrays: FALLO con {engine}\n{proc.stderr}')
+            count, elapsed, rss = proc.stdout.split()[-3:]
+            results.append((count, float(elapsed), int(rss)))
+        if results[0][0] != results[1][0]:
+            raise SystemExit(f'arrays: FALLO con {engine}, {results[1][0]} primos en lugar de {results[0][0]}')
+        row = f'{engine:<10}'
+        for count, elapsed, rss in results:
+            row += f'{elapsed:>9.2f}s {rss / 2**20:>9.1f} MB RSS'
+        print(row + f'   ({results[0][2] / results[1][2]:.1f}x menos memoria, '
+                    f'{results[1][1] / results[0][1]:.1f}x más tiempo)')
+
+
+def bench_matrix(args):
+    '''
+    Producto de matrices n x n con arrays de arrays (a[i][j], un solo
+    buffer por matriz) y con un array plano indexado a mano
+    (a[i * n + j]).
+    '''
+    print(f'matrix: producto de matrices {args.n} x {args.n}')
+    print(f"{'motor':<10}{'a[i * n + j]':>14}{'a[i][j]':>16}")
+    for engine in args.engine:
+        outputs, times = [], []
+        for name in ('matrix_flat.bminor', 'matrix.bminor'):
+            out, elapsed = run(load(name), f'{args.n}\n', engine, check=True)
+            outputs.append(out)
+            times.append(elapsed)
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f'matrix: FALLO con {engine}, {outputs[1].strip()} en lugar de {outputs[0].strip()}')
+        print(f'{engine:<10}{times[0]:>13.2f}s{times[1]:>9.2f}s {times[0] / times[1]:>5.2f}x')
+
+
+def bench_pool(args):
+    '''
+    Dos funciones con un array local (de 4 y de 'args.m' elementos)
+    llamadas 'args.n' veces, creando sus arrays en cada llamada y
+    reutilizando los buffers de los que no escapan (escape.py).
+    '''
+    n, m = args.n, args.m
+    print(f'pool: {n:,} llamadas con arrays locales de 4 y {m} elementos')
+    print(f"{'motor':<10}{'nuevos':>10}{'reutilizados':>18}")
+    for engine in args.engine:
+        outputs, times, _ = compare('pooling', load('pool.bminor'), f'{n}\n{m}\n', engine, check=True)
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f'pool: FALLO con {engine}, {outputs[1].strip()} en lugar de {outputs[0].strip()}')
+        print(f'{engine:<10}{times[0]:>9.2f}s{times[1]:>9.2f}s {times[0] / times[1]:>5.2f}x')
+
+
+def bench_overflow(args):
+    '''
+    Filtro de tres puntos sobre un array de 'args.n' enteros, aplicado
+    'args.k' veces, verificando que cada operación entera quepa en 64
+    bits y sin verificar las que ranges.py acota.
+    '''
+    n, k = args.n, args.k
+    ast = parse(load('overflow.bminor'))
+    print(mark_ranges(ast))
+    print(f'overflow: filtro sobre {n:,} enteros, {2 * k} pasadas')
+    print(f"{'motor':<10}{'verificadas':>12}{'acotadas':>14}")
+    for engine in args.engine:
+        outputs, times, _ = compare('ranges', load('overflow.bminor'), f'{n}\n{k}\n', engine, check=True)
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f'overflow: FALLO con {engine}, {outputs[1].strip()} en lugar de {outputs[0].strip()}')
+        print(f'{engine:<10}{times[0]:>11.2f}s{times[1]:>9.2f}s {times[0] / times[1]:>5.2f}x')
+
+
+def bench_engines(args):
+    '''
+    Ejecuta test/interp y test/exercises con cada motor, verifica que
+    la salida sea idéntica a la del intérprete tree-walking y reporta
+    la aceleración respecto a él.
+    '''
+    files = sorted(glob.glob(os.path.join(TEST_DIR, 'interp', '*.bminor')))
+    files += sorted(glob.glob(os.path.join(TEST_DIR, 'exercises', '*.bminor')))
+    engines = [e for e in args.engine if e != 'tree']
+
+    print(f"{'programa':<28}{'tree':>10}" + ''.join(f'{e:>16}' for e in engines))
+    failed = 0
+    totals = dict.fromkeys(['tree'] + engines, 0.0)
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        expected, base = run(source)
+        totals['tree'] += base
+        row = f'{os.path.relpath(path, TEST_DIR):<28}{base:>9.3f}s'
+        for engine in engines:
+            out, elapsed = run(source, engine=engine)
+            totals[engine] += elapsed
+            if out != expected:
+                failed += 1
+                row += f"{'DIFERENTE':>16}"
+            else:
+                row += f'{elapsed:>8.3f}s {base / elapsed:>5.1f}x'
+        print(row)
+
+    row = f"{'total':<28}{totals['tree']:>9.3f}s"
+    for engine in engines:
+        row += f"{totals[engine]:>8.3f}s {totals['tree'] / totals[engine]:>5.1f}x"
+    print(row)
+    if failed:
+        raise SystemExit(f'engines: {failed} salidas diferentes al intérprete')
+
+
+def bench_native(args):
+    '''
+    Compila test/interp y test/exercises a C (cgen.py) o a ensamblador
+    x86-64 (asmgen.py), verifica que la salida del ejecutable sea
+    idéntica a la del intérprete y compara los tiempos de ejecución.
+    '''
+    import cgen
+    import asmgen
+
+    lang = 's' if args.backend == 'asm' else 'c'
+
+    files = sorted(glob.glob(os.path.join(TEST_DIR, 'interp', '*.bminor')))
+    files += sorted(glob.glob(os.path.join(TEST_DIR, 'exercises', '*.bminor')))
+
+    print(f"{'programa':<28}{args.ref:>10}{args.backend:>10}{'nativo':>16}")
+    failed = 0
+    totals = [0.0, 0.0]
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        expected, base = run(source, engine=args.ref, check=True)
+
+        start = time.perf_counter()
+        try:
+            if args.backend == 'asm':
+                code = asmgen.generate(parse(source), args.level)
+            else:
+                code = cgen.generate(parse(source))
+        except cgen.CodegenError as e:
+            # Programas con construcciones que el back-end no soporta
+            # (por ejemplo arrays de arrays): sólo los ejecuta el intérprete
+            print(f'{os.path.relpath(path, TEST_DIR):<28}{base:>9.3f}s  no soportado: {e}')
+            continue
+        exe = cgen.build(code, lang=lang)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        proc = subprocess.run([exe], input=b'', stdout=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+        out = proc.stdout.decode('utf-8')
+
+        totals[0] += base
+        totals[1] += elapsed
+        row = f'{os.path.relpath(path, TEST_DIR):<28}{base:>9.3f}s{build:>9.3f}s'
+        if out != expected:
+            failed += 1
+            row += f"{'DIFERENTE':>16}"
+        else:
+            row += f'{elapsed:>8.3f}s {base / elapsed:>5.0f}x'
+        print(row)
+
+    print(f"{'total':<28}{totals[0]:>9.3f}s{'':>10}{totals[1]:>8.3f}s {totals[0] / totals[1]:>5.0f}x")
+    if failed:
+        raise SystemExit(f'native: {failed} salidas diferentes al intérprete')
+
+
+def bench_pass(args):
+    '''
+    Ejecuta test/interp y test/exercises con y sin la pasada 'args.bench'
+    (fold, inline, peval, cse, licm o bounds), verifica que la salida no cambie y reporta los nodos
+    transformados (en bounds, las verificaciones de límites eliminadas) y la aceleración.
+    '''
+    name = args.bench
+    files = sorted(glob.glob(os.path.join(TEST_DIR, 'interp', '*.bminor')))
+    files += sorted(glob.glob(os.path.join(TEST_DIR, 'exercises', '*.bminor')))
+
+    print(f"{'programa':<28}{'nodos':>8}{'sin ' + name:>12}{'con ' + name:>16}")
+    failed = 0
+    totals = [0.0, 0.0]
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        ast = parse(source)
+        Check.checker(ast)
+        nodes = AST_PASSES[name](ast).total
+
+        expected, base = run(source, engine=args.engine, check=True)
+        out, elapsed = run(source, engine=args.engine, passes=[name])
+        totals[0] += base
+        totals[1] += elapsed
+        row = f'{os.path.relpath(path, TEST_DIR):<28}{nodes:>8}{base:>11.3f}s'
+        if out != expected:
+            failed += 1
+            row += f"{'DIFERENTE':>16}"
+        else:
+            row += f'{elapsed:>8.3f}s {base / elapsed:>5.2f}x'
+        print(row)
+
+    print(f"{'total':<36}{totals[0]:>11.3f}s{totals[1]:>8.3f}s {totals[0] / totals[1]:>5.2f}x")
+    if failed:
+        raise SystemExit(f'{name}: {failed} salidas diferentes sin la pasada')
+
+
+def bench_specialize(args):
+    '''
+    Ejecuta test/interp y test/exercises (verificados) con las operaciones
+    genéricas y especializadas por tipo, verifica que la salida no cambie
+    y reporta las operaciones especializadas y la aceleración.
+    '''
+    files = sorted(glob.glob(os.path.join(TEST_DIR, 'interp', '*.bminor')))
+    files += sorted(glob.glob(os.path.join(TEST_DIR, 'exercises', '*.bminor')))
+
+    print(f"{'programa':<28}{'ops':>8}{'genérico':>12}{'especializado':>16}")
+    failed = 0
+    totals = [0.0, 0.0]
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        ast = parse(source)
+        Check.checker(ast)
+        ops = Specializer.specialize(ast).total
+
+        expected, base = run(source, engine=args.engine, check=True, generic=True)
+        out, elapsed = run(source, engine=args.engine, check=True)
+        totals[0] += base
+        totals[1] += elapsed
+        row = f'{os.path.relpath(path, TEST_DIR):<28}{ops:>8}{base:>11.3f}s'
+        if out != expected:
+            failed += 1
+            row += f"{'DIFERENTE':>16}"
+        else:
+            row += f'{elapsed:>8.3f}s {base / elapsed:>5.2f}x'
+        print(row)
+
+    print(f"{'total':<36}{totals[0]:>11.3f}s{totals[1]:>8.3f}s {totals[0] / totals[1]:>5.2f}x")
+    if failed:
+        raise SystemExit(f'specialize: {failed} salidas diferentes sin especializar')
+
+
+def bench_power(args):
+    '''
+    Potencias ('^') y productos, divisiones y módulos enteros por
+    potencias de dos con las operaciones genéricas (interp.binary_op),
+    especializadas por tipo y además con reducción de fuerza
+    (strength.py). Verifica que la salida no cambie.
+    '''
+    source = load('power.bminor')
+    stdin = f'{args.n}\n'
+    ast = parse(source)
+    Check.checker(ast)
+    print(f'power: {args.n:,} iteraciones, {StrengthReducer.reduce(ast)}')
+    print(f"{'motor':<10}{'genérico':>10}{'especializado':>16}{'con strength':>16}")
+    for engine in args.engine:
+        expected, base = run(source, stdin, engine, check=True, generic=True)
+        row = f'{engine:<10}{base:>9.2f}s'
+        for passes in ((), ('strength',)):
+            out, elapsed = run(source, stdin, engine, check=True, passes=passes)
+            if out != expected:
+                raise SystemExit(f'power: FALLO con {engine}, se esperaba {expected.strip()!r}')
+            row += f'{elapsed:>9.2f}s {base / elapsed:>5.2f}x'
+        print(row)
+
+
+def bench_super(args):
+    '''
+    Ejecuta test/exercises en la VM con y sin superinstrucciones, verifica
+    que la salida no cambie y reporta la aceleración y, por cada forma,
+    los sitios del bytecode y las veces que se ejecutó.
+    '''
+    files = sorted(glob.glob(os.path.join(TEST_DIR, 'exercises', '*.bminor')))
+    patterns = {}
+
+    print(f"{'programa':<28}{'sin':>10}{'con':>16}")
+    failed = 0
+    totals = [0.0, 0.0]
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        outs, times, engine = compare('superinstructions', source, engine='vm', check=True)
+        for pattern, sites, hits in engine.superinstructions():
+            total = patterns.setdefault(pattern, [0, 0])
+            total[0] += sites
+            total[1] += hits
+        totals[0] += times[0]
+        totals[1] += times[1]
+        row = f'{os.path.relpath(path, TEST_DIR):<28}{times[0]:>9.3f}s'
+        if outs[0] != outs[1]:
+            failed += 1
+            row += f"{'DIFERENTE':>16}"
+        else:
+            row += f'{times[1]:>8.3f}s {times[0] / times[1]:>5.2f}x'
+        print(row)
+    print(f"{'total':<28}{totals[0]:>9.3f}s{totals[1]:>8.3f}s {totals[0] / totals[1]:>5.2f}x")
+
+    print(f"\n{'forma':<16}{'sitios':>8}{'ejecuciones':>16}")
+    for pattern, (sites, hits) in patterns.items():
+        print(f'{pattern:<16}{sites:>8}{hits:>16,}')
+    if failed:
+        raise SystemExit(f'super: {failed} salidas diferentes sin superinstrucciones')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bminor benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('recursion', help='llamadas recursivas con RSS acotado')
+    p.add_argument('--calls', type=int, default=1_000_000, help='número de llamadas')
+    p.add_argument('--limit', type=float, default=16, help='crecimiento máximo de RSS (MB)')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_recursion)
+
+    p = sub.add_parser('calls', help='programas con muchas llamadas (fib, gcd)')
+    p.add_argument('--fib', type=int, default=29, help='argumento de fib(n)')
+    p.add_argument('--gcd', type=int, default=200_000, help='iteraciones de main (cada una llama a gcd)')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_calls)
+
+    p = sub.add_parser('engines', help='compara los motores de ejecución con el intérprete')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a comparar (por defecto: todos)')
+    p.set_defaults(func=bench_engines)
+
+    p = sub.add_parser('depth', help='recursión profunda sin usar la pila de Python')
+    p.add_argument('--depth', type=int, default=1_000_000, help='profundidad de la recursión')
+    p.add_argument('--engine', choices=ENGINES, default='vm', help='motor de ejecución')
+    p.set_defaults(func=bench_depth)
+
+    p = sub.add_parser('tail', help='recursión en posición de cola con y sin tailcall.py')
+    p.add_argument('--depth', type=int, default=1_000_000, help='profundidad de la recursión')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: todos)')
+    p.set_defaults(func=bench_tail)
+
+    p = sub.add_parser('memo', help='funciones puras recursivas con y sin memorización')
+    p.add_argument('--n', type=int, default=22, help='argumento de fib y de binomial')
+    p.add_argument('--k', type=int, default=11, help='segundo argumento de binomial')
+    p.add_argument('--size', type=int, default=4096, help='entradas del cache de cada función')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: todos)')
+    p.set_defaults(func=bench_memo)
+
+    p = sub.add_parser('dce', help='módulos grandes generados con y sin eliminación de código muerto')
+    p.add_argument('--functions', type=int, action='append',
+                   help='funciones del módulo generado (por defecto: 500 y 2000)')
+    p.set_defaults(func=bench_dce)
+
+    p = sub.add_parser('loops', help='ciclos for anidados con y sin ciclos contados')
+    p.add_argument('--outer', type=int, default=1000, help='iteraciones del ciclo externo')
+    p.add_argument('--inner', type=int, default=10_000, help='iteraciones del ciclo interno')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: tree, closure y vm)')
+    p.set_defaults(func=bench_loops)
+
+    p = sub.add_parser('arrays', help='memoria y tiempo de un array de booleans como lista y como BitArray')
+    p.add_argument('--n', type=int, default=10_000_000, help='elementos del array de la criba')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: closure, vm y python)')
+    p.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    p.add_argument('--bits', action='store_true', help=argparse.SUPPRESS)
+    p.set_defaults(func=bench_arrays)
+
+    p = sub.add_parser('matrix', help='arrays de arrays comparados con un array plano indexado a mano')
+    p.add_argument('--n', type=int, default=120, help='tamaño de las matrices')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: closure, vm y python)')
+    p.set_defaults(func=bench_matrix)
+
+    p = sub.add_parser('pool', help='arrays locales nuevos en cada llamada y reutilizados')
+    p.add_argument('--n', type=int, default=200_000, help='llamadas a cada función')
+    p.add_argument('--m', type=int, default=16, help='elementos del array local grande')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: closure, vm y python)')
+    p.set_defaults(func=bench_pool)
+
+    p = sub.add_parser('overflow', help='operaciones enteras de 64 bits verificadas y acotadas por rangos')
+    p.add_argument('--n', type=int, default=20_000, help='elementos del array')
+    p.add_argument('--k', type=int, default=20, help='pasadas de ida y vuelta del filtro')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: closure, vm y python)')
+    p.set_defaults(func=bench_overflow)
+
+    p = sub.add_parser('native', help='compara los back-ends nativos con el intérprete')
+    p.add_argument('--ref', choices=ENGINES, default='tree',
+                   help='motor de referencia (por defecto: tree)')
+    p.add_argument('--backend', choices=('c', 'asm'), default='c',
+                   help='back-end a compilar (por defecto: c)')
+    p.add_argument('-O', dest='level', type=int, default=2, choices=range(4),
+                   help='nivel de optimización del back-end asm (por defecto: 2)')
+    p.set_defaults(func=bench_native)
+
+    p = sub.add_parser('fold', help='compara la ejecución con y sin plegado de constantes')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('licm', help='compara la ejecución con y sin extracción de código invariante')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('bounds', help='compara la ejecución con y sin verificaciones de límites')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('cse', help='compara la ejecución con y sin eliminación de subexpresiones comunes')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('inline', help='compara la ejecución con y sin expansión en línea de funciones')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('peval', help='compara la ejecución con y sin evaluación parcial de llamadas puras')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_pass)
+
+    p = sub.add_parser('power', help='potencias genéricas, especializadas y con reducción de fuerza')
+    p.add_argument('--n', type=int, default=50_000, help='iteraciones del ciclo')
+    p.add_argument('--engine', choices=ENGINES, action='append',
+                   help='motor a medir (por defecto: todos)')
+    p.set_defaults(func=bench_power)
+
+    p = sub.add_parser('specialize', help='compara las operaciones genéricas con las especializadas por tipo')
+    p.add_argument('--engine', choices=ENGINES, default='tree', help='motor de ejecución')
+    p.set_defaults(func=bench_specialize)
+
+    p = sub.add_parser('super', help='compara la VM con y sin superinstrucciones')
+    p.set_defaults(func=bench_super)
+
+    args = parser.parse_args()
+    if args.bench in ('engines', 'tail', 'memo', 'power') and not args.engine:
+        args.engine = list(ENGINES)
+    if args.bench == 'dce' and not args.functions:
+        args.functions = [500, 2000]
+    if args.bench in ('arrays', 'matrix', 'pool', 'overflow') and not args.engine:
+        args.engine = ['closure', 'vm', 'python']
+    if args.bench == 'loops' and not args.engine:
+        args.engine = ['tree', 'closure', 'vm']
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,19 @@ def main():
     parser.add_argument('--checker', help='checker a file')
     parser.add_argument('--ast', help='show ast')
     parser.add_argument('--interp', help='interpreter a file')
+    parser.add_argument('--dis', help='show bytecode')
+    parser.add_argument('--compile', help='compile a file to a native executable')
+    parser.add_argument('-o', dest='output', help='output executable for --compile')
+    parser.add_argument('--backend', default='c', choices=['c', 'asm'],
+                        help='native backend for --compile (C or x86-64 assembly)')
+    parser.add_argument('-O', dest='level', type=int, choices=range(4),
+                        help='optimization level of the IR pipeline (asm backend)')
+    parser.add_argument('--engine', default='tree', choices=['tree', 'closure', 'vm', 'python'],
+                        help='execution engine for --interp')
+    parser.add_argument('--emit', choices=['python', 'c', 'asm'],
+                        help='show generated code for --interp instead of running it')
+    parser.add_argument('--bits', action='store_true',
+                        help='store boolean arrays with one bit per element for --interp')
     args = parser.parse_args()
 
     if args.scan:
@@ -24,7 +37,11 @@ def main():
     elif args.ast:
         ast(args.ast)
     elif args.interp:
-        interpreter(args.interp)
+        interpreter(args.interp, args.engine, args.emit, args.bits)
+    elif args.dis:
+        dis(args.dis)
+    elif args.compile:
+        compile(args.compile, args.output, args.backend, args.level)
 
 def scan(file):
     cmd = ["python3", './lexer.py', file]
@@ -56,8 +73,12 @@ def checker(file):
         # print with lines 
         print(stdout)
     
-def interpreter(file):
-    cmd = ["python3", './interp.py', file]
+def interpreter(file, engine='tree', emit=None, bits=False):
+    cmd = ["python3", './interp.py', '--engine', engine, file]
+    if emit:
+        cmd += ['--emit', emit]
+    if bits:
+        cmd += ['--bits']
     p = Popen(cmd, stdout=PIPE, stderr=PIPE, encoding='utf-8')
     stdout, stderr = p.communicate()
     if stderr:
@@ -77,6 +98,28 @@ def ast(file):
         # print with lines 
         print(stdout)
     
+def dis(file):
+    cmd = ["python3", './vm.py', '--dis', file]
+    p = Popen(cmd, stdout=PIPE, stderr=PIPE, encoding='utf-8')
+    stdout, stderr = p.communicate()
+    if stderr:
+        print(stderr)
+    else:
+        print(stdout)
+
+def compile(file, output=None, backend='c', level=None):
+    cmd = ["python3", './asmgen.py' if backend == 'asm' else './cgen.py', file]
+    if output:
+        cmd += ['-o', output]
+    if level is not None and backend == 'asm':
+        cmd += [f'-O{level}']
+    p = Popen(cmd, stdout=PIPE, stderr=PIPE, encoding='utf-8')
+    stdout, stderr = p.communicate()
+    if stderr:
+        print(stderr)
+    else:
+        print(stdout)
+
 
 if __name__ == '__main__':
     main()
@@ -85,4 +128,4 @@ if __name__ == '__main__':
 ## pruebas para
 # palabras reservadas
 # identificadores
-# literales: char, string, integer, float, boolean
\ No newline at end of file
+# literales: char, string, integer, float, boolean
@@ -0,0 +1,410 @@
+'''
+Eliminación de verificaciones de límites sobre el AST verificado.
+
+Se ejecuta después de Check.checker. Para cada ciclo 'for' contado
+sobre una variable entera i (ver loops.py) calcula el rango de valores
+que i toma dentro del cuerpo:
+
+    for (i = s; i < E; i = i + k)       s <= i < E     (k > 0)
+    for (i = E; i >= s; i = i - k)      s <= i <= E    (k > 0)
+
+donde E es un literal, una variable o array_length(a), más o menos un
+literal. El límite inferior s puede ser un literal o una expresión
+sobre las variables de los ciclos que contienen a éste (j = i * i).
+
+Un acceso a[i + c] (c un literal, puede faltar) del cuerpo está dentro
+de los límites si s + c >= 0 y además:
+
+  - E es array_length(a) (el mismo a), o
+  - E es la variable N y a se declaró como 'array [N] T' con ese mismo
+    N, o E y el tamaño declarado de a son números conocidos,
+
+y el cuerpo no modifica (asigna, incrementa ni declara) i, a ni las
+variables de E. Con un tamaño declarado, a y N no se asignan en todo el
+programa (su valor es el de la declaración). Si alguna de esas
+variables es global y el cuerpo llama a funciones, el ciclo no se
+analiza.
+
+Los accesos demostrados se marcan con n.unchecked = True y los motores
+los ejecutan sin verificar el tipo del array, el del índice ni sus
+límites (un array que no acepta el valor guardado sigue siendo un error
+de ejecución). Los demás se verifican igual que antes.
+
+usage:
+    python3 bounds.py <filename>
+'''
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, assigned_name, FLIP, for_step, expr_text
+from typesys import is_array
+
+
+class BoundsStats:
+    def __init__(self):
+        self.loads = 0              # lecturas a[i] sin verificación
+        self.stores = 0             # escrituras a[i] = ... sin verificación
+        self.accesses = 0           # accesos a[i] del programa
+        self.proofs = []            # (función, línea, 'for i' o 'constantes', [accesos])
+
+    @property
+    def total(self):
+        return self.loads + self.stores
+
+    def __str__(self):
+        lines = [f'bounds: {self.total} de {self.accesses} accesos a arrays sin verificación '
+                 f'de límites ({self.loads} lecturas, {self.stores} escrituras)']
+        for func, lineno, reason, accesses in self.proofs:
+            lines.append(f'  {func}:{lineno} {reason}: {", ".join(accesses)}')
+        return '\n'.join(lines)
+
+
+def _int(n):
+    '''Valor del literal entero n, o None.'''
+    if isinstance(n, Integer) and n.value.__class__ is int:
+        return n.value
+    return None
+
+
+def _offset(n):
+    '''(expresión, c) de n = expresión + c con c un literal entero.'''
+    if isinstance(n, BinOper) and n.right is not None and n.oper in ('+', '-'):
+        c = _int(n.right)
+        if c is not None:
+            return n.left, c if n.oper == '+' else -c
+        if n.oper == '+' and _int(n.left) is not None:
+            return n.right, _int(n.left)
+    return n, 0
+
+
+class BoundsChecks:
+    @classmethod
+    def eliminate(cls, program: Program):
+        '''Marca los accesos del programa (ya verificado) que no necesitan verificarse.'''
+        bounds = cls()
+        bounds.stats = BoundsStats()
+        bounds.functions = {d.name for d in program.body if isinstance(d, FuncDecl)}
+        bounds.globals = {}
+        for decl in program.body:
+            if isinstance(decl, (VarDecl, VarDeclInit)):
+                # Un global declarado dos veces no se analiza
+                bounds.globals[decl.name] = None if decl.name in bounds.globals else decl
+        for decl in bounds.globals.values():
+            if isinstance(decl, VarDecl) and isinstance(decl.type, ArrayType) \
+                    and isinstance(decl.type.size, Identifier):
+                decl.size_decl = bounds.globals.get(decl.type.size.name)
+        # Variables asignadas en alguna función (sus globales cambian)
+        bounds.written = {assigned_name(n) for n in walk(program.body)} - {None}
+        nodes = list(walk(program.body))
+        bounds.stores = {id(n.left) for n in nodes if isinstance(n, Assign)}
+        bounds.incrs = {id(n.expr) for n in nodes if isinstance(n, (PreInc, PreDec))}
+        bounds.marked = set()
+        # Si un inicializador global llama a una función, ésta podría
+        # leer un array global que todavía no se creó
+        bounds.early = any(isinstance(n, Call) and not bounds._builtin(n)
+                           for d in program.body if isinstance(d, VarDeclInit)
+                           for n in walk([d]))
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                bounds._function(decl)
+        bounds.stats.accesses = sum(1 for n in nodes if bounds._candidate(n))
+        return bounds.stats
+
+    def _function(self, func):
+        self.func = func
+        self.locals = {}            # nombre -> declaraciones en la función
+        for p in func.params:
+            self.locals.setdefault(p.name, []).append(p)
+        for n in walk(func.body):
+            if isinstance(n, (VarDecl, VarDeclInit)):
+                self.locals.setdefault(n.name, []).append(n)
+        self.local_written = {assigned_name(n) for n in walk(func.body)} - {None}
+        self.declared = {p.name for p in func.params}
+        self.ranges = {}            # variable de un ciclo que contiene -> límite inferior
+        self._block(func.body)
+
+    # =====================================================================
+    # Declaraciones
+    # =====================================================================
+    def _decl(self, name):
+        '''
+        Declaración a la que se refiere 'name' en este punto de la función
+        (como resolve.py: un local antes de declararse es el global), o
+        None si no se puede saber.
+        '''
+        if name in self.declared:
+            decls = self.locals[name]
+            return decls[0] if len(decls) == 1 else None
+        if name in self.locals and name not in self.globals:
+            return None
+        return self.globals.get(name)
+
+    def _global(self, decl):
+        return not isinstance(decl, Param) and self.globals.get(decl.name) is decl
+
+    def _constant(self, decl):
+        '''True si la variable 'decl' conserva siempre el valor de su declaración.'''
+        written = self.written if self._global(decl) else self.local_written
+        return decl.name not in written
+
+    def _value(self, n):
+        '''Valor entero de n si se conoce al compilar (literal o constante), o None.'''
+        if _int(n) is not None:
+            return n.value
+        if isinstance(n, Identifier):
+            decl = self._decl(n.name)
+            if isinstance(decl, VarDeclInit) and self._constant(decl) \
+                    and not isinstance(decl.init, list):
+                return _int(decl.init)
+        return None
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def _block(self, stmts):
+        for stmt in stmts or []:
+            self._stmt(stmt)
+
+    def _stmt(self, n):
+        if isinstance(n, IfStmt):
+            self._constants(n, [n.cond])
+        elif isinstance(n, (WhileStmt, DoWhileStmt)):
+            self._constants(n, [n.cond])
+        elif isinstance(n, ForStmt):
+            self._constants(n, [n.init, n.cond, n.step])
+        elif not isinstance(n, Block):
+            self._constants(n, [n])
+        if isinstance(n, (VarDecl, VarDeclInit)):
+            self.declared.add(n.name)
+            if isinstance(n.type, ArrayType) and isinstance(n.type.size, Identifier):
+                # La variable del tamaño, vista desde la declaración
+                n.size_decl = self._decl(n.type.size.name)
+        elif isinstance(n, Block):
+            self._block(n.body)
+        elif isinstance(n, IfStmt):
+            self._block(n.then_branch)
+            self._block(n.else_branch)
+        elif isinstance(n, (WhileStmt, DoWhileStmt)):
+            self._block(n.body if isinstance(n.body, list) else [n.body])
+        elif isinstance(n, ForStmt):
+            self._loop(n)
+
+    def _loop(self, n):
+        loop = self._range(n)
+        if loop is None:
+            self._block(n.body)
+            return
+        var, lo, hi, calls = loop
+        saved = self.ranges
+        self.ranges = dict(saved, **{var.name: lo})
+        self._block(n.body)
+        self.ranges = saved
+
+        if hi is None:
+            return
+        proven = []
+        for node in walk(n.body):
+            if self._candidate(node) and self._inside(node, var, lo, hi, calls, n):
+                proven.append(node)
+        self._mark(n, f'for {var.name}', proven)
+
+    def _constants(self, stmt, exprs):
+        '''Marca los accesos a[c] de 'exprs' con 0 <= c < tamaño declarado de a.'''
+        proven = []
+        for node in walk([e for e in exprs if e is not None]):
+            if self._candidate(node) and _int(node.pos) is not None and node.pos.value >= 0:
+                size = self._size(self._decl(node.array.name))
+                if size is not None and size[1] is not None and node.pos.value < size[1]:
+                    proven.append(node)
+        self._mark(stmt, 'constantes', proven)
+
+    def _mark(self, stmt, reason, proven):
+        proven = [node for node in proven if id(node) not in self.marked]
+        for node in proven:
+            node.unchecked = True
+            self.marked.add(id(node))
+            if id(node) in self.stores:
+                self.stats.stores += 1
+            else:
+                self.stats.loads += 1
+        if proven:
+            self.stats.proofs.append((self.func.name, getattr(stmt, 'lineno', '?'), reason,
+                                      [f'{expr_text(a.array)}[{expr_text(a.pos)}]' for a in proven]))
+
+    def _candidate(self, n):
+        '''Accesos a[...] que se pueden ejecutar sin verificar (no a[i][j] ni ++a[i]).'''
+        return (isinstance(n, ArrayAccess) and isinstance(n.array, Identifier)
+                and not is_array(getattr(n, 'type', 'undefined')) and id(n) not in self.incrs)
+
+    # =====================================================================
+    # Rangos
+    # =====================================================================
+    def _range(self, n):
+        '''
+        (variable, s, E, llamadas) si dentro del cuerpo del 'for' n vale
+        s <= i < E (y si el cuerpo llama a funciones), o None. E es una
+        cota de _upper, o None si sólo se conoce s.
+        '''
+        step = for_step(n.step) if n.step is not None else None
+        init = n.init
+        if step is None or not (isinstance(init, Assign) and isinstance(init.left, Identifier)
+                                and init.left.name == step[0].name):
+            return None
+        var, inc, sign = step
+        if getattr(var, 'type', None) != 'integer':
+            return None
+        # Los valores de i van en un solo sentido
+        k = _int(inc) if _int(inc) is not None else self._lower(inc)
+        if k is None or k < 0:
+            return None
+
+        cond, oper, bound = n.cond, None, None
+        if isinstance(cond, BinOper) and cond.oper in FLIP:
+            if isinstance(cond.left, Identifier) and cond.left.name == var.name:
+                oper, bound = cond.oper, cond.right
+            elif isinstance(cond.right, Identifier) and cond.right.name == var.name:
+                oper, bound = FLIP[cond.oper], cond.left
+        lo = hi = None
+        if sign > 0:
+            lo = self._lower(init.right)
+            if oper in ('<', '<='):
+                hi = self._upper(bound)
+                if hi is not None and oper == '<=':
+                    hi = (hi[0], hi[1], hi[2] + 1)
+        elif oper in ('>', '>='):
+            lo, hi = _int(bound), self._upper(init.right)
+            if lo is not None and oper == '>':
+                lo += 1
+            if hi is not None:
+                hi = (hi[0], hi[1], hi[2] + 1)
+        if lo is None:
+            return None
+        if hi is None:
+            bound = None
+
+        # Lo que el cuerpo puede modificar
+        names = {var.name} | {e.name for e in walk([bound, inc, init.right])
+                              if isinstance(e, Identifier)}
+        calls = False
+        for node in walk(n.body):
+            if isinstance(node, Call):
+                calls |= not self._builtin(node)
+            elif isinstance(node, (VarDecl, VarDeclInit)) and node.name in names:
+                return None
+            elif assigned_name(node) in names:
+                return None
+        if calls and any(self._global(d) for d in map(self._decl, names) if d is not None):
+            return None
+        if any(self._decl(name) is None for name in names if name != var.name):
+            return None
+        return var, lo, hi, calls
+
+    def _builtin(self, n):
+        return isinstance(n.func, Identifier) and n.func.name == 'array_length' \
+            and n.func.name not in self.functions
+
+    def _lower(self, n):
+        '''Cota inferior entera de la expresión n, o None.'''
+        if _int(n) is not None:
+            return n.value
+        if isinstance(n, Identifier):
+            return self.ranges.get(n.name)
+        if isinstance(n, BinOper) and n.right is not None and n.oper in ('+', '*'):
+            a, b = self._lower(n.left), self._lower(n.right)
+            if a is None or b is None:
+                return None
+            if n.oper == '+':
+                return a + b
+            if a >= 0 and b >= 0:
+                return a * b
+        if isinstance(n, BinOper) and n.right is not None and n.oper == '-' and _int(n.right) is not None:
+            a = self._lower(n.left)
+            return None if a is None else a - n.right.value
+        return None
+
+    def _upper(self, n):
+        '''
+        Cota superior (exclusiva) de un límite: (declaración, 'len', d)
+        para array_length(a) + d, (declaración, None, d) para N + d y
+        (None, K, d) para un número conocido K + d.
+        '''
+        base, d = _offset(n)
+        if self._value(base) is not None:
+            return None, self._value(base), d
+        if isinstance(base, Identifier):
+            decl = self._decl(base.name)
+            return None if decl is None else (decl, None, d)
+        if isinstance(base, Call) and self._builtin(base) and len(base.args) == 1 \
+                and isinstance(base.args[0], Identifier):
+            decl = self._decl(base.args[0].name)
+            return None if decl is None else (decl, 'len', d)
+        return None
+
+    def _size(self, decl):
+        '''Tamaño declarado del array 'decl': (declaración de N, None) o (None, K), o None.'''
+        if not isinstance(decl, (VarDecl, VarDeclInit)) or not isinstance(decl.type, ArrayType) \
+                or isinstance(decl.type.elem_type, ArrayType) or not self._constant(decl) \
+                or (self.early and self._global(decl)):
+            return None
+        if isinstance(decl, VarDeclInit):
+            # Un inicializador {...}: el array tiene un elemento por valor
+            return (None, len(decl.init)) if isinstance(decl.init, list) else None
+        size = decl.type.size
+        if _int(size) is not None:
+            return None, size.value
+        if isinstance(size, Identifier) and getattr(decl, 'size_decl', None) is not None:
+            init = getattr(decl.size_decl, 'init', None)
+            if isinstance(decl.size_decl, VarDeclInit) and self._constant(decl.size_decl) \
+                    and _int(init) is not None:
+                return None, init.value
+            if self._constant(decl.size_decl):
+                return decl.size_decl, None
+        return None
+
+    def _inside(self, node, var, lo, hi, calls, loop):
+        '''True si el acceso 'node' del cuerpo de 'loop' está dentro de los límites.'''
+        index, c = _offset(node.pos)
+        if not (isinstance(index, Identifier) and index.name == var.name) or lo + c < 0:
+            return False
+        decl = self._decl(node.array.name)
+        if decl is None:
+            return False
+        # El array no cambia dentro del cuerpo
+        for n in walk(loop.body):
+            if assigned_name(n) == decl.name or (isinstance(n, (VarDecl, VarDeclInit))
+                                            and n.name == decl.name):
+                return False
+        if calls and self._global(decl):
+            return False
+        hdecl, value, d = hi
+        if value == 'len':
+            return hdecl is decl and c + d <= 0
+        size = self._size(decl)
+        if size is None:
+            return False
+        sdecl, length = size
+        if hdecl is None:
+            return length is not None and value + d + c <= length
+        return sdecl is hdecl and c + d <= 0
+
+
+def eliminate(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, marca los
+    accesos a arrays que no necesitan verificación de límites. Retorna
+    un BoundsStats (o None si el checker reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return BoundsChecks.eliminate(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 bounds.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    print(eliminate(ast))
@@ -0,0 +1,621 @@
+'''
+Generación de código C a partir del AST verificado.
+
+El programa se verifica primero con el checker (checker.py), que anota
+cada expresión con su tipo. Con esos tipos estáticos cada construcción
+de B-Minor se traduce a C99:
+
+  - integer es int64_t, float es double, boolean es bool, char es el
+    código Unicode del carácter y string es un 'const char *' UTF-8.
+  - Los arrays son punteros a bm_array y cada acceso verifica los
+    límites. La división, el módulo y 'print' conservan la semántica
+    (y los mensajes de error) del intérprete.
+  - Cada función de B-Minor es una función C. Sus variables locales se
+    declaran al inicio de la función y los globales se inicializan en
+    orden en bm_init(), antes de llamar a main.
+  - Un prototipo sin definición (p. ej. 'puts: function void (s: string);')
+    se declara 'extern' con su nombre original, de modo que se enlaza
+    con libc o con cualquier otro código objeto.
+
+C no define el orden de evaluación de los operandos ni de los
+argumentos; cuando alguno tiene efectos (llamadas, asignaciones, accesos
+que pueden fallar) los operandos se evalúan de izquierda a derecha en
+variables temporales, igual que en el intérprete.
+
+El runtime (runtime/bminor.c) se compila junto con el programa usando
+el compilador de C del sistema ($CC, por defecto 'cc').
+
+usage:
+    python3 cgen.py <filename> [-o ejecutable] [--emit]
+'''
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import CALL, written_names, read_names
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime')
+
+CFLAGS = ['-std=c99', '-O2', '-fwrapv']
+
+# Tipos de B-Minor (nombres de typesys) y su representación en C
+_CTYPES = {
+    'integer': 'bm_int',
+    'float'  : 'bm_float',
+    'boolean': 'bm_bool',
+    'char'   : 'bm_char',
+    'string' : 'bm_string',
+    'void'   : 'void',
+}
+
+# Valor inicial de una variable sin inicializador
+_DEFAULTS = {
+    'integer': '0',
+    'float'  : '0.0',
+    'boolean': 'false',
+    'char'   : '0',
+    'string' : '""',
+}
+
+# Funciones built-in del intérprete y su implementación en el runtime
+RUNTIME_BUILTINS = {
+    'read_int'    : 'bm_read_int',
+    'read_float'  : 'bm_read_float',
+    'read_string' : 'bm_read_string',
+    'array_length': 'bm_array_length',
+}
+
+_PRINT = {
+    'integer': 'bm_print_int',
+    'float'  : 'bm_print_float',
+    'boolean': 'bm_print_bool',
+    'char'   : 'bm_print_char',
+    'string' : 'bm_print_string',
+}
+
+# Operadores que se traducen directamente al operador de C
+_NATIVE_OPS = {'+', '-', '*', '<', '>', '<=', '>=', '==', '!='}
+
+
+class CodegenError(Exception):
+    '''Construcción de B-Minor que el back-end de C no puede traducir.'''
+    pass
+
+
+def ctype(typ):
+    '''Tipo C de un tipo B-Minor (nombre de typesys).'''
+    if typ.startswith('array'):
+        return 'bm_array *'
+    if typ not in _CTYPES:
+        raise CodegenError(f"Tipo '{typ}' no soportado por el back-end de C")
+    return _CTYPES[typ]
+
+
+def _decl(typ, name):
+    t = ctype(typ)
+    return f'{t}{name}' if t.endswith('*') else f'{t} {name}'
+
+
+def c_string(value):
+    '''Literal C con los bytes UTF-8 de un string.'''
+    out = []
+    for b in value.encode('utf-8'):
+        c = chr(b)
+        if c in '"\\?':
+            out.append('\\' + c)
+        elif 32 <= b < 127:
+            out.append(c)
+        else:
+            out.append(f'\\{b:03o}')
+    return '"' + ''.join(out) + '"'
+
+
+def _body(stmts):
+    return stmts if isinstance(stmts, list) else [stmts]
+
+
+def _pure(n):
+    '''
+    Expresiones sin efectos que no pueden fallar: se pueden evaluar en
+    cualquier orden respecto de los demás operandos.
+    '''
+    if isinstance(n, (Literal, Identifier)):
+        return True
+    if isinstance(n, UnaryOper):
+        return _pure(n.expr)
+    if isinstance(n, LogicalOpExpr):
+        return _pure(n.left) and _pure(n.right)
+    if isinstance(n, BinOper) and n.right is not None:
+        if n.oper in _NATIVE_OPS:
+            return _pure(n.left) and _pure(n.right)
+        if n.oper in ('/', '%'):
+            # Divisor constante distinto de cero
+            return (isinstance(n.right, (Integer, Float)) and n.right.value != 0
+                    and _pure(n.left))
+    return False
+
+
+class CGenerator(Visitor):
+    '''
+    Genera el código C. Los visit de expresiones retornan un string con
+    la expresión C; los de sentencias agregan líneas a 'lines'.
+    '''
+    def generate(self, program: Program):
+        self.funcs = {}             # nombre -> FuncDecl con cuerpo
+        self.externs = {}           # nombre -> prototipo sin definición
+        self.globals = {}           # nombre -> nombre C
+        self._collect(program)
+
+        out = ['#include "bminor.h"', '']
+        for name, func in self.externs.items():
+            out.append(f'extern {self._signature(func, name)};')
+        for func in self.funcs.values():
+            out.append(f'static {self._signature(func, self._name(func.name))};')
+        out.append('')
+
+        # Globales (se inicializan en bm_init)
+        init = self._function_body(lambda: self._block(program.body), toplevel=True)
+        for decl in program.body:
+            if isinstance(decl, (VarDecl, VarDeclInit)):
+                out.append(f'static {_decl(self._type(decl.type), self.globals[decl.name])};')
+        out.append('')
+
+        for func in self.funcs.values():
+            out += self._function(func)
+            out.append('')
+
+        out.append('static void bm_init(void)')
+        out += init
+        out.append('')
+        out += self._main(program)
+        return '\n'.join(out) + '\n'
+
+    # =====================================================================
+    # Declaraciones globales
+    # =====================================================================
+    def _collect(self, program):
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                if decl.prototype:
+                    if decl.name not in self.funcs:
+                        self.externs[decl.name] = decl
+                    continue
+                if decl.name in self.funcs:
+                    raise CodegenError(f"La función '{decl.name}' se define más de una vez")
+                self.externs.pop(decl.name, None)
+                self.funcs[decl.name] = decl
+            elif isinstance(decl, (VarDecl, VarDeclInit)):
+                self.globals[decl.name] = self._name(decl.name)
+
+    def _name(self, name):
+        '''Nombre C de un símbolo B-Minor (evita choques con C y el runtime).'''
+        return 'b_' + name
+
+    def _type(self, typ):
+        if isinstance(typ, ArrayType):
+            if not isinstance(typ.elem_type, SimpleType):
+                raise CodegenError('Los arrays de arrays no están soportados por el back-end de C')
+            return f'array[{typ.elem_type.name}]'
+        return typ.name
+
+    def _signature(self, func, cname):
+        params = ', '.join(_decl(self._type(p.type), self._name(p.name)) for p in func.params)
+        return f'{ctype(self._type(func.type))} {cname}({params or "void"})'
+
+    def _main(self, program):
+        out = ['int main(void)', '{', '    bm_init();']
+        main = self.funcs.get('main')
+        if main is not None:
+            if main.params:
+                msg = (f"La función 'main' debe definirse sin argumentos "
+                       f"(esperado 0, pero tiene {len(main.params)})")
+                out.append(f'    bm_error({c_string(msg)});')
+            else:
+                out.append('    b_main();')
+        out += ['    return 0;', '}']
+        return out
+
+    # =====================================================================
+    # Funciones
+    # =====================================================================
+    def _function_body(self, generate, params=(), ret='void', toplevel=False):
+        '''
+        Genera el cuerpo de una función: retorna sus líneas, con las
+        declaraciones de variables locales y temporales al inicio. Con
+        'toplevel' las declaraciones son las de los globales (bm_init).
+        '''
+        self.toplevel = toplevel
+        self.scope = {}
+        self.used = set(self.globals.values()) | {self._name(f) for f in self.funcs}
+        self.locals = []
+        self.temps = []
+        self.lines = []
+        self.level = 1
+        for p in params:
+            self.scope[p.name] = (self._name(p.name), self._type(p.type))
+        generate()
+        # Sin 'return' al final, el intérprete retorna None
+        if ret != 'void' and not (self.lines and self.lines[-1].startswith('    return ')):
+            self._emit(f'return {_DEFAULTS.get(ret, "0")};')
+
+        out = ['{']
+        out += [f'    {_decl(t, name)};' for t, name in self.locals + self.temps]
+        out += self.lines
+        out.append('}')
+        return out
+
+    def _function(self, func):
+        ret = self._type(func.type)
+        body = self._function_body(lambda: self._block(func.body), func.params, ret)
+        return [f'static {self._signature(func, self._name(func.name))}'] + body
+
+    def _emit(self, line):
+        self.lines.append('    ' * self.level + line)
+
+    def _block(self, stmts):
+        for stmt in _body(stmts):
+            self._stmt(stmt)
+
+    def _nested(self, stmts):
+        self.level += 1
+        self._block(stmts)
+        self.level -= 1
+
+    def _stmt(self, n):
+        if isinstance(n, (Statement, IfStmt, ForStmt, ReturnStmt, Block, VarDeclInit, FuncDecl)):
+            n.accept(self)
+        else:
+            self._emit(f'{self._expr(n)};')
+
+    def _expr(self, n):
+        if isinstance(n, PrintStmt):
+            raise CodegenError("'print' sólo se puede usar como sentencia en el back-end de C")
+        return n.accept(self)
+
+    def _temp(self, typ):
+        name = f'_t{len(self.temps) + 1}'
+        self.temps.append((typ, name))
+        return name
+
+    def _operands(self, exprs):
+        '''
+        Traduce una lista de operandos que el intérprete evalúa de
+        izquierda a derecha. Retorna (prefijo, códigos): el prefijo son
+        asignaciones a temporales que fijan el orden de evaluación.
+        '''
+        codes = [self._expr(e) for e in exprs]
+        # Último operando cuyo orden respecto de uno posterior importa
+        last = -1
+        for i, a in enumerate(exprs):
+            if any(self._conflict(a, b) for b in exprs[i+1:]):
+                last = i
+        prefix = []
+        for i in range(last + 1):
+            e = exprs[i]
+            if isinstance(e, Literal):
+                continue
+            if (isinstance(e, Identifier) and e.name in self.scope
+                    and not any(e.name in written_names(b) for b in exprs[i+1:])):
+                continue
+            temp = self._temp(e.type)
+            prefix.append(f'{temp} = {codes[i]}')
+            codes[i] = temp
+        return prefix, codes
+
+    def _conflict(self, a, b):
+        '''True si el resultado depende de evaluar 'a' antes que 'b'.'''
+        if not _pure(a) and not _pure(b):
+            return True
+        return self._clobbers(a, b) or self._clobbers(b, a)
+
+    def _clobbers(self, writer, reader):
+        '''True si 'writer' puede modificar una variable que lee 'reader'.'''
+        writes = written_names(writer)
+        if not writes:
+            return False
+        for name in read_names(reader):
+            if name in writes or (CALL in writes and name not in self.scope):
+                return True
+        return False
+
+    def _sequence(self, prefix, code):
+        return f'({", ".join(prefix + [code])})' if prefix else code
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def _declare(self, n):
+        '''Nombre C de la variable declarada por n (global o local).'''
+        typ = self._type(n.type)
+        if self.toplevel:
+            return self.globals[n.name], typ
+
+        prev = self.scope.get(n.name)
+        if prev is not None and prev[1] == typ:
+            return prev
+        cname = self._name(n.name)
+        k = 1
+        while cname in self.used:
+            k += 1
+            cname = f'{self._name(n.name)}_{k}'
+        self.used.add(cname)
+        self.locals.append((typ, cname))
+        self.scope[n.name] = (cname, typ)
+        return cname, typ
+
+    def visit(self, n: VarDecl):
+        cname, typ = self._declare(n)
+        if isinstance(n.type, ArrayType):
+            elem = self._type(n.type.elem_type)
+            if n.type.size is None:
+                value = '0'
+            else:
+                prefix, (size,) = self._operands([n.type.size])
+                label = c_string(n.name)
+                if elem == 'string':
+                    value = f'bm_new_string_array({size}, {label})'
+                else:
+                    value = f'bm_new_array({size}, sizeof({ctype(elem)}), {label})'
+                value = self._sequence(prefix, value)
+        else:
+            value = _DEFAULTS[typ]
+        self._emit(f'{cname} = {value};')
+
+    def visit(self, n: VarDeclInit):
+        typ = self._type(n.type)
+        if isinstance(n.init, list):
+            elem = ctype(typ[6:-1])
+            if n.init:
+                prefix, items = self._operands(n.init)
+                value = self._sequence(prefix, f'bm_array_from({len(items)}, sizeof({elem}), '
+                                               f'({elem}[]){{{", ".join(items)}}})')
+            else:
+                value = f'bm_new_array(0, sizeof({elem}), {c_string(n.name)})'
+        else:
+            value = self._expr(n.init)
+        # El inicializador se traduce antes de declarar la variable
+        cname, typ = self._declare(n)
+        self._emit(f'{cname} = {value};')
+
+    def visit(self, n: FuncDecl):
+        pass
+
+    def visit(self, n: PrintStmt):
+        typ = n.expr.type
+        value = self._expr(n.expr)
+        if typ == 'void':
+            self._emit(f'{value};')
+            self._emit('bm_print_string("None");')
+        elif typ in _PRINT:
+            self._emit(f'{_PRINT[typ]}({value});')
+        else:
+            raise CodegenError(f"'print' de un valor de tipo '{typ}' no está soportado por el back-end de C")
+
+    def visit(self, n: ExprStmt):
+        self._emit(f'{self._expr(n.expr)};')
+
+    def visit(self, n: Block):
+        self._block(n.body)
+
+    def _cond(self, cond, stmt):
+        if cond is None:
+            raise CodegenError(f"'{stmt}' sin condición no está soportado por el back-end de C")
+        return self._expr(cond)
+
+    def visit(self, n: IfStmt):
+        self._emit(f'if ({self._cond(n.cond, "if")}) {{')
+        self._nested(n.then_branch)
+        if n.else_branch:
+            self._emit('} else {')
+            self._nested(n.else_branch)
+        self._emit('}')
+
+    def visit(self, n: WhileStmt):
+        self._emit(f'while ({self._cond(n.cond, "while")}) {{')
+        self._nested(n.body)
+        self._emit('}')
+
+    def visit(self, n: DoWhileStmt):
+        self._emit('do {')
+        self._nested(n.body)
+        self._emit(f'}} while ({self._cond(n.cond, "do-while")});')
+
+    def visit(self, n: ForStmt):
+        init = self._expr(n.init) if n.init else ''
+        cond = self._expr(n.cond) if n.cond else ''
+        step = self._expr(n.step) if n.step else ''
+        self._emit(f'for ({init}; {cond}; {step}) {{')
+        self._nested(n.body)
+        self._emit('}')
+
+    def visit(self, n: ReturnStmt):
+        if n.expr:
+            self._emit(f'return {self._expr(n.expr)};')
+        else:
+            self._emit('return;')
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: Integer):
+        if not -2**63 <= n.value < 2**63:
+            raise CodegenError(f'El literal {n.value} no cabe en un entero de 64 bits')
+        if -2**31 < n.value < 2**31:
+            return str(n.value)
+        return f'INT64_C({n.value})'
+
+    def visit(self, n: Float):
+        text = repr(n.value)
+        if text in ('inf', 'nan'):
+            raise CodegenError(f'El literal float {n.value} no es finito')
+        return text
+
+    def visit(self, n: Boolean):
+        return 'true' if n.value else 'false'
+
+    def visit(self, n: Char):
+        if len(n.value) != 1:
+            raise CodegenError(f'Literal char inválido: {n.value!r}')
+        return str(ord(n.value))
+
+    def visit(self, n: String):
+        return c_string(n.value)
+
+    def visit(self, n: Identifier):
+        if n.type == 'function':
+            raise CodegenError(f"Usar la función '{n.name}' como valor no está soportado por el back-end de C")
+        if n.name in self.scope:
+            return self.scope[n.name][0]
+        return self.globals[n.name]
+
+    def visit(self, n: BinOper):
+        prefix, (left, right) = self._operands([n.left, n.right])
+        ints = n.left.type == 'integer' and n.right.type == 'integer'
+        if n.left.type == 'string':
+            if n.oper == '+':
+                code = f'bm_concat({left}, {right})'
+            elif n.oper == '==':
+                code = f'bm_streq({left}, {right})'
+            else:
+                code = f'!bm_streq({left}, {right})'
+        elif n.oper == '/':
+            code = f'bm_idiv({left}, {right})' if ints else f'bm_fdiv({left}, {right})'
+        elif n.oper == '%':
+            code = f'bm_imod({left}, {right})' if ints else f'bm_fmod({left}, {right})'
+        elif n.oper == '^':
+            code = f'bm_ipow({left}, {right})' if ints else f'bm_fpow({left}, {right})'
+        elif n.oper == '<<':
+            # Sin signo: el desplazamiento de un negativo es indefinido en C
+            code = f'((bm_int)((uint64_t)({left}) << ({right})))'
+        else:
+            code = f'({left} {n.oper} {right})'
+        return self._sequence(prefix, code)
+
+    def visit(self, n: LogicalOpExpr):
+        return f'({self._expr(n.left)} {n.oper} {self._expr(n.right)})'
+
+    def visit(self, n: UnaryOper):
+        expr = self._expr(n.expr)
+        if n.oper == '+':
+            return expr
+        return f'({n.oper}{expr})'
+
+    def _incdec(self, n, oper):
+        post = isinstance(n, (PostInc, PostDec))
+        if isinstance(n.expr, Identifier):
+            target = self._expr(n.expr)
+        else:
+            prefix, (arr, idx) = self._operands([n.expr.array, n.expr.pos])
+            target = f'BM_INCR({ctype(n.type)}, {arr}, {idx})'
+        code = f'({target}{oper})' if post else f'({oper}{target})'
+        return code if isinstance(n.expr, Identifier) else self._sequence(prefix, code)
+
+    def visit(self, n: PreInc):
+        return self._incdec(n, '++')
+
+    def visit(self, n: PreDec):
+        return self._incdec(n, '--')
+
+    def visit(self, n: Assign):
+        if isinstance(n.left, Identifier):
+            return f'({self._expr(n.left)} = {self._expr(n.right)})'
+        if not isinstance(n.left, ArrayAccess):
+            raise CodegenError('Target de asignación inválido')
+        target = n.left
+        prefix, (value, arr, idx) = self._operands([n.right, target.array, target.pos])
+        lineno = c_string(str(getattr(target, 'lineno', None)))
+        store = f'BM_STORE({ctype(target.type)}, {arr}, {idx}, {lineno}) = {value}'
+        return self._sequence(prefix, store) if prefix else f'({store})'
+
+    def visit(self, n: Call):
+        name = n.func.name
+        if name in self.funcs:
+            cname = self._name(name)
+        elif name in self.externs:
+            cname = name
+        else:
+            cname = RUNTIME_BUILTINS[name]
+        prefix, args = self._operands(n.args)
+        return self._sequence(prefix, f'{cname}({", ".join(args)})')
+
+    def visit(self, n: ArrayAccess):
+        prefix, (arr, idx) = self._operands([n.array, n.pos])
+        return self._sequence(prefix, f'BM_LOAD({ctype(n.type)}, {arr}, {idx})')
+
+
+def generate(program: Program):
+    '''
+    Verifica el programa y retorna su traducción a C. Lanza CodegenError
+    si el checker reporta errores.
+    '''
+    Check.checker(program)
+    if errors_detected():
+        raise CodegenError(f'El programa tiene {errors_detected()} errores de tipo')
+    return CGenerator().generate(program)
+
+
+def compile_c(source, output, cc=None, lang='c'):
+    '''
+    Compila el código generado (junto con el runtime) en 'output'. Con
+    lang='s' el código es ensamblador (ver asmgen.py).
+    '''
+    cc = cc or os.environ.get('CC', 'cc')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'program.{lang}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        cmd = [cc, *CFLAGS, '-I', RUNTIME_DIR, path,
+               os.path.join(RUNTIME_DIR, 'bminor.c'), '-lm', '-o', output]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise CodegenError(f'{cc} terminó con código {proc.returncode}:\n{proc.stderr}')
+    return output
+
+
+_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'bminor-cgen')
+
+def build(source, lang='c'):
+    '''
+    Compila el código generado y retorna la ruta del ejecutable. Los
+    ejecutables se guardan en una caché indexada por el hash del código
+    (incluido el runtime y las opciones del compilador).
+    '''
+    key = hashlib.sha256(source.encode('utf-8'))
+    for name in ('bminor.h', 'bminor.c'):
+        with open(os.path.join(RUNTIME_DIR, name), 'rb') as f:
+            key.update(f.read())
+    key.update(' '.join(CFLAGS + [lang]).encode())
+    exe = os.path.join(_CACHE_DIR, key.hexdigest()[:24])
+    if not os.path.exists(exe):
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        compile_c(source, exe + '.tmp', lang=lang)
+        os.replace(exe + '.tmp', exe)
+    return exe
+
+
+if __name__ == '__main__':
+    import argparse
+    from parser import parse
+
+    argparser = argparse.ArgumentParser(description='bminor C backend')
+    argparser.add_argument('file', help='programa a compilar')
+    argparser.add_argument('-o', dest='output', help='ejecutable a generar')
+    argparser.add_argument('--emit', action='store_true',
+                           help='mostrar el código C en lugar de compilarlo')
+    args = argparser.parse_args()
+
+    ast = parse(open(args.file, encoding='utf-8').read())
+    try:
+        source = generate(ast)
+        if args.emit:
+            sys.stdout.write(source)
+        else:
+            output = args.output or os.path.splitext(os.path.basename(args.file))[0]
+            compile_c(source, output)
+    except CodegenError as e:
+        raise SystemExit(f'cgen: {e}')
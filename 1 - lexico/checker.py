@@ -3,47 +3,167 @@
 Este archivo contiene la parte de verificación de tipos del compilador.
 Recorre el AST, construye la tabla de símbolos y valida que los tipos
 usados en las operaciones y declaraciones sean consistentes.
+
+Cada expresión queda anotada con su tipo en el atributo 'type' (un
+nombre de typesys: 'integer', 'float', ..., o 'array[integer]' para
+los arrays). Los back-ends que necesitan tipos estáticos (por ejemplo
+la generación de C) trabajan sobre este AST verificado.
+
+Una expresión con un error queda con el tipo 'undefined', que no se
+vuelve a reportar en las expresiones y sentencias que la contienen (un
+solo error por problema).
+
+Como única conversión implícita, un literal entero escrito donde se
+espera un float (por ejemplo 'e: float = 1' o el argumento 10 de un
+parámetro float) se reemplaza por el literal float equivalente.
 '''
 from rich    import print
 from typing  import Union, List
 
-from errors  import error
+from errors  import error, clear_errors, errors_detected, silence_errors
 from model   import *
 from symtab  import Symtab
-from typesys import typenames, check_binop, check_unaryop, CheckError, lookup_type
+from typesys import (typenames, check_binop, check_unaryop, CheckError, lookup_type,
+                     array_type, elem_type, is_array)
+
+
+def _lineno(n):
+    return getattr(n, 'lineno', None)
+
+
+def _known(*types):
+    '''False si algún tipo es 'undefined' (el error ya se reportó).'''
+    return 'undefined' not in types
+
+
+def _builtins():
+    '''Declaraciones de las funciones built-in del intérprete.'''
+    def builtin(name, ret, *params):
+        return FuncDecl(name, FuncType(SimpleType(ret), [Param(p, t) for p, t in params]))
+
+    return [
+        builtin('read_int', 'integer'),
+        builtin('read_float', 'float'),
+        builtin('read_string', 'string'),
+        builtin('array_length', 'integer', ('a', ArrayType(None, None))),
+    ]
 
 
 class Check(Visitor):
     @classmethod
-    def checker(cls, n: Program):
+    def checker(cls, n: Program, quiet=False, coerce=True):
+        '''
+        Verifica el programa. Con quiet los errores sólo se cuentan (no
+        se muestran) y con coerce=False un literal entero donde se
+        espera un float es un error en lugar de convertirse.
+        '''
+        if quiet:
+            silence_errors()
+            try:
+                return cls.checker(n, coerce=coerce)
+            finally:
+                silence_errors(False)
+        clear_errors()
         checker = cls()
+        checker.coerce = coerce
+        checker.undefined = set()   # (función, nombre) ya reportados
         env = Symtab('global')
+        for func in _builtins():
+            func.builtin = True
+            env.add(func.name, func)
         for decl in n.body:
             decl.accept(checker, env)
+        # Los motores especializan las operaciones de los programas sin errores
+        n.checked = not errors_detected()
         return env
 
+    # =====================================================================
+    # Utilidades
+    # =====================================================================
+    def _type_name(self, typ):
+        '''Nombre (typesys) del tipo declarado por un nodo de tipo.'''
+        if isinstance(typ, ArrayType):
+            if typ.elem_type is None:
+                return array_type(None)
+            return array_type(self._type_name(typ.elem_type))
+        return typ.name
+
+    def _coerce(self, expr, expected):
+        '''
+        Si expr es un literal entero y se espera un float, retorna el
+        literal float equivalente. En otro caso retorna expr.
+        '''
+        if not self.coerce or expected != 'float' or getattr(expr, 'type', None) != 'integer':
+            return expr
+        if isinstance(expr, Integer):
+            lit = Float(float(expr.value))
+        elif isinstance(expr, UnaryOper) and expr.oper == '-' and isinstance(expr.expr, Integer):
+            lit = Float(-float(expr.expr.value))
+        else:
+            return expr
+        lit.lineno = _lineno(expr)
+        return lit
+
+    def _assignable(self, target, value):
+        '''True si un valor de tipo 'value' se puede guardar en 'target'.'''
+        if target == value:
+            return True
+        # array_length acepta arrays de cualquier tipo
+        return target == 'array' and is_array(value)
+
+    def _declare(self, n, env: Symtab):
+        prev = env.entries.get(n.name)
+        if prev is not None and isinstance(prev, FuncDecl) != isinstance(n, FuncDecl):
+            error(f"El símbolo '{n.name}' ya fue declarado", _lineno(n))
+        env.add(n.name, n)
+
+    def _cond(self, cond, stmt, env: Symtab):
+        if cond is None:
+            return
+        cond.accept(self, env)
+        if cond.type != 'boolean' and _known(cond.type):
+            error(f"La condición del '{stmt}' debe ser de tipo 'boolean', no '{cond.type}'", _lineno(cond))
+
+    def _body(self, body, env: Symtab):
+        stmts = body if isinstance(body, list) else [body]
+        for stmt in stmts:
+            stmt.accept(self, env)
+
     # =====================================================================
     # Declaraciones (crean nuevas entradas en la tabla de símbolos)
     # =====================================================================
     def visit(self, n: VarDecl, env: Symtab):
         '''
-        1. Si n.value existe, visitar la expresión para inferir su tipo.
-        2. Verificar que el tipo de n.value (si existe) sea asignable al tipo declarado.
+        1. Visitar el tipo declarado (y el tamaño, si es un array).
+        2. Agregar la variable 'n' a la tabla de símbolos actual.
+        '''
+        n.type.accept(self, env)
+        self._declare(n, env)
+
+    def visit(self, n: VarDeclInit, env: Symtab):
+        '''
+        1. Visitar el inicializador (o la lista de valores del array).
+        2. Verificar que su tipo coincida con el tipo declarado.
         3. Agregar la variable 'n' a la tabla de símbolos actual.
         '''
-        n.type.accept(self, env) # Asigna el nombre del tipo a n.type.name
-        
-        if n.value:
-            n.value.accept(self, env)
-            if check_binop('=', n.type.name, n.value.type) is None:
-                error(f"En asignación de '{n.name}', el tipo '{n.value.type}' no coincide con el tipo declarado '{n.type.name}'", n.lineno)
-        
-        try:
-            env.add(n.name, n)
-        except Symtab.SymbolConflictError:
-            error(f"La variable '{n.name}' ya fue declarada con un tipo diferente", n.lineno)
-        except Symtab.SymbolDefinedError:
-            error(f"La variable '{n.name}' ya fue declarada", n.lineno)
+        n.type.accept(self, env)
+        expected = self._type_name(n.type)
+        if isinstance(n.init, list):
+            if not isinstance(n.type, ArrayType):
+                error(f"La variable '{n.name}' no es un array y se inicializa con una lista", _lineno(n))
+            else:
+                elem = elem_type(expected)
+                for i, item in enumerate(n.init):
+                    item.accept(self, env)
+                    n.init[i] = item = self._coerce(item, elem)
+                    if item.type != elem and _known(item.type):
+                        error(f"En la inicialización de '{n.name}', el elemento {i+1} es de tipo '{item.type}' pero se esperaba '{elem}'", _lineno(n))
+        elif n.init:
+            n.init.accept(self, env)
+            n.init = n.value = self._coerce(n.init, expected)
+            if not self._assignable(expected, n.init.type) and _known(n.init.type):
+                error(f"En asignación de '{n.name}', el tipo '{n.init.type}' no coincide con el tipo declarado '{expected}'", _lineno(n))
+        self._declare(n, env)
 
     def visit(self, n: FuncDecl, env: Symtab):
         '''
@@ -52,13 +172,13 @@ class Check(Visitor):
         3. Visitar los parámetros y agregarlos a la nueva tabla.
         4. Visitar el cuerpo de la función.
         '''
-        try:
-            env.add(n.name, n)
-        except Symtab.SymbolConflictError:
-            raise CheckError(f"La función '{n.name}' ya fue declarada con un tipo diferente", n.lineno)
-        except Symtab.SymbolDefinedError:
-            raise CheckError(f"La función '{n.name}' ya fue declarada", n.lineno)
-        
+        prev = env.entries.get(n.name)
+        if isinstance(prev, FuncDecl) and not getattr(prev, 'builtin', False):
+            if [self._type_name(p.type) for p in prev.params] != [self._type_name(p.type) for p in n.params] \
+               or self._type_name(prev.type) != self._type_name(n.type):
+                error(f"La función '{n.name}' ya fue declarada con un tipo diferente", _lineno(n))
+        self._declare(n, env)
+
         func_env = Symtab(n.name, env)
         for parm in n.params:
             parm.accept(self, func_env)
@@ -69,16 +189,12 @@ class Check(Visitor):
     def visit(self, n: Param, env: Symtab):
         '''
         1. Agregar el parámetro 'n' a la tabla de símbolos actual.
-        '''        
+        '''
         n.type.accept(self, env)
-        try:
-            env.add(n.name, n)
-        except Symtab.SymbolConflictError:
-            raise CheckError(f"El parámetro '{n.name}' ya fue declarado con un tipo diferente")
-        except Symtab.SymbolDefinedError:
-            raise CheckError(f"El parámetro '{n.name}' ya fue declarado")
-        except e:
-            raise CheckError(f"Error al agregar el parámetro '{n.name}'")
+        if n.name in env.entries:
+            error(f"El parámetro '{n.name}' ya fue declarado", _lineno(n))
+        env.add(n.name, n)
+
     # =====================================================================
     # Sentencias (Statements)
     # =====================================================================
@@ -89,19 +205,21 @@ class Check(Visitor):
         3. Verificar que el tipo de n.expr coincida con el tipo de retorno de la función.
         '''
         if env.name == 'global':
-            error("La instrucción 'return' no puede estar fuera de una función", n.lineno)
+            error("La instrucción 'return' no puede estar fuera de una función", _lineno(n))
             return
 
         func = env.get(env.name)
-        func.type.accept(self, env)
-        expected_type = func.type.name
-        
+        expected_type = self._type_name(func.type)
+
         if n.expr:
             n.expr.accept(self, env)
-            if expected_type != n.expr.type:
-                error(f"La función '{func.name}' retorna '{expected_type}' pero se encontró un retorno de tipo '{n.expr.type}'", n.lineno)
+            n.expr = self._coerce(n.expr, expected_type)
+            if expected_type == 'void':
+                error(f"La función '{func.name}' es de tipo 'void' y no puede retornar un valor", _lineno(n))
+            elif expected_type != n.expr.type and _known(n.expr.type):
+                error(f"La función '{func.name}' retorna '{expected_type}' pero se encontró un retorno de tipo '{n.expr.type}'", _lineno(n))
         elif expected_type != 'void':
-             error(f"La función '{func.name}' debe retornar un valor de tipo '{expected_type}'", n.lineno)
+            error(f"La función '{func.name}' debe retornar un valor de tipo '{expected_type}'", _lineno(n))
 
     def visit(self, n: Assign, env: Symtab):
         '''
@@ -111,118 +229,110 @@ class Check(Visitor):
         '''
         n.right.accept(self, env)
         n.left.accept(self, env)
-        
-        # n.type = check_binop('=', n.left.type, n.right.type)
-        # if n.type is None:
-        #     error(f"Asignación inválida. No se puede asignar tipo '{n.right.type}' a '{n.left.type}'", n.lineno)
+        n.right = self._coerce(n.right, n.left.type)
+        n.type = n.right.type
+
+        if not isinstance(n.left, (Identifier, ArrayAccess)):
+            error("Target de asignación inválido", _lineno(n))
+        elif n.left.type != n.right.type and _known(n.left.type, n.right.type):
+            error(f"Asignación inválida. No se puede asignar tipo '{n.right.type}' a '{n.left.type}'", _lineno(n))
+
+    def visit(self, n: Block, env: Symtab):
+        self._body(n.body, env)
 
     def visit(self, n: IfStmt, env: Symtab):
-        n.cond.accept(self, env)
-        if n.cond.type != 'boolean':
-            error(f"La condición del 'if' debe ser de tipo 'boolean', no '{n.cond.type}'", n.lineno)
-        for stmt in n.then_branch:
-            stmt.accept(self, env)
+        self._cond(n.cond, 'if', env)
+        self._body(n.then_branch, env)
         if n.else_branch:
-            for stmt in n.else_branch:
-                stmt.accept(self, env)
+            self._body(n.else_branch, env)
 
     def visit(self, n: WhileStmt, env: Symtab):
-        n.cond.accept(self, env)
-        if n.cond.type != 'boolean':
-            error(f"La condición del 'while' debe ser de tipo 'boolean', no '{n.cond.type}'", n.lineno)
-        for stmt in n.body:
-            stmt.accept(self, env)
+        self._cond(n.cond, 'while', env)
+        self._body(n.body, env)
 
     def visit(self, n: DoWhileStmt, env: Symtab):
-        # Visita el cuerpo del bucle
-        body_stmts = n.body.body if isinstance(n.body, Block) else [n.body]
-        for stmt in body_stmts:
-            stmt.accept(self, env)
-            
-        # Visita la condición y verifica que sea booleana
-        n.cond.accept(self, env)
-        if n.cond.type != 'boolean':
-            error(f"La condición del 'do-while' debe ser de tipo 'boolean', no '{n.cond.type}'", n.lineno)
+        # Visita el cuerpo del bucle y verifica que la condición sea booleana
+        self._body(n.body, env)
+        self._cond(n.cond, 'do-while', env)
 
     def visit(self, n: ForStmt, env: Symtab):
         # Visita las tres partes de la cabecera del for
         if n.init:
             n.init.accept(self, env)
-        if n.cond:
-            n.cond.accept(self, env)
-            # if n.cond.type != 'boolean':
-            #     error(f"La condición del 'for' debe ser de tipo 'boolean', no '{n.cond.type}'", n.lineno)
+        self._cond(n.cond, 'for', env)
         if n.step:
             n.step.accept(self, env)
 
         # Visita el cuerpo del bucle
-        body_stmts = n.body.body if isinstance(n.body, Block) else [n.body]
-        for stmt in body_stmts:
-            print(stmt)
-            # stmt.accept(self, env)
+        self._body(n.body, env)
 
     def visit(self, n: IfCond, env: Symtab):
         # Visita la expresión dentro de la condición
         n.cond.accept(self, env)
         # El tipo del nodo IfCond es el tipo de la expresión que envuelve
-        n.type = "boolean" # TODO
-
-    def visit(self, n: ReturnStmt, env: Symtab):
-        # 1. Asegurarse de que no esté en el ámbito global
-        if env.name == 'global':
-            error("La instrucción 'return' no puede estar fuera de una función", n.lineno)
-            return
-
-        # 2. Obtener el tipo de retorno esperado de la función actual
-        func = env.get(env.name)
-        func.type.accept(self, env)
-        expected_type = func.type.name
-        
-        # 3. Comprobar la expresión de retorno
-        if n.expr:
-            # Caso: return <expression>;
-            if expected_type == 'void':
-                raise CheckError(f"La función '{func.name}' es de tipo 'void' y no puede retornar un valor")
-            
-            n.expr.accept(self, env)
-            # Comprueba si el tipo retornado coincide con el esperado
-            # if n.expr.type != expected_type:
-            #     error(f"Tipo de retorno incompatible. La función '{func.name}' esperaba '{expected_type}' pero recibió '{n.expr.type}'", n.lineno)
-        else:
-            if expected_type != 'void':
-                raise CheckError(f"La función '{func.name}' debe retornar un valor de tipo '{expected_type}'")
+        n.type = n.cond.type
 
     def visit(self, n: PrintStmt, env: Symtab):
         if n.expr:
             n.expr.accept(self, env)
+        n.type = 'void'
+
+    def visit(self, n: ExprStmt, env: Symtab):
+        n.expr.accept(self, env)
 
     # =====================================================================
     # Expresiones (devuelven un tipo)
     # =====================================================================
     def visit(self, n: BinOper, env: Symtab):
-        pass
+        '''
+        1. Visitar n.left y n.right para obtener sus tipos.
+        2. Verificar si n.oper es una operación permitida entre esos tipos.
+        3. Anotar el tipo resultante en el nodo.
+        '''
+        n.left.accept(self, env)
+        n.right.accept(self, env)
+        n.type = check_binop(n.oper, n.left.type, n.right.type)
+        if n.type is None and not _known(n.left.type, n.right.type):
+            n.type = 'undefined'
+        elif n.type is None:
+            error(f"Operación inválida '{n.oper}' entre los tipos '{n.left.type}' y '{n.right.type}'", _lineno(n))
+            n.type = 'undefined'
 
     def visit(self, n: LogicalOpExpr, env: Symtab):
-        pass
-        # '''
-        # 1. Visitar n.left y n.right para obtener sus tipos.
-        # 2. Verificar si n.oper es una operación permitida entre esos tipos.
-        # 3. Anotar el tipo resultante en el nodo.
-        # '''
-        # n.left.accept(self, env)
-        # n.right.accept(self, env)
-        # n.type = check_binop(n.oper, n.left.type, n.right.type)
-        # if n.type is None:
-        #     raise SyntaxError(f"Operación inválida '{n.oper}' entre los tipos '{n.left.type}' y '{n.right.type}'")
-
-    def visit(self, n: ExprStmt, env: Symtab):
-        n.expr.accept(self, env)
+        n.left.accept(self, env)
+        n.right.accept(self, env)
+        n.type = check_binop(n.oper, n.left.type, n.right.type)
+        if n.type is None and not _known(n.left.type, n.right.type):
+            n.type = 'undefined'
+        elif n.type is None:
+            error(f"Operación inválida '{n.oper}' entre los tipos '{n.left.type}' y '{n.right.type}'", _lineno(n))
+            n.type = 'undefined'
 
     def visit(self, n: UnaryOper, env: Symtab):
         n.expr.accept(self, env)
         n.type = check_unaryop(n.oper, n.expr.type)
-        if n.type is None:
-            error(f"Operación unaria inválida '{n.oper}' para el tipo '{n.expr.type}'", n.lineno)
+        if n.type is None and not _known(n.expr.type):
+            n.type = 'undefined'
+        elif n.type is None:
+            error(f"Operación unaria inválida '{n.oper}' para el tipo '{n.expr.type}'", _lineno(n))
+            n.type = 'undefined'
+
+    def _incdec(self, n, oper, env: Symtab):
+        n.expr.accept(self, env)
+        if not isinstance(n.expr, (Identifier, ArrayAccess)):
+            error(f"Operando para '{oper}' debe ser un l-value", _lineno(n))
+        n.type = check_unaryop(oper, n.expr.type)
+        if n.type is None and not _known(n.expr.type):
+            n.type = 'undefined'
+        elif n.type is None:
+            error(f"Operación unaria inválida '{oper}' para el tipo '{n.expr.type}'", _lineno(n))
+            n.type = 'undefined'
+
+    def visit(self, n: PreInc, env: Symtab):
+        self._incdec(n, '++', env)
+
+    def visit(self, n: PreDec, env: Symtab):
+        self._incdec(n, '--', env)
 
     def visit(self, n: Identifier, env: Symtab):
         '''
@@ -233,10 +343,14 @@ class Check(Visitor):
         symbol = env.get(n.name)
         if symbol is None:
             n.type = 'undefined' # Para evitar errores en cascada
-            raise SyntaxError(f"La variable o función '{n.name}' no está definida")
+            # Cada nombre no definido se reporta una vez por función
+            if (env.name, n.name) not in self.undefined:
+                self.undefined.add((env.name, n.name))
+                error(f"La variable o función '{n.name}' no está definida", _lineno(n))
+        elif isinstance(symbol, FuncDecl):
+            n.type = 'function'
         else:
-            symbol.type.accept(self, env)
-            n.type = symbol.type.name
+            n.type = self._type_name(symbol.type)
 
     def visit(self, n: Call, env: Symtab):
         '''
@@ -245,26 +359,43 @@ class Check(Visitor):
         3. Verificar que el tipo de cada argumento coincida con el tipo del parámetro.
         4. Anotar el tipo de retorno de la función en el nodo de llamada.
         '''
+        for arg in n.args:
+            arg.accept(self, env)
+        n.type = 'undefined'
+
         func = env.get(n.func.name)
+        n.func.type = 'function'
+        if func is None:
+            if (env.name, n.func.name) not in self.undefined:
+                self.undefined.add((env.name, n.func.name))
+                error(f"La función '{n.func.name}' no está definida", _lineno(n))
+            return
         if not isinstance(func, FuncDecl):
-            raise SyntaxError(f"'{n.func.name}' no es una función")
+            error(f"'{n.func.name}' no es una función", _lineno(n))
+            return
 
+        n.type = self._type_name(func.type)
         if len(n.args) != len(func.params):
-            raise SyntaxError(f"La función '{func.name}' esperaba {len(func.params)} argumentos, pero recibió {len(n.args)}")
-            
-        for i, arg in enumerate(n.args):
-            arg.accept(self, env)
-            param = func.params[i]
-            param.type.accept(self, env)
-            if arg.type != param.type.name:
-                raise SyntaxError(f"En la llamada a '{func.name}', el argumento {i+1} es de tipo '{arg.type}' pero se esperaba '{param.type.name}'")
-        
-        func.type.accept(self, env)
-        n.type = func.type.name
+            error(f"La función '{func.name}' esperaba {len(func.params)} argumentos, pero recibió {len(n.args)}", _lineno(n))
+            return
 
-    def visit(self, n: VarDeclInit, env: Symtab):
-        env.add(n.name, n)
-  
+        for i, param in enumerate(func.params):
+            expected = self._type_name(param.type)
+            n.args[i] = arg = self._coerce(n.args[i], expected)
+            if not self._assignable(expected, arg.type) and _known(arg.type):
+                error(f"En la llamada a '{func.name}', el argumento {i+1} es de tipo '{arg.type}' pero se esperaba '{expected}'", _lineno(n))
+
+    def visit(self, n: ArrayAccess, env: Symtab):
+        n.array.accept(self, env)
+        n.pos.accept(self, env)
+        if n.pos.type != 'integer' and _known(n.pos.type):
+            error(f"El índice de un array debe ser 'integer', no '{n.pos.type}'", _lineno(n))
+        if is_array(n.array.type):
+            n.type = elem_type(n.array.type)
+        else:
+            if n.array.type != 'undefined':
+                error(f"'{getattr(n.array, 'name', '?')}' no es un array", _lineno(n))
+            n.type = 'undefined'
 
     # =====================================================================
     # Tipos y Literales (casos base de la recursión)
@@ -272,26 +403,25 @@ class Check(Visitor):
     def visit(self, n: Literal, env: Symtab):
         # El tipo ya está definido en el __post_init__ del nodo Literal
         pass
-    
+
     def visit(self, n: SimpleType, env: Symtab):
         if not lookup_type(n.name):
-            raise CheckError(f"El tipo '{n.name}' no está definido.")
+            error(f"El tipo '{n.name}' no está definido.")
 
     def visit(self, n: ArrayType, env: Symtab):
-        # Lógica para verificar arreglos (si se implementa)
+        if n.size:
+            n.size.accept(self, env)
+            if n.size.type != 'integer' and _known(n.size.type):
+                error(f"El tamaño de un arreglo debe ser 'integer', no '{n.size.type}'", _lineno(n.size))
         n.elem_type.accept(self, env)
-        # if n.size:
-        #     if n.size.type != 'integer':
-        #         error(f"El tamaño de un arreglo debe ser 'integer', no '{n.size.type}'", n.lineno)
-
 
 
 if __name__ == '__main__':
     import sys
-    
+
     if len(sys.argv) != 2:
         raise SystemExit("Usage: python astprint.py <filename>")
-    
+
     try:
         from parser import parse
         txt = open(sys.argv[1], encoding='utf-8').read()
@@ -305,8 +435,6 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"[red]Ocurrió un error durante el parsing o la impresión:[/red]")
         # print(e)
-        # print stack 
+        # print stack
         import traceback
         print(traceback.format_exc())
-
-
@@ -0,0 +1,1064 @@
+'''
+Motor de ejecución por compilación a closures.
+
+El intérprete tree-walking (interp.py) despacha accept/visit para cada
+nodo cada vez que lo evalúa. Este motor recorre el AST una sola vez y
+lo traduce a un árbol de closures de Python especializados: el operador
+de cada BinOper, el slot de cada variable y la forma de cada sentencia
+de control se deciden al compilar, y en ejecución sólo quedan llamadas
+directas entre closures.
+
+Convenciones:
+
+  - Toda closure recibe como único argumento la lista de slots del
+    frame actual (ver frame.py). Los globales se capturan al compilar.
+  - Las closures de expresiones retornan su valor.
+  - Las closures de sentencias retornan None o una señal (BREAK,
+    CONTINUE, RETURN); el valor del 'return' se deja en 'ret[0]'.
+
+La semántica de cada operación (incluidos los mensajes de error) es la
+del intérprete: los caminos rápidos sólo cubren los casos comunes y todo
+lo demás se delega en las funciones de runtime de interp.py.
+'''
+from operator import itemgetter
+
+from rich    import print
+from model   import *
+from frame   import Frame, FramePool
+from resolve import Resolver, LOCAL, GLOBAL
+from loops   import counted_loop, final_value
+from memo    import memoized
+from arrays  import ARRAYS, BitArray, Strided
+from interp  import (BminorExit, BREAK, RETURN, _is_truthy,
+                     runtime_error, check_numeric_operand, binary_op, unary_op,
+                     array_load, array_store, default_value, new_array, pooled_array,
+                     init_array, array_sizes, index_chain, strided_load, strided_store,
+                     print_value, preload_image, builtin_functions, BuiltinFunction,
+                     int_overflow, int_result, INT_MIN, INT_MAX,
+                     Options, mark_program, trap_overflow)
+
+# Clases de los valores numéricos (bool queda fuera a propósito: el
+# intérprete lo acepta como número, pero ese caso va por el camino lento)
+_NUM = frozenset({int, float})
+
+# Operadores binarios que se compilan ('<<', '>>' y '&' sólo los genera strength.py)
+_BINOPS = frozenset({'+', '-', '*', '/', '%', '==', '!=', '<', '>', '<=', '>=',
+                     '^', '<<', '>>', '&'})
+
+# Nodos que se compilan como sentencias (retornan None o una señal)
+_STATEMENTS = (Statement, IfStmt, ForStmt, ReturnStmt, Block, FuncDecl, VarDeclInit)
+
+# Resultado de un ciclo contado que se debe ejecutar de la forma normal
+_NOT_COUNTED = object()
+
+# Valor de ret[0] cuando el cuerpo termina con una llamada a sí mismo en
+# posición de cola: los argumentos ya se copiaron en el frame
+_TAILCALL = object()
+
+# Operadores cuyo resultado es siempre un bool
+_BOOL_OPS = {'==', '!=', '<', '>', '<=', '>='}
+
+
+class CompiledFunction:
+    '''
+    Función B-Minor compilada. 'body' es la closure del cuerpo y se
+    asigna después de crear todas las funciones, para poder enlazar las
+    llamadas (incluidas las recursivas) antes de compilar los cuerpos.
+    '''
+    def __init__(self, node, ret):
+        self.node = node
+        self.pool = FramePool(node.nslots, arrays=getattr(node, 'arrays', None))
+        self.ret = ret
+        self.body = None
+
+    @property
+    def arity(self) -> int:
+        return len(self.node.params)
+
+    def __call__(self, interp, *args):
+        return self.invoke(args)
+
+    def invoke(self, args):
+        pool = self.pool
+        frame = pool.acquire()
+        slots = frame.slots
+        slots[:len(args)] = args
+        result = None
+        if self.body(slots) is RETURN:
+            result = self.ret[0]
+        pool.release(frame)
+        return result
+
+
+class Compiler(Visitor):
+    '''
+    Traduce el AST resuelto en closures. Cada visit retorna la closure
+    que evalúa (o ejecuta) el nodo.
+    '''
+    def __init__(self, engine):
+        self.engine = engine
+        self.gslots = engine.globals.slots
+        self.ret = [None]
+        self.compiled = {}      # id(FuncDecl) -> CompiledFunction
+        self.functions = {}     # slot global -> CompiledFunction
+        self.builtins = {}      # slot global -> BuiltinFunction
+        self.checked = False    # programa verificado (condiciones booleanas)
+        self.func = None        # FuncDecl que se está compilando
+
+    def compile(self, n: Program):
+        '''
+        Compila el programa completo. Retorna una closure que ejecuta
+        las declaraciones globales en orden.
+        '''
+        self.checked = getattr(n, 'checked', False)
+        for decl in n.body:
+            if isinstance(decl, FuncDecl):
+                func = CompiledFunction(decl, self.ret)
+                self.compiled[id(decl)] = func
+                self.functions[decl.slot] = func
+                if getattr(decl, 'memo', None) is not None:
+                    # Las llamadas a una función memorizada pasan por su cache
+                    del self.functions[decl.slot]
+        for slot, value in enumerate(self.gslots):
+            if isinstance(value, BuiltinFunction):
+                self.builtins[slot] = value
+        # Los globales de la imagen inicial (peval.py) ya tienen su valor
+        preset = preload_image(n, self.gslots)
+        return self._block([decl for decl in n.body if id(decl) not in preset])
+
+    # =====================================================================
+    # Utilidades
+    # =====================================================================
+    def _stmt(self, n):
+        '''Compila n en contexto de sentencia.'''
+        if isinstance(n, Assign):
+            return self._assign(n, False)
+        f = n.accept(self)
+        if isinstance(n, _STATEMENTS):
+            return f
+        # Expresión usada como sentencia: se descarta su valor
+        def expr_stmt(slots):
+            f(slots)
+        return expr_stmt
+
+    def _block(self, stmts):
+        fs = [self._stmt(stmt) for stmt in stmts]
+        if not fs:
+            return lambda slots: None
+        if len(fs) == 1:
+            return fs[0]
+        if len(fs) == 2:
+            f0, f1 = fs
+            def block2(slots):
+                status = f0(slots)
+                if status is not None:
+                    return status
+                return f1(slots)
+            return block2
+        def block(slots):
+            for f in fs:
+                status = f(slots)
+                if status is not None:
+                    return status
+            return None
+        return block
+
+    def _cond(self, n):
+        '''
+        Compila una condición. La closure retorna un valor cuya veracidad
+        en Python coincide con _is_truthy.
+        '''
+        f = n.accept(self)
+        if self.checked:
+            return f
+        if (isinstance(n, BinOper) and n.oper in _BOOL_OPS) or \
+           (isinstance(n, UnaryOper) and n.oper == '!') or isinstance(n, Boolean):
+            return f
+        def cond(slots):
+            return _is_truthy(f(slots))
+        return cond
+
+    def _store(self, n, vf):
+        '''Sentencia que guarda vf(slots) en la variable declarada por n.'''
+        slot = n.slot
+        if n.scope == LOCAL:
+            def store_local(slots):
+                slots[slot] = vf(slots)
+            return store_local
+        g = self.gslots
+        def store_global(slots):
+            g[slot] = vf(slots)
+        return store_global
+
+    # =====================================================================
+    # Declaraciones
+    # =====================================================================
+    def visit(self, n: FuncDecl):
+        func = self.compiled.get(id(n)) or CompiledFunction(n, self.ret)
+        self.func = n
+        func.body = self._block(n.body)
+        self.func = None
+        if getattr(n, 'tailcalls', 0):
+            func.body = self._tail_loop(func.body)
+        func = memoized(func, n)
+        g, slot = self.gslots, n.slot
+        def decl_func(slots):
+            g[slot] = func
+        return decl_func
+
+    def _tail_loop(self, body):
+        '''
+        Cuerpo de una función con llamadas a sí misma en posición de cola:
+        se vuelve a ejecutar sobre el mismo frame mientras termine con una.
+        '''
+        ret = self.ret
+        def tail_loop(slots):
+            while True:
+                status = body(slots)
+                if status is not RETURN or ret[0] is not _TAILCALL:
+                    return status
+        return tail_loop
+
+    def visit(self, n: VarDecl):
+        if isinstance(n.type, ArrayType) and n.type.size:
+            sfs = [size.accept(self) for size in array_sizes(n.type)]
+            if getattr(n, 'pool', None) is not None:
+                # Array que no escapa (escape.py): buffer del pool de la función
+                slot = n.slot
+                if len(sfs) == 1:
+                    sf = sfs[0]
+                    def new(slots):
+                        return pooled_array(n, (sf(slots),), slots[slot])
+                else:
+                    def new(slots):
+                        return pooled_array(n, tuple([f(slots) for f in sfs]), slots[slot])
+            elif len(sfs) == 1:
+                sf = sfs[0]
+                def new(slots):
+                    return new_array(n, sf(slots))
+            else:
+                def new(slots):
+                    return new_array(n, *[f(slots) for f in sfs])
+            return self._store(n, new)
+        value = default_value(n.type) if isinstance(n.type, SimpleType) else None
+        return self._store(n, lambda slots: value)
+
+    def visit(self, n: VarDeclInit):
+        if isinstance(n.init, list):
+            fs = [item.accept(self) for item in n.init]
+            def init_list(slots):
+                return init_array(n, [f(slots) for f in fs])
+            return self._store(n, init_list)
+        if n.init:
+            return self._store(n, n.init.accept(self))
+        return self._store(n, lambda slots: None)
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def visit(self, n: Block):
+        return self._block(n.body)
+
+    def visit(self, n: PrintStmt):
+        f = n.expr.accept(self)
+        def print_stmt(slots):
+            print_value(f(slots))
+        return print_stmt
+
+    def visit(self, n: ExprStmt):
+        return self._stmt(n.expr)
+
+    def visit(self, n: IfStmt):
+        cond = self._cond(n.cond)
+        then = self._block(n.then_branch)
+        if n.else_branch:
+            other = self._block(n.else_branch)
+            def if_else(slots):
+                if cond(slots):
+                    return then(slots)
+                return other(slots)
+            return if_else
+        def if_then(slots):
+            if cond(slots):
+                return then(slots)
+            return None
+        return if_then
+
+    def visit(self, n: WhileStmt):
+        cond = self._cond(n.cond)
+        body = self._block(n.body)
+        def while_stmt(slots):
+            while cond(slots):
+                status = body(slots)
+                if status is not None:
+                    if status is BREAK:
+                        break
+                    if status is RETURN:
+                        return status
+            return None
+        return while_stmt
+
+    def visit(self, n: DoWhileStmt):
+        cond = self._cond(n.cond)
+        body = self._stmt(n.body)
+        def do_while_stmt(slots):
+            while True:
+                status = body(slots)
+                if status is not None:
+                    if status is BREAK:
+                        break
+                    if status is RETURN:
+                        return status
+                if not cond(slots):
+                    break
+            return None
+        return do_while_stmt
+
+    def visit(self, n: ForStmt):
+        init = self._stmt(n.init) if n.init else None
+        cond = self._cond(n.cond) if n.cond else (lambda slots: True)
+        step = self._stmt(n.step) if n.step else (lambda slots: None)
+        body = self._block(n.body)
+        loop = counted_loop(n) if self.engine.options.counted else None
+        counted = self._counted(loop, body) if loop is not None else None
+        def for_stmt(slots):
+            if init:
+                init(slots)
+            if counted:
+                status = counted(slots)
+                if status is not _NOT_COUNTED:
+                    return status
+            while cond(slots):
+                status = body(slots)
+                if status is not None:
+                    if status is BREAK:
+                        break
+                    if status is RETURN:
+                        return status
+                step(slots)
+            return None
+        return for_stmt
+
+    def _counted(self, loop, body):
+        '''
+        Closure que ejecuta un ciclo contado (loops.py) recorriendo un
+        range, o retorna _NOT_COUNTED si los valores no permiten contarlo.
+        '''
+        start = loop.var.accept(self)
+        stop = loop.bound.accept(self)
+        step = loop.step.accept(self)
+        make_range, slot = loop.range, loop.var.slot
+        if loop.var.scope == LOCAL:
+            def counted_local(slots):
+                r = make_range(start(slots), stop(slots), step(slots))
+                if r is None:
+                    return _NOT_COUNTED
+                for value in r:
+                    slots[slot] = value
+                    status = body(slots)
+                    if status is RETURN:
+                        return status
+                    if status is BREAK:
+                        return None
+                slots[slot] = final_value(r)
+                return None
+            return counted_local
+        g = self.gslots
+        def counted_global(slots):
+            r = make_range(start(slots), stop(slots), step(slots))
+            if r is None:
+                return _NOT_COUNTED
+            for value in r:
+                g[slot] = value
+                status = body(slots)
+                if status is RETURN:
+                    return status
+                if status is BREAK:
+                    return None
+            g[slot] = final_value(r)
+            return None
+        return counted_global
+
+    def visit(self, n: ReturnStmt):
+        ret = self.ret
+        if getattr(n, 'tail', False):
+            # Llamada a sí misma en posición de cola (tailcall.py): los
+            # argumentos reemplazan al frame actual y _tail_loop repite el cuerpo
+            argfs = [arg.accept(self) for arg in n.expr.args]
+            nargs = len(argfs)
+            blank = (None,) * self.func.nslots
+            def return_tail(slots):
+                args = [f(slots) for f in argfs]
+                slots[:] = blank
+                slots[:nargs] = args
+                ret[0] = _TAILCALL
+                return RETURN
+            return return_tail
+        if n.expr:
+            f = n.expr.accept(self)
+            def return_value(slots):
+                ret[0] = f(slots)
+                return RETURN
+            return return_value
+        def return_void(slots):
+            ret[0] = None
+            return RETURN
+        return return_void
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: BinOper):
+        op = n.oper
+        if op not in _BINOPS:
+            def not_implemented(slots):
+                raise NotImplementedError(f"Operador binario no implementado: {op}")
+            return not_implemented
+
+        lf = n.left.accept(self)
+        rf = n.right.accept(self)
+
+        if op in ('^', '<<', '>>', '&'):
+            impl = getattr(n, 'impl', None)
+            if impl is not None:
+                def typed(slots):
+                    return impl(lf(slots), rf(slots))
+                return typed
+            def generic(slots):
+                return binary_op(n, lf(slots), rf(slots))
+            return generic
+
+        if getattr(n, 'impl', None) is not None:
+            typed = self._typed_binop(n, lf, rf)
+            if typed is not None:
+                return typed
+
+        # Los resultados enteros que no caben en 64 bits van por
+        # binary_op, que los reduce (interp.int_result)
+        lo, hi = INT_MIN, INT_MAX
+        if op == '+':
+            def add(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l + r
+                    if lo <= v <= hi or v.__class__ is float:
+                        return v
+                return binary_op(n, l, r)
+            return add
+        if op == '-':
+            def sub(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l - r
+                    if lo <= v <= hi or v.__class__ is float:
+                        return v
+                return binary_op(n, l, r)
+            return sub
+        if op == '*':
+            def mul(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l * r
+                    if lo <= v <= hi or v.__class__ is float:
+                        return v
+                return binary_op(n, l, r)
+            return mul
+        if op == '/':
+            def div(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ is int and r.__class__ is int and r:
+                    v = l // r
+                    if v <= hi:
+                        return v
+                    return int_overflow(v)
+                if l.__class__ in _NUM and r.__class__ in _NUM and r:
+                    return l / r
+                return binary_op(n, l, r)
+            return div
+        if op == '%':
+            def mod(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM and r:
+                    return l % r
+                return binary_op(n, l, r)
+            return mod
+        if op == '==':
+            def eq(slots):
+                return lf(slots) == rf(slots)
+            return eq
+        if op == '!=':
+            def ne(slots):
+                return lf(slots) != rf(slots)
+            return ne
+        if op == '<':
+            def lt(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    return l < r
+                return binary_op(n, l, r)
+            return lt
+        if op == '>':
+            def gt(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    return l > r
+                return binary_op(n, l, r)
+            return gt
+        if op == '<=':
+            def le(slots):
+                l = lf(slots); r = rf(slots)
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    return l <= r
+                return binary_op(n, l, r)
+            return le
+        def ge(slots):
+            l = lf(slots); r = rf(slots)
+            if l.__class__ in _NUM and r.__class__ in _NUM:
+                return l >= r
+            return binary_op(n, l, r)
+        return ge
+
+    def _typed_binop(self, n, lf, rf):
+        '''
+        Closure sin verificación de tipos para una operación especializada
+        (specialize.py), o None si la división o el módulo deben seguir
+        verificando el divisor. Las operaciones enteras que ranges.py no
+        acotó verifican que el resultado quepa en 64 bits.
+        '''
+        op = n.oper
+        if n.type == 'integer' and not getattr(n, 'bounded', False) and op in ('+', '-', '*'):
+            lo, hi = INT_MIN, INT_MAX
+            if op == '+':
+                def add64(slots):
+                    v = lf(slots) + rf(slots)
+                    if lo <= v <= hi:
+                        return v
+                    return int_overflow(v)
+                return add64
+            if op == '-':
+                def sub64(slots):
+                    v = lf(slots) - rf(slots)
+                    if lo <= v <= hi:
+                        return v
+                    return int_overflow(v)
+                return sub64
+            def mul64(slots):
+                v = lf(slots) * rf(slots)
+                if lo <= v <= hi:
+                    return v
+                return int_overflow(v)
+            return mul64
+        if op == '+':
+            def add(slots):
+                return lf(slots) + rf(slots)
+            return add
+        if op == '-':
+            def sub(slots):
+                return lf(slots) - rf(slots)
+            return sub
+        if op == '*':
+            def mul(slots):
+                return lf(slots) * rf(slots)
+            return mul
+        if op == '<':
+            def lt(slots):
+                return lf(slots) < rf(slots)
+            return lt
+        if op == '>':
+            def gt(slots):
+                return lf(slots) > rf(slots)
+            return gt
+        if op == '<=':
+            def le(slots):
+                return lf(slots) <= rf(slots)
+            return le
+        if op == '>=':
+            def ge(slots):
+                return lf(slots) >= rf(slots)
+            return ge
+        return None
+
+    def visit(self, n: LogicalOpExpr):
+        lf = n.left.accept(self)
+        rf = n.right.accept(self)
+        if getattr(n, 'impl', None) is not None:
+            # Operandos booleanos: 'and'/'or' de Python retornan lo mismo
+            if n.oper == '&&':
+                def land(slots):
+                    return lf(slots) and rf(slots)
+                return land
+            def lor(slots):
+                return lf(slots) or rf(slots)
+            return lor
+        if n.oper == '||':
+            def lor(slots):
+                l = lf(slots)
+                if l is True or (l is not False and _is_truthy(l)):
+                    return l
+                return rf(slots)
+            return lor
+        if n.oper == '&&':
+            def land(slots):
+                l = lf(slots)
+                if l is True or (l is not False and _is_truthy(l)):
+                    return rf(slots)
+                return l
+            return land
+        def not_implemented(slots):
+            lf(slots)
+            raise NotImplementedError(f"Operador lógico no implementado: {n.oper}")
+        return not_implemented
+
+    def visit(self, n: UnaryOper):
+        f = n.expr.accept(self)
+        lo = INT_MIN
+        if getattr(n, 'impl', None) is not None:
+            if n.oper == '-' and n.type == 'integer' and not getattr(n, 'bounded', False):
+                def neg64(slots):
+                    v = f(slots)
+                    if v != lo:
+                        return -v
+                    return int_overflow(-v)
+                return neg64
+            if n.oper == '-':
+                def neg(slots):
+                    return -f(slots)
+                return neg
+            def lnot(slots):
+                return not f(slots)
+            return lnot
+        if n.oper == '-':
+            def neg(slots):
+                v = f(slots)
+                if v.__class__ in _NUM and v != lo:
+                    return -v
+                return unary_op(n, v)
+            return neg
+        if n.oper == '!':
+            def lnot(slots):
+                v = f(slots)
+                if v is True or v is False:
+                    return not v
+                return not _is_truthy(v)
+            return lnot
+        def other(slots):
+            return unary_op(n, f(slots))
+        return other
+
+    def visit(self, n: Assign):
+        return self._assign(n, True)
+
+    def _assign(self, n, value):
+        '''
+        Compila una asignación. Si 'value' es falso la closure se usa como
+        sentencia y retorna None en lugar del valor asignado.
+        '''
+        rf = n.right.accept(self)
+        target = n.left
+
+        if isinstance(target, Identifier):
+            slot = target.slot
+            if target.scope == LOCAL:
+                if value:
+                    def assign_local(slots):
+                        v = slots[slot] = rf(slots)
+                        return v
+                    return assign_local
+                def set_local(slots):
+                    slots[slot] = rf(slots)
+                return set_local
+            g = self.gslots
+            if value:
+                def assign_global(slots):
+                    v = g[slot] = rf(slots)
+                    return v
+                return assign_global
+            def set_global(slots):
+                g[slot] = rf(slots)
+            return set_global
+
+        if isinstance(target, ArrayAccess) and isinstance(target.array, ArrayAccess):
+            assign_index = self._assign_strided(target, rf)
+            if value:
+                return assign_index
+            def set_strided(slots):
+                assign_index(slots)
+            return set_strided
+
+        if isinstance(target, ArrayAccess) and self._bits(target):
+            assign_index = self._assign_bits(target, rf)
+            if value:
+                return assign_index
+            def set_bit(slots):
+                assign_index(slots)
+            return set_bit
+
+        if isinstance(target, ArrayAccess) and getattr(target, 'unchecked', False):
+            # Índice dentro de los límites (bounds.py): sin verificaciones
+            af = target.array.accept(self)
+            pf = target.pos.accept(self)
+            def assign_index(slots):
+                v = rf(slots)
+                arr = af(slots)
+                idx = pf(slots)
+                try:
+                    arr[idx] = v
+                except (TypeError, OverflowError):
+                    array_store(target, arr, idx, v)
+                return v
+            if value:
+                return assign_index
+            def set_index(slots):
+                assign_index(slots)
+            return set_index
+
+        if isinstance(target, ArrayAccess):
+            af = target.array.accept(self)
+            pf = target.pos.accept(self)
+            def assign_index(slots):
+                v = rf(slots)
+                arr = af(slots)
+                idx = pf(slots)
+                if arr.__class__ in ARRAYS and idx.__class__ is int and 0 <= idx < len(arr):
+                    try:
+                        arr[idx] = v
+                    except (TypeError, OverflowError):
+                        array_store(target, arr, idx, v)
+                else:
+                    array_store(target, arr, idx, v)
+                return v
+            if value:
+                return assign_index
+            def set_index(slots):
+                assign_index(slots)
+            return set_index
+
+        def invalid(slots):
+            rf(slots)
+            runtime_error("Target de asignación inválido")
+        return invalid
+
+    def _bits(self, n):
+        '''True si el acceso n es a un array de boolean guardado en un BitArray (Options.bits).'''
+        return self.engine.options.bits and getattr(n, 'type', None) == 'boolean'
+
+    def _assign_bits(self, target, rf):
+        '''
+        Compila arr[i] = valor sobre un BitArray con las operaciones de
+        bits en línea (sin la llamada a BitArray.__setitem__). Los arrays
+        que no son un BitArray (los de la imagen de peval.py) y los
+        valores que no son boolean van por array_store.
+        '''
+        af = target.array.accept(self)
+        pf = target.pos.accept(self)
+        def assign_bit(slots):
+            v = rf(slots)
+            arr = af(slots)
+            idx = pf(slots)
+            if arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size:
+                if v is True:
+                    arr.bits[idx >> 3] |= 1 << (idx & 7)
+                    return v
+                if v is False:
+                    arr.bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+                    return v
+            array_store(target, arr, idx, v)
+            return v
+        return assign_bit
+
+    def _assign_strided(self, target, rf):
+        '''Compila a[i][j]... = valor (ver interp.strided_store).'''
+        root, idxs = index_chain(target)
+        af = root.accept(self)
+        pfs = [idx.accept(self) for idx in idxs]
+        if len(pfs) == 2:
+            pf, qf = pfs
+            def assign_index2(slots):
+                v = rf(slots)
+                arr = af(slots)
+                i = pf(slots)
+                j = qf(slots)
+                if arr.__class__ is Strided and i.__class__ is int and j.__class__ is int:
+                    d = arr.dims
+                    if len(d) == 2 and 0 <= i < d[0] and 0 <= j < d[1]:
+                        try:
+                            arr.data[arr.offset + i * d[1] + j] = v
+                            return v
+                        except (TypeError, OverflowError):
+                            pass
+                strided_store(target, arr, [i, j], v)
+                return v
+            return assign_index2
+        def assign_strided(slots):
+            v = rf(slots)
+            arr = af(slots)
+            strided_store(target, arr, [f(slots) for f in pfs], v)
+            return v
+        return assign_strided
+
+    def _incr(self, n, delta, message):
+        '''Compila ++x / --x / x++ / x-- (y sus variantes sobre arrays).'''
+        target = n.expr
+        post = isinstance(n, (PostInc, PostDec))
+        if isinstance(target, Identifier):
+            load = target.accept(self)
+            slot = target.slot
+            g = self.gslots
+            local = target.scope == LOCAL
+            # Sin verificar el rango si ranges.py lo acotó
+            lo, hi = (None, None) if getattr(n, 'bounded', False) else (INT_MIN, INT_MAX)
+            def incr_var(slots):
+                old = v = load(slots)
+                if v.__class__ not in _NUM:
+                    check_numeric_operand(n, v)
+                v += delta
+                if lo is not None and not lo <= v <= hi and v.__class__ is int:
+                    v = int_overflow(v)
+                if local:
+                    slots[slot] = v
+                else:
+                    g[slot] = v
+                return old if post else v
+            return incr_var
+        if isinstance(target, ArrayAccess):
+            af = target.array.accept(self)
+            pf = target.pos.accept(self)
+            def incr_index(slots):
+                arr = af(slots)
+                idx = pf(slots)
+                if not isinstance(arr, ARRAYS): runtime_error("Base no es array")
+                if not isinstance(idx, int): runtime_error("Índice no es entero")
+                old = arr[idx]
+                check_numeric_operand(n, old)
+                v = int_result(old + delta)
+                array_store(target, arr, idx, v)
+                return old if post else v
+            return incr_index
+        def invalid(slots):
+            runtime_error(message)
+        return invalid
+
+    def visit(self, n: PreInc):
+        return self._incr(n, 1, "Operando para '++' debe ser un l-value (variable o acceso a array)")
+
+    def visit(self, n: PreDec):
+        return self._incr(n, -1, "Operando para '--' debe ser un l-value")
+
+    def visit(self, n: Call):
+        argfs = [arg.accept(self) for arg in n.args]
+        nargs = len(argfs)
+        engine = self.engine
+        func = n.func
+        target = None
+        if isinstance(func, Identifier) and func.scope == GLOBAL:
+            target = self.functions.get(func.slot) or self.builtins.get(func.slot)
+
+        if target is not None and target.arity not in (-1, nargs):
+            def arity_error(slots):
+                for f in argfs:
+                    f(slots)
+                runtime_error(f"Error de aridad: Se esperaban {target.arity} argumentos, pero se recibieron {nargs}")
+            return arity_error
+
+        if isinstance(target, CompiledFunction):
+            call = self._direct_call(target, argfs)
+            if not getattr(n, 'early', False):
+                return call
+            # Se puede ejecutar antes de la declaración de la función
+            # (resolve.py): se verifica el slot como en interp.py
+            g, slot = self.gslots, func.slot
+            def call_early(slots):
+                if g[slot] is None:
+                    runtime_error("Intento de llamar a algo que no es una función " + str(func.name))
+                return call(slots)
+            return call_early
+
+        if isinstance(target, BuiltinFunction):
+            def call_builtin(slots):
+                return target(engine, *[f(slots) for f in argfs])
+            return call_builtin
+
+        # Llamada dinámica: el destino se obtiene en tiempo de ejecución
+        cf = func.accept(self)
+        def call_dynamic(slots):
+            callee = cf(slots)
+            if not callable(callee):
+                runtime_error("Intento de llamar a algo que no es una función " + str(func.name))
+            args = [f(slots) for f in argfs]
+            if hasattr(callee, 'arity') and callee.arity != -1:
+                if len(args) != callee.arity:
+                    runtime_error(f"Error de aridad: Se esperaban {callee.arity} argumentos, pero se recibieron {len(args)}")
+            return callee(engine, *args)
+        return call_dynamic
+
+    def _direct_call(self, fn, argfs):
+        '''
+        Llamada enlazada estáticamente a una función compilada. Se evita
+        construir listas de argumentos y se reutilizan los frames del pool
+        de la función sin pasar por CompiledFunction.invoke.
+        '''
+        pool = fn.pool
+        free, size, blank, limit = pool.free, pool.size, pool._blank, pool.limit
+        ret = self.ret
+
+        def enter():
+            return free.pop() if free else Frame(size)
+
+        def leave(frame, status):
+            result = ret[0] if status is RETURN else None
+            frame.slots[:] = blank
+            if len(free) < limit:
+                free.append(frame)
+            return result
+
+        if pool.arrays is not None:
+            # Los arrays locales vuelven a su pool (FramePool.release)
+            release = pool.release
+            def leave(frame, status):
+                result = ret[0] if status is RETURN else None
+                release(frame)
+                return result
+
+        if len(argfs) == 1:
+            a0, = argfs
+            def call1(slots):
+                v0 = a0(slots)
+                frame = enter()
+                frame.slots[0] = v0
+                return leave(frame, fn.body(frame.slots))
+            return call1
+
+        if len(argfs) == 2:
+            a0, a1 = argfs
+            def call2(slots):
+                v0 = a0(slots)
+                v1 = a1(slots)
+                frame = enter()
+                s = frame.slots
+                s[0] = v0
+                s[1] = v1
+                return leave(frame, fn.body(s))
+            return call2
+
+        nargs = len(argfs)
+        def call(slots):
+            args = [f(slots) for f in argfs]
+            frame = enter()
+            s = frame.slots
+            s[:nargs] = args
+            return leave(frame, fn.body(s))
+        return call
+
+    def visit(self, n: ArrayAccess):
+        if isinstance(n.array, ArrayAccess):
+            return self._strided(n)
+        af = n.array.accept(self)
+        pf = n.pos.accept(self)
+        if self._bits(n):
+            # Lectura del bit en línea (ver _assign_bits)
+            def index_bit(slots):
+                arr = af(slots)
+                idx = pf(slots)
+                if arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size:
+                    return arr.bits[idx >> 3] >> (idx & 7) & 1 == 1
+                if idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr):
+                    return arr[idx]
+                return array_load(n, arr, idx)
+            return index_bit
+        if getattr(n, 'unchecked', False):
+            # Índice dentro de los límites (bounds.py): sin verificaciones
+            def index_unchecked(slots):
+                return af(slots)[pf(slots)]
+            return index_unchecked
+        def index(slots):
+            arr = af(slots)
+            idx = pf(slots)
+            if idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr):
+                return arr[idx]
+            return array_load(n, arr, idx)
+        return index
+
+    def _strided(self, n):
+        '''Compila a[i][j]...: un solo acceso al buffer (ver interp.strided_load).'''
+        root, idxs = index_chain(n)
+        af = root.accept(self)
+        pfs = [idx.accept(self) for idx in idxs]
+        if len(pfs) == 2:
+            pf, qf = pfs
+            def index2(slots):
+                arr = af(slots)
+                i = pf(slots)
+                j = qf(slots)
+                if arr.__class__ is Strided and i.__class__ is int and j.__class__ is int:
+                    d = arr.dims
+                    if len(d) == 2 and 0 <= i < d[0] and 0 <= j < d[1]:
+                        return arr.data[arr.offset + i * d[1] + j]
+                return strided_load(n, arr, [i, j])
+            return index2
+        def index_n(slots):
+            arr = af(slots)
+            return strided_load(n, arr, [f(slots) for f in pfs])
+        return index_n
+
+    def visit(self, n: Identifier):
+        if n.scope == LOCAL:
+            # itemgetter evita una closure de Python por cada lectura local
+            return itemgetter(n.slot)
+        g, slot = self.gslots, n.slot
+        def load_global(slots):
+            return g[slot]
+        return load_global
+
+    def visit(self, n: Literal):
+        value = n.value
+        def const(slots):
+            return value
+        return const
+
+
+class ClosureEngine:
+    '''
+    Motor de ejecución con la misma interfaz que Interpreter: compila
+    el programa a closures y luego ejecuta 'main'.
+    '''
+    def __init__(self, options=None):
+        self.options = options or Options()
+        self.globals = None
+        self.builtins = builtin_functions()
+
+    def error(self, node, message):
+        '''Reporta un error en tiempo de ejecución.'''
+        runtime_error(message)
+
+    def interpret(self, node: Program):
+        try:
+            trap_overflow(self.options.trap)
+            env = Resolver.resolve(node, self.builtins)
+            mark_program(node, self.options)
+            if getattr(node, 'checked', False):
+                from specialize import Specializer
+                Specializer.specialize(node)
+
+            self.globals = Frame(len(node.globals))
+            gslots = self.globals.slots
+            for name, func in self.builtins.items():
+                gslots[env.get(name)] = func
+
+            program = Compiler(self).compile(node)
+            program(gslots)
+
+            main_func = None
+            if env.get('main') is not None:
+                main_func = gslots[env.get('main')]
+
+            if main_func and callable(main_func):
+                arity = getattr(main_func, 'arity', 0)
+                if arity != 0:
+                    self.error(None, f"La función 'main' debe definirse sin argumentos (esperado 0, pero tiene {arity})")
+                main_func(self)
+        except BminorExit:
+            pass # Error ya reportado
+        except Exception as e:
+            print(f"[Error Interno del Intérprete] {e}")
+            import traceback
+            traceback.print_exc()
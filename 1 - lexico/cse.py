@@ -0,0 +1,490 @@
+'''
+Eliminación de subexpresiones comunes sobre el AST verificado.
+
+Se ejecuta después de Check.checker (y de fold.py, si se usa). Dentro de
+cada función recorre las sentencias en el mismo orden en que las evalúa
+el intérprete y lleva el conjunto de expresiones aritméticas
+"disponibles": las que ya se evaluaron y cuyas variables no cambiaron
+desde entonces. Cuando una operación se repite mientras está
+disponible, la primera ocurrencia se guarda en un temporal local
+(_cse1 = x*x) y las siguientes lo leen.
+
+Sólo se consideran operaciones binarias sin efectos cuyos operandos son
+variables escalares, literales u otras operaciones de ese tipo (los
+accesos a arrays y las llamadas nunca forman parte de una subexpresión).
+Una expresión deja de estar disponible cuando:
+
+  - se asigna una de sus variables (=, ++, --, o una declaración local),
+  - se llama a una función y la expresión lee una variable global,
+  - el control puede llegar por otro camino: lo evaluado dentro de una
+    rama de un 'if' o del operando derecho de '&&'/'||' no está
+    disponible después, y lo que se modifica en el cuerpo de un ciclo
+    no está disponible en su condición.
+
+Las divisiones y módulos también se reutilizan: si la primera ocurrencia
+no falló, la segunda (con los mismos valores) tampoco lo haría.
+
+En los ciclos, una expresión que está disponible al final de cada
+iteración (por ejemplo x*x + y*y en la condición del 'if' al final del
+ciclo de in_mandelbrot) también lo está al comienzo de la siguiente. Si
+no puede fallar (no divide), se calcula una vez antes del ciclo y todos
+sus cálculos escriben el mismo temporal, de modo que el comienzo de cada
+iteración la reutiliza.
+
+usage:
+    python3 cse.py <filename>
+'''
+import copy
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, key_names, PURE_OPERS, COMMUTATIVE, SCALARS
+
+
+class CSEStats:
+    def __init__(self):
+        self.reused = 0             # ocurrencias reemplazadas por un temporal
+        self.temps = 0              # temporales creados
+
+    @property
+    def total(self):
+        return self.reused
+
+    def __str__(self):
+        return (f'cse: {self.reused} subexpresiones reutilizadas '
+                f'({self.temps} temporales)')
+
+
+def _key(n):
+    '''
+    Forma canónica de una subexpresión candidata, o None si no lo es.
+    Los operandos de las operaciones conmutativas se ordenan (salvo la
+    concatenación de strings).
+    '''
+    if isinstance(n, Identifier):
+        return ('id', n.name) if getattr(n, 'type', None) in SCALARS else None
+    if isinstance(n, Literal):
+        return ('lit', n.type, repr(n.value))
+    if isinstance(n, UnaryOper):
+        inner = _key(n.expr)
+        return None if inner is None else (n.oper, inner)
+    if isinstance(n, BinOper) and n.right is not None and n.oper in PURE_OPERS:
+        if getattr(n, 'type', None) not in SCALARS:
+            return None
+        left, right = _key(n.left), _key(n.right)
+        if left is None or right is None:
+            return None
+        if n.oper in COMMUTATIVE and n.left.type != 'string':
+            left, right = sorted((left, right), key=repr)
+        return (n.oper, left, right)
+    return None
+
+
+def _safe(key):
+    '''True si la subexpresión no puede fallar (se puede calcular de más).'''
+    if key[0] in ('id', 'lit'):
+        return True
+    return key[0] not in ('/', '%') and all(_safe(part) for part in key[1:])
+
+
+class _Expr:
+    '''
+    Un cálculo disponible: el nodo que lo realiza y las variables que lee.
+    Los cálculos de la misma expresión que llegan al comienzo de un ciclo
+    forman un grupo (union-find) que comparte el temporal.
+    '''
+    def __init__(self, node, reads, globals_, preheader=False):
+        self.node = node
+        self.reads = reads
+        self.globals = globals_
+        self.preheader = preheader  # calculado antes de un ciclo
+        self.reused = False
+        self.parent = self
+        self.temp = None
+
+    def root(self):
+        e = self
+        while e.parent is not e:
+            e = e.parent
+        return e
+
+
+class CommonSubexpressions(Visitor):
+    '''
+    El análisis (visit) marca las ocurrencias repetidas; la reescritura
+    (_rewrite) reemplaza luego cada primera ocurrencia por la asignación
+    al temporal y las siguientes por el temporal.
+    '''
+    @classmethod
+    def eliminate(cls, program: Program):
+        '''Elimina las subexpresiones comunes del programa (ya verificado). Retorna un CSEStats.'''
+        cse = cls()
+        cse.stats = CSEStats()
+        taken = {n.name for n in walk(program.body)
+                 if isinstance(n, (Identifier, VarDecl, VarDeclInit, FuncDecl))}
+        taken |= {p.name for n in walk(program.body) if isinstance(n, FuncDecl) for p in n.params}
+        cse.taken = taken
+        cse.globals = {d.name for d in program.body if not isinstance(d, FuncDecl)}
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                cse._function(decl)
+        return cse.stats
+
+    def _function(self, func):
+        local = {p.name for p in func.params}
+        local |= {n.name for n in walk(func.body) if isinstance(n, (VarDecl, VarDeclInit))}
+        # Un local que comparte nombre con un global puede leerlo antes de
+        # declararse (resolve.py): se trata como global
+        self.shared = self.globals | (set(_names_in(func.body)) - local)
+        self.visible = self.globals - local
+        self.declared = {p.name for p in func.params}
+        self.avail = {}             # forma canónica -> _Expr
+        self.reuses = {}            # id(nodo) -> _Expr que lo calcula
+        self.exprs = []             # todos los _Expr de la función
+        self.preheaders = {}        # id(ciclo) -> _Expr calculados antes del ciclo
+        self.dry = False
+        self._block(func.body)
+
+        groups = {}
+        for entry in self.exprs:
+            groups.setdefault(entry.root(), []).append(entry)
+        decls = []
+        for root, members in groups.items():
+            if not any(e.reused for e in members):
+                continue
+            root.temp = self._fresh()
+            for e in members:
+                e.temp = root.temp
+            decl = VarDecl(root.temp, SimpleType(root.node.type))
+            decl.lineno = getattr(func, 'lineno', None)
+            decls.append(decl)
+        if decls:
+            self.stats.temps += len(decls)
+            self.firsts = {id(e.node): e for e in self.exprs if e.temp and not e.preheader}
+            func.body = decls + self._body(func.body)
+
+    def _fresh(self):
+        k = 1
+        while f'_cse{k}' in self.taken:
+            k += 1
+        self.taken.add(f'_cse{k}')
+        return f'_cse{k}'
+
+    # =====================================================================
+    # Disponibilidad
+    # =====================================================================
+    def _kill(self, name):
+        self.avail = {k: e for k, e in self.avail.items() if name not in e.reads}
+
+    def _kill_call(self):
+        self.avail = {k: e for k, e in self.avail.items() if not e.globals}
+
+    def _kill_all(self, names):
+        for name in names:
+            if name is None:
+                self._kill_call()
+            else:
+                self._kill(name)
+
+    def _keep(self, saved, names):
+        '''Vuelve al conjunto 'saved' sin lo que mata 'names'.'''
+        self.avail = saved
+        self._kill_all(names)
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def _block(self, stmts):
+        for stmt in stmts:
+            self._stmt(stmt)
+
+    def _stmt(self, n):
+        if n is not None:
+            n.accept(self)
+
+    def visit(self, n: VarDecl):
+        n.type.accept(self)
+        self._kill(n.name)
+        self.declared.add(n.name)
+
+    def visit(self, n: VarDeclInit):
+        n.type.accept(self)
+        for e in (n.init if isinstance(n.init, list) else [n.init]):
+            self._stmt(e)
+        self._kill(n.name)
+        self.declared.add(n.name)
+
+    def visit(self, n: ArrayType):
+        self._stmt(n.size)
+
+    def visit(self, n: SimpleType):
+        pass
+
+    def visit(self, n: FuncDecl):
+        pass
+
+    def visit(self, n: PrintStmt):
+        self._stmt(n.expr)
+
+    def visit(self, n: ExprStmt):
+        self._stmt(n.expr)
+
+    def visit(self, n: ReturnStmt):
+        self._stmt(n.expr)
+
+    def visit(self, n: Block):
+        self._block(n.body)
+
+    def visit(self, n: IfStmt):
+        self._stmt(n.cond)
+        saved = self.avail
+        self.avail = dict(saved)
+        self._block(n.then_branch)
+        self.avail = dict(saved)
+        self._block(n.else_branch or [])
+        self._keep(saved, _killed(n.then_branch + (n.else_branch or [])))
+
+    def visit(self, n: WhileStmt):
+        self._loop(n, [], n.cond, n.body, [])
+
+    def visit(self, n: ForStmt):
+        self._stmt(n.init)
+        self._loop(n, [], n.cond, n.body, [n.step] if n.step is not None else [])
+
+    def visit(self, n: DoWhileStmt):
+        self._loop(n, [n.body], n.cond, [], [])
+
+    def _loop(self, loop, before, cond, body, step):
+        '''
+        Ciclo que en cada iteración evalúa 'before', la condición, 'body'
+        y 'step'. Al entrar sólo sigue disponible lo que el ciclo no
+        modifica; al salir, lo disponible después de evaluar la condición.
+        '''
+        self._kill_all(_killed(before + [cond] + body + step))
+        pre = self._preheader(loop, before, cond, body + step) if not self.dry else []
+        self._block(before)
+        self._stmt(cond)
+        at_exit = self.avail
+        self.avail = dict(at_exit)
+        self._block(body + step)
+        # El cálculo que llega al final de la iteración escribe el mismo
+        # temporal que lee el comienzo de la siguiente
+        for key, entry in pre:
+            end = self.avail[key].root()
+            if end is not entry.root():
+                end.parent = entry.root()
+        self.avail = at_exit
+
+    def _preheader(self, loop, before, cond, rest):
+        '''
+        Agrega a las expresiones disponibles las que estarán disponibles
+        al final de cada iteración, calculadas antes del ciclo. Retorna
+        los pares (forma canónica, _Expr) agregados.
+        '''
+        entry = self.avail
+        known = self.declared | self.visible
+        self.dry, self.avail = True, dict(entry)
+        self._block(before)
+        self._stmt(cond)
+        self._block(rest)
+        back, self.dry, self.avail = self.avail, False, dict(entry)
+
+        pre = []
+        for key, e in back.items():
+            # Sólo lo que se puede calcular antes: sin divisiones y con
+            # variables ya declaradas al entrar al ciclo
+            if key in entry or not _safe(key) or not e.reads <= known:
+                continue
+            calc = _Expr(copy.deepcopy(e.node), e.reads, e.globals, preheader=True)
+            self.avail[key] = calc
+            self.exprs.append(calc)
+            pre.append((key, calc))
+        if pre:
+            self.preheaders[id(loop)] = [calc for _, calc in pre]
+        return pre
+
+    # =====================================================================
+    # Expresiones (en el orden de evaluación del intérprete)
+    # =====================================================================
+    def visit(self, n: Literal):
+        pass
+
+    def visit(self, n: Identifier):
+        pass
+
+    def visit(self, n: BinOper):
+        key = _key(n)
+        entry = self.avail.get(key) if key is not None else None
+        if entry is not None:
+            if not self.dry:
+                entry.reused = True
+                self.reuses[id(n)] = entry
+                self.stats.reused += 1
+            return
+        self._stmt(n.left)
+        self._stmt(n.right)
+        reads = key_names(key) if key is not None else None
+        if reads:
+            entry = _Expr(n, reads, bool(reads & self.shared))
+            self.avail[key] = entry
+            if not self.dry:
+                self.exprs.append(entry)
+
+    def visit(self, n: UnaryOper):
+        self._stmt(n.expr)
+
+    def visit(self, n: LogicalOpExpr):
+        self._stmt(n.left)
+        saved = self.avail
+        self.avail = dict(saved)
+        self._stmt(n.right)
+        self._keep(saved, _killed([n.right]))
+
+    def _target(self, n):
+        '''Destino de una asignación o incremento.'''
+        if isinstance(n, ArrayAccess):
+            self._stmt(n.array)
+            self._stmt(n.pos)
+        elif isinstance(n, Identifier):
+            self._kill(n.name)
+
+    def visit(self, n: Assign):
+        self._stmt(n.right)
+        self._target(n.left)
+
+    def visit(self, n: PreInc):
+        self._target(n.expr)
+
+    def visit(self, n: PreDec):
+        self._target(n.expr)
+
+    def visit(self, n: Call):
+        for a in n.args:
+            self._stmt(a)
+        self._kill_call()
+
+    def visit(self, n: ArrayAccess):
+        self._stmt(n.array)
+        self._stmt(n.pos)
+
+    # =====================================================================
+    # Reescritura
+    # =====================================================================
+    def _body(self, stmts):
+        '''Reescribe una lista de sentencias, con los cálculos previos a cada ciclo.'''
+        out = []
+        for stmt in stmts:
+            pre = [e for e in self.preheaders.get(id(stmt), ()) if e.temp]
+            if pre and isinstance(stmt, ForStmt) and stmt.init is not None:
+                out.append(self._rewrite(stmt.init))
+                stmt.init = None
+            out += [self._assign(e, e.node) for e in pre]
+            out.append(self._rewrite(stmt))
+        return out
+
+    def _rewrite(self, n):
+        '''Reescribe n y sus hijos; retorna el nodo que lo reemplaza.'''
+        if n is None or isinstance(n, list):
+            return self._body(n) if n is not None else None
+        entry = self.reuses.get(id(n))
+        if entry is not None:
+            return self._temp(entry, n)
+        if isinstance(n, DoWhileStmt):
+            body = self._body([n.body])
+            n.body = body[0] if len(body) == 1 else Block(body)
+            n.cond = self._rewrite(n.cond)
+            return n
+        for field in _FIELDS.get(type(n), ()):
+            setattr(n, field, self._rewrite(getattr(n, field)))
+        if isinstance(n, VarDeclInit):
+            n.value = n.init
+        entry = self.firsts.get(id(n))
+        if entry is not None:
+            return self._assign(entry, n)
+        return n
+
+    def _assign(self, entry, n):
+        assign = Assign(self._temp(entry, n), n)
+        assign.type = n.type
+        assign.lineno = getattr(n, 'lineno', None)
+        return assign
+
+    def _temp(self, entry, n):
+        ident = Identifier(entry.temp)
+        ident.type = entry.node.type
+        ident.lineno = getattr(n, 'lineno', None)
+        return ident
+
+
+# Hijos que se reescriben de cada clase de nodo (las declaraciones de
+# tipo y los destinos simples no contienen subexpresiones candidatas)
+_FIELDS = {
+    BinOper: ('left', 'right'),
+    LogicalOpExpr: ('left', 'right'),
+    UnaryOper: ('expr',),
+    Assign: ('left', 'right'),
+    PreInc: ('expr',),
+    PreDec: ('expr',),
+    PostInc: ('expr',),
+    PostDec: ('expr',),
+    ArrayAccess: ('array', 'pos'),
+    Call: ('args',),
+    VarDecl: ('type',),
+    VarDeclInit: ('type', 'init'),
+    ArrayType: ('size',),
+    PrintStmt: ('expr',),
+    ExprStmt: ('expr',),
+    ReturnStmt: ('expr',),
+    Block: ('body',),
+    IfStmt: ('cond', 'then_branch', 'else_branch'),
+    WhileStmt: ('cond', 'body'),
+    ForStmt: ('init', 'cond', 'step', 'body'),
+}
+
+
+def _names_in(body):
+    '''Nombres de variables que se leen o escriben en body.'''
+    return {n.name for n in walk(body) if isinstance(n, Identifier)}
+
+
+def _killed(body):
+    '''
+    Variables que pueden cambiar al ejecutar body; None representa una
+    llamada (que puede modificar cualquier global).
+    '''
+    out = set()
+    for n in walk([s for s in body if s is not None]):
+        if isinstance(n, Call):
+            out.add(None)
+        elif isinstance(n, (VarDecl, VarDeclInit)):
+            out.add(n.name)
+        elif isinstance(n, Assign) and isinstance(n.left, Identifier):
+            out.add(n.left.name)
+        elif isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, Identifier):
+            out.add(n.expr.name)
+    return out
+
+
+def eliminate(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, elimina sus
+    subexpresiones comunes. Retorna un CSEStats (o None si el checker
+    reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return CommonSubexpressions.eliminate(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 cse.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = eliminate(ast)
+    if stats is not None:
+        print(stats)
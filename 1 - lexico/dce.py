@@ -0,0 +1,209 @@
+'''
+Eliminación de código muerto y de declaraciones inalcanzables.
+
+Sólo usa la forma del AST (no los tipos), así que se puede ejecutar
+antes de Check.checker: el checker, la resolución de nombres y la
+compilación de cada motor reciben un programa más chico. Los errores de
+tipo del código eliminado ya no se reportan.
+
+  - Sentencias inalcanzables: lo que sigue a un 'return' en la misma
+    lista de sentencias (o a un 'if' cuyas dos ramas retornan) se
+    elimina. Las declaraciones de variables se conservan: nunca se
+    ejecutan, pero los bloques no abren un alcance nuevo y el nombre
+    puede usarse más abajo.
+
+  - Ramas constantes: los 'if' con condición 'true' o 'false' se
+    reemplazan por la rama que se ejecuta, y los 'while' y 'for' con
+    condición 'false' por nada (o por la inicialización del 'for'),
+    igual que en fold.py.
+
+  - Árbol de llamadas: el grafo de llamadas (call_graph) une cada
+    declaración global con los nombres globales que usa. Desde 'main' y
+    desde los inicializadores globales que tienen efectos o pueden
+    fallar se marcan los nombres alcanzables; las funciones, prototipos
+    y variables globales que no se alcanzan se eliminan.
+
+usage:
+    python3 dce.py <filename>
+'''
+from model   import *
+from astutil import walk, is_quiet
+
+
+class DeadCodeStats:
+    def __init__(self):
+        self.functions = []         # funciones eliminadas
+        self.globals = 0            # variables globales eliminadas
+        self.statements = 0         # sentencias inalcanzables eliminadas
+        self.branches = 0           # 'if'/'while'/'for' con condición constante
+        self.nodes = 0              # nodos del AST eliminados en total
+
+    @property
+    def total(self):
+        return self.nodes
+
+    def __str__(self):
+        lines = [f'dce: {self.nodes} nodos eliminados ({len(self.functions)} funciones, '
+                 f'{self.globals} globales, {self.statements} sentencias inalcanzables, '
+                 f'{self.branches} ramas)']
+        if self.functions:
+            lines.append(f"  funciones: {', '.join(self.functions)}")
+        return '\n'.join(lines)
+
+
+def _returns(n):
+    '''True si la sentencia n siempre termina con un 'return'.'''
+    if isinstance(n, ReturnStmt):
+        return True
+    if isinstance(n, Block):
+        return any(_returns(s) for s in n.body)
+    if isinstance(n, IfStmt):
+        return (bool(n.else_branch) and any(_returns(s) for s in n.then_branch)
+                and any(_returns(s) for s in n.else_branch))
+    return False
+
+
+def _uses(n):
+    '''Nombres que usa n (variables y funciones llamadas o usadas como valor).'''
+    names = set()
+    for e in walk([n]):
+        if isinstance(e, Identifier):
+            names.add(e.name)
+        elif isinstance(e, Call) and isinstance(e.func, Identifier):
+            names.add(e.func.name)
+    return names
+
+
+def _effects(decl):
+    '''True si ejecutar la declaración global puede tener efectos o fallar.'''
+    if isinstance(decl, FuncDecl):
+        return False
+    exprs = []
+    if isinstance(decl.type, ArrayType) and decl.type.size is not None:
+        size = decl.type.size
+        if isinstance(size, Literal) and isinstance(size.value, int) and size.value < 0:
+            return True
+        exprs.append(size)
+    if isinstance(decl, VarDeclInit) and decl.init is not None:
+        exprs += decl.init if isinstance(decl.init, list) else [decl.init]
+    return not all(is_quiet(e) for e in exprs)
+
+
+def call_graph(program: Program):
+    '''
+    Grafo de llamadas del programa: nombre global -> nombres globales que
+    usan sus declaraciones (el cuerpo de una función, el inicializador y
+    el tamaño de una variable).
+    '''
+    decls = [d for d in program.body if isinstance(d, (VarDecl, VarDeclInit, FuncDecl))]
+    names = {d.name for d in decls}
+    graph = {name: set() for name in names}
+    for d in decls:
+        graph[d.name] |= _uses(d) & names
+    return graph
+
+
+class DeadCode:
+    @classmethod
+    def eliminate(cls, program: Program):
+        '''Elimina el código muerto del programa. Retorna un DeadCodeStats.'''
+        dce = cls()
+        dce.stats = DeadCodeStats()
+        before = sum(1 for _ in walk(program.body))
+
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                decl.body = dce._block(decl.body)
+
+        # Nombres alcanzables desde 'main' y desde los inicializadores
+        # globales que se ejecutan por sus efectos
+        graph = call_graph(program)
+        roots = {'main'} & graph.keys()
+        for decl in program.body:
+            if isinstance(decl, (VarDecl, VarDeclInit)) and _effects(decl):
+                roots |= graph[decl.name]
+        live = set()
+        work = list(roots)
+        while work:
+            name = work.pop()
+            if name not in live:
+                live.add(name)
+                work += graph[name] - live
+
+        body = []
+        for decl in program.body:
+            if (isinstance(decl, (VarDecl, VarDeclInit, FuncDecl))
+                    and decl.name not in live and not _effects(decl)):
+                if isinstance(decl, FuncDecl):
+                    if not decl.prototype:
+                        dce.stats.functions.append(decl.name)
+                else:
+                    dce.stats.globals += 1
+                continue
+            body.append(decl)
+        program.body = body
+        # La imagen inicial de peval.py no debe cargar globales eliminados
+        if hasattr(program, 'image'):
+            kept = {id(d) for d in body}
+            program.image = [(d, v) for d, v in program.image if id(d) in kept]
+
+        dce.stats.nodes = before - sum(1 for _ in walk(program.body))
+        return dce.stats
+
+    def _block(self, stmts):
+        '''Lista de sentencias sin las ramas constantes ni el código inalcanzable.'''
+        out = []
+        for i, stmt in enumerate(stmts):
+            new = self._stmt(stmt)
+            out += new
+            if any(_returns(s) for s in new):
+                dead = stmts[i + 1:]
+                kept = [s for s in dead if isinstance(s, (VarDecl, VarDeclInit))]
+                self.stats.statements += len(dead) - len(kept)
+                out += kept
+                break
+        return out
+
+    def _stmt(self, n):
+        '''Lista de sentencias que reemplaza a n.'''
+        if isinstance(n, IfStmt):
+            n.then_branch = self._block(n.then_branch)
+            n.else_branch = self._block(n.else_branch) if n.else_branch else n.else_branch
+            if isinstance(n.cond, Boolean):
+                # Los bloques no abren un alcance nuevo: la rama se inserta tal cual
+                self.stats.branches += 1
+                return n.then_branch if n.cond.value else list(n.else_branch or [])
+        elif isinstance(n, WhileStmt):
+            n.body = self._block(n.body)
+            if isinstance(n.cond, Boolean) and not n.cond.value:
+                self.stats.branches += 1
+                return []
+        elif isinstance(n, ForStmt):
+            n.body = self._block(n.body)
+            if isinstance(n.cond, Boolean) and not n.cond.value:
+                self.stats.branches += 1
+                return [n.init] if n.init is not None else []
+        elif isinstance(n, DoWhileStmt):
+            body = self._stmt(n.body)
+            n.body = body[0] if len(body) == 1 else Block(body)
+        elif isinstance(n, Block):
+            n.body = self._block(n.body)
+        return [n]
+
+
+def eliminate(program: Program):
+    '''
+    Elimina el código muerto del programa (no necesita los tipos: se
+    puede ejecutar antes del checker). Retorna un DeadCodeStats.
+    '''
+    return DeadCode.eliminate(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 dce.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    print(eliminate(ast))
@@ -16,9 +16,22 @@ from rich import print
 
 _errors_detected = 0
 
+# Con _silent los errores se cuentan pero no se muestran (ver silence_errors)
+_silent = False
+
+class BminorExit(BaseException):
+	'''
+	Excepción para detener la ejecución por un error de runtime. Se define
+	aquí y no en interp.py para que sea la misma clase aunque interp.py se
+	ejecute como __main__.
+	'''
+	pass
+
 def error(message, lineno=None):
 	global _errors_detected
-	if lineno:
+	if _silent:
+		pass
+	elif lineno:
 		print(f'{lineno}: [red]{message}[/red]')
 	else:
 		print(f"[red]{message}[/red]")
@@ -29,4 +42,13 @@ def errors_detected():
 	
 def clear_errors():
 	global _errors_detected
-	_errors_detected = 0
\ No newline at end of file
+	_errors_detected = 0
+
+def silence_errors(flag=True):
+	'''
+	Con flag=True los errores siguientes sólo se cuentan. Lo usa el
+	intérprete, que verifica el programa para especializarlo y no debe
+	mezclar los mensajes del checker con la salida del programa.
+	'''
+	global _silent
+	_silent = flag
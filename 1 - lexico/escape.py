@@ -0,0 +1,282 @@
+'''
+Análisis de escape de los arrays locales y pools de buffers.
+
+Un array local con tamaño ('tmp: array [n] integer;' dentro de una
+función) se crea y se llena de ceros cada vez que se ejecuta su
+declaración. Si el array no escapa de la llamada, su buffer queda libre
+cuando la función retorna y la siguiente llamada lo puede reutilizar.
+
+Después de la resolución de nombres (resolve.py) un array local escapa
+si su variable (o una fila a[i] de un array de arrays) se usa como
+valor en cualquier lugar que no sea:
+
+  - la raíz de un acceso a[i] (a[i][j], ...) que se lee, se asigna o se
+    incrementa (a[i] = fila copia la fila en el buffer),
+  - el argumento de array_length o de 'print',
+  - un argumento de una llamada directa a una función del programa en
+    la posición de un parámetro que tampoco escapa (la llamada termina
+    antes que la función que le presta el array).
+
+Así un array que se asigna a otra variable (o se reasigna), se guarda
+en un array, se retorna o se pasa a un parámetro que escapa no se
+reutiliza. Los parámetros que no escapan se calculan para todo el
+programa a la vez: se suponen todos seguros y se descartan los que
+escapan hasta que no cambia nada. Las variables que comparten el slot
+con un parámetro, que tienen otra declaración (sin tamaño, con
+inicializador o de otro tipo base) en la misma función o cuyo tamaño no
+está completo no se consideran.
+
+Cada variable que no escapa tiene un ArrayPool, que sus declaraciones
+guardan en el atributo 'pool' (las demás tienen None); cada FuncDecl
+tiene en 'arrays' la lista de pares (slot, ArrayPool) de sus variables
+(o None). Los motores crean esos arrays con interp.pooled_array, que
+toma un buffer libre de las mismas dimensiones y lo vuelve a poner en
+cero sin pasar por new_array, y al terminar la llamada el FramePool de
+la función (frame.py) devuelve a cada pool el buffer que quedó en su
+slot. Una declaración dentro de un ciclo devuelve primero el array de
+la iteración anterior.
+
+usage:
+    python3 escape.py <filename>
+'''
+from model   import *
+from resolve import Resolver, LOCAL, GLOBAL
+from astutil import walk, assigned_name
+from arrays  import BitArray
+
+# Buffers libres que se conservan por cada forma de array
+POOL_LIMIT = 16
+
+
+class ArrayPool:
+    '''
+    Buffers libres de un array local de una función, por clase de tamaño:
+    dimensiones -> [contenido en cero, buffer, buffer, ...]. Se guardan a
+    lo sumo 'limit' buffers por clase.
+    '''
+    __slots__ = ('name', 'strided', 'limit', 'free', 'allocated')
+
+    def __init__(self, name, levels, limit=POOL_LIMIT):
+        self.name = name
+        self.strided = levels > 1                   # un Strided sobre un buffer
+        self.limit = limit
+        self.free = {}
+        self.allocated = 0
+
+    def acquire(self, sizes):
+        '''Un buffer libre con esas dimensiones (una tupla), en cero, o None.'''
+        free = self.free.get(sizes)
+        if free is None or len(free) == 1:
+            return None
+        arr = free.pop()
+        data = arr.data if self.strided else arr
+        if data.__class__ is BitArray:
+            data.bits[:] = free[0]
+        else:
+            data[:] = free[0]
+        return arr
+
+    def created(self, sizes, arr):
+        '''Registra un buffer recién creado (en cero) con esas dimensiones.'''
+        self.allocated += 1
+        if sizes not in self.free:
+            data = arr.data if self.strided else arr
+            self.free[sizes] = [bytes(len(data.bits)) if data.__class__ is BitArray else data[:]]
+
+    def release(self, arr):
+        '''Devuelve un buffer al pool (si hay lugar en su clase).'''
+        free = self.free.get(arr.dims if self.strided else (len(arr),))
+        if free is not None and len(free) <= self.limit:
+            free.append(arr)
+
+    def __str__(self):
+        return f'{self.name}: {self.allocated} buffers creados'
+
+
+class EscapeStats:
+    def __init__(self):
+        self.arrays = 0             # arrays locales con tamaño
+        self.pooled = {}            # función -> nombres de los arrays que no escapan
+
+    @property
+    def total(self):
+        return sum(len(names) for names in self.pooled.values())
+
+    def __str__(self):
+        lines = [f'escape: {self.total} de {self.arrays} arrays locales no escapan '
+                 f'de su llamada (sus buffers se reutilizan)']
+        for func, names in self.pooled.items():
+            lines.append(f'  {func}: {", ".join(names)}')
+        return '\n'.join(lines)
+
+
+def _levels(typ):
+    '''Cantidad de dimensiones de un tipo array.'''
+    levels = 0
+    while isinstance(typ, ArrayType):
+        levels += 1
+        typ = typ.elem_type
+    return levels, typ
+
+
+def _chain(n):
+    '''Raíz y profundidad de un acceso a[i][j]...'''
+    depth = 0
+    while isinstance(n, ArrayAccess):
+        depth += 1
+        n = n.array
+    return n, depth
+
+
+class EscapeAnalysis:
+    @classmethod
+    def mark(cls, program: Program, enabled=True):
+        '''
+        Anota 'pool' en las declaraciones de arrays locales que no
+        escapan y 'arrays' en sus FuncDecl; si 'enabled' es False ninguna
+        queda marcada. Retorna un EscapeStats.
+        '''
+        stats = EscapeStats()
+        self = cls()
+
+        # Funciones que se pueden llamar directamente (como en tailcall.py)
+        self.funcs = {}
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and decl.prototype:
+                continue
+            self.funcs[decl.slot] = decl if decl.slot not in self.funcs else None
+        for n in walk(program.body):
+            if assigned_name(n) is not None:
+                target = n.expr if isinstance(n, (PreInc, PreDec)) else n.left
+                if target.scope == GLOBAL:
+                    self.funcs[target.slot] = None
+        self.funcs = {slot: f for slot, f in self.funcs.items() if isinstance(f, FuncDecl)}
+        self.length = None
+        if 'array_length' in program.globals and all(d.name != 'array_length' for d in program.body):
+            self.length = program.globals.index('array_length')
+
+        # Parámetros array que no escapan: (slot de la función, posición)
+        self.safe = {(func.slot, k) for func in self.funcs.values()
+                     for k, parm in enumerate(func.params) if isinstance(parm.type, ArrayType)}
+        changed = True
+        while changed:
+            changed = False
+            for func in self.funcs.values():
+                params = {parm.slot: (k, _levels(parm.type)[0]) for k, parm in enumerate(func.params)
+                          if (func.slot, k) in self.safe}
+                for slot in self._escaping(func, {s: d for s, (_, d) in params.items()}):
+                    self.safe.discard((func.slot, params[slot][0]))
+                    changed = True
+
+        for func in program.body:
+            if isinstance(func, FuncDecl) and not func.prototype:
+                self._function(func, stats, enabled)
+        return stats
+
+    def _function(self, func, stats, enabled):
+        func.arrays = None
+        decls = {}
+        for n in walk(func.body):
+            if isinstance(n, (VarDecl, VarDeclInit)):
+                n.pool = None
+                decls.setdefault(n.slot, []).append(n)
+
+        # Slot -> (dimensiones, tipo base) de los arrays locales candidatos
+        tracked = {}
+        for slot, group in decls.items():
+            arrays = [d for d in group if isinstance(d, VarDecl) and isinstance(d.type, ArrayType)
+                      and d.type.size is not None]
+            stats.arrays += len(arrays)
+            if not arrays or len(arrays) != len(group) or slot < len(func.params):
+                continue
+            shapes = set()
+            for d in arrays:
+                levels, elem = _levels(d.type)
+                sized, typ = 0, d.type
+                while isinstance(typ, ArrayType) and typ.size is not None:
+                    sized += 1
+                    typ = typ.elem_type
+                shapes.add((levels, getattr(elem, 'name', None), sized == levels))
+            if len(shapes) == 1:
+                levels, elem, complete = shapes.pop()
+                if complete and elem is not None:
+                    tracked[slot] = (levels, elem)
+
+        if not enabled:
+            return
+        escaping = self._escaping(func, {slot: levels for slot, (levels, _) in tracked.items()})
+        func.arrays = []
+        for slot, (levels, _) in tracked.items():
+            if slot in escaping:
+                continue
+            pool = ArrayPool(f'{func.name}.{decls[slot][0].name}', levels)
+            for d in decls[slot]:
+                d.pool = pool
+            func.arrays.append((slot, pool))
+        if not func.arrays:
+            func.arrays = None
+            return
+        stats.pooled[func.name] = [decls[slot][0].name for slot, _ in func.arrays]
+
+    def _escaping(self, func, tracked):
+        '''
+        Slots de 'tracked' (slot -> dimensiones) cuyo array escapa de una
+        llamada a 'func'.
+        '''
+        def mine(n):
+            return (isinstance(n, Identifier) and n.scope == LOCAL and n.slot in tracked)
+
+        allowed = set()     # usos como valor permitidos
+        roots = set()       # raíces y accesos internos de una cadena a[i][j]
+        for n in walk(func.body):
+            if isinstance(n, ArrayAccess):
+                roots.add(id(n.array))
+            elif isinstance(n, Assign) and isinstance(n.left, ArrayAccess):
+                allowed.add(id(n.left))
+            elif isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, ArrayAccess):
+                allowed.add(id(n.expr))
+            elif isinstance(n, PrintStmt):
+                allowed.add(id(n.expr))
+            elif isinstance(n, Call) and isinstance(n.func, Identifier) and n.func.scope == GLOBAL:
+                callee = self.funcs.get(n.func.slot)
+                if n.func.slot == self.length:
+                    allowed.update(id(arg) for arg in n.args)
+                elif callee is not None and len(n.args) == len(callee.params):
+                    allowed.update(id(arg) for k, arg in enumerate(n.args)
+                                   if (callee.slot, k) in self.safe)
+
+        escaping = set()
+        for n in walk(func.body):
+            if id(n) in roots:
+                continue
+            if mine(n):
+                # El array como valor (o reasignado)
+                if id(n) not in allowed:
+                    escaping.add(n.slot)
+            elif isinstance(n, ArrayAccess):
+                root, depth = _chain(n)
+                # Una fila de un array de arrays comparte el buffer
+                if mine(root) and depth < tracked[root.slot] and id(n) not in allowed:
+                    escaping.add(root.slot)
+            elif isinstance(n, Assign) and mine(n.left):
+                escaping.add(n.left.slot)
+            elif isinstance(n, (PreInc, PreDec)) and mine(n.expr):
+                escaping.add(n.expr.slot)
+        return escaping
+
+
+def mark(program: Program):
+    '''Resuelve los nombres del programa y marca sus arrays locales que no escapan.'''
+    from interp import builtin_functions
+    Resolver.resolve(program, builtin_functions())
+    return EscapeAnalysis.mark(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 escape.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    print(mark(ast))
@@ -0,0 +1,327 @@
+'''
+Plegado y propagación de constantes sobre el AST verificado.
+
+Se ejecuta después de Check.checker (necesita los tipos anotados) y
+antes de la ejecución, de modo que todos los motores (y los back-ends)
+reciben el AST simplificado:
+
+  - Las operaciones cuyos operandos son literales se evalúan con la
+    misma semántica del intérprete (división entera hacia abajo, '%' de
+    Python, floats IEEE). No se pliega lo que fallaría al ejecutarse
+    (división por cero, operadores no implementados), los enteros que
+    no caben en 64 bits ni los floats no finitos, para que el intérprete
+    y los back-ends nativos sigan dando el mismo resultado.
+
+  - Los globales inicializados con una constante que nunca se modifican
+    en el programa, y las variables locales declaradas en el nivel
+    superior de una función con un inicializador constante y que nunca
+    se reasignan, se reemplazan por su valor.
+
+  - Los 'if' y 'while' con condición constante se reemplazan por la
+    rama que se ejecuta.
+
+usage:
+    python3 fold.py <filename>
+'''
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, assigned_name, make_literal
+
+_NUMERIC = ('integer', 'float')
+
+
+class FoldStats:
+    def __init__(self):
+        self.folded = 0             # operaciones reemplazadas por su valor
+        self.propagated = 0         # usos de variables reemplazados por su valor
+        self.branches = 0           # 'if'/'while' con condición constante
+
+    @property
+    def total(self):
+        return self.folded + self.propagated + self.branches
+
+    def __str__(self):
+        return (f'fold: {self.total} nodos plegados ({self.folded} operaciones, '
+                f'{self.propagated} constantes propagadas, {self.branches} ramas)')
+
+
+def _binop(oper, left, right):
+    '''Valor de 'left oper right' (literales ya verificados), o None.'''
+    a, b = left.value, right.value
+    numeric = left.type in _NUMERIC and right.type in _NUMERIC
+    if oper in ('==', '!='):
+        return (a == b) == (oper == '==')
+    if oper == '+' and left.type == right.type == 'string':
+        return a + b
+    if not numeric:
+        return None
+    if oper == '+':
+        return a + b
+    if oper == '-':
+        return a - b
+    if oper == '*':
+        return a * b
+    if oper == '/':
+        if b == 0:
+            return None
+        return a / b if isinstance(a, float) or isinstance(b, float) else a // b
+    if oper == '%':
+        return None if b == 0 else a % b
+    if oper == '^':
+        from interp import fpow
+        if not isinstance(b, int):
+            return None
+        if isinstance(a, int):
+            # Con enteros de Python, como + - *: si el resultado no cabe en
+            # 64 bits make_literal no lo pliega y queda para la ejecución
+            # (que lo reduce o lo detiene según --overflow)
+            if b < 0 or (b > 64 and a not in (-1, 0, 1)):
+                return None
+            return a ** b
+        result = fpow(a, b)
+        if b < 0:
+            return 1.0 / result if result != 0 else None
+        return result
+    if oper == '<':
+        return a < b
+    if oper == '<=':
+        return a <= b
+    if oper == '>':
+        return a > b
+    if oper == '>=':
+        return a >= b
+    return None
+
+
+class ConstantFolder(Visitor):
+    '''
+    Los visit de expresiones retornan el nodo que reemplaza a la
+    expresión (ella misma si no cambia); los de sentencias reescriben
+    sus hijos.
+    '''
+    @classmethod
+    def fold(cls, program: Program):
+        '''Pliega el programa (ya verificado) en su lugar. Retorna un FoldStats.'''
+        folder = cls()
+        folder.stats = FoldStats()
+
+        written = {assigned_name(n) for n in walk(program.body)} - {None}
+        decls = [d for d in program.body if isinstance(d, (VarDecl, VarDeclInit))]
+        names = [d.name for d in decls]
+
+        # Globales: en orden, cada inicializador sólo ve los anteriores
+        folder.env = {}
+        calls = False
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                continue
+            decl.accept(folder)
+            calls |= any(isinstance(n, Call) for n in walk([decl]))
+            if (isinstance(decl, VarDeclInit) and isinstance(decl.init, Literal)
+                    and decl.name not in written and names.count(decl.name) == 1):
+                folder.env[decl.name] = decl.init
+
+        # Si un inicializador global llama a una función, ésta podría leer
+        # un global que todavía no tiene su valor
+        consts = {} if calls else folder.env
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                folder._function(decl, consts)
+        return folder.stats
+
+    def _function(self, func, consts):
+        local = [p.name for p in func.params]
+        local += [n.name for n in walk(func.body) if isinstance(n, (VarDecl, VarDeclInit))]
+        written = {assigned_name(n) for n in walk(func.body)} - {None}
+        self.env = {k: v for k, v in consts.items() if k not in local}
+        body = []
+        for stmt in func.body:
+            body += self._stmt(stmt)
+            # Local del nivel superior: los usos posteriores ya la ven asignada
+            if (isinstance(stmt, VarDeclInit) and isinstance(stmt.init, Literal)
+                    and stmt.name not in written and local.count(stmt.name) == 1):
+                self.env[stmt.name] = stmt.init
+        func.body = body
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def _block(self, stmts):
+        out = []
+        for stmt in stmts:
+            out += self._stmt(stmt)
+        return out
+
+    def _stmt(self, n):
+        '''Lista de sentencias que reemplaza a n.'''
+        if isinstance(n, (Statement, IfStmt, ForStmt, ReturnStmt, Block, VarDeclInit, FuncDecl)):
+            result = n.accept(self)
+            return [n] if result is None else result
+        return [self._expr(n)]
+
+    def _expr(self, n):
+        return n.accept(self) if n is not None else None
+
+    def visit(self, n: VarDecl):
+        n.type.accept(self)
+
+    def visit(self, n: VarDeclInit):
+        n.type.accept(self)
+        if isinstance(n.init, list):
+            n.init = [self._expr(e) for e in n.init]
+        else:
+            n.init = self._expr(n.init)
+            n.value = n.init
+
+    def visit(self, n: ArrayType):
+        if n.size is not None:
+            n.size = self._expr(n.size)
+
+    def visit(self, n: SimpleType):
+        pass
+
+    def visit(self, n: FuncDecl):
+        pass
+
+    def visit(self, n: PrintStmt):
+        n.expr = self._expr(n.expr)
+
+    def visit(self, n: ExprStmt):
+        n.expr = self._expr(n.expr)
+
+    def visit(self, n: ReturnStmt):
+        n.expr = self._expr(n.expr)
+
+    def visit(self, n: Block):
+        n.body = self._block(n.body)
+
+    def visit(self, n: IfStmt):
+        n.cond = self._expr(n.cond)
+        n.then_branch = self._block(n.then_branch)
+        n.else_branch = self._block(n.else_branch) if n.else_branch else n.else_branch
+        if isinstance(n.cond, Boolean):
+            # Los bloques no abren un alcance nuevo: la rama se inserta tal cual
+            self.stats.branches += 1
+            return n.then_branch if n.cond.value else list(n.else_branch or [])
+
+    def visit(self, n: WhileStmt):
+        n.cond = self._expr(n.cond)
+        n.body = self._block(n.body)
+        if isinstance(n.cond, Boolean) and not n.cond.value:
+            self.stats.branches += 1
+            return []
+
+    def visit(self, n: DoWhileStmt):
+        n.body = self._stmt(n.body)
+        n.body = n.body[0] if len(n.body) == 1 else Block(n.body)
+        n.cond = self._expr(n.cond)
+
+    def visit(self, n: ForStmt):
+        n.init = self._expr(n.init)
+        n.cond = self._expr(n.cond)
+        n.step = self._expr(n.step)
+        n.body = self._block(n.body)
+        if isinstance(n.cond, Boolean) and not n.cond.value:
+            self.stats.branches += 1
+            return [n.init] if n.init is not None else []
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: Literal):
+        return n
+
+    def visit(self, n: Identifier):
+        value = self.env.get(n.name)
+        if value is None or getattr(n, 'type', None) == 'function':
+            return n
+        self.stats.propagated += 1
+        return make_literal(value.value, value.type, getattr(n, 'lineno', None))
+
+    def _replace(self, n, value):
+        lit = make_literal(value, n.type, getattr(n, 'lineno', None)) if value is not None else None
+        if lit is None:
+            return n
+        self.stats.folded += 1
+        return lit
+
+    def visit(self, n: BinOper):
+        n.left = self._expr(n.left)
+        n.right = self._expr(n.right)
+        if isinstance(n.left, Literal) and isinstance(n.right, Literal):
+            return self._replace(n, _binop(n.oper, n.left, n.right))
+        return n
+
+    def visit(self, n: LogicalOpExpr):
+        n.left = self._expr(n.left)
+        n.right = self._expr(n.right)
+        if isinstance(n.left, Boolean):
+            # Igual que el intérprete: '&&' falso y '||' verdadero retornan
+            # el operando izquierdo sin evaluar el derecho
+            self.stats.folded += 1
+            if n.left.value == (n.oper == '||'):
+                return n.left
+            return n.right
+        return n
+
+    def visit(self, n: UnaryOper):
+        n.expr = self._expr(n.expr)
+        if isinstance(n.expr, Literal):
+            if n.oper == '-' and n.expr.type in _NUMERIC:
+                return self._replace(n, -n.expr.value)
+            if n.oper == '!' and isinstance(n.expr, Boolean):
+                return self._replace(n, not n.expr.value)
+        return n
+
+    def _target(self, n):
+        '''Destino de una asignación: sólo se pliegan los índices.'''
+        if isinstance(n, ArrayAccess):
+            self._target(n.array)
+            n.pos = self._expr(n.pos)
+        return n
+
+    def visit(self, n: Assign):
+        n.right = self._expr(n.right)
+        n.left = self._target(n.left)
+        return n
+
+    def visit(self, n: PreInc):
+        n.expr = self._target(n.expr)
+        return n
+
+    def visit(self, n: PreDec):
+        n.expr = self._target(n.expr)
+        return n
+
+    def visit(self, n: Call):
+        n.args = [self._expr(a) for a in n.args]
+        return n
+
+    def visit(self, n: ArrayAccess):
+        self._target(n.array)
+        n.pos = self._expr(n.pos)
+        return n
+
+
+def fold(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, lo pliega.
+    Retorna un FoldStats (o None si el checker reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return ConstantFolder.fold(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 fold.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = fold(ast)
+    if stats is not None:
+        print(stats)
@@ -0,0 +1,63 @@
+'''
+Marcos de activación (frames) para la ejecución de funciones.
+
+Cada función B-Minor conoce, después de la resolución de nombres
+(ver resolve.py), cuántas variables locales necesita. Un Frame es
+un objeto de tamaño fijo con una lista preasignada de slots: los
+parámetros ocupan los primeros slots y las variables locales los
+siguientes.
+
+Los frames no guardan ninguna referencia a su padre ni el padre a
+ellos, de modo que al terminar la llamada el frame vuelve a la
+lista libre (free-list) de su función y puede reutilizarse en la
+siguiente llamada. Así la memoria permanece constante aunque se
+realicen millones de llamadas.
+'''
+
+
+class Frame:
+    '''
+    Registro de activación con un número fijo de slots.
+    '''
+    __slots__ = ('slots',)
+
+    def __init__(self, size):
+        self.slots = [None] * size
+
+
+class FramePool:
+    '''
+    Lista libre de frames de un mismo tamaño.
+
+    'acquire' entrega un frame limpio (todos los slots en None) y
+    'release' lo devuelve al pool. Se conservan como máximo 'limit'
+    frames libres para que una recursión muy profunda no deje
+    retenida toda su pila de frames después de terminar. 'arrays' son
+    los pares (slot, ArrayPool) de los arrays locales que no escapan de
+    la función (escape.py): 'release' devuelve a su pool los que
+    quedaron en los slots.
+    '''
+    __slots__ = ('size', 'limit', 'free', 'arrays', '_blank')
+
+    def __init__(self, size, limit=64, arrays=None):
+        self.size = size
+        self.limit = limit
+        self.free = []
+        self.arrays = arrays
+        self._blank = (None,) * size
+
+    def acquire(self):
+        if self.free:
+            return self.free.pop()
+        return Frame(self.size)
+
+    def release(self, frame):
+        if self.arrays is not None:
+            slots = frame.slots
+            for slot, pool in self.arrays:
+                if slots[slot] is not None:
+                    pool.release(slots[slot])
+        # Limpiar los slots para no retener arrays ni strings
+        frame.slots[:] = self._blank
+        if len(self.free) < self.limit:
+            self.free.append(frame)
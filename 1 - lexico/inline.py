@@ -0,0 +1,189 @@
+'''
+Expansión en línea de funciones pequeñas sobre el AST verificado.
+
+Se ejecuta después de Check.checker. Una función se expande en línea
+si es una hoja pequeña de la forma
+
+    f: function T (p1: T1, ..., pk: Tk) = { return expr; }
+
+donde expr no llama a funciones (tampoco a sí misma), no modifica
+ninguna variable y sólo usa sus parámetros y variables globales. Cada
+llamada f(a1, ..., ak) se reemplaza por una copia de expr en la que
+cada pi se sustituye por ai, siempre que:
+
+  - cada argumento sea un literal, una variable u otra expresión sin
+    efectos que no pueda fallar (y en ese caso el parámetro se use a lo
+    sumo una vez, para no repetir el cálculo),
+  - la función que llama no declare una variable local con el nombre de
+    f o de algún global que use expr.
+
+Como expr no asigna sus parámetros, leer directamente la variable del
+argumento equivale a la copia de un escalar; los arrays y los strings
+se leen por referencia, igual que en la llamada. Las funciones se
+procesan hasta un punto fijo, de modo que una función que sólo llama a
+hojas expandibles (por ejemplo can_move, que llama a index en
+test/exercises/knight.bminor) se vuelve a su vez una hoja expandible.
+
+Las funciones cuyo cuerpo tiene más de una sentencia no se expanden:
+el AST no tiene una expresión que ejecute sentencias.
+
+usage:
+    python3 inline.py <filename>
+'''
+from copy import deepcopy
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, assigned_name, is_quiet, function_locals, CHILD_FIELDS
+
+# Tamaño máximo (en nodos) de la expresión de una función expandible
+MAX_NODES = 32
+
+
+class InlineStats:
+    def __init__(self):
+        self.calls = {}             # función expandida -> llamadas reemplazadas
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def __str__(self):
+        lines = [f'inline: {self.total} llamadas expandidas de {len(self.calls)} funciones']
+        for name, count in self.calls.items():
+            lines.append(f'  {name}: {count}')
+        return '\n'.join(lines)
+
+
+def _writes(expr):
+    '''True si la evaluación de expr modifica alguna variable o array.'''
+    return any(isinstance(n, (Assign, PreInc, PreDec)) or assigned_name(n) is not None
+               for n in walk([expr]))
+
+
+class Inliner:
+    @classmethod
+    def inline(cls, program: Program):
+        '''Expande en línea las llamadas del programa (ya verificado). Retorna un InlineStats.'''
+        inliner = cls()
+        inliner.stats = InlineStats()
+        decls = [d for d in program.body if isinstance(d, (VarDecl, VarDeclInit, FuncDecl))]
+        names = [d.name for d in decls]
+        inliner.globals = set(names)
+        inliner.funcs = {d.name: d for d in decls
+                         if isinstance(d, FuncDecl) and not d.prototype and names.count(d.name) == 1}
+
+        # Hasta un punto fijo: expandir una llamada puede convertir a la
+        # función que llama en una hoja expandible
+        changed = True
+        while changed:
+            changed = False
+            for decl in program.body:
+                if isinstance(decl, FuncDecl):
+                    if decl.prototype:
+                        continue
+                    inliner.caller, inliner.shadowed = decl, function_locals(decl)
+                    before = inliner.stats.total
+                    decl.body = inliner._rewrite(decl.body)
+                    changed |= inliner.stats.total != before
+                elif isinstance(decl, VarDeclInit):
+                    inliner.caller, inliner.shadowed = None, set()
+                    inliner._rewrite(decl)
+        return inliner.stats
+
+    def _leaf(self, func):
+        '''Expresión de 'func' si es una hoja expandible, o None.'''
+        body = func.body
+        if len(body) != 1 or not isinstance(body[0], ReturnStmt) or body[0].expr is None:
+            return None
+        expr = body[0].expr
+        params = [p.name for p in func.params]
+        if len(set(params)) != len(params):
+            return None
+        size = 0
+        for n in walk([expr]):
+            size += 1
+            if isinstance(n, Call):
+                return None
+            if isinstance(n, Identifier) and n.name not in params and n.name not in self.globals:
+                return None
+        if size > MAX_NODES or _writes(expr):
+            return None
+        return expr
+
+    def _expand(self, n: Call):
+        '''Expresión que reemplaza a la llamada n, o None si no se expande.'''
+        if not isinstance(n.func, Identifier) or n.func.name in self.shadowed:
+            return None
+        func = self.funcs.get(n.func.name)
+        if func is None or func is self.caller or len(n.args) != len(func.params):
+            return None
+        expr = self._leaf(func)
+        if expr is None:
+            return None
+        params = [p.name for p in func.params]
+        used = [n for n in walk([expr]) if isinstance(n, Identifier)]
+        # Globales de la función que el llamador oculta con una local
+        if any(e.name not in params and e.name in self.shadowed for e in used):
+            return None
+        for param, arg in zip(params, n.args):
+            if not is_quiet(arg):
+                return None
+            uses = sum(e.name == param for e in used)
+            if uses > 1 and not isinstance(arg, (Literal, Identifier)):
+                return None
+
+        self.stats.calls[func.name] = self.stats.calls.get(func.name, 0) + 1
+        return _substitute(deepcopy(expr), dict(zip(params, n.args)))
+
+    def _rewrite(self, n):
+        '''Reescribe n y sus hijos; retorna el nodo que lo reemplaza.'''
+        if isinstance(n, list):
+            return [self._rewrite(e) for e in n]
+        for field in CHILD_FIELDS.get(type(n), ()):
+            child = getattr(n, field)
+            if child is not None:
+                setattr(n, field, self._rewrite(child))
+        if isinstance(n, VarDeclInit):
+            n.value = n.init
+        if isinstance(n, Call):
+            expr = self._expand(n)
+            if expr is not None:
+                return expr
+        return n
+
+
+def _substitute(n, args):
+    '''Reemplaza en n (una copia) cada parámetro por una copia de su argumento.'''
+    if isinstance(n, Identifier) and n.name in args:
+        return deepcopy(args[n.name])
+    for field in CHILD_FIELDS.get(type(n), ()):
+        child = getattr(n, field)
+        if child is not None:
+            setattr(n, field, _substitute(child, args))
+    return n
+
+
+def inline(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, expande en línea
+    sus funciones pequeñas. Retorna un InlineStats (o None si el checker
+    reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return Inliner.inline(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 inline.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = inline(ast)
+    if stats is not None:
+        print(stats)
@@ -4,25 +4,42 @@ Tree-walking interpreter para model.py
 
 from rich import print  # Usado por el intérprete de ejemplo
 from model import * # Importa todas las clases de model.py
-from symtab import Symtab # Importa la Tabla de Símbolos
+from frame import Frame, FramePool # Marcos de activación con slots
+from resolve import Resolver, LOCAL # Resolución de nombres a slots
+from loops import counted_loop, final_value # Ciclos contados
+from tailcall import TailCalls # Llamadas recursivas en posición de cola
+from escape import EscapeAnalysis # Arrays locales que reutilizan sus buffers
+from ranges import IntegerRanges # Operaciones enteras que no se desbordan
+from memo import memoized # Funciones puras memorizadas (--memo)
+from arrays import ARRAYS, Strided, allocate, from_values, strided # Arrays en memoria contigua
+from errors import BminorExit # Compartida con los módulos que importan interp
+from astutil import walk # Recorrido del AST
+
+
+class Signal:
+    '''
+    Estado con el que termina una sentencia (completion record).
 
+    Las sentencias retornan None cuando terminan normalmente, o una
+    de las señales BREAK, CONTINUE o RETURN para alterar el flujo de
+    control. El valor de un 'return' se deja en Interpreter.retval.
+    Así el flujo de control no depende de lanzar excepciones.
+    '''
+    __slots__ = ('name',)
 
-class ReturnException(Exception):
-    '''Excepción para manejar la sentencia 'return'.'''
-    def __init__(self, value):
-        self.value = value
+    def __init__(self, name):
+        self.name = name
 
-class BreakException(Exception):
-    '''Excepción para manejar la sentencia 'break'.'''
-    pass
+    def __repr__(self):
+        return f'Signal({self.name})'
 
-class ContinueException(Exception):
-    '''Excepción para manejar la sentencia 'continue'.'''
-    pass
+BREAK    = Signal('break')
+CONTINUE = Signal('continue')
+RETURN   = Signal('return')
 
-class BminorExit(BaseException):
-    '''Excepción para detener la ejecución por un error.'''
-    pass
+# Valor de retorno de una llamada en posición de cola: los argumentos
+# quedan en Interpreter.tailargs
+_TAILCALL = object()
 
 def _is_truthy(value):
   '''Define la veracidad de un valor en el lenguaje.'''
@@ -35,6 +52,372 @@ def _is_truthy(value):
   # Todos los demás valores (strings, arrays, funciones) son 'truthy'
   return True
 
+# =====================================================================
+# Semántica de las operaciones
+#
+# Funciones compartidas por todos los motores de ejecución (tree-walking,
+# closures, ...) para que produzcan exactamente la misma salida y los
+# mismos mensajes de error.
+# =====================================================================
+
+def runtime_error(message):
+    '''Reporta un error en tiempo de ejecución y detiene el programa.'''
+    # En un intérprete real, usaríamos la info de línea/columna del nodo
+    print(f"[Error de Runtime] {message}")
+    raise BminorExit()
+
+def check_numeric_operands(node, left, right):
+    '''Helper para operaciones binarias numéricas.'''
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return True
+    runtime_error(f"En '{node.oper}', los operandos deben ser números (recibido {type(left).__name__} y {type(right).__name__})")
+
+def check_numeric_operand(node, value):
+    '''Helper para operaciones unarias numéricas.'''
+    if isinstance(value, (int, float)):
+        return True
+    runtime_error(f"En '{node.oper}', el operando debe ser un número (recibido {type(value).__name__})")
+
+def binary_op(node, left, right):
+    '''Aplica el operador binario node.oper a operandos ya evaluados.'''
+    op = node.oper
+
+    if op == '+':
+        # 'add' está sobrecargado para strings
+        if isinstance(left, str) and isinstance(right, str):
+            return left + right
+        check_numeric_operands(node, left, right)
+        return int_result(left + right)
+    elif op == '-':
+        check_numeric_operands(node, left, right)
+        return int_result(left - right)
+    elif op == '*':
+        check_numeric_operands(node, left, right)
+        return int_result(left * right)
+    elif op == '/':
+        check_numeric_operands(node, left, right)
+        if right == 0:
+            runtime_error("División por cero")
+        # Forzar división de flotantes si alguno es flotante
+        if isinstance(left, float) or isinstance(right, float):
+            return left / right
+        else:
+            return int_result(left // right) # División entera (MIN / -1 se desborda)
+    elif op == '%':
+        check_numeric_operands(node, left, right)
+        if right == 0:
+            runtime_error("Módulo por cero")
+        return left % right
+    
+    # Comparaciones
+    elif op == '==': return left == right
+    elif op == '!=': return left != right
+    elif op == '<':
+        check_numeric_operands(node, left, right)
+        return left < right
+    elif op == '>':
+        check_numeric_operands(node, left, right)
+        return left > right
+    elif op == '<=':
+        check_numeric_operands(node, left, right)
+        return left <= right
+    elif op == '>=':
+        check_numeric_operands(node, left, right)
+        return left >= right
+    elif op == '^':
+        check_numeric_operands(node, left, right)
+        return power(left, right)
+
+    # Desplazamientos y máscara entre enteros: sólo los genera strength.py
+    elif op == '<<': return int_result(left << right)
+    elif op == '>>': return left >> right
+    elif op == '&': return left & right
+    else:
+        raise NotImplementedError(f"Operador binario no implementado: {op}")
+
+# =====================================================================
+# Enteros de 64 bits
+#
+# 'integer' es un entero de 64 bits con signo. Los motores calculan con
+# los int de Python y reducen a 64 bits (complemento a dos, como los
+# back-ends nativos con -fwrapv) los resultados de + - * / << '-' ++ --
+# y '^' que se salen del rango; con --overflow=trap esos resultados son
+# un error de ejecución. Las operaciones que ranges.py demuestra que no
+# se desbordan (n.bounded) no se verifican.
+# =====================================================================
+
+INT_MIN = -2**63
+INT_MAX = 2**63 - 1
+
+# Si es True, un desbordamiento es un error en lugar de dar la vuelta. Lo
+# fija cada motor al empezar a ejecutar (Options.trap): las operaciones
+# de este módulo son compartidas por todos los motores y no saben cuál
+# las llama
+TRAP_OVERFLOW = False
+
+def trap_overflow(enabled):
+    '''Fija el modo de los desbordamientos (error o vuelta). Retorna el modo anterior.'''
+    global TRAP_OVERFLOW
+    previous, TRAP_OVERFLOW = TRAP_OVERFLOW, enabled
+    return previous
+
+_WRAP = 2**64
+
+def wrap_int(value):
+    '''Entero de 64 bits con signo (complemento a dos), como en los back-ends nativos.'''
+    value %= _WRAP
+    return value - _WRAP if value >= 2**63 else value
+
+def int_overflow(value):
+    '''Resultado entero fuera de 64 bits: da la vuelta o, con TRAP_OVERFLOW, es un error.'''
+    if TRAP_OVERFLOW:
+        runtime_error(f"Desbordamiento de entero ({value})")
+    return wrap_int(value)
+
+def int_result(value):
+    '''Resultado de una operación numérica: los enteros se reducen a 64 bits.'''
+    if value.__class__ is not int or INT_MIN <= value <= INT_MAX:
+        return value
+    return int_overflow(value)
+
+def ipow(base, exp):
+    '''
+    base ^ exp entre enteros (exp >= 0) por cuadrados sucesivos: O(log exp)
+    productos, cada uno reducido a 64 bits como en bm_ipow.
+    '''
+    result = 1
+    while exp:
+        if exp & 1:
+            result = int_result(result * base)
+        exp >>= 1
+        if exp:
+            base = int_result(base * base)
+    return result
+
+def fpow(base, exp):
+    '''
+    base ^ |exp| con base float por cuadrados sucesivos, con la misma
+    secuencia de productos que bm_fpow (el resultado es idéntico).
+    '''
+    n = -exp if exp < 0 else exp
+    result = 1.0
+    while n:
+        if n & 1:
+            result *= base
+        n >>= 1
+        if n:
+            base *= base
+    return result
+
+def power(base, exp):
+    '''Semántica del operador '^': el exponente es siempre entero.'''
+    if not isinstance(exp, int) or isinstance(exp, bool):
+        runtime_error(f"En '^', el exponente debe ser un entero (recibido {type(exp).__name__})")
+    if isinstance(base, int):
+        if exp < 0:
+            runtime_error("Exponente negativo en una potencia entera")
+        return ipow(base, exp)
+    result = fpow(base, exp)
+    if exp < 0:
+        if result == 0:
+            runtime_error("División por cero")
+        return 1.0 / result
+    return result
+
+def unary_op(node, value):
+    '''Aplica el operador unario node.oper a un operando ya evaluado.'''
+    if node.oper == '-':
+        check_numeric_operand(node, value)
+        return int_result(-value)
+    elif node.oper == '!':
+        return not _is_truthy(value)
+    else:
+        raise NotImplementedError(f"Operador unario no implementado: {node.oper}")
+
+def array_load(node, arr, idx):
+    '''Lectura arr[idx] con verificación de tipo y de límites.'''
+    if not isinstance(arr, ARRAYS):
+        runtime_error("Base de acceso a array no es un array")
+    if not isinstance(idx, int):
+        runtime_error("Índice de array no es un entero")
+    if idx < 0 or idx >= len(arr):
+        runtime_error(f"Índice de array fuera de límites ({idx} para tamaño {len(arr)})")
+        
+    return arr[idx]
+
+def array_store(node, arr, idx, value):
+    '''Escritura arr[idx] = value con verificación de tipo y de límites.'''
+    if not isinstance(arr, ARRAYS):
+        runtime_error("Base de acceso a array no es un array " + str(node.lineno))
+    if not isinstance(idx, int):
+        runtime_error("Índice de array no es un entero")
+    if idx < 0 or idx >= len(arr):
+        runtime_error(f"Índice de array fuera de límites ({idx})")
+    try:
+        arr[idx] = value
+    except OverflowError:
+        runtime_error(f"Entero fuera del rango de 64 bits ({value})")
+    except TypeError:
+        runtime_error(f"Valor de tipo {type(value).__name__} en un array de otro tipo")
+
+def default_value(typ):
+    '''Valor inicial de una variable (o elemento) del tipo simple dado.'''
+    if isinstance(typ, SimpleType):
+        if typ.name == 'integer': return 0
+        elif typ.name == 'float': return 0.0
+        elif typ.name == 'boolean': return False # <-- El valor clave para 'isprime'
+        elif typ.name == 'string': return ""
+        elif typ.name == 'char': return '\0'
+    return None
+
+def new_array(node, *sizes):
+    '''
+    Crea el array declarado en 'node' con los tamaños dados (uno por
+    dimensión, ver array_sizes). Un array de arrays es un solo buffer.
+    '''
+    total = 1
+    for size_val in sizes:
+        if not isinstance(size_val, int):
+            runtime_error(f"Tamaño del array '{node.name}' no es un entero (es {type(size_val).__name__})")
+        if size_val < 0:
+            runtime_error(f"Tamaño del array '{node.name}' no puede ser negativo ({size_val})")
+        total *= size_val
+
+    # Memoria contigua según el tipo base (arrays.py)
+    elem_type = node.type
+    for _ in sizes:
+        elem_type = elem_type.elem_type
+    data = allocate(getattr(elem_type, 'name', None), total, default_value(elem_type),
+                    getattr(node, 'bits', False))
+    return data if len(sizes) == 1 else strided(data, sizes)
+
+def pooled_array(node, sizes, old):
+    '''
+    new_array para un array local que no escapa de su función (escape.py):
+    reutiliza un buffer libre de las mismas dimensiones, puesto en cero.
+    'sizes' es una tupla y 'old' el valor actual de la variable (el array
+    de la iteración anterior si la declaración está en un ciclo), que
+    vuelve primero al pool.
+    '''
+    pool = node.pool
+    if old is not None:
+        pool.release(old)
+    arr = pool.acquire(sizes)
+    if arr is not None:
+        return arr
+    arr = new_array(node, *sizes)
+    pool.created(sizes, arr)
+    return arr
+
+def array_sizes(typ):
+    '''
+    Expresiones de tamaño de un tipo array, de la dimensión exterior a
+    la interior ('array [N] array [M] float' -> [N, M]). Se detiene en
+    la primera dimensión sin tamaño.
+    '''
+    sizes = []
+    while isinstance(typ, ArrayType) and typ.size is not None:
+        sizes.append(typ.size)
+        typ = typ.elem_type
+    return sizes
+
+def index_chain(node):
+    '''
+    Raíz e índices de un acceso a[i][j]...: (a, [i, j, ...]). Los
+    motores evalúan la raíz y luego los índices, en ese orden.
+    '''
+    idxs = []
+    while isinstance(node, ArrayAccess):
+        idxs.append(node.pos)
+        node = node.array
+    idxs.reverse()
+    return node, idxs
+
+def strided_load(node, arr, idxs):
+    '''
+    Lectura arr[i][j]... con los índices ya evaluados. Si arr es un
+    Strided con esas dimensiones se lee directo en el buffer; si no, es
+    una cadena de array_load (con los mismos errores).
+    '''
+    if arr.__class__ is Strided and len(idxs) == len(arr.dims):
+        offset = arr.offset
+        for idx, dim, stride in zip(idxs, arr.dims, arr.strides):
+            if idx.__class__ is not int or not 0 <= idx < dim:
+                break
+            offset += idx * stride
+        else:
+            return arr.data[offset]
+    return _chain_load(node, arr, idxs)
+
+def strided_store(node, arr, idxs, value):
+    '''Escritura arr[i][j]... = value con los índices ya evaluados.'''
+    if arr.__class__ is Strided and len(idxs) == len(arr.dims):
+        offset = arr.offset
+        for idx, dim, stride in zip(idxs, arr.dims, arr.strides):
+            if idx.__class__ is not int or not 0 <= idx < dim:
+                break
+            offset += idx * stride
+        else:
+            try:
+                arr.data[offset] = value
+                return
+            except (TypeError, OverflowError):
+                pass
+    array_store(node, _chain_load(node.array, arr, idxs[:-1]), idxs[-1], value)
+
+def _chain_load(node, arr, idxs):
+    '''arr[i][j]... acceso por acceso; 'node' es el acceso más externo.'''
+    nodes = []
+    for _ in idxs:
+        nodes.append(node)
+        node = node.array
+    for access, idx in zip(reversed(nodes), idxs):
+        arr = array_load(access, arr, idx)
+    return arr
+
+def init_array(node, values):
+    '''Array declarado en 'node' con los valores de su inicializador.'''
+    try:
+        return from_values(getattr(_elem_type(node.type), 'name', None), values,
+                           getattr(node, 'bits', False))
+    except (TypeError, OverflowError):
+        # Valores de otro tipo (programa sin verificar): una lista
+        return values
+
+def mark_arrays(program, bits=False):
+    '''
+    Anota 'bits' en las declaraciones de arrays del programa: si es True
+    sus elementos boolean se guardan en un BitArray (Options.bits).
+    '''
+    for n in walk(program.body):
+        if isinstance(n, (VarDecl, VarDeclInit)) and isinstance(n.type, ArrayType):
+            n.bits = bits
+
+def _elem_type(typ):
+    '''Tipo base de un array (puede ser un array de arrays).'''
+    elem_type = typ.elem_type
+    while isinstance(elem_type, ArrayType):
+         elem_type = elem_type.elem_type
+    return elem_type
+
+def preload_image(program, gslots):
+    '''
+    Copia en los slots globales la imagen inicial calculada al compilar
+    (peval.py). Retorna los ids de las declaraciones que ya no se ejecutan.
+    '''
+    image = getattr(program, 'image', ())
+    for decl, value in image:
+        gslots[decl.slot] = value
+    return {id(decl) for decl, _ in image}
+
+def print_value(value):
+    '''Semántica de la sentencia 'print'.'''
+    if isinstance(value, str):
+        # Interpretar secuencias de escape
+        value = value.replace('\\n', '\n').replace('\\t', '\t')
+    elif isinstance(value, ARRAYS):
+        value = list(value)
+    print(value, end='')
 
 class BuiltinFunction:
     '''Wrapper para funciones nativas de Python (built-ins).'''
@@ -49,11 +432,43 @@ class BuiltinFunction:
             # Propaga errores de la función nativa
             interp.error(None, f"Error en built-in '{self.func.__name__}': {e}")
 
+def builtin_functions():
+    '''Funciones built-in disponibles en el entorno global.'''
+
+    def builtin_read_int():
+        try:
+            # Como strtoll en bm_read_int: fuera de 64 bits se satura
+            return min(max(int(input()), INT_MIN), INT_MAX)
+        except ValueError:
+            return 0
+
+    def builtin_read_float():
+        try:
+            return float(input())
+        except ValueError:
+            return 0.0
+
+    def builtin_read_string():
+        return input()
+
+    def builtin_array_length(arr):
+        return len(arr)
+
+    builtins = {
+        'read_int': BuiltinFunction(builtin_read_int, 0),
+        'read_float': BuiltinFunction(builtin_read_float, 0),
+        'read_string': BuiltinFunction(builtin_read_string, 0),
+        'array_length': BuiltinFunction(builtin_array_length, 1),
+    }
+
+    return builtins
+
 class Function:
 
-  def __init__(self, node, env):
+  def __init__(self, node):
     self.node = node
-    self.env = env
+    # Cada función reutiliza sus propios frames (ver frame.py)
+    self.pool = FramePool(node.nslots, arrays=getattr(node, 'arrays', None))
 
   @property
   def arity(self) -> int:
@@ -61,100 +476,143 @@ class Function:
 
   def __call__(self, interp, *args):
 
-    call_env = Symtab(self.node.name, self.env)
+    frame = self.pool.acquire()
 
-    for param_node, arg_value in zip(self.node.params, args):
-        call_env.add(param_node.name, arg_value) # Ej: call_env.add('base', 10)
+    # Los parámetros ocupan los primeros slots del frame
+    frame.slots[:len(args)] = args
 
     result = None 
     try:
-      for stmt in self.node.body:
-        stmt.accept(interp, call_env) 
-        
-    except ReturnException as e:
-      result = e.value
+      while True:
+        # Como _exec_body, pero deja el valor del 'return' en result
+        for stmt in self.node.body:
+          status = stmt.accept(interp, frame)
+          if isinstance(status, Signal):
+            if status is RETURN:
+              result = interp.retval
+              interp.retval = None
+            break
+        if result is not _TAILCALL:
+          break
+        # Llamada a sí misma en posición de cola (tailcall.py): se reutiliza
+        # el frame con los nuevos argumentos en lugar de crear otro
+        args = interp.tailargs
+        interp.tailargs = None
+        result = None
+        frame.slots[:] = self.pool._blank
+        frame.slots[:len(args)] = args
+
+    finally:
+      self.pool.release(frame)
       
     return result
 
-
-  def bind(self, instance):
-    self.env.add("this", instance)
-    return Function(self.node, self.env)
-
 # =====================================================================
 # Intérprete Principal
 # =====================================================================
 
-class Interpreter(Visitor):
+def _load(interp, node, env):
     '''
-    Implementación de un intérprete tree-walking usando el Visitor
-    definido con 'multimeta' en model.py.
+    Lee el slot (local o global) asignado al nombre del nodo. Es una
+    función y no un método: en un Visitor todo método es multimethod y
+    cada lectura de una variable pagaría su despacho.
     '''
-    def __init__(self):
-        self.global_env = Symtab('global')
-        self._add_builtins(self.global_env)
+    if node.scope == LOCAL:
+        return env.slots[node.slot]
+    return interp.globals.slots[node.slot]
 
-    def _add_builtins(self, env: Symtab):
-        '''Añade funciones built-in al entorno global.'''
 
-        def builtin_read_int():
-            try:
-                return int(input())
-            except ValueError:
-                return 0
-        
-        def builtin_read_float():
-            try:
-                return float(input())
-            except ValueError:
-                return 0.0
+def _store(interp, node, value, env):
+    '''Escribe en el slot (local o global) asignado al nombre del nodo.'''
+    if node.scope == LOCAL:
+        env.slots[node.slot] = value
+    else:
+        interp.globals.slots[node.slot] = value
+
+
+def _operand(interp, node, env):
+    '''
+    Valor de un operando (de una operación especializada o de una
+    llamada). Las variables y los literales se leen directamente, sin
+    despachar accept/visit (es una función y no un método: en un Visitor
+    todo método es multimethod).
+    '''
+    if node.__class__ is Identifier:
+        if node.scope == LOCAL:
+            return env.slots[node.slot]
+        return interp.globals.slots[node.slot]
+    if isinstance(node, Literal):
+        return node.value
+    return node.accept(interp, env)
 
-        def builtin_read_string():
-            return input()
 
-        def builtin_array_length(arr):
-            return len(arr)
+def _exec_body(interp, body, env):
+    '''
+    Ejecuta una lista de sentencias. Retorna la señal que detuvo la
+    ejecución (BREAK, CONTINUE o RETURN) o None si terminó normalmente.
+    Es una función y no un método del Visitor para no despachar el
+    multimethod en cada bloque.
+    '''
+    for stmt in body:
+        status = stmt.accept(interp, env)
+        # Las expresiones usadas como sentencia retornan su valor
+        if isinstance(status, Signal):
+            return status
+    return None
 
-        builtins = {
-            'read_int': BuiltinFunction(builtin_read_int, 0),
-            'read_float': BuiltinFunction(builtin_read_float, 0),
-            'read_string': BuiltinFunction(builtin_read_string, 0),
-            'array_length': BuiltinFunction(builtin_array_length, 1),
-        }
 
-        for name, func in builtins.items():
-            env.add(name, func)
+# Destino de un sitio de llamada que todavía no se ejecutó
+_UNBOUND = object()
 
-    def error(self, node, message):
-        '''Reporta un error en tiempo de ejecución.'''
-        # En un intérprete real, usaríamos la info de línea/columna del nodo
-        print(f"[Error de Runtime] {message}")
-        raise BminorExit()
-
-    def _check_numeric_operands(self, node, left, right):
-        '''Helper para operaciones binarias numéricas.'''
-        if isinstance(left, (int, float)) and isinstance(right, (int, float)):
-            return True
-        
-        print (left, right)
-        self.error(node, f"En '{node.oper}', los operandos deben ser números (recibido {type(left).__name__} y {type(right).__name__})")
 
-    def _check_numeric_operand(self, node, value):
-        '''Helper para operaciones unarias numéricas.'''
-        if isinstance(value, (int, float)):
-            return True
-        self.error(node, f"En '{node.oper}', el operando debe ser un número (recibido {type(value).__name__})")
+class Interpreter(Visitor):
+    '''
+    Implementación de un intérprete tree-walking usando el Visitor
+    definido con 'multimeta' en model.py.
+    '''
+    def __init__(self, options=None):
+        self.options = options or Options()
+        self.globals = None
+        self.retval = None
+        self.tailargs = None    # argumentos de una llamada en posición de cola
+        self.targets = {}       # id(Call) -> destino de la última llamada
+        self.builtins = builtin_functions()
+        self.truthy = _is_truthy
 
-  
 
+    def error(self, node, message):
+        '''Reporta un error en tiempo de ejecución.'''
+        runtime_error(message)
 
     def interpret(self, node: Node):
         '''Punto de entrada principal para interpretar un AST.'''
         try:
-            env = node.accept(self)
+            # La caché de llamadas es de esta ejecución: el AST puede
+            # interpretarse de nuevo con otras funciones en los slots
+            self.targets = {}
+            trap_overflow(self.options.trap)
+
+            # Resolver cada nombre a un slot local o global
+            env = Resolver.resolve(node, self.builtins)
+            mark_program(node, self.options)
+
+            # Programa verificado: operaciones especializadas por tipo (sin
+            # verificar el desbordamiento de las acotadas) y condiciones que
+            # siempre son booleanas
+            if getattr(node, 'checked', False):
+                from specialize import Specializer
+                Specializer.specialize(node)
+                self.truthy = bool
 
+            self.globals = Frame(len(node.globals))
+            for name, func in self.builtins.items():
+                self.globals.slots[env.get(name)] = func
 
-            main_func = env.get('main')
+            node.accept(self)
+
+            main_func = None
+            if env.get('main') is not None:
+                main_func = self.globals.slots[env.get('main')]
 
             # 3. Si 'main' existe y es una función, llamarla
             if main_func and callable(main_func):
@@ -180,220 +638,172 @@ class Interpreter(Visitor):
     # =================================================================
 
     def visit(self, node: Program):
-        env = Symtab('global')
+        preset = preload_image(node, self.globals.slots)
         for stmt in node.body:
-            stmt.accept(self, env)
-        return env
+            if id(stmt) not in preset:
+                stmt.accept(self, self.globals)
 
-    def visit(self, node: Block, env: Symtab):
-     
-        for stmt in node.body:
-            stmt.accept(self, env)
+    def visit(self, node: Block, env: Frame):
+        return _exec_body(self, node.body, env)
             
-    def visit(self, n: FuncDecl, env: Symtab):
-        func_env = Symtab(n.name, env)
-        func = Function(n, func_env)
-        env.add(n.name, func)
+    def visit(self, n: FuncDecl, env: Frame):
+        _store(self, n, memoized(Function(n), n), env)
 
-    def visit(self, node: VarDecl, env: Symtab):
+    def visit(self, node: VarDecl, env: Frame):
         value = None # Valor por defecto
 
         # Comprobar si es una declaración de array
         if isinstance(node.type, ArrayType):
             if node.type.size:
-                # Es un array con tamaño, ej: array [N] boolean
-                size_val = node.type.size.accept(self, env)
-                
-                if not isinstance(size_val, int):
-                    self.error(node, f"Tamaño del array '{node.name}' no es un entero (es {type(size_val).__name__})")
-                if size_val < 0:
-                    self.error(node, f"Tamaño del array '{node.name}' no puede ser negativo ({size_val})")
-
-                # Determinar el valor por defecto para los elementos
-                default_elem_val = None
-                
-                # Necesitamos encontrar el tipo base (puede ser un array de arrays)
-                elem_type = node.type.elem_type
-                while isinstance(elem_type, ArrayType):
-                     elem_type = elem_type.elem_type
-
-                if isinstance(elem_type, SimpleType):
-                    if elem_type.name == 'integer':
-                        default_elem_val = 0
-                    elif elem_type.name == 'float':
-                        default_elem_val = 0.0
-                    elif elem_type.name == 'boolean':
-                        default_elem_val = False # <-- El valor clave para 'isprime'
-                    elif elem_type.name == 'string':
-                        default_elem_val = ""
-                    elif elem_type.name == 'char':
-                        default_elem_val = '\0' 
-                
-                # Asignar una nueva lista (el array) con los valores por defecto
-                value = [default_elem_val] * size_val
+                # Es un array con tamaño, ej: array [N] boolean (o
+                # array [N] array [M] float: un tamaño por dimensión)
+                sizes = [size.accept(self, env) for size in array_sizes(node.type)]
+                if getattr(node, 'pool', None) is not None:
+                    value = pooled_array(node, tuple(sizes), env.slots[node.slot])
+                else:
+                    value = new_array(node, *sizes)
             else:
                 # Es un array sin tamaño (ej: 'array [] boolean' en un parámetro)
                 value = None
         
         # Opcional: Asignar valores por defecto a tipos simples también
         elif isinstance(node.type, SimpleType):
-            if node.type.name == 'integer': value = 0
-            elif node.type.name == 'float': value = 0.0
-            elif node.type.name == 'boolean': value = False
-            elif node.type.name == 'string': value = ""
-            elif node.type.name == 'char': value = '\0'
+            value = default_value(node.type)
 
-        env.add(node.name, value)
+        _store(self, node, value, env)
 
-    def visit(self, node: VarDeclInit, env: Symtab):
+    def visit(self, node: VarDeclInit, env: Frame):
         # Declaración con inicializador (potencialmente lista para array)
         if isinstance(node.init, list):
             # Inicialización de array
-            value = [item.accept(self, env) for item in node.init]
+            value = init_array(node, [item.accept(self, env) for item in node.init])
         elif node.init:
             # Inicialización de variable simple
             value = node.init.accept(self, env)
         else:
             value = None
-        env.add(node.name, value)
+        _store(self, node, value, env)
         
     def visit(self, node: PrintStmt, env):
         value = node.expr.accept(self, env)
-        if isinstance(value, str):
-            # Interpretar secuencias de escape
-            value = value.replace('\\n', '\n').replace('\\t', '\t')
-        print(value, end='')
-
-    def visit(self, node: WhileStmt, env: Symtab):
-        while _is_truthy(node.cond.accept(self, env)):
-            try:
-                for stmt in node.body:
-                    stmt.accept(self, env)
-            except BreakException:
-                break # Salir del bucle
-            except ContinueException:
-                continue # Saltar a la siguiente iteración
-
-    def visit(self, node: DoWhileStmt, env: Symtab):
+        print_value(value)
+
+    def visit(self, node: WhileStmt, env: Frame):
+        while self.truthy(node.cond.accept(self, env)):
+            status = _exec_body(self, node.body, env)
+            if status is not None:
+                if status is BREAK:
+                    break # Salir del bucle
+                if status is RETURN:
+                    return status
+                # CONTINUE: saltar a la siguiente iteración
+
+    def visit(self, node: DoWhileStmt, env: Frame):
         while True:
-            try:
-                node.body.accept(self, env)
-            except BreakException:
-                break
-            except ContinueException:
+            status = node.body.accept(self, env)
+            if isinstance(status, Signal):
+                if status is BREAK:
+                    break
+                if status is RETURN:
+                    return status
                 # En do-while, 'continue' va a la condición
-                pass
             
-            if not _is_truthy(node.cond.accept(self, env)):
+            if not self.truthy(node.cond.accept(self, env)):
                 break
 
-    def visit(self, node: IfStmt, env: Symtab):
+    def visit(self, node: IfStmt, env: Frame):
         # return  self.error(node, "División por cero "+str(node.cond.cond));
         cond_val = node.cond.accept(self, env)
-        if _is_truthy(cond_val):
-            for stmt in node.then_branch:
-                stmt.accept(self, env)
+        if self.truthy(cond_val):
+            return _exec_body(self, node.then_branch, env)
         elif node.else_branch:
-            for stmt in node.else_branch:
-                stmt.accept(self, env)
+            return _exec_body(self, node.else_branch, env)
 
 
             
-    def visit(self, node: ForStmt, env: Symtab): 
+    def visit(self, node: ForStmt, env: Frame): 
         # 1. Inicializador
         if node.init:
             node.init.accept(self, env)
-        
+
+        # Ciclo contado (loops.py): se recorre un range sin evaluar la
+        # condición ni el paso en cada iteración
+        loop = counted_loop(node) if self.options.counted else None
+        if loop is not None:
+            r = loop.range(_load(self, loop.var, env), loop.bound.accept(self, env),
+                           loop.step.accept(self, env))
+            if r is not None:
+                return self._counted(node, loop.var, r, env)
+
         while True:
             # 2. Condición
             cond_val = True # 'for(;;)' es un bucle infinito
             if node.cond:
                 cond_val = node.cond.accept(self, env)
             
-            if not _is_truthy(cond_val):
+            if not self.truthy(cond_val):
                 break # Salir del bucle
 
             # 3. Cuerpo
-            try:
-                for stmt in node.body:
-                    stmt.accept(self, env)
-            except BreakException:
-                break # Salir del 'for'
-            except ContinueException:
-                # 'continue' salta al 'step'
-                pass
+            status = _exec_body(self, node.body, env)
+            if status is not None:
+                if status is BREAK:
+                    break # Salir del 'for'
+                if status is RETURN:
+                    return status
+                # CONTINUE: salta al 'step'
             
             # 4. Step
             if node.step:
                 node.step.accept(self, env)
 
-    def visit(self, node: ReturnStmt, env: Symtab):
+    def _counted(self, node, var, r, env):
+        for value in r:
+            _store(self, var, value, env)
+            status = _exec_body(self, node.body, env)
+            if status is not None:
+                if status is BREAK:
+                    return None
+                if status is RETURN:
+                    return status
+        _store(self, var, final_value(r), env)
+
+    def visit(self, node: ReturnStmt, env: Frame):
+        if getattr(node, 'tail', False):
+            # Function.__call__ vuelve a ejecutar el cuerpo con estos argumentos
+            self.tailargs = [_operand(self, arg, env) for arg in node.expr.args]
+            self.retval = _TAILCALL
+            return RETURN
         value = None
         if node.expr:
             value = node.expr.accept(self, env)
-        raise ReturnException(value)
+        self.retval = value
+        return RETURN
         
-    def visit(self, node: ExprStmt, env: Symtab):
+    def visit(self, node: ExprStmt, env: Frame):
         node.expr.accept(self , env)
 
     
-    def visit(self, node: BinOper, env: Symtab):
+    def visit(self, node: BinOper, env: Frame):
         
         # return  self.error(node, "División por cero "+str(node.right.name) + " "  + str(node.lineno));
+        impl = getattr(node, 'impl', None)
+        if impl is not None:
+            # Especializada (specialize.py)
+            return impl(_operand(self, node.left, env), _operand(self, node.right, env))
+
         left = node.left.accept(self, env)
         right = node.right.accept(self, env)
 
-        op = node.oper
+        return binary_op(node, left, right)
 
+    def visit(self, node: LogicalOpExpr, env: Frame):
+        impl = getattr(node, 'impl', None)
+        if impl is not None:
+            left = _operand(self, node.left, env)
+            return left if impl(left) else _operand(self, node.right, env)
 
-        if op == '+':
-            # 'add' está sobrecargado para strings
-            if isinstance(left, str) and isinstance(right, str):
-                return left + right
-            self._check_numeric_operands(node, left, right)
-            return left + right
-        elif op == '-':
-            self._check_numeric_operands(node, left, right)
-            return left - right
-        elif op == '*':
-            self._check_numeric_operands(node, left, right)
-            return left * right
-        elif op == '/':
-            self._check_numeric_operands(node, left, right)
-            if right == 0:
-                self.error(node, "División por cero")
-            # Forzar división de flotantes si alguno es flotante
-            if isinstance(left, float) or isinstance(right, float):
-                return left / right
-            else:
-                return left // right # División entera
-        elif op == '%':
-            self._check_numeric_operands(node, left, right)
-            if right == 0:
-                self.error(node, "Módulo por cero")
-            return left % right
-        
-        # Comparaciones
-        elif op == '==': return left == right
-        elif op == '!=': return left != right
-        elif op == '<':
-            self._check_numeric_operands(node, left, right)
-            return left < right
-        elif op == '>':
-            self._check_numeric_operands(node, left, right)
-            return left > right
-        elif op == '<=':
-            self._check_numeric_operands(node, left, right)
-            return left <= right
-        elif op == '>=':
-            self._check_numeric_operands(node, left, right)
-            return left >= right
-        else:
-            raise NotImplementedError(f"Operador binario no implementado: {op}")
-
-    def visit(self, node: LogicalOpExpr, env: Symtab):
         left = node.left.accept(self, env)
-        
         if node.oper == '||':
             # Cortocircuito: si 'left' es verdadero, no evaluar 'right'
             return left if _is_truthy(left) else node.right.accept(self, env)
@@ -403,39 +813,38 @@ class Interpreter(Visitor):
         else:
             raise NotImplementedError(f"Operador lógico no implementado: {node.oper}")
 
-    def visit(self, node: UnaryOper,  env: Symtab):
+    def visit(self, node: UnaryOper,  env: Frame):
+        impl = getattr(node, 'impl', None)
+        if impl is not None:
+            return impl(_operand(self, node.expr, env))
         expr_val = node.expr.accept(self, env)
-        
-        if node.oper == '-':
-            self._check_numeric_operand(node, expr_val)
-            return -expr_val
-        elif node.oper == '!':
-            return not _is_truthy(expr_val)
-        else:
-            raise NotImplementedError(f"Operador unario no implementado: {node.oper}")
+        return unary_op(node, expr_val)
             
-    def visit(self, node: Assign, env: Symtab):
+    def visit(self, node: Assign, env: Frame):
         rvalue = node.right.accept(self, env)
         lvalue_node = node.left
         
         if isinstance(lvalue_node, Identifier):
             # Asignación a variable: x = ...
-            env.add(lvalue_node.name, rvalue)
+            _store(self, lvalue_node, rvalue, env)
+        elif isinstance(lvalue_node, ArrayAccess) and isinstance(lvalue_node.array, ArrayAccess):
+            # Asignación a un array de arrays: a[i][j] = ...
+            root, idxs = index_chain(lvalue_node)
+            arr = root.accept(self, env)
+            strided_store(lvalue_node, arr, [idx.accept(self, env) for idx in idxs], rvalue)
         elif isinstance(lvalue_node, ArrayAccess):
             # Asignación a array: a[i] = ...
             arr = lvalue_node.array.accept(self, env)
             
             idx = lvalue_node.pos.accept(self, env)
-            
-            if not isinstance(arr, list):
-                env.print()
-                print(arr, lvalue_node.array.name, lvalue_node.pos )
-                self.error(lvalue_node, "Base de acceso a array no es un array " + str(lvalue_node.lineno))
-            if not isinstance(idx, int):
-                self.error(lvalue_node, "Índice de array no es un entero")
-            if idx < 0 or idx >= len(arr):
-                self.error(lvalue_node, f"Índice de array fuera de límites ({idx})")
-            arr[idx] = rvalue
+            if getattr(lvalue_node, 'unchecked', False):
+                # Índice dentro de los límites (bounds.py)
+                try:
+                    arr[idx] = rvalue
+                    return rvalue
+                except (TypeError, OverflowError):
+                    pass
+            array_store(lvalue_node, arr, idx, rvalue)
         else:
             self.error(node, "Target de asignación inválido")
             
@@ -444,59 +853,64 @@ class Interpreter(Visitor):
   
    
         
-    def visit(self, node: PreInc, env: Symtab):
+    def visit(self, node: PreInc, env: Frame):
         lvalue_node = node.expr
         
         if isinstance(lvalue_node, Identifier):
-            name = lvalue_node.name
-            value = env.get(name)
-            self._check_numeric_operand(node, value)
-            value += 1
-            env.add(name, value)
-            return value
+            value = _load(self, lvalue_node, env)
+            check_numeric_operand(node, value)
+            new = int_result(value + 1)
+            _store(self, lvalue_node, new, env)
+            return value if node.__class__ is PostInc else new
         elif isinstance(lvalue_node, ArrayAccess):
             arr = lvalue_node.array.accept(self, env)
-            idx = lvalue_node.index.accept(self, env)
+            idx = lvalue_node.pos.accept(self, env)
             # Validaciones de array/índice
-            if not isinstance(arr, list): self.error(lvalue_node, "Base no es array")
+            if not isinstance(arr, ARRAYS): self.error(lvalue_node, "Base no es array")
             if not isinstance(idx, int): self.error(lvalue_node, "Índice no es entero")
             
             value = arr[idx]
-            self._check_numeric_operand(node, value)
-            value += 1
-            arr[idx] = value
-            return value
+            check_numeric_operand(node, value)
+            new = int_result(value + 1)
+            array_store(lvalue_node, arr, idx, new)
+            return value if node.__class__ is PostInc else new
         else:
             self.error(node, "Operando para '++' debe ser un l-value (variable o acceso a array)")
 
-    def visit(self, node: PreDec, env: Symtab):
+    def visit(self, node: PreDec, env: Frame):
         lvalue_node = node.expr
 
         if isinstance(lvalue_node, Identifier):
-            name = lvalue_node.name
-            value = env.get(name)
-            self._check_numeric_operand(node, value)
-            value -= 1
-            env.add(name, value)
-            return value
+            value = _load(self, lvalue_node, env)
+            check_numeric_operand(node, value)
+            new = int_result(value - 1)
+            _store(self, lvalue_node, new, env)
+            return value if node.__class__ is PostDec else new
         elif isinstance(lvalue_node, ArrayAccess):
             arr = lvalue_node.array.accept(self, env)
-            idx = lvalue_node.index.accept(self, env)
+            idx = lvalue_node.pos.accept(self, env)
             # Validaciones
-            if not isinstance(arr, list): self.error(lvalue_node, "Base no es array")
+            if not isinstance(arr, ARRAYS): self.error(lvalue_node, "Base no es array")
             if not isinstance(idx, int): self.error(lvalue_node, "Índice no es entero")
             
             value = arr[idx]
-            self._check_numeric_operand(node, value)
-            value -= 1
-            arr[idx] = value
-            return value
+            check_numeric_operand(node, value)
+            new = int_result(value - 1)
+            array_store(lvalue_node, arr, idx, new)
+            return value if node.__class__ is PostDec else new
         else:
             self.error(node, "Operando para '--' debe ser un l-value")
 
-    def visit(self, node: Call, env: Symtab):
-        callee = node.func.accept(self, env)
-        
+    def visit(self, node: Call, env: Frame):
+        callee = _operand(self, node.func, env)
+
+        # Caché del sitio de llamada: si el destino es el mismo de la
+        # llamada anterior, ya se verificó que es una función con la
+        # aridad correcta. Se guarda en el intérprete y no en el nodo,
+        # que es compartido con otras ejecuciones del mismo AST
+        if callee is self.targets.get(id(node), _UNBOUND):
+            return callee(self, *[_operand(self, arg, env) for arg in node.args])
+
         if not callable(callee):
             self.error(node, "Intento de llamar a algo que no es una función " + str(node.func.name))
             
@@ -505,74 +919,187 @@ class Interpreter(Visitor):
         if hasattr(callee, 'arity') and callee.arity != -1:
             if len(args) != callee.arity:
                 self.error(node, f"Error de aridad: Se esperaban {callee.arity} argumentos, pero se recibieron {len(args)}")
-        
+
+        self.targets[id(node)] = callee
         return callee(self, *args)
         
-    def visit(self, node: ArrayAccess, env: Symtab):
+    def visit(self, node: ArrayAccess, env: Frame):
+        if isinstance(node.array, ArrayAccess):
+            # a[i][j]...: un solo acceso al buffer del array de arrays
+            root, idxs = index_chain(node)
+            arr = root.accept(self, env)
+            return strided_load(node, arr, [idx.accept(self, env) for idx in idxs])
         arr = node.array.accept(self, env)
         idx = node.pos.accept(self, env)
-        
-        if not isinstance(arr, list):
-            self.error(node, "Base de acceso a array no es un array")
-        if not isinstance(idx, int):
-            self.error(node, "Índice de array no es un entero")
-        if idx < 0 or idx >= len(arr):
-            self.error(node, f"Índice de array fuera de límites ({idx} para tamaño {len(arr)})")
-            
-        return arr[idx]
+        if getattr(node, 'unchecked', False):
+            # Índice dentro de los límites (bounds.py)
+            return arr[idx]
+        return array_load(node, arr, idx)
 
-    def visit(self, node: Identifier, env: Symtab):
-        # print (node.name)
-        # print (env.get(node.name))
-        return env.get(node.name)
+    def visit(self, node: Identifier, env: Frame):
+        return _load(self, node, env)
         
     # =================================================================
     # Visitantes de Nodos (Literales)
     # =================================================================
     
-    def visit(self, node: Literal, env: Symtab):
+    def visit(self, node: Literal, env: Frame):
         return node.value
 
-    def visit(self, node: Integer, env: Symtab):
+    def visit(self, node: Integer, env: Frame):
         return node.value
 
-    def visit(self, node: Float, env: Symtab):
+    def visit(self, node: Float, env: Frame):
         return node.value
 
-    def visit(self, node: Boolean, env: Symtab):
+    def visit(self, node: Boolean, env: Frame):
         return node.value
 
-    def visit(self, node: Char, env: Symtab):
+    def visit(self, node: Char, env: Frame):
         return node.value
 
-    def visit(self, node: String,  env: Symtab):
+    def visit(self, node: String,  env: Frame):
         return node.value
     
-    def visit(self, n: SimpleType, env: Symtab):
+    def visit(self, n: SimpleType, env: Frame):
         pass
-    
-    def visit(self, node: Param,  env: Symtab):
-        print (node.name, "tipo", node.type, "a")
-        node.type.accept(self, env)
-        env.add(node.name, node)
 
 
 
+# Pasadas sobre el AST del programa verificado, en el orden en que se
+# aplican: (opción, módulo, función, qué hace). --dce y --memo van aparte:
+# la primera se aplica antes del checker y la segunda muestra sus
+# estadísticas después de la ejecución
+PASS_OPTIONS = (
+    ('fold',     'fold',     'fold',      'plegar constantes antes de ejecutar'),
+    ('inline',   'inline',   'inline',    'expandir en línea las funciones pequeñas'),
+    ('peval',    'peval',    'evaluate',  'evaluar al compilar las llamadas puras constantes'),
+    ('strength', 'strength', 'reduce',    'reducir la fuerza de las potencias y productos'),
+    ('bounds',   'bounds',   'eliminate', 'quitar las verificaciones de límites demostradas'),
+    ('licm',     'licm',     'hoist',     'extraer el código invariante de los ciclos'),
+    ('cse',      'cse',      'eliminate', 'eliminar subexpresiones comunes antes de ejecutar'),
+)
+
+# Motores de ejecución disponibles (--engine)
+ENGINES = ('tree', 'closure', 'vm', 'python')
+
+class Options:
+    '''
+    Opciones de un motor de ejecución. Las optimizaciones están activas
+    por defecto; bench.py las desactiva de a una para medir cuánto
+    aporta cada una.
+    '''
+    def __init__(self, counted=True, tailcalls=True, pooling=True, ranges=True,
+                 superinstructions=True, bits=False, trap=False):
+        self.counted = counted          # ciclos contados (loops.py)
+        self.tailcalls = tailcalls      # llamadas en posición de cola (tailcall.py)
+        self.pooling = pooling          # buffers de arrays locales reutilizados (escape.py)
+        self.ranges = ranges            # operaciones enteras acotadas sin verificar (ranges.py)
+        self.superinstructions = superinstructions  # superinstrucciones de la VM (vm.py)
+        self.bits = bits                # arrays de boolean con un bit por elemento (arrays.py)
+        self.trap = trap                # un desbordamiento entero es un error (--overflow=trap)
+
+def mark_program(program, options):
+    '''
+    Anota el programa (ya resuelto) con los análisis que usan todos los
+    motores, según sus opciones.
+    '''
+    TailCalls.mark(program, options.tailcalls)
+    EscapeAnalysis.mark(program, options.pooling)
+    mark_arrays(program, options.bits)
+    if getattr(program, 'checked', False):
+        IntegerRanges.mark(program, options.ranges)
+
+def make_engine(name='tree', **options):
+    '''Crea el motor de ejecución con el nombre y las opciones (Options) dados.'''
+    options = Options(**options)
+    if name == 'closure':
+        from closure import ClosureEngine
+        return ClosureEngine(options)
+    if name == 'vm':
+        from vm import VM
+        return VM(options)
+    if name == 'python':
+        from pygen import PythonEngine
+        return PythonEngine(options)
+    return Interpreter(options)
+
+
 if __name__ == '__main__':
+    import argparse
+    import importlib
     import sys
-    
-    if len(sys.argv) != 2:
-        raise SystemExit("Usage: python astprint.py <filename>")
+
+    argparser = argparse.ArgumentParser(description='bminor interpreter')
+    argparser.add_argument('file', help='programa a ejecutar')
+    argparser.add_argument('--engine', choices=ENGINES, default='tree',
+                           help='motor de ejecución (por defecto: tree)')
+    argparser.add_argument('--emit', choices=('python', 'c', 'asm'),
+                           help='mostrar el código generado en lugar de ejecutar')
+    argparser.add_argument('--dce', action='store_true',
+                           help='eliminar el código muerto y las funciones inalcanzables antes de verificar')
+    for option, _, _, text in PASS_OPTIONS:
+        argparser.add_argument(f'--{option}', action='store_true',
+                               help=f'verificar el programa y {text}')
+    argparser.add_argument('--memo', action='store_true',
+                           help='verificar el programa y memorizar las funciones puras')
+    argparser.add_argument('--memo-size', type=int, default=4096,
+                           help='entradas del cache de cada función memorizada (por defecto: 4096)')
+    argparser.add_argument('--overflow', choices=('wrap', 'trap'), default='wrap',
+                           help='enteros que no caben en 64 bits: dar la vuelta o detener el programa')
+    argparser.add_argument('--bits', action='store_true',
+                           help='guardar los arrays de boolean con un bit por elemento (menos memoria)')
+    argparser.add_argument('--no-check', action='store_true',
+                           help='ejecutar sin verificar los tipos (sin especializar las operaciones)')
+    args = argparser.parse_args()
     
     try:
         from parser import parse
-        
-        # 2. Crear una INSTANCIA del intérprete
-        interpreter_instance = Interpreter()
-        txt = open(sys.argv[1], encoding='utf-8').read()
+
+        # 2. Crear una INSTANCIA del intérprete (del módulo interp, el
+        # mismo que usan los otros motores: éste corre como __main__)
+        import interp
+        interpreter_instance = interp.make_engine(args.engine, trap=args.overflow == 'trap',
+                                                  bits=args.bits)
+        txt = open(args.file, encoding='utf-8').read()
         ast = parse(txt)
-        # 3. Llamar al método 'interpret' EN LA INSTANCIA
-        interpreter_instance.interpret(ast)
+        if args.dce:
+            # Antes del checker: se verifica y se compila sólo lo alcanzable
+            from dce import eliminate
+            print(eliminate(ast), file=sys.stderr)
+        if not args.no_check:
+            # Si el programa no tiene errores de tipo, los motores
+            # especializan sus operaciones (specialize.py). El checker no
+            # muestra sus errores ni convierte literales (así la salida es
+            # la misma que sin verificar): si falla, ast.checked es False
+            # y el programa se ejecuta con las operaciones genéricas
+            from checker import Check
+            Check.checker(ast, quiet=True, coerce=False)
+        for option, module, function, _ in PASS_OPTIONS:
+            if getattr(args, option):
+                stats = getattr(importlib.import_module(module), function)(ast)
+                if stats is not None:
+                    print(stats, file=sys.stderr)
+        memo_stats = None
+        if args.memo:
+            from memo import memoize
+            memo_stats = memoize(ast, args.memo_size)
+        if args.no_check:
+            ast.checked = False
+        if args.emit == 'python':
+            sys.stdout.write(interp.make_engine('python', bits=args.bits).transpile(ast)[0])
+        elif args.emit == 'c':
+            from cgen import generate
+            sys.stdout.write(generate(ast))
+        elif args.emit == 'asm':
+            from asmgen import generate
+            sys.stdout.write(generate(ast))
+        else:
+            # 3. Llamar al método 'interpret' EN LA INSTANCIA
+            interpreter_instance.interpret(ast)
+            if memo_stats is not None:
+                # Aciertos y fallos de cada cache después de la ejecución
+                print(memo_stats, file=sys.stderr)
 
     except ImportError:
         print("[red]Error:[/red] No se encontró el archivo 'parser.py'.")
@@ -581,4 +1108,4 @@ if __name__ == '__main__':
         print(f"[red]Ocurrió un error durante el interprete o la impresión:[/red]")
         print(e)
         # import traceback
-        # print(traceback.format_exc())
\ No newline at end of file
+        # print(traceback.format_exc())
@@ -0,0 +1,1237 @@
+'''
+Representación intermedia (IR) de tres direcciones de B-Minor.
+
+Cada función del programa verificado se traduce a instrucciones de tres
+direcciones sobre registros virtuales (VReg), agrupadas en bloques
+básicos que forman el grafo de control de flujo (CFG) de la función.
+Sobre el CFG se construye la forma SSA (Cytron et al.: phi en la
+frontera de dominancia y renombrado sobre el árbol de dominadores), se
+aplican las optimizaciones y se sale de SSA insertando copias en los
+predecesores.
+
+Las optimizaciones se ejecutan con un PassManager que recibe un nivel
+(-O0 a -O3) o una lista explícita de pasadas, mide el tiempo de cada
+una y puede mostrar el IR después de cada pasada:
+
+    -O0   sin optimizaciones
+    -O1   simplificación del CFG y eliminación de código muerto
+    -O2   -O1 en forma SSA, con propagación de copias
+    -O3   -O2 con plegado de constantes y de saltos
+
+usage:
+    python3 ir.py <filename> [-O N] [--time-passes] [--dump-ir PASADA]
+'''
+import sys
+import time
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from cgen    import CodegenError, RUNTIME_BUILTINS
+from astutil import written_names
+
+# =====================================================================
+# Instrucciones
+# =====================================================================
+class VReg:
+    '''Registro virtual. 'var' es el nombre de la variable local que guarda.'''
+    __slots__ = ('n', 'cls', 'var')
+
+    def __init__(self, n, cls, var=None):
+        self.n = n
+        self.cls = cls
+        self.var = var
+
+    def __repr__(self):
+        return f'%{self.cls}{self.n}'
+
+
+class Instr:
+    '''
+    Instrucción de tres direcciones. 'dst' es el registro que define
+    (una lista en 'params'); los VReg dentro de 'args' son los usos.
+    '''
+    __slots__ = ('op', 'dst', 'args')
+
+    def __init__(self, op, dst, args):
+        self.op = op
+        self.dst = dst
+        self.args = args
+
+    def defs(self):
+        if self.dst is None:
+            return []
+        return self.dst if isinstance(self.dst, list) else [self.dst]
+
+    def uses(self):
+        return [a for a in self.args if isinstance(a, VReg)]
+
+    def __repr__(self):
+        dst = f'{self.dst} = ' if self.dst is not None else ''
+        return f'{dst}{self.op} {", ".join(map(str, self.args))}'.rstrip()
+
+
+class BasicBlock:
+    '''
+    Bloque básico: 'code' no incluye la etiqueta. Si la última
+    instrucción no es un salto incondicional, 'ret' o 'fail', el bloque
+    continúa en el siguiente de la lista.
+    '''
+    __slots__ = ('label', 'code', 'preds', 'succs')
+
+    def __init__(self, label, code=None):
+        self.label = label
+        self.code = code if code is not None else []
+        self.preds = []
+        self.succs = []
+
+    def phis(self):
+        return [ins for ins in self.code if ins.op == 'phi']
+
+
+class Function:
+    def __init__(self, name, ret):
+        self.name = name            # símbolo en ensamblador
+        self.ret = ret              # tipo de retorno (nombre de typesys)
+        self.code = []              # instrucciones (antes de build_cfg)
+        self.blocks = []
+        self.params = []
+        self.nregs = 0
+        self.nlabels = 0
+        self.ssa = False
+
+    def new(self, cls, var=None):
+        self.nregs += 1
+        return VReg(self.nregs, cls, var)
+
+    def label(self):
+        self.nlabels += 1
+        return f'.L{self.name}_{self.nlabels}'
+
+    def instrs(self):
+        for b in self.blocks:
+            yield from b.code
+
+    def dump(self, out=sys.stdout):
+        print(f'{self.name}:', file=out)
+        for b in self.blocks:
+            preds = ', '.join(p.label for p in b.preds)
+            print(f'  {b.label + ":":<30}; preds: {preds}' if preds else f'  {b.label}:', file=out)
+            for ins in b.code:
+                print(f'    {ins}', file=out)
+
+
+JUMPS = {'jmp', 'cjump', 'fcjump', 'jz', 'jnz'}
+
+_NEGATE = {'<': '>=', '>=': '<', '>': '<=', '<=': '>', '==': '!=', '!=': '=='}
+_COMPARISONS = set(_NEGATE)
+
+
+def _cls(typ):
+    return 'f' if typ == 'float' else 'i'
+
+
+def imm32(value):
+    return -2**31 <= value < 2**31
+
+
+class Lowering(Visitor):
+    '''Traduce el AST verificado a funciones de instrucciones de tres direcciones.'''
+
+    def lower(self, program: Program):
+        self.strings = {}           # valor -> etiqueta
+        self.nlabels = 0
+        self.funcs = {}
+        self.externs = {}
+        self.globals = {}           # nombre -> (símbolo, tipo)
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                if decl.prototype:
+                    if decl.name not in self.funcs:
+                        self.externs[decl.name] = decl
+                elif decl.name in self.funcs:
+                    raise CodegenError(f"La función '{decl.name}' se define más de una vez")
+                else:
+                    self.externs.pop(decl.name, None)
+                    self.funcs[decl.name] = decl
+            elif isinstance(decl, (VarDecl, VarDeclInit)):
+                self.globals[decl.name] = ('b_' + decl.name, self._type(decl.type))
+
+        functions = []
+        for decl in self.funcs.values():
+            functions.append(self._function(decl))
+        init = self._begin('bm_init', 'void', toplevel=True)
+        self._block(program.body)
+        self._end()
+        functions.append(init)
+        return functions
+
+    # -----------------------------------------------------------------
+    # Utilidades
+    # -----------------------------------------------------------------
+    def _type(self, typ):
+        if isinstance(typ, ArrayType):
+            if not isinstance(typ.elem_type, SimpleType):
+                raise CodegenError('Los arrays de arrays no están soportados por el IR')
+            return f'array[{typ.elem_type.name}]'
+        return typ.name
+
+    def string(self, value):
+        if value not in self.strings:
+            self.strings[value] = f'.LS{len(self.strings)}'
+        return self.strings[value]
+
+    def label(self):
+        self.nlabels += 1
+        return f'.L{self.nlabels}'
+
+    def new(self, cls, var=None):
+        return self.func.new(cls, var)
+
+    def emit(self, op, dst=None, *args):
+        self.func.code.append(Instr(op, dst, list(args)))
+        return dst
+
+    def _begin(self, name, ret, params=(), toplevel=False):
+        self.func = Function(name, ret)
+        self.toplevel = toplevel
+        self.scope = {}
+        regs = []
+        for p in params:
+            typ = self._type(p.type)
+            reg = self.new(_cls(typ), p.name)
+            self.scope[p.name] = (reg, typ)
+            regs.append(reg)
+        self.func.params = regs
+        self.emit('params', regs)
+        return self.func
+
+    def _end(self):
+        ret = self.func.ret
+        code = self.func.code
+        if not code or code[-1].op != 'ret':
+            if ret == 'void':
+                self.emit('ret', None)
+            else:
+                self.emit('ret', None, 0.0 if ret == 'float' else 0)
+
+    def _function(self, decl):
+        self._begin('b_' + decl.name, self._type(decl.type), decl.params)
+        self._block(decl.body)
+        self._end()
+        return self.func
+
+    def _block(self, stmts):
+        for stmt in stmts if isinstance(stmts, list) else [stmts]:
+            if isinstance(stmt, (Statement, IfStmt, ForStmt, ReturnStmt, Block,
+                                 VarDeclInit, FuncDecl)):
+                stmt.accept(self)
+            else:
+                self._expr(stmt)
+
+    def _expr(self, n):
+        if isinstance(n, PrintStmt):
+            raise CodegenError("'print' sólo se puede usar como sentencia en el IR")
+        return n.accept(self)
+
+    def _operands(self, exprs):
+        '''
+        Evalúa los operandos de izquierda a derecha. Si un operando es una
+        variable local que un operando posterior modifica, se copia antes.
+        '''
+        values = []
+        for i, e in enumerate(exprs):
+            v = self._expr(e)
+            if (isinstance(v, VReg) and v.var is not None
+                    and any(v.var in written_names(b) for b in exprs[i+1:])):
+                t = self.new(v.cls)
+                self.emit('mov', t, v)
+                v = t
+            values.append(v)
+        return values
+
+    def _to_float(self, v, typ):
+        if typ == 'float':
+            return v
+        if isinstance(v, int):
+            return float(v)
+        return self.emit('i2f', self.new('f'), v)
+
+    def _call(self, target, kind, ret, args):
+        dst = None if ret == 'void' else self.new(_cls(ret))
+        self.emit('call', dst, target, kind, ret, *args)
+        return dst
+
+    def _int(self, value):
+        '''Operando entero: inmediato si cabe en 32 bits.'''
+        if imm32(value):
+            return value
+        return self.emit('const', self.new('i'), value)
+
+    # -----------------------------------------------------------------
+    # Declaraciones
+    # -----------------------------------------------------------------
+    def _declare(self, n, typ):
+        '''Destino de la variable declarada: (VReg, None) o (None, símbolo global).'''
+        if self.toplevel:
+            return None, self.globals[n.name][0]
+        prev = self.scope.get(n.name)
+        if prev is None or prev[1] != typ:
+            prev = (self.new(_cls(typ), n.name), typ)
+            self.scope[n.name] = prev
+        return prev[0], None
+
+    def _store_var(self, n, typ, value):
+        reg, sym = self._declare(n, typ)
+        if reg is not None:
+            self.emit('mov', reg, value)
+        else:
+            self.emit('gstore', None, sym, value)
+
+    def _default(self, typ):
+        if typ == 'float':
+            return 0.0
+        if typ == 'string':
+            return self.emit('str', self.new('i'), self.string(''))
+        return 0
+
+    def visit(self, n: VarDecl):
+        typ = self._type(n.type)
+        if isinstance(n.type, ArrayType):
+            if n.type.size is None:
+                value = 0
+            else:
+                size = self._expr(n.type.size)
+                name = self.string(n.name)
+                if typ == 'array[string]':
+                    value = self._call('bm_new_string_array', 'rt', typ, [size, name])
+                else:
+                    value = self._call('bm_new_array', 'rt', typ, [size, 8, name])
+        else:
+            value = self._default(typ)
+        self._store_var(n, typ, value)
+
+    def visit(self, n: VarDeclInit):
+        typ = self._type(n.type)
+        if isinstance(n.init, list):
+            items = self._operands(n.init)
+            value = self._call('bm_new_array', 'rt', typ, [len(items), 8, self.string(n.name)])
+            lineno = self.string(str(getattr(n, 'lineno', None)))
+            for i, item in enumerate(items):
+                self.emit('store', None, value, i, item, lineno)
+        else:
+            value = self._expr(n.init)
+        self._store_var(n, typ, value)
+
+    def visit(self, n: FuncDecl):
+        pass
+
+    # -----------------------------------------------------------------
+    # Sentencias
+    # -----------------------------------------------------------------
+    _PRINT = {
+        'integer': 'bm_print_int',
+        'float'  : 'bm_print_float',
+        'boolean': 'bm_print_bool',
+        'char'   : 'bm_print_char',
+        'string' : 'bm_print_string',
+    }
+
+    def visit(self, n: PrintStmt):
+        typ = n.expr.type
+        value = self._expr(n.expr)
+        if typ == 'void':
+            self._call('bm_print_string', 'rt', 'void', [self.string('None')])
+        elif typ in self._PRINT:
+            self._call(self._PRINT[typ], 'rt', 'void', [value])
+        else:
+            raise CodegenError(f"'print' de un valor de tipo '{typ}' no está soportado por el IR")
+
+    def visit(self, n: ExprStmt):
+        self._expr(n.expr)
+
+    def visit(self, n: Block):
+        self._block(n.body)
+
+    def visit(self, n: IfStmt):
+        if n.cond is None:
+            raise CodegenError("'if' sin condición no está soportado")
+        lelse = self.label()
+        self.branch(n.cond, lelse, False)
+        self._block(n.then_branch)
+        if n.else_branch:
+            lend = self.label()
+            self.emit('jmp', None, lend)
+            self.emit('label', None, lelse)
+            self._block(n.else_branch)
+            self.emit('label', None, lend)
+        else:
+            self.emit('label', None, lelse)
+
+    def _loop(self, cond, body, step=None):
+        # La condición se evalúa antes de entrar y al final de cada vuelta
+        top, end = self.label(), self.label()
+        if cond is not None:
+            self.branch(cond, end, False)
+        self.emit('label', None, top)
+        self._block(body)
+        if step is not None:
+            self._expr(step)
+        if cond is not None:
+            self.branch(cond, top, True)
+        else:
+            self.emit('jmp', None, top)
+        self.emit('label', None, end)
+
+    def visit(self, n: WhileStmt):
+        if n.cond is None:
+            raise CodegenError("'while' sin condición no está soportado")
+        self._loop(n.cond, n.body)
+
+    def visit(self, n: ForStmt):
+        if n.init:
+            self._expr(n.init)
+        self._loop(n.cond, n.body, n.step)
+
+    def visit(self, n: DoWhileStmt):
+        if n.cond is None:
+            raise CodegenError("'do-while' sin condición no está soportado")
+        top = self.label()
+        self.emit('label', None, top)
+        self._block(n.body)
+        self.branch(n.cond, top, True)
+
+    def visit(self, n: ReturnStmt):
+        if n.expr:
+            self.emit('ret', None, self._expr(n.expr))
+        else:
+            self.emit('ret', None)
+
+    # -----------------------------------------------------------------
+    # Condiciones
+    # -----------------------------------------------------------------
+    def branch(self, n, label, sense):
+        '''Salta a 'label' si el valor de verdad de n es 'sense'.'''
+        if isinstance(n, LogicalOpExpr):
+            if (n.oper == '&&') != sense:
+                # '&&' falso o '||' verdadero: basta con uno de los dos
+                self.branch(n.left, label, sense)
+                self.branch(n.right, label, sense)
+            else:
+                skip = self.label()
+                self.branch(n.left, skip, not sense)
+                self.branch(n.right, label, sense)
+                self.emit('label', None, skip)
+        elif isinstance(n, UnaryOper) and n.oper == '!':
+            self.branch(n.expr, label, not sense)
+        elif isinstance(n, Boolean):
+            if n.value == sense:
+                self.emit('jmp', None, label)
+        elif (isinstance(n, BinOper) and n.oper in _COMPARISONS
+              and n.left.type != 'string'):
+            a, b = self._operands([n.left, n.right])
+            if 'float' in (n.left.type, n.right.type):
+                a = self._to_float(a, n.left.type)
+                b = self._to_float(b, n.right.type)
+                self.emit('fcjump', None, n.oper, a, b, sense, label)
+            else:
+                op = n.oper if sense else _NEGATE[n.oper]
+                self.emit('cjump', None, op, a, b, label)
+        else:
+            v = self._expr(n)
+            self.emit('jnz' if sense else 'jz', None, v, label)
+
+    # -----------------------------------------------------------------
+    # Expresiones
+    # -----------------------------------------------------------------
+    def visit(self, n: Integer):
+        if not -2**63 <= n.value < 2**63:
+            raise CodegenError(f'El literal {n.value} no cabe en un entero de 64 bits')
+        return self._int(n.value)
+
+    def visit(self, n: Float):
+        return n.value
+
+    def visit(self, n: Boolean):
+        return int(n.value)
+
+    def visit(self, n: Char):
+        if len(n.value) != 1:
+            raise CodegenError(f'Literal char inválido: {n.value!r}')
+        return ord(n.value)
+
+    def visit(self, n: String):
+        return self.emit('str', self.new('i'), self.string(n.value))
+
+    def visit(self, n: Identifier):
+        if n.type == 'function':
+            raise CodegenError(f"Usar la función '{n.name}' como valor no está soportado")
+        if n.name in self.scope:
+            return self.scope[n.name][0]
+        sym, typ = self.globals[n.name]
+        return self.emit('gload', self.new(_cls(typ)), sym)
+
+    def visit(self, n: BinOper):
+        lt, rt = n.left.type, n.right.type
+        a, b = self._operands([n.left, n.right])
+        if lt == 'string':
+            if n.oper == '+':
+                return self._call('bm_concat', 'rt', 'string', [a, b])
+            eq = self._call('bm_streq', 'rt', 'boolean', [a, b])
+            return eq if n.oper == '==' else self.emit('not', self.new('i'), eq)
+
+        if n.oper in _COMPARISONS:
+            if 'float' in (lt, rt):
+                a, b = self._to_float(a, lt), self._to_float(b, rt)
+                return self.emit('fcmp', self.new('i'), n.oper, a, b)
+            return self.emit('cmp', self.new('i'), n.oper, a, b)
+
+        if n.oper == '^':
+            if n.type == 'float':
+                return self._call('bm_fpow', 'rt', 'float', [self._to_float(a, lt), b])
+            return self._call('bm_ipow', 'rt', 'integer', [a, b])
+
+        if n.type == 'float':
+            a, b = self._to_float(a, lt), self._to_float(b, rt)
+            if n.oper == '%':
+                return self._call('bm_fmod', 'rt', 'float', [a, b])
+            op = {'+': 'fadd', '-': 'fsub', '*': 'fmul', '/': 'fdiv'}[n.oper]
+            return self.emit(op, self.new('f'), a, b)
+
+        op = {'+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '%': 'mod',
+              '<<': 'shl', '>>': 'sar', '&': 'and'}[n.oper]
+        return self.emit(op, self.new('i'), a, b)
+
+    def visit(self, n: LogicalOpExpr):
+        dst, lfalse, lend = self.new('i'), self.label(), self.label()
+        self.branch(n, lfalse, False)
+        self.emit('mov', dst, 1)
+        self.emit('jmp', None, lend)
+        self.emit('label', None, lfalse)
+        self.emit('mov', dst, 0)
+        self.emit('label', None, lend)
+        return dst
+
+    def visit(self, n: UnaryOper):
+        v = self._expr(n.expr)
+        if n.oper == '+':
+            return v
+        if n.oper == '!':
+            return self.emit('not', self.new('i'), v)
+        if isinstance(v, float):
+            return -v
+        if isinstance(v, int):
+            return self._int(-v)
+        return self.emit('fneg' if v.cls == 'f' else 'neg', self.new(v.cls), v)
+
+    def _incdec(self, n, delta):
+        # x++ / x--: el resultado es el valor anterior
+        post = isinstance(n, (PostInc, PostDec))
+        target = n.expr
+        if isinstance(target, ArrayAccess):
+            arr, idx = self._operands([target.array, target.pos])
+            old = self.emit('load', self.new(_cls(n.type)), arr, idx) if post else None
+            new = self.emit('incidx', self.new(_cls(n.type)), arr, idx, delta)
+            return old if post else new
+        one = float(delta) if n.type == 'float' else delta
+        op = 'fadd' if n.type == 'float' else 'add'
+        if target.name in self.scope:
+            reg = self.scope[target.name][0]
+            old = self.emit('mov', self.new(reg.cls), reg) if post else None
+            new = self.emit(op, reg, reg, one)
+            return old if post else new
+        sym, typ = self.globals[target.name]
+        old = self.emit('gload', self.new(_cls(typ)), sym)
+        new = self.emit(op, self.new(_cls(typ)), old, one)
+        self.emit('gstore', None, sym, new)
+        return old if post else new
+
+    def visit(self, n: PreInc):
+        return self._incdec(n, 1)
+
+    def visit(self, n: PreDec):
+        return self._incdec(n, -1)
+
+    def visit(self, n: Assign):
+        if isinstance(n.left, Identifier):
+            value = self._expr(n.right)
+            if n.left.name in self.scope:
+                self.emit('mov', self.scope[n.left.name][0], value)
+            else:
+                self.emit('gstore', None, self.globals[n.left.name][0], value)
+            return value
+        if not isinstance(n.left, ArrayAccess):
+            raise CodegenError('Target de asignación inválido')
+        target = n.left
+        value, arr, idx = self._operands([n.right, target.array, target.pos])
+        lineno = self.string(str(getattr(target, 'lineno', None)))
+        self.emit('store', None, arr, idx, value, lineno)
+        return value
+
+    def visit(self, n: Call):
+        name = n.func.name
+        args = self._operands(n.args)
+        ret = n.type
+        if name in self.funcs:
+            return self._call('b_' + name, 'user', ret, args)
+        if name in self.externs:
+            return self._call(name, 'extern', ret, args)
+        return self._call(RUNTIME_BUILTINS[name], 'rt', ret, args)
+
+    def visit(self, n: ArrayAccess):
+        arr, idx = self._operands([n.array, n.pos])
+        return self.emit('load', self.new(_cls(n.type)), arr, idx)
+
+
+def lower(program: Program):
+    '''
+    Verifica el programa y lo traduce al IR. Retorna (funciones,
+    strings): cada función ya tiene su CFG; 'strings' asocia cada
+    literal string con su etiqueta.
+    '''
+    Check.checker(program)
+    if errors_detected():
+        raise CodegenError(f'El programa tiene {errors_detected()} errores de tipo')
+    lowering = Lowering()
+    functions = lowering.lower(program)
+    for func in functions:
+        build_cfg(func)
+    return functions, lowering
+
+
+# =====================================================================
+# Grafo de control de flujo
+# =====================================================================
+_ENDS = {'jmp', 'ret', 'fail'}          # el bloque no continúa en el siguiente
+
+
+def _target(ins):
+    return ins.args[-1] if ins.op in JUMPS else None
+
+
+def build_cfg(func):
+    '''Agrupa func.code en bloques básicos.'''
+    blocks = [BasicBlock(func.label())]
+    for ins in func.code:
+        if ins.op == 'label':
+            if blocks[-1].code or len(blocks) > 1:
+                blocks.append(BasicBlock(ins.args[0]))
+            else:
+                # La primera etiqueta da nombre al bloque de entrada
+                blocks[-1].label = ins.args[0]
+            continue
+        if blocks[-1].code and blocks[-1].code[-1].op in JUMPS | _ENDS:
+            blocks.append(BasicBlock(func.label()))
+        blocks[-1].code.append(ins)
+    func.blocks = blocks
+    func.code = []
+    compute_edges(func)
+
+
+def compute_edges(func):
+    '''Calcula preds y succs de cada bloque.'''
+    labels = {b.label: b for b in func.blocks}
+    for b in func.blocks:
+        b.preds, b.succs = [], []
+    for i, b in enumerate(func.blocks):
+        last = b.code[-1] if b.code else None
+        succs = []
+        if last is None or last.op not in _ENDS:
+            if i + 1 < len(func.blocks):
+                succs.append(func.blocks[i + 1])
+        if last is not None and last.op in JUMPS:
+            target = labels[_target(last)]
+            if target not in succs:
+                succs.append(target)
+        b.succs = succs
+        for s in succs:
+            s.preds.append(b)
+
+
+def linearize(func):
+    '''Instrucciones de la función en el orden de los bloques, con sus etiquetas.'''
+    code = []
+    for b in func.blocks:
+        code.append(Instr('label', None, [b.label]))
+        code += b.code
+    return code
+
+
+def _reverse_postorder(func):
+    seen, order = set(), []
+    stack = [(func.blocks[0], iter(func.blocks[0].succs))]
+    seen.add(func.blocks[0])
+    while stack:
+        block, succs = stack[-1]
+        for s in succs:
+            if s not in seen:
+                seen.add(s)
+                stack.append((s, iter(s.succs)))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    return order[::-1]
+
+
+def remove_unreachable(func):
+    '''Elimina los bloques inalcanzables desde la entrada. Retorna cuántos.'''
+    reachable = set(_reverse_postorder(func))
+    dead = [b for b in func.blocks if b not in reachable]
+    if not dead:
+        return 0
+    dead_labels = {b.label for b in dead}
+    func.blocks = [b for b in func.blocks if b in reachable]
+    for b in func.blocks:
+        for phi in b.phis():
+            phi.args = [x for k in range(0, len(phi.args), 2)
+                        for x in phi.args[k:k+2] if phi.args[k] not in dead_labels]
+    compute_edges(func)
+    return len(dead)
+
+
+def dominators(func):
+    '''
+    Dominador inmediato de cada bloque alcanzable (Cooper, Harvey y
+    Kennedy, "A Simple, Fast Dominance Algorithm").
+    '''
+    rpo = _reverse_postorder(func)
+    index = {b: i for i, b in enumerate(rpo)}
+    entry = rpo[0]
+    idom = {entry: entry}
+
+    def intersect(a, b):
+        while a is not b:
+            while index[a] > index[b]:
+                a = idom[a]
+            while index[b] > index[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for b in rpo[1:]:
+            preds = [p for p in b.preds if p in idom]
+            new = preds[0]
+            for p in preds[1:]:
+                new = intersect(p, new)
+            if idom.get(b) is not new:
+                idom[b] = new
+                changed = True
+    return idom
+
+
+def frontiers(func, idom):
+    '''Frontera de dominancia de cada bloque.'''
+    df = {b: set() for b in idom}
+    for b in idom:
+        preds = [p for p in b.preds if p in idom]
+        if len(preds) < 2:
+            continue
+        for p in preds:
+            runner = p
+            while runner is not idom[b]:
+                df[runner].add(b)
+                runner = idom[runner]
+    return df
+
+
+# =====================================================================
+# Forma SSA
+# =====================================================================
+def _undef(v):
+    '''Valor de una variable leída antes de asignarse en algún camino.'''
+    return 0.0 if v.cls == 'f' else 0
+
+
+def to_ssa(func):
+    '''Construye la forma SSA. Retorna la cantidad de phi insertadas.'''
+    if func.ssa:
+        return 0
+    remove_unreachable(func)
+    idom = dominators(func)
+    df = frontiers(func, idom)
+
+    # Sólo las variables asignadas más de una vez necesitan renombrarse
+    where, count = {}, {}
+    for b in func.blocks:
+        for ins in b.code:
+            for d in ins.defs():
+                where.setdefault(d, set()).add(b)
+                count[d] = count.get(d, 0) + 1
+    multi = {v for v, c in count.items() if c > 1}
+
+    phis = {}                       # phi -> variable original
+    for v in sorted(multi, key=lambda v: v.n):
+        work = list(where[v])
+        placed = set()
+        while work:
+            b = work.pop()
+            for f in df[b]:
+                if f not in placed:
+                    phi = Instr('phi', v, [])
+                    f.code.insert(0, phi)
+                    phis[phi] = v
+                    placed.add(f)
+                    if f not in where[v]:
+                        work.append(f)
+
+    children = {b: [] for b in idom}
+    for b, d in idom.items():
+        if b is not d:
+            children[d].append(b)
+
+    stacks = {v: [] for v in multi}
+
+    def current(v):
+        return stacks[v][-1] if stacks[v] else _undef(v)
+
+    def rename(b):
+        pushed = []
+        for ins in b.code:
+            if ins.op != 'phi':
+                ins.args = [current(a) if a in stacks else a for a in ins.args]
+            if ins.op == 'phi':
+                v = phis[ins]
+                ins.dst = func.new(v.cls, v.var)
+                stacks[v].append(ins.dst)
+                pushed.append(v)
+            elif isinstance(ins.dst, list):
+                for k, d in enumerate(ins.dst):
+                    if d in stacks:
+                        ins.dst[k] = func.new(d.cls, d.var)
+                        stacks[d].append(ins.dst[k])
+                        pushed.append(d)
+            elif ins.dst in stacks:
+                v = ins.dst
+                ins.dst = func.new(v.cls, v.var)
+                stacks[v].append(ins.dst)
+                pushed.append(v)
+        for s in b.succs:
+            for phi in s.phis():
+                phi.args += [b.label, current(phis[phi])]
+        return pushed
+
+    # Recorrido del árbol de dominadores sin recursión
+    work = [(func.blocks[0], None)]
+    while work:
+        b, pushed = work.pop()
+        if pushed is not None:
+            for v in pushed:
+                stacks[v].pop()
+            continue
+        work.append((b, rename(b)))
+        work += [(c, None) for c in reversed(children[b])]
+
+    func.ssa = True
+    return len(phis)
+
+
+def _parallel_copy(func, copies):
+    '''
+    Instrucciones que copian simultáneamente [(destino, origen), ...]:
+    primero las copias cuyo destino ya no se lee; los ciclos se rompen
+    con un registro temporal.
+    '''
+    code = []
+    pending = [(d, s) for d, s in copies if d is not s]
+    while pending:
+        for i, (d, s) in enumerate(pending):
+            if not any(s2 is d for _, s2 in pending):
+                code.append(Instr('mov', d, [s]))
+                pending.pop(i)
+                break
+        else:
+            d = pending[0][0]
+            t = func.new(d.cls)
+            code.append(Instr('mov', t, [d]))
+            pending = [(d2, t if s2 is d else s2) for d2, s2 in pending]
+    return code
+
+
+def from_ssa(func):
+    '''
+    Sale de la forma SSA: cada phi se reemplaza por copias al final de
+    los predecesores. Las aristas críticas se dividen antes. Retorna la
+    cantidad de copias insertadas.
+    '''
+    if not func.ssa:
+        return 0
+    # División de aristas críticas (predecesor con más de un sucesor)
+    for b in list(func.blocks):
+        if not b.phis():
+            continue
+        for p in list(b.preds):
+            if len(p.succs) == 1 and not (p.code and p.code[-1].op in JUMPS - {'jmp'}):
+                continue
+            mid = BasicBlock(func.label())
+            last = p.code[-1] if p.code else None
+            pos = func.blocks.index(p)
+            if last is not None and _target(last) == b.label and (
+                    pos + 1 >= len(func.blocks) or func.blocks[pos + 1] is not b):
+                # Arista del salto: el bloque nuevo salta al destino
+                last.args[-1] = mid.label
+                mid.code.append(Instr('jmp', None, [b.label]))
+                func.blocks.append(mid)
+            else:
+                func.blocks.insert(pos + 1, mid)
+            for phi in b.phis():
+                for k in range(0, len(phi.args), 2):
+                    if phi.args[k] == p.label:
+                        phi.args[k] = mid.label
+        compute_edges(func)
+
+    copies = 0
+    labels = {b.label: b for b in func.blocks}
+    for b in func.blocks:
+        phis = b.phis()
+        if not phis:
+            continue
+        for p in b.preds:
+            pairs = []
+            for phi in phis:
+                k = phi.args.index(p.label, 0, len(phi.args))
+                if phi.args[k + 1] is not phi.dst:
+                    pairs.append((phi.dst, phi.args[k + 1]))
+            code = _parallel_copy(func, pairs)
+            copies += len(code)
+            at = len(p.code) - 1 if p.code and p.code[-1].op == 'jmp' else len(p.code)
+            p.code[at:at] = code
+        b.code = [ins for ins in b.code if ins.op != 'phi']
+    func.ssa = False
+    return copies
+
+
+# =====================================================================
+# Optimizaciones
+# =====================================================================
+# Instrucciones sin efectos: se pueden eliminar si su resultado no se usa
+_PURE = {'const', 'str', 'mov', 'gload', 'add', 'sub', 'mul', 'shl', 'sar', 'and', 'cmp', 'not', 'neg',
+         'fadd', 'fsub', 'fmul', 'fcmp', 'i2f', 'fneg', 'phi'}
+
+
+def _resolve(repl, v):
+    while isinstance(v, VReg) and v in repl:
+        v = repl[v]
+    return v
+
+
+def _replace(func, repl):
+    '''Reemplaza los usos según repl (VReg -> VReg o inmediato).'''
+    for ins in func.instrs():
+        ins.args = [_resolve(repl, a) if isinstance(a, VReg) else a for a in ins.args]
+
+
+def copyprop(func):
+    '''
+    Propagación de copias (sólo en SSA): los usos del destino de 'mov'
+    pasan a usar el origen, y las phi cuyos argumentos son todos el mismo
+    valor se reemplazan por ese valor. Retorna cuántas se eliminaron.
+    '''
+    if not func.ssa:
+        return 0
+    removed = 0
+    while True:
+        repl = {}
+        for ins in func.instrs():
+            if ins.op == 'mov':
+                repl[ins.dst] = ins.args[0]
+            elif ins.op == 'phi':
+                values = {_key(v) for v in ins.args[1::2] if v is not ins.dst}
+                if len(values) == 1:
+                    repl[ins.dst] = next(v for v in ins.args[1::2] if v is not ins.dst)
+        if not repl:
+            return removed
+        _replace(func, repl)
+        for b in func.blocks:
+            before = len(b.code)
+            b.code = [ins for ins in b.code if not (ins.op in ('mov', 'phi') and ins.dst in repl)]
+            removed += before - len(b.code)
+
+
+def _key(v):
+    # 0 y 0.0 (o 0.0 y -0.0) son inmediatos distintos
+    return v if isinstance(v, VReg) else (type(v), repr(v))
+
+
+def dce(func):
+    '''Eliminación de instrucciones puras cuyo resultado no se usa.'''
+    removed = 0
+    while True:
+        used = set()
+        for ins in func.instrs():
+            used.update(ins.uses())
+        n = 0
+        for b in func.blocks:
+            keep = [ins for ins in b.code
+                    if not (ins.op in _PURE and ins.dst not in used)]
+            n += len(b.code) - len(keep)
+            b.code = keep
+        if not n:
+            return removed
+        removed += n
+
+
+def simplify_cfg(func):
+    '''
+    Simplificación del CFG (fuera de SSA): elimina bloques inalcanzables,
+    redirige los saltos a bloques que sólo saltan a otro y quita los
+    saltos al bloque siguiente. Retorna la cantidad de cambios.
+    '''
+    if func.ssa:
+        return 0
+    changes = remove_unreachable(func)
+    forward = {}
+    for b in func.blocks:
+        if len(b.code) == 1 and b.code[0].op == 'jmp' and b.code[0].args[0] != b.label:
+            forward[b.label] = b.code[0].args[0]
+
+    def final(label):
+        seen = set()
+        while label in forward and label not in seen:
+            seen.add(label)
+            label = forward[label]
+        return label
+
+    for ins in func.instrs():
+        if ins.op in JUMPS and final(ins.args[-1]) != ins.args[-1]:
+            ins.args[-1] = final(ins.args[-1])
+            changes += 1
+    for i, b in enumerate(func.blocks[:-1]):
+        if b.code and b.code[-1].op in JUMPS and b.code[-1].args[-1] == func.blocks[i + 1].label:
+            b.code.pop()
+            changes += 1
+    compute_edges(func)
+    return changes + remove_unreachable(func)
+
+
+_WRAP = 2**64
+
+def wrap(value):
+    '''Entero de 64 bits con signo (complemento a dos).'''
+    value %= _WRAP
+    return value - _WRAP if value >= 2**63 else value
+
+
+_INT_FOLD = {
+    'add': lambda a, b: wrap(a + b),
+    'sub': lambda a, b: wrap(a - b),
+    'mul': lambda a, b: wrap(a * b),
+    'div': lambda a, b: wrap(a // b),
+    'mod': lambda a, b: wrap(a % b),
+    'shl': lambda a, b: wrap(a << b),
+    'sar': lambda a, b: a >> b,
+    'and': lambda a, b: a & b,
+}
+
+_FLOAT_FOLD = {
+    'fadd': lambda a, b: a + b,
+    'fsub': lambda a, b: a - b,
+    'fmul': lambda a, b: a * b,
+    'fdiv': lambda a, b: a / b,
+}
+
+_COMPARE = {
+    '<' : lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>' : lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+
+def _imm(v):
+    return not isinstance(v, (VReg, str))
+
+
+def _fold_value(ins):
+    '''Valor constante de la instrucción, o None.'''
+    op, args = ins.op, ins.args
+    if op in ('cmp', 'fcmp'):
+        if _imm(args[1]) and _imm(args[2]):
+            return int(_COMPARE[args[0]](args[1], args[2]))
+        return None
+    if not args or not all(_imm(a) for a in args):
+        return None
+    if op in _INT_FOLD:
+        # La división por cero se deja para que falle al ejecutarse
+        return None if op in ('div', 'mod') and args[1] == 0 else _INT_FOLD[op](*args)
+    if op in _FLOAT_FOLD:
+        return None if op == 'fdiv' and args[1] == 0 else _FLOAT_FOLD[op](*args)
+    if op == 'not':
+        return args[0] ^ 1
+    if op == 'neg':
+        return wrap(-args[0])
+    if op == 'fneg':
+        return -args[0]
+    if op == 'i2f':
+        return float(args[0])
+    if op == 'const' and imm32(args[0]):
+        return args[0]
+    return None
+
+
+def _fold_branch(ins):
+    '''True/False si el salto condicional es constante, o None.'''
+    op, args = ins.op, ins.args
+    if op in ('jz', 'jnz') and _imm(args[0]):
+        return (args[0] != 0) == (op == 'jnz')
+    if op == 'cjump' and _imm(args[1]) and _imm(args[2]):
+        return _COMPARE[args[0]](args[1], args[2])
+    if op == 'fcjump' and _imm(args[1]) and _imm(args[2]):
+        return _COMPARE[args[0]](args[1], args[2]) == args[3]
+    return None
+
+
+def fold(func):
+    '''
+    Plegado de constantes (sólo en SSA): las instrucciones con operandos
+    inmediatos se reemplazan por su valor y los saltos condicionales
+    constantes por saltos incondicionales (o se eliminan). Retorna la
+    cantidad de instrucciones plegadas.
+    '''
+    if not func.ssa:
+        return 0
+    folded = 0
+    while True:
+        n = 0
+        for b in func.blocks:
+            for i, ins in enumerate(b.code):
+                value = _fold_value(ins)
+                if value is not None:
+                    if isinstance(value, int) and not imm32(value):
+                        if ins.op == 'const':
+                            continue
+                        b.code[i] = Instr('const', ins.dst, [value])
+                    else:
+                        b.code[i] = Instr('mov', ins.dst, [value])
+                    n += 1
+            last = b.code[-1] if b.code else None
+            taken = _fold_branch(last) if last is not None else None
+            if taken is None:
+                continue
+            if taken:
+                b.code[-1] = Instr('jmp', None, [last.args[-1]])
+            else:
+                b.code.pop()
+            n += 1
+        if not n:
+            return folded
+        folded += n
+        # Las phi pierden los argumentos de las aristas eliminadas
+        compute_edges(func)
+        for b in func.blocks:
+            preds = {p.label for p in b.preds}
+            for phi in b.phis():
+                phi.args = [x for k in range(0, len(phi.args), 2)
+                            for x in phi.args[k:k+2] if phi.args[k] in preds]
+        remove_unreachable(func)
+        copyprop(func)
+
+
+# =====================================================================
+# Pass manager
+# =====================================================================
+PASSES = {
+    'ssa'        : to_ssa,
+    'copyprop'   : copyprop,
+    'fold'       : fold,
+    'dce'        : dce,
+    'outssa'     : from_ssa,
+    'simplifycfg': simplify_cfg,
+}
+
+PIPELINES = {
+    0: [],
+    1: ['simplifycfg', 'dce'],
+    2: ['simplifycfg', 'ssa', 'copyprop', 'dce', 'outssa', 'simplifycfg'],
+    3: ['simplifycfg', 'ssa', 'copyprop', 'fold', 'dce', 'outssa', 'simplifycfg'],
+}
+
+
+class PassManager:
+    '''
+    Ejecuta una secuencia de pasadas sobre todas las funciones. Cada
+    pasada retorna la cantidad de cambios que hizo; el pass manager
+    acumula esa cantidad y el tiempo de cada pasada. Con 'dump' (nombres
+    de pasadas, o 'all') muestra el IR después de esas pasadas.
+    '''
+    def __init__(self, passes, dump=(), out=sys.stderr):
+        unknown = [p for p in passes if p not in PASSES]
+        if unknown:
+            raise CodegenError(f"Pasada desconocida: {', '.join(unknown)}")
+        self.passes = list(passes)
+        self.dump = set(dump)
+        self.out = out
+        self.stats = []             # (pasada, segundos, cambios)
+
+    @classmethod
+    def level(cls, level, **kwargs):
+        if level not in PIPELINES:
+            raise CodegenError(f'Nivel de optimización inválido: -O{level}')
+        return cls(PIPELINES[level], **kwargs)
+
+    def run(self, functions):
+        if self.dump & {'all', 'lower'}:
+            self._dump('lower', functions)
+        for name in self.passes:
+            start = time.perf_counter()
+            changes = sum(PASSES[name](func) for func in functions)
+            self.stats.append((name, time.perf_counter() - start, changes))
+            if self.dump & {'all', name}:
+                self._dump(name, functions)
+        return functions
+
+    def _dump(self, name, functions):
+        print(f'; ---- IR después de {name} ----', file=self.out)
+        for func in functions:
+            func.dump(self.out)
+
+    def report(self, out=None):
+        '''Tabla con el tiempo y los cambios de cada pasada.'''
+        out = out or self.out
+        total = sum(t for _, t, _ in self.stats)
+        print(f"{'pasada':<16}{'tiempo':>12}{'cambios':>10}", file=out)
+        for name, seconds, changes in self.stats:
+            print(f'{name:<16}{seconds * 1000:>10.3f}ms{changes:>10}', file=out)
+        print(f"{'total':<16}{total * 1000:>10.3f}ms", file=out)
+
+
+def optimize(functions, level=2, timing=False, dump=()):
+    '''Ejecuta el pipeline de -O<level> sobre las funciones del IR.'''
+    pm = PassManager.level(level, dump=dump)
+    pm.run(functions)
+    if timing:
+        pm.report()
+    return functions
+
+
+def add_ir_arguments(argparser):
+    '''Opciones de línea de comandos del pass manager.'''
+    argparser.add_argument('-O', dest='level', type=int, default=2, choices=sorted(PIPELINES),
+                           help='nivel de optimización (por defecto: 2)')
+    argparser.add_argument('--time-passes', action='store_true',
+                           help='mostrar el tiempo de cada pasada')
+    argparser.add_argument('--dump-ir', action='append', default=[], metavar='PASADA',
+                           help="mostrar el IR después de la pasada ('lower' o 'all' también)")
+
+
+if __name__ == '__main__':
+    import argparse
+    from parser import parse
+
+    argparser = argparse.ArgumentParser(description='bminor IR')
+    argparser.add_argument('file', help='programa a traducir')
+    add_ir_arguments(argparser)
+    args = argparser.parse_args()
+
+    ast = parse(open(args.file, encoding='utf-8').read())
+    try:
+        functions, _ = lower(ast)
+        optimize(functions, args.level, args.time_passes, args.dump_ir)
+        for func in functions:
+            func.dump()
+    except CodegenError as e:
+        raise SystemExit(f'ir: {e}')
@@ -0,0 +1,331 @@
+'''
+Extracción de código invariante de los ciclos (while y for) sobre el AST
+verificado.
+
+Se ejecuta después de Check.checker. Para cada ciclo (primero los más
+internos) busca en la condición, el cuerpo y el paso las subexpresiones
+sin efectos cuyo valor no cambia dentro del ciclo, las calcula una vez
+en un temporal local (_licm1 = ...) antes del ciclo (después del
+inicializador de un 'for') y las reemplaza por el temporal:
+
+  - operaciones aritméticas, de comparación y concatenaciones sobre
+    variables escalares que el ciclo no modifica,
+  - lecturas de variables globales escalares,
+  - array_length(a).
+
+Una variable cambia dentro del ciclo si se asigna, se incrementa o se
+declara en él; una llamada a una función del programa puede cambiar
+cualquier global. Las operaciones que pueden fallar (división o módulo
+por algo que no es una constante distinta de cero, array_length) sólo
+se extraen de la parte de la condición que se evalúa siempre al entrar
+al ciclo, antes de cualquier efecto o posible error: así el programa
+falla en el mismo lugar y con el mismo mensaje.
+
+usage:
+    python3 licm.py <filename>
+'''
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, is_quiet, expr_text, key_names, PURE_OPERS, COMMUTATIVE, SCALARS
+
+class LICMStats:
+    def __init__(self):
+        self.loops = []             # (función, línea, 'while'/'for', [expresiones])
+
+    @property
+    def total(self):
+        return sum(len(exprs) for *_, exprs in self.loops)
+
+    def __str__(self):
+        lines = [f'licm: {self.total} expresiones invariantes extraídas de {len(self.loops)} ciclos']
+        for func, lineno, kind, exprs in self.loops:
+            lines.append(f'  {func}:{lineno} {kind}: {", ".join(exprs)}')
+        return '\n'.join(lines)
+
+
+def _traps(key):
+    '''True si la subexpresión puede fallar al evaluarse.'''
+    if key[0] in ('id', 'lit'):
+        return False
+    if key[0] in ('/', '%'):
+        divisor = key[2]
+        if divisor[0] != 'lit' or divisor[2] in ('0', '0.0', '-0.0'):
+            return True
+    return key[0] == 'array_length' or any(_traps(part) for part in key[1:])
+
+
+class LoopInvariants(Visitor):
+    '''
+    Los visit de sentencias retornan la lista de sentencias que las
+    reemplaza (un ciclo con cálculos previos se convierte en varias).
+    '''
+    @classmethod
+    def hoist(cls, program: Program):
+        '''Extrae el código invariante de los ciclos del programa (ya verificado). Retorna un LICMStats.'''
+        licm = cls()
+        licm.stats = LICMStats()
+        licm.taken = {n.name for n in walk(program.body)
+                      if isinstance(n, (Identifier, VarDecl, VarDeclInit, FuncDecl))}
+        licm.taken |= {p.name for n in walk(program.body) if isinstance(n, FuncDecl) for p in n.params}
+        licm.functions = {d.name for d in program.body if isinstance(d, FuncDecl)}
+        licm.globals = {d.name for d in program.body if not isinstance(d, FuncDecl)}
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                licm._function(decl)
+        return licm.stats
+
+    def _function(self, func):
+        local = {p.name for p in func.params}
+        local |= {n.name for n in walk(func.body) if isinstance(n, (VarDecl, VarDeclInit))}
+        # Un local que comparte nombre con un global puede leerlo antes de
+        # declararse (resolve.py): se trata como global
+        used = {n.name for n in walk(func.body) if isinstance(n, Identifier)}
+        self.shared = self.globals | (used - local)
+        self.visible = self.globals - local
+        self.declared = {p.name for p in func.params}
+        self.func = func
+        self.temps = []
+        body = self._block(func.body)
+        if self.temps:
+            func.body = self.temps + body
+
+    def _fresh(self, typ):
+        k = 1
+        while f'_licm{k}' in self.taken:
+            k += 1
+        name = f'_licm{k}'
+        self.taken.add(name)
+        decl = VarDecl(name, SimpleType(typ))
+        decl.lineno = getattr(self.func, 'lineno', None)
+        self.temps.append(decl)
+        return name
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def _block(self, stmts):
+        out = []
+        for stmt in stmts:
+            out += self._stmt(stmt)
+        return out
+
+    def _stmt(self, n):
+        result = n.accept(self) if n is not None else None
+        return [n] if result is None else result
+
+    def visit(self, n: Node):
+        pass
+
+    def visit(self, n: VarDecl):
+        self.declared.add(n.name)
+
+    def visit(self, n: VarDeclInit):
+        self.declared.add(n.name)
+
+    def visit(self, n: Block):
+        n.body = self._block(n.body)
+
+    def visit(self, n: IfStmt):
+        n.then_branch = self._block(n.then_branch)
+        n.else_branch = self._block(n.else_branch) if n.else_branch else n.else_branch
+
+    def visit(self, n: DoWhileStmt):
+        body = self._stmt(n.body)
+        n.body = body[0] if len(body) == 1 else Block(body)
+
+    def visit(self, n: WhileStmt):
+        return self._loop(n, 'while', [])
+
+    def visit(self, n: ForStmt):
+        return self._loop(n, 'for', [n.step] if n.step is not None else [])
+
+    def _loop(self, n, kind, step):
+        known = self.declared | self.visible
+        n.body = self._block(n.body)
+
+        # Lo que el ciclo puede modificar
+        written, calls = set(), False
+        for node in walk([n.cond] + n.body + step):
+            if isinstance(node, Call):
+                calls |= not self._builtin(node)
+            elif isinstance(node, (VarDecl, VarDeclInit)):
+                written.add(node.name)
+            elif isinstance(node, Assign) and isinstance(node.left, Identifier):
+                written.add(node.left.name)
+            elif isinstance(node, (PreInc, PreDec)) and isinstance(node.expr, Identifier):
+                written.add(node.expr.name)
+        self.invariant = known - written
+        if calls:
+            self.invariant -= self.shared
+        self.hoisted = {}           # forma canónica -> (temporal, expresión)
+
+        # La condición se evalúa al menos una vez al entrar al ciclo
+        self.guaranteed = True
+        n.cond = self._expr(n.cond)
+        self.guaranteed = False
+        n.body = [self._expr(s) if not isinstance(s, _STATEMENTS) else self._exprs_in(s)
+                  for s in n.body]
+        if isinstance(n, ForStmt) and n.step is not None:
+            n.step = self._expr(n.step)
+
+        if not self.hoisted:
+            return None
+        out = []
+        if isinstance(n, ForStmt) and n.init is not None:
+            out.append(n.init)
+            n.init = None
+        exprs = []
+        for temp, expr in self.hoisted.values():
+            ident = Identifier(temp)
+            ident.type = expr.type
+            ident.lineno = getattr(expr, 'lineno', None)
+            assign = Assign(ident, expr)
+            assign.type = expr.type
+            assign.lineno = getattr(expr, 'lineno', None)
+            out.append(assign)
+            exprs.append(expr_text(expr))
+        self.stats.loops.append((self.func.name, getattr(n, 'lineno', '?'), kind, exprs))
+        return out + [n]
+
+    def _builtin(self, n):
+        return n.func.name == 'array_length' and n.func.name not in self.functions
+
+    def _exprs_in(self, n):
+        '''Reescribe las expresiones de una sentencia del cuerpo (no de los ciclos internos).'''
+        if isinstance(n, (PrintStmt, ExprStmt, ReturnStmt)):
+            n.expr = self._expr(n.expr)
+        elif isinstance(n, VarDeclInit):
+            if isinstance(n.init, list):
+                n.init = [self._expr(e) for e in n.init]
+            else:
+                n.init = n.value = self._expr(n.init)
+        elif isinstance(n, IfStmt):
+            n.cond = self._expr(n.cond)
+            n.then_branch = [self._exprs_in(s) if isinstance(s, _STATEMENTS) else self._expr(s)
+                             for s in n.then_branch]
+            n.else_branch = [self._exprs_in(s) if isinstance(s, _STATEMENTS) else self._expr(s)
+                             for s in n.else_branch or []] or n.else_branch
+        elif isinstance(n, Block):
+            n.body = [self._exprs_in(s) if isinstance(s, _STATEMENTS) else self._expr(s)
+                      for s in n.body]
+        elif isinstance(n, (WhileStmt, ForStmt, DoWhileStmt)):
+            # Sus cálculos previos ya están en el cuerpo de este ciclo; lo
+            # que queda adentro puede depender de variables del ciclo interno
+            pass
+        return n
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def _key(self, n):
+        '''Forma canónica de una subexpresión que se puede extraer, o None.'''
+        if isinstance(n, Identifier):
+            return ('id', n.name) if getattr(n, 'type', None) in SCALARS else None
+        if isinstance(n, Literal):
+            return ('lit', n.type, repr(n.value))
+        if isinstance(n, UnaryOper) and n.oper in ('-', '!'):
+            inner = self._key(n.expr)
+            return None if inner is None else (n.oper, inner)
+        if isinstance(n, Call) and self._builtin(n) and len(n.args) == 1 \
+                and isinstance(n.args[0], Identifier):
+            return ('array_length', ('id', n.args[0].name))
+        if isinstance(n, BinOper) and n.right is not None and n.oper in PURE_OPERS:
+            if getattr(n, 'type', None) not in SCALARS:
+                return None
+            left, right = self._key(n.left), self._key(n.right)
+            if left is None or right is None:
+                return None
+            if n.oper in COMMUTATIVE and n.left.type != 'string':
+                left, right = sorted((left, right), key=repr)
+            return (n.oper, left, right)
+        return None
+
+    def _candidate(self, n):
+        if isinstance(n, Identifier):
+            # Sólo vale la pena extraer la lectura de un global
+            if n.name not in self.visible:
+                return None
+        elif not isinstance(n, (BinOper, UnaryOper, Call)):
+            return None
+        key = self._key(n)
+        if key is None:
+            return None
+        reads = key_names(key)
+        if not reads or not reads <= self.invariant:
+            return None
+        if _traps(key) and not self.guaranteed:
+            return None
+        return key
+
+    def _expr(self, n):
+        '''Reescribe la expresión n en el orden de evaluación; retorna su reemplazo.'''
+        if n is None:
+            return None
+        key = self._candidate(n)
+        if key is not None:
+            if key not in self.hoisted:
+                self.hoisted[key] = (self._fresh(n.type), n)
+            ident = Identifier(self.hoisted[key][0])
+            ident.type = n.type
+            ident.lineno = getattr(n, 'lineno', None)
+            return ident
+
+        if isinstance(n, LogicalOpExpr):
+            n.left = self._expr(n.left)
+            guaranteed, self.guaranteed = self.guaranteed, False
+            n.right = self._expr(n.right)
+            self.guaranteed = guaranteed and is_quiet(n.right)
+            return n
+        if isinstance(n, BinOper):
+            n.left = self._expr(n.left)
+            n.right = self._expr(n.right)
+        elif isinstance(n, UnaryOper):
+            n.expr = self._expr(n.expr)
+        elif isinstance(n, Assign):
+            n.right = self._expr(n.right)
+            if isinstance(n.left, ArrayAccess):
+                self._access(n.left)
+        elif isinstance(n, (PreInc, PreDec)):
+            if isinstance(n.expr, ArrayAccess):
+                self._access(n.expr)
+        elif isinstance(n, Call):
+            n.args = [self._expr(a) for a in n.args]
+        elif isinstance(n, ArrayAccess):
+            self._access(n)
+        self.guaranteed = self.guaranteed and is_quiet(n)
+        return n
+
+    def _access(self, n):
+        '''Reescribe los índices de a[i] (o a[i][j]...), en orden.'''
+        if isinstance(n.array, ArrayAccess):
+            self._access(n.array)
+        n.pos = self._expr(n.pos)
+
+
+# Nodos del cuerpo de un ciclo que son sentencias (el resto son expresiones)
+_STATEMENTS = (Statement, IfStmt, ForStmt, ReturnStmt, Block, VarDecl, VarDeclInit)
+
+
+def hoist(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, extrae el código
+    invariante de sus ciclos. Retorna un LICMStats (o None si el checker
+    reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return LoopInvariants.hoist(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 licm.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = hoist(ast)
+    if stats is not None:
+        print(stats)
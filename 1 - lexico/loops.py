@@ -0,0 +1,115 @@
+'''
+Reconocimiento de ciclos contados.
+
+Un 'for' de la forma
+
+    for (init; i < N; i = i + k) cuerpo
+
+(también con <=, > o >=, con la variable a cualquier lado de la
+comparación, y con i = k + i, i = i - k, ++i, --i, i++ o i-- como paso) es un
+ciclo contado si:
+
+  - N es un literal entero o una variable, y k un literal entero o una
+    variable (distinta de i),
+  - el cuerpo no modifica i, N ni k (no las asigna, incrementa ni
+    declara),
+  - si alguna de ellas es global, el cuerpo no llama a funciones.
+
+Los motores ejecutan estos ciclos recorriendo un range de Python: la
+condición y el paso ya no se evalúan en cada iteración, sólo se guarda
+el valor de la variable. Antes de entrar verifican que el valor inicial,
+el límite y el paso sean enteros y que el paso avance hacia el límite
+y que el último paso no se salga de 64 bits (si no, el ciclo se ejecuta
+de la forma normal y el paso da la vuelta). Al terminar, la
+variable queda con el primer valor que no cumple la condición, igual que
+en el ciclo original.
+'''
+from model import *
+from astutil import walk, assigned_name, FLIP, for_step, loop_operand
+
+_INT_MIN, _INT_MAX = -2**63, 2**63 - 1
+
+
+class CountedLoop:
+    '''
+    Un ciclo contado: la variable (el Identifier de la condición), la
+    comparación (con la variable a la izquierda), el límite y el paso
+    (nodos Literal o Identifier) y el signo del paso.
+    '''
+    def __init__(self, var, oper, bound, step, sign):
+        self.var = var
+        self.oper = oper
+        self.bound = bound
+        self.step = step
+        self.sign = sign
+
+    def range(self, start, stop, step):
+        '''
+        range con los valores que toma la variable, o None si el ciclo
+        no se puede contar (valores no enteros, un paso que no avanza
+        hacia el límite o que se sale de 64 bits).
+        '''
+        if start.__class__ is not int or stop.__class__ is not int or step.__class__ is not int:
+            return None
+        step *= self.sign
+        if self.oper in ('<', '<='):
+            if step <= 0:
+                return None
+            r = range(start, stop + 1 if self.oper == '<=' else stop, step)
+        elif step >= 0:
+            return None
+        else:
+            r = range(start, stop - 1 if self.oper == '>=' else stop, step)
+        if not _INT_MIN <= final_value(r) <= _INT_MAX:
+            return None
+        return r
+
+
+def final_value(r):
+    '''Valor de la variable al salir normalmente de un ciclo que recorre el range r.'''
+    return r.start + len(r) * r.step
+
+
+def _global(n):
+    return isinstance(n, Identifier) and getattr(n, 'scope', 'global') != 'local'
+
+
+def counted_loop(n: ForStmt):
+    '''
+    CountedLoop del 'for' n (ya resuelto), o None si no es un ciclo
+    contado. El resultado se guarda en el nodo.
+    '''
+    if hasattr(n, 'counted'):
+        return n.counted
+    n.counted = None
+    step = for_step(n.step) if n.step is not None else None
+    cond = n.cond
+    if step is None or not isinstance(cond, BinOper) or cond.oper not in FLIP:
+        return None
+    var, inc, sign = step
+    if isinstance(cond.left, Identifier) and cond.left.name == var.name:
+        ivar, oper, bound = cond.left, cond.oper, cond.right
+    elif isinstance(cond.right, Identifier) and cond.right.name == var.name:
+        ivar, oper, bound = cond.right, FLIP[cond.oper], cond.left
+    else:
+        return None
+    if not loop_operand(bound, var.name):
+        return None
+    # La condición, el paso y los usos del cuerpo deben ser la misma variable
+    if (getattr(ivar, 'scope', None), getattr(ivar, 'slot', None)) != \
+            (getattr(var, 'scope', None), getattr(var, 'slot', None)):
+        return None
+
+    names = {var.name} | {e.name for e in (bound, inc) if isinstance(e, Identifier)}
+    calls = False
+    for node in walk(n.body):
+        if isinstance(node, Call):
+            calls = True
+        elif isinstance(node, (VarDecl, VarDeclInit)) and node.name in names:
+            return None
+        elif assigned_name(node) in names:
+            return None
+    if calls and any(_global(e) for e in (ivar, bound, inc)):
+        return None
+    n.counted = CountedLoop(ivar, oper, bound, inc, sign)
+    return n.counted
@@ -0,0 +1,219 @@
+'''
+Memorización automática de funciones puras.
+
+Se ejecuta después de Check.checker. Una función es pura si:
+
+  - sus parámetros y su tipo de retorno son escalares (no arrays ni
+    void),
+  - sólo asigna (o incrementa) sus parámetros y variables locales: no
+    modifica globales ni elementos de arrays,
+  - no usa 'print' ni llama a read_int/read_float/read_string; sólo
+    llama a array_length y a otras funciones puras (incluida ella misma),
+  - sólo lee globales escalares que ningún código del programa asigna.
+
+En un programa verificado los argumentos de una función pura tienen
+siempre la clase de sus parámetros, así que su resultado depende sólo de
+la tupla de argumentos. Las funciones puras que llaman a funciones o
+tienen ciclos (fib, binomial, gcd, ...) se memorizan con un LRUCache
+acotado: cada llamada busca primero sus argumentos en el cache y, si no
+están, ejecuta la función y guarda el resultado, descartando el menos
+usado recientemente cuando el cache está lleno. Las funciones puras sin
+llamadas ni ciclos no se memorizan: buscar en el cache cuesta más que
+volver a calcular la expresión.
+
+La pasada deja el cache en el atributo 'memo' de cada FuncDecl
+memorizada; los motores envuelven esas funciones en un Memoized al
+definirlas. Las estadísticas (aciertos, fallos, descartes) se muestran
+con --memo en interp.py al terminar la ejecución.
+
+usage:
+    python3 memo.py <filename>
+'''
+from collections import OrderedDict
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import walk, assigned_name, function_locals, is_scalar, PURE_BUILTINS
+
+# Entradas por defecto del cache de cada función memorizada
+MEMO_SIZE = 4096
+
+
+class LRUCache:
+    '''
+    Resultados de una función, indexados por la tupla de argumentos, con
+    a lo sumo 'size' entradas (se descarta la menos usada recientemente).
+    '''
+    def __init__(self, name, size=MEMO_SIZE):
+        self.name = name
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def __str__(self):
+        return (f'{self.name}: {self.hits} aciertos, {self.misses} fallos '
+                f'({self.hit_rate:.1%}), {self.evictions} descartes, '
+                f'{len(self.entries)}/{self.size} entradas')
+
+
+class Memoized:
+    '''
+    Función B-Minor (de cualquier motor) con sus resultados en un LRUCache.
+    Se llama igual que la función original: func(interp, *args).
+    '''
+    def __init__(self, func, cache: LRUCache):
+        self.func = func
+        self.cache = cache
+
+    @property
+    def arity(self) -> int:
+        return self.func.arity
+
+    def __call__(self, interp, *args):
+        cache = self.cache
+        entries = cache.entries
+        if args in entries:
+            cache.hits += 1
+            entries.move_to_end(args)
+            return entries[args]
+        cache.misses += 1
+        result = self.func(interp, *args)
+        entries[args] = result
+        if len(entries) > cache.size:
+            entries.popitem(last=False)
+            cache.evictions += 1
+        return result
+
+    def __repr__(self):
+        return f'<memoized {self.func!r}>'
+
+
+class MemoStats:
+    def __init__(self):
+        self.pure = []              # nombres de las funciones puras
+        self.caches = []            # LRUCache de cada función memorizada
+
+    @property
+    def total(self):
+        return len(self.caches)
+
+    def __str__(self):
+        lines = [f'memo: {self.total} funciones memorizadas ({len(self.pure)} puras)']
+        for cache in self.caches:
+            lines.append(f'  {cache}')
+        return '\n'.join(lines)
+
+
+def pure_functions(program: Program):
+    '''Nombres de las funciones puras del programa (ya verificado).'''
+    decls = [d for d in program.body if isinstance(d, (VarDecl, VarDeclInit, FuncDecl))]
+    funcs = {d.name: d for d in decls if isinstance(d, FuncDecl) and not d.prototype}
+    variables = {d.name for d in decls if not isinstance(d, FuncDecl)}
+
+    # Globales escalares que ningún código asigna, declarados antes del
+    # primer inicializador que llama a una función (una función llamada
+    # al inicializar no debe ver un global todavía sin su valor)
+    assigned = {assigned_name(n) for n in walk(program.body)}
+    constants = set()
+    for d in decls:
+        if isinstance(d, VarDeclInit) and any(isinstance(n, Call) for n in walk([d])):
+            break
+        if not isinstance(d, FuncDecl) and is_scalar(d.type) and d.name not in assigned:
+            constants.add(d.name)
+
+    # Nombres con una sola definición (además de sus prototipos)
+    defined = [d.name for d in decls if not (isinstance(d, FuncDecl) and d.prototype)]
+    pure = {name for name, f in funcs.items()
+            if defined.count(name) == 1
+            and is_scalar(f.type) and all(is_scalar(p.type) for p in f.params)}
+
+    # Se parte de todas las candidatas y se descartan las que usan algo
+    # impuro hasta un punto fijo (así la recursión queda pura)
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not _pure_body(funcs[name], pure, variables, constants):
+                pure.discard(name)
+                changed = True
+    return [name for name in funcs if name in pure]
+
+
+def _pure_body(func, pure, variables, constants):
+    local = function_locals(func)
+    if local & variables:
+        # Una local con el nombre de un global: las lecturas son ambiguas
+        return False
+    callees = {id(n.func) for n in walk(func.body) if isinstance(n, Call)}
+    for n in walk(func.body):
+        if isinstance(n, PrintStmt):
+            return False
+        if isinstance(n, (Assign, PreInc, PreDec)):
+            if assigned_name(n) not in local:
+                return False
+        elif isinstance(n, Call):
+            if not isinstance(n.func, Identifier):
+                return False
+            callee = n.func.name
+            if callee in local or not (callee in pure or callee in PURE_BUILTINS):
+                return False
+        elif isinstance(n, Identifier) and id(n) not in callees:
+            if n.name not in local and n.name not in constants:
+                return False
+    return True
+
+
+class Memoizer:
+    @classmethod
+    def memoize(cls, program: Program, size=MEMO_SIZE):
+        '''
+        Anota un LRUCache en 'memo' de cada función pura que conviene
+        memorizar (ya verificado). Retorna un MemoStats.
+        '''
+        stats = MemoStats()
+        stats.pure = pure_functions(program)
+        for decl in program.body:
+            if not isinstance(decl, FuncDecl) or decl.name not in stats.pure:
+                continue
+            if any(isinstance(n, (Call, WhileStmt, DoWhileStmt, ForStmt)) for n in walk(decl.body)):
+                decl.memo = LRUCache(decl.name, size)
+                stats.caches.append(decl.memo)
+        return stats
+
+
+def memoized(func, decl):
+    '''La función 'func' de un motor envuelta en un Memoized si 'decl' se memoriza.'''
+    cache = getattr(decl, 'memo', None)
+    return Memoized(func, cache) if cache is not None else func
+
+
+def memoize(program: Program, size=MEMO_SIZE):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, memoriza sus
+    funciones puras. Retorna un MemoStats (o None si el checker reportó
+    errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return Memoizer.memoize(program, size)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 memo.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = memoize(ast)
+    if stats is not None:
+        print(stats)
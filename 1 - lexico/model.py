@@ -120,6 +120,8 @@ class FuncDecl(Node):
         self.params = type_func.params if type_func.params is not None else []
         # FIX: Ensure body is a list
         self.body = body if body is not None else []
+        # Prototipo sin cuerpo (p. ej. 'puts: function void (s: string);')
+        self.prototype = body is None
 
     def pretty(self, tree):
         branch = tree.add(f"FuncDecl {self.name}: {self.type.name if hasattr(self.type, 'name') else 'complex type'}")
@@ -155,6 +157,21 @@ class PreDec(Expression):
         self.expr.pretty(branch)
         return tree
 
+# x++ y x--: modifican x igual que ++x y --x (las pasadas que sólo
+# necesitan saber qué se asigna los tratan como PreInc y PreDec), pero
+# su valor es el de x antes de modificarla
+class PostInc(PreInc):
+    def pretty(self, tree=None):
+        branch = tree.add("PostInc")
+        self.expr.pretty(branch)
+        return tree
+
+class PostDec(PreDec):
+    def pretty(self, tree=None):
+        branch = tree.add("PostDec")
+        self.expr.pretty(branch)
+        return tree
+
 class SimpleType(Node):
     def __init__(self, name):
         self.name = name
@@ -330,11 +330,11 @@ class Parser(sly.Parser):
 
 	@_("expr9 INC")
 	def expr9(self, p):
-		return _L(BinOper("post++", p.expr9, None), p.lineno)
+		return _L(PostInc(p.expr9), p.lineno)
 
 	@_("expr9 DEC")
 	def expr9(self, p):
-		return _L(BinOper("post--", p.expr9, None), p.lineno)
+		return _L(PostDec(p.expr9), p.lineno)
 
 	# ---------------------
 	# Groups and higher constructs
@@ -350,24 +350,32 @@ class Parser(sly.Parser):
 
 	@_("ID '(' opt_expr_list ')'")
 	def group(self, p):
-		return Call(Identifier(p.ID), p.opt_expr_list)
+		return _L(Call(_L(Identifier(p.ID), p.lineno), p.opt_expr_list), p.lineno)
 
 	@_("PRINT expr")
 	def group(self, p):
 		return _L(PrintStmt(p.expr), p.lineno)
 
-	@_("ID indexPos")
+	@_("access")
 	def group(self, p):
-		return _L(ArrayAccess(Identifier(p.ID), p.indexPos), p.lineno)
+		return p.access
 
 	@_("factor")
 	def group(self, p):
 		return p.factor
 
 	# ---------------------
-	# Array index
+	# Array index (a[i], a[i][j], ...)
 	# ---------------------
 
+	@_("ID indexPos")
+	def access(self, p):
+		return _L(ArrayAccess(Identifier(p.ID), p.indexPos), p.lineno)
+
+	@_("access indexPos")
+	def access(self, p):
+		return _L(ArrayAccess(p.access, p.indexPos), p.lineno)
+
 	@_("'[' expr ']'")
 	def indexPos(self, p):
 		return p.expr
@@ -471,11 +479,11 @@ class Parser(sly.Parser):
 	
 	@_("INC expr9")
 	def expr9(self, p):
-		return PreInc(p.expr9)
+		return _L(PreInc(p.expr9), p.lineno)
 
 	@_("DEC expr9")
 	def expr9(self, p):
-		return PreDec(p.expr9)
+		return _L(PreDec(p.expr9), p.lineno)
 
 	def error(self, p):
 		if p:
@@ -0,0 +1,389 @@
+'''
+Evaluación parcial de llamadas a funciones puras con argumentos constantes.
+
+Se ejecuta después de Check.checker. Usa el análisis de pureza de
+memo.py: una llamada a una función pura cuyos argumentos son todos
+literales se ejecuta al compilar, con la semántica del intérprete
+(interp.py), y se reemplaza por el literal de su resultado. Cada
+evaluación tiene un presupuesto de STEPS pasos (nodos evaluados); si se
+agota, si la ejecución fallaría (división por cero, índice fuera de
+límites, ...), si una operación entera se sale de 64 bits (la ejecución
+la reduce o la detiene según --overflow) o si el resultado no es
+representable (ver astutil.make_literal), la llamada se deja como
+estaba y se ejecuta normalmente.
+
+Los globales escalares se procesan en orden: si el inicializador sólo
+depende de literales, de globales anteriores ya calculados y de
+llamadas puras, se evalúa completo y el global pasa a la imagen inicial
+del programa (Program.image, pares (declaración, valor)). Los motores
+copian la imagen en los slots globales antes de ejecutar y ya no
+ejecutan esas declaraciones. El tamaño de los arrays globales se calcula
+de la misma forma. Después del primer inicializador que llama a una
+función que no es pura, los globales siguientes ya no entran a la
+imagen: esa función podría modificarlos.
+
+usage:
+    python3 peval.py <filename>
+'''
+import contextlib
+import io
+
+from model   import *
+from checker import Check
+from errors  import errors_detected, BminorExit
+from memo    import pure_functions
+from astutil import walk, assigned_name, make_literal, is_scalar, CHILD_FIELDS, PURE_BUILTINS
+from arrays  import ARRAYS
+from interp  import (RETURN, _is_truthy, binary_op, unary_op, check_numeric_operand,
+                     array_load, default_value, new_array, init_array, array_sizes,
+                     int_result, trap_overflow)
+
+# Pasos (nodos evaluados) de cada evaluación
+STEPS = 10_000
+
+
+class PartialEvalStats:
+    def __init__(self):
+        self.calls = 0              # llamadas reemplazadas por su resultado
+        self.globals = 0            # globales de la imagen inicial
+        self.sizes = 0              # tamaños de arrays globales calculados
+        self.aborted = 0            # evaluaciones abandonadas
+        self.steps = 0              # pasos usados en total
+
+    @property
+    def total(self):
+        return self.calls + self.globals + self.sizes
+
+    def __str__(self):
+        return (f'peval: {self.calls} llamadas evaluadas, {self.globals} globales en la '
+                f'imagen inicial, {self.sizes} tamaños de arrays ({self.aborted} '
+                f'evaluaciones abandonadas, {self.steps} pasos)')
+
+
+# Valor de un global que no se conoce al compilar
+_NONE = object()
+
+
+class _Abort(Exception):
+    '''La evaluación no se puede completar al compilar.'''
+
+
+class Evaluator(Visitor):
+    '''
+    Ejecuta expresiones y funciones puras al compilar. Las variables se
+    guardan en diccionarios nombre -> valor: 'consts' tiene los globales
+    conocidos y cada llamada usa uno propio para sus locales (los
+    bloques no abren un alcance nuevo).
+    '''
+    def __init__(self, funcs, consts):
+        self.funcs = funcs          # nombre -> FuncDecl de las funciones puras
+        self.consts = consts        # nombre -> valor de los globales conocidos
+        self.steps = 0
+        self.retval = None
+
+    def run(self, expr, stats):
+        '''
+        Valor de la expresión 'expr', o None si no se puede evaluar.
+        Lo que el intérprete mostraría al fallar se descarta.
+        '''
+        self.steps = STEPS
+        # Un resultado entero que no cabe en 64 bits abandona la evaluación:
+        # queda para la ejecución, que lo reduce o lo detiene según el
+        # motor (--overflow)
+        previous = trap_overflow(True)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return self._expr(expr, {})
+        except (_Abort, BminorExit, RecursionError, NotImplementedError):
+            stats.aborted += 1
+            return None
+        finally:
+            trap_overflow(previous)
+            stats.steps += STEPS - self.steps
+
+    def _tick(self):
+        self.steps -= 1
+        if self.steps < 0:
+            raise _Abort()
+
+    def _expr(self, n, env):
+        self._tick()
+        return n.accept(self, env)
+
+    def _exec(self, body, env):
+        for stmt in body:
+            self._tick()
+            status = stmt.accept(self, env)
+            if status is RETURN:
+                return status
+        return None
+
+    def _load(self, name, env):
+        if name in env:
+            return env[name]
+        if name in self.consts:
+            return self.consts[name]
+        raise _Abort()
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def visit(self, n: VarDecl, env):
+        if isinstance(n.type, ArrayType):
+            if n.type.size is None:
+                raise _Abort()
+            env[n.name] = new_array(n, *[self._expr(size, env) for size in array_sizes(n.type)])
+        else:
+            env[n.name] = default_value(n.type)
+
+    def visit(self, n: VarDeclInit, env):
+        if isinstance(n.init, list):
+            env[n.name] = init_array(n, [self._expr(e, env) for e in n.init])
+        else:
+            env[n.name] = self._expr(n.init, env) if n.init else None
+
+    def visit(self, n: Block, env):
+        return self._exec(n.body, env)
+
+    def visit(self, n: ExprStmt, env):
+        self._expr(n.expr, env)
+
+    def visit(self, n: ReturnStmt, env):
+        self.retval = self._expr(n.expr, env) if n.expr else None
+        return RETURN
+
+    def visit(self, n: IfStmt, env):
+        if _is_truthy(self._expr(n.cond, env)):
+            return self._exec(n.then_branch, env)
+        if n.else_branch:
+            return self._exec(n.else_branch, env)
+
+    def visit(self, n: WhileStmt, env):
+        while _is_truthy(self._expr(n.cond, env)):
+            if self._exec(n.body, env) is RETURN:
+                return RETURN
+
+    def visit(self, n: DoWhileStmt, env):
+        while True:
+            if self._exec([n.body], env) is RETURN:
+                return RETURN
+            if not _is_truthy(self._expr(n.cond, env)):
+                return None
+
+    def visit(self, n: ForStmt, env):
+        if n.init:
+            self._expr(n.init, env)
+        while n.cond is None or _is_truthy(self._expr(n.cond, env)):
+            if self._exec(n.body, env) is RETURN:
+                return RETURN
+            if n.step:
+                self._expr(n.step, env)
+
+    def visit(self, n: Node, env):
+        # print y cualquier otro nodo que no se evalúa al compilar
+        raise _Abort()
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: Literal, env):
+        return n.value
+
+    def visit(self, n: Identifier, env):
+        return self._load(n.name, env)
+
+    def visit(self, n: BinOper, env):
+        return binary_op(n, self._expr(n.left, env), self._expr(n.right, env))
+
+    def visit(self, n: LogicalOpExpr, env):
+        left = self._expr(n.left, env)
+        if n.oper == '||':
+            return left if _is_truthy(left) else self._expr(n.right, env)
+        if n.oper == '&&':
+            return self._expr(n.right, env) if _is_truthy(left) else left
+        raise _Abort()
+
+    def visit(self, n: UnaryOper, env):
+        return unary_op(n, self._expr(n.expr, env))
+
+    def visit(self, n: Assign, env):
+        # Las funciones puras sólo asignan sus variables locales
+        if not isinstance(n.left, Identifier) or n.left.name not in env:
+            raise _Abort()
+        value = self._expr(n.right, env)
+        env[n.left.name] = value
+        return value
+
+    def _incr(self, n, delta, env):
+        if not isinstance(n.expr, Identifier) or n.expr.name not in env:
+            raise _Abort()
+        value = env[n.expr.name]
+        check_numeric_operand(n, value)
+        new = env[n.expr.name] = int_result(value + delta)
+        # x++ y x-- valen el valor anterior
+        return value if isinstance(n, (PostInc, PostDec)) else new
+
+    def visit(self, n: PreInc, env):
+        return self._incr(n, 1, env)
+
+    def visit(self, n: PreDec, env):
+        return self._incr(n, -1, env)
+
+    def visit(self, n: ArrayAccess, env):
+        return array_load(n, self._expr(n.array, env), self._expr(n.pos, env))
+
+    def visit(self, n: Call, env):
+        if not isinstance(n.func, Identifier) or n.func.name in env:
+            raise _Abort()
+        args = [self._expr(arg, env) for arg in n.args]
+        if n.func.name == 'array_length' and len(args) == 1 and isinstance(args[0], ARRAYS):
+            return len(args[0])
+        func = self.funcs.get(n.func.name)
+        if func is None or len(args) != len(func.params):
+            raise _Abort()
+        frame = {p.name: value for p, value in zip(func.params, args)}
+        self.retval = None
+        result = self.retval if self._exec(func.body, frame) is RETURN else None
+        self.retval = None
+        return result
+
+
+class PartialEvaluator:
+    @classmethod
+    def evaluate(cls, program: Program):
+        '''
+        Evalúa las llamadas puras con argumentos constantes y arma la
+        imagen inicial de globales (ya verificado). Retorna un
+        PartialEvalStats.
+        '''
+        peval = cls()
+        peval.stats = PartialEvalStats()
+        funcs = {d.name: d for d in program.body if isinstance(d, FuncDecl) and not d.prototype}
+        pure = {name: funcs[name] for name in pure_functions(program)}
+        assigned = {assigned_name(n) for n in walk(program.body)}
+        names = [d.name for d in program.body]
+
+        # Globales en orden: 'image' tiene los valores iniciales conocidos
+        image = {}
+        peval.evaluator = Evaluator(pure, image)
+        peval.aborted = set()       # ids de las llamadas que no se pudieron evaluar
+        program.image = []
+        rest = []
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                continue
+            if rest:
+                rest.append(decl)
+                continue
+            value = peval._global(decl, names.count(decl.name) == 1)
+            if value is not _NONE:
+                image[decl.name] = value
+                program.image.append((decl, value))
+            elif peval._impure(decl):
+                # Desde aquí una función llamada al inicializar podría
+                # modificar los globales siguientes
+                rest.append(decl)
+
+        # Las funciones puras sólo leen globales que nunca se asignan
+        peval.evaluator.consts = {k: v for k, v in image.items() if k not in assigned}
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and not decl.prototype:
+                decl.body = peval._rewrite(decl.body)
+        for decl in rest:
+            peval._rewrite(decl)
+        peval.stats.globals = len(program.image)
+        return peval.stats
+
+    def _global(self, decl, unique):
+        '''
+        Valor inicial del global 'decl' para la imagen, o _NONE si no se
+        conoce al compilar (el inicializador y el tamaño de los arrays se
+        reescriben igual).
+        '''
+        if isinstance(decl, VarDecl):
+            if isinstance(decl.type, ArrayType):
+                # Un tamaño por dimensión (array [N] array [M] ...)
+                typ = decl.type
+                while isinstance(typ, ArrayType) and typ.size is not None:
+                    if not isinstance(typ.size, Literal):
+                        typ.size = self._constant(typ.size, 'integer')
+                        if isinstance(typ.size, Literal):
+                            self.stats.sizes += 1
+                    typ = typ.elem_type
+            elif is_scalar(decl.type) and unique:
+                return default_value(decl.type)
+            return _NONE
+        if isinstance(decl, VarDeclInit) and decl.init is not None and not isinstance(decl.init, list):
+            if not is_scalar(decl.type):
+                return _NONE
+            decl.init = decl.value = self._constant(decl.init, decl.type.name)
+            if isinstance(decl.init, Literal) and unique:
+                return decl.init.value
+            return _NONE
+        self._rewrite(decl)
+        return _NONE
+
+    def _constant(self, expr, typ):
+        '''Literal con el valor de 'expr', o expr (reescrita) si no se puede evaluar.'''
+        expr = self._rewrite(expr)
+        if isinstance(expr, Literal):
+            return expr
+        if any(id(n) in self.aborted for n in walk([expr])):
+            return expr
+        value = self.evaluator.run(expr, self.stats)
+        lit = make_literal(value, typ, getattr(expr, 'lineno', None)) if value is not None else None
+        if lit is None:
+            return expr
+        self.stats.calls += sum(isinstance(n, Call) for n in walk([expr]))
+        return lit
+
+    def _impure(self, decl):
+        '''True si la declaración llama a una función que no es pura.'''
+        return any(isinstance(n, Call) and not (isinstance(n.func, Identifier) and
+                   (n.func.name in self.evaluator.funcs or n.func.name in PURE_BUILTINS))
+                   for n in walk([decl]))
+
+    def _rewrite(self, n):
+        '''Reemplaza en n las llamadas puras con argumentos literales.'''
+        if isinstance(n, list):
+            return [self._rewrite(e) for e in n]
+        for field in CHILD_FIELDS.get(type(n), ()):
+            child = getattr(n, field)
+            if child is not None:
+                setattr(n, field, self._rewrite(child))
+        if isinstance(n, VarDeclInit):
+            n.value = n.init
+        if (isinstance(n, Call) and isinstance(n.func, Identifier)
+                and n.func.name in self.evaluator.funcs
+                and all(isinstance(arg, Literal) for arg in n.args)):
+            value = self.evaluator.run(n, self.stats)
+            lit = make_literal(value, n.type, getattr(n, 'lineno', None)) if value is not None else None
+            if lit is not None:
+                self.stats.calls += 1
+                return lit
+            self.aborted.add(id(n))
+        return n
+
+
+def evaluate(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, evalúa al
+    compilar sus llamadas puras constantes. Retorna un PartialEvalStats
+    (o None si el checker reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return PartialEvaluator.evaluate(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 peval.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = evaluate(ast)
+    if stats is not None:
+        print(stats)
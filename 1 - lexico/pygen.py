@@ -0,0 +1,866 @@
+'''
+Traducción de B-Minor a código fuente Python.
+
+El AST resuelto (ver resolve.py) se traduce a un módulo Python
+equivalente que luego se compila con compile() y se ejecuta con exec:
+
+  - Cada FuncDecl es una función Python con sus variables locales; los
+    globales del programa son variables globales del módulo generado.
+  - 'while', 'for' y 'do-while' son ciclos 'while' nativos.
+  - Las operaciones entre enteros usan directamente los operadores de
+    Python; '/' y '%' conservan la semántica del intérprete (división
+    entera entre enteros y error de división por cero). Los resultados
+    de + - * / << '-' ++ y -- que se pueden salir de 64 bits se
+    comparan en línea con los límites y sólo si no caben pasan por
+    interp.int_overflow; las operaciones que ranges.py acotó no se
+    comparan.
+  - Los accesos a arrays conservan la verificación de límites. Con la
+    opción 'bits' (arrays.py) los accesos a arrays de boolean leen y
+    escriben el bit del BitArray en línea.
+  - Una función con llamadas a sí misma en posición de cola (tailcall.py)
+    envuelve su cuerpo en 'while True': la llamada asigna los argumentos
+    a los parámetros y hace 'continue'. Dentro de un ciclo pone '_tail'
+    en True y hace 'break'; al terminar cada ciclo '_tail' sale también
+    del ciclo externo hasta llegar al 'while True' de la función.
+
+A diferencia del intérprete, el código generado para un programa que
+pasó el checker (Program.checked) no repite en cada operación las
+verificaciones de tipo: usa los operadores de Python según los tipos
+declarados. Si el checker reportó errores los tipos declarados no son
+confiables, y las operaciones binarias y unarias pasan por
+interp.binary_op y unary_op. Todo caso que no se puede traducir
+directamente se delega en las funciones de runtime de interp.py, de
+modo que la salida y los mensajes de error son los mismos.
+
+Los objetos código compilados se guardan en una caché indexada por el
+hash del código fuente generado. La caché es del proceso: sirve cuando
+un mismo proceso ejecuta varias veces el mismo programa (bench.py, o
+quien use PythonEngine como biblioteca), no entre ejecuciones de
+interp.py, y guarda a lo sumo CODE_CACHE_LIMIT programas.
+
+usage:
+    python3 pygen.py <filename>
+'''
+import hashlib
+
+from rich    import print
+from model   import *
+from resolve import Resolver, LOCAL, GLOBAL
+from memo    import Memoized
+from astutil import is_quiet
+from arrays  import ARRAYS, BitArray, Strided
+from interp  import (BminorExit, _is_truthy, runtime_error, check_numeric_operand,
+                     binary_op, unary_op, power, array_load, array_store, default_value,
+                     new_array, pooled_array, init_array, array_sizes, index_chain, strided_load,
+                     strided_store, print_value, builtin_functions, int_result, int_overflow,
+                     INT_MIN, INT_MAX, Options, mark_program, trap_overflow)
+
+# Nodos que se traducen como sentencias
+_STATEMENTS = (Statement, IfStmt, ForStmt, ReturnStmt, Block, FuncDecl, VarDeclInit)
+
+# Operadores que se traducen directamente al operador de Python
+_NATIVE_OPS = {'+', '-', '*', '==', '!=', '<', '>', '<=', '>='}
+
+# Operadores de comparación (resultado boolean)
+_COMPARISONS = {'==', '!=', '<', '>', '<=', '>='}
+
+# Operadores cuyo resultado es entero si ambos operandos lo son
+_INT_OPS = {'+', '-', '*', '/', '%', '^', '<<', '>>', '&'}
+
+# Operadores entre enteros sin sintaxis propia: sólo los genera strength.py
+_SHIFT_OPS = {'<<', '>>', '&'}
+
+# Operadores nativos cuyo resultado entero se puede salir de 64 bits
+_OVERFLOW_OPS = {'+', '-', '*', '<<'}
+
+
+def _name(name):
+    '''Nombre Python de una variable B-Minor (evita choques con Python).'''
+    return 'b_' + name
+
+
+def _declarations(body):
+    '''Todas las declaraciones de variables dentro de una lista de sentencias.'''
+    for stmt in body:
+        if isinstance(stmt, (VarDecl, VarDeclInit)):
+            yield stmt
+        elif isinstance(stmt, IfStmt):
+            yield from _declarations(stmt.then_branch)
+            yield from _declarations(stmt.else_branch or [])
+        elif isinstance(stmt, (WhileStmt, ForStmt)):
+            if isinstance(stmt, ForStmt) and stmt.init:
+                yield from _declarations([stmt.init])
+            yield from _declarations(stmt.body)
+        elif isinstance(stmt, DoWhileStmt):
+            yield from _declarations([stmt.body])
+        elif isinstance(stmt, Block):
+            yield from _declarations(stmt.body)
+
+
+def _tail_returns(body, loop=False):
+    '''
+    Genera un bool por cada llamada en posición de cola de 'body': True si
+    está dentro de un ciclo.
+    '''
+    for stmt in body:
+        if isinstance(stmt, ReturnStmt) and getattr(stmt, 'tail', False):
+            yield loop
+        elif isinstance(stmt, IfStmt):
+            yield from _tail_returns(stmt.then_branch, loop)
+            yield from _tail_returns(stmt.else_branch or [], loop)
+        elif isinstance(stmt, Block):
+            yield from _tail_returns(stmt.body, loop)
+        elif isinstance(stmt, (WhileStmt, ForStmt)):
+            yield from _tail_returns(stmt.body, True)
+        elif isinstance(stmt, DoWhileStmt):
+            yield from _tail_returns([stmt.body], True)
+
+
+def _is_simple(n):
+    '''Expresiones sin efectos que se pueden evaluar más de una vez.'''
+    return isinstance(n, (Identifier, Literal))
+
+
+class PythonGenerator(Visitor):
+    '''
+    Genera el código fuente. Los visit de expresiones retornan un string
+    con la expresión Python; los de sentencias agregan líneas a 'lines'.
+    '''
+    def __init__(self, builtins):
+        self.builtins = builtins
+        self.lines = []
+        self.level = 0
+        self.nodes = []         # nodos referenciados como _n[k] en el código
+        self.gtypes = {}        # slot global -> tipo declarado (o FuncDecl)
+        self.ltypes = {}        # slot local  -> tipo declarado
+        self.loops = 0          # ciclos que rodean a la sentencia actual
+        self.tailcall = None    # (parámetros, locales) si la función repite su cuerpo
+        self.checked = False    # el programa pasó el checker: los tipos declarados valen
+        self.bits = False       # los arrays de boolean son BitArray (Options.bits)
+
+    @classmethod
+    def generate(cls, n: Program, builtins=(), bits=False):
+        '''
+        Retorna el código fuente Python del programa y la lista de nodos
+        que ese código referencia.
+        '''
+        gen = cls(builtins)
+        gen.checked = getattr(n, 'checked', False)
+        gen.bits = bits
+        for decl in n.body:
+            gen.gtypes[decl.slot] = decl if isinstance(decl, FuncDecl) else decl.type
+
+        gen.emit('# Generado por pygen.py')
+        names = [_name(name) for name in n.globals if name not in builtins]
+        if names:
+            gen.emit(' = '.join(names) + ' = None')
+        for decl in n.body:
+            gen._stmt(decl)
+        return '\n'.join(gen.lines) + '\n', gen.nodes
+
+    # =====================================================================
+    # Utilidades
+    # =====================================================================
+    def emit(self, line):
+        self.lines.append('    ' * self.level + line)
+
+    def node(self, n):
+        '''Referencia al nodo n desde el código generado.'''
+        self.nodes.append(n)
+        return f'_n[{len(self.nodes) - 1}]'
+
+    def _block(self, stmts):
+        self.level += 1
+        start = len(self.lines)
+        for stmt in stmts:
+            self._stmt(stmt)
+        if len(self.lines) == start:
+            self.emit('pass')
+        self.level -= 1
+
+    def _stmt(self, n):
+        if isinstance(n, Assign):
+            self._assign_stmt(n)
+        elif isinstance(n, (PreInc, PreDec)) and isinstance(n.expr, Identifier) and self._is_int(n.expr) \
+                and getattr(n, 'bounded', False):
+            self.emit(f"{self._target(n.expr)} {'+=' if isinstance(n, PreInc) else '-='} 1")
+        elif isinstance(n, _STATEMENTS):
+            n.accept(self)
+        else:
+            self.emit(n.accept(self))
+
+    def _type_of(self, n):
+        '''Tipo declarado del nombre al que se refiere n (o None).'''
+        if n.scope == LOCAL:
+            return self.ltypes.get(n.slot)
+        return self.gtypes.get(n.slot)
+
+    def _is_int(self, n):
+        '''True si la expresión produce siempre un entero.'''
+        if isinstance(n, BinOper):
+            return (n.oper in _INT_OPS and n.right is not None
+                    and self._is_int(n.left) and self._is_int(n.right))
+        if isinstance(n, UnaryOper):
+            return n.oper == '-' and self._is_int(n.expr)
+        if isinstance(n, (PreInc, PreDec)):
+            return self._is_int(n.expr)
+        if isinstance(n, Assign):
+            return self._is_int(n.right)
+        if isinstance(n, Call) and isinstance(n.func, Identifier) and n.func.scope == GLOBAL:
+            if n.func.name in ('read_int', 'array_length') and self.gtypes.get(n.func.slot) is None:
+                return True
+        return self._has_type(n, 'integer')
+
+    def _has_type(self, n, name):
+        '''True si el valor de n es siempre del tipo simple 'name'.'''
+        if isinstance(n, Literal):
+            return n.type == name
+        if not self.checked:
+            return False
+        if isinstance(n, Identifier):
+            typ = self._type_of(n)
+            return isinstance(typ, SimpleType) and typ.name == name
+        if isinstance(n, ArrayAccess) and isinstance(n.array, Identifier):
+            typ = self._type_of(n.array)
+            return (isinstance(typ, ArrayType) and isinstance(typ.elem_type, SimpleType)
+                    and typ.elem_type.name == name)
+        if isinstance(n, Call) and isinstance(n.func, Identifier) and n.func.scope == GLOBAL:
+            func = self.gtypes.get(n.func.slot)
+            return (isinstance(func, FuncDecl) and isinstance(func.type, SimpleType)
+                    and func.type.name == name)
+        return False
+
+    def _bit(self, n):
+        '''True si n es a[i] sobre un array de boolean guardado en un BitArray.'''
+        return (self.bits and self.checked and isinstance(n.array, Identifier)
+                and getattr(n, 'type', None) == 'boolean')
+
+    def _is_bool(self, n):
+        '''True si la expresión produce siempre un boolean.'''
+        if isinstance(n, BinOper):
+            return n.oper in _COMPARISONS
+        if isinstance(n, UnaryOper):
+            return n.oper == '!'
+        if isinstance(n, LogicalOpExpr):
+            return self._is_bool(n.left) and self._is_bool(n.right)
+        if isinstance(n, Assign):
+            return self._is_bool(n.right)
+        return self._has_type(n, 'boolean')
+
+    def _cond(self, n):
+        '''Condición de if/while con la veracidad del intérprete.'''
+        code = self._expr(n)
+        if self._is_bool(n) or self._is_int(n):
+            return code
+        return f'_truthy({code})'
+
+    def _target(self, n):
+        return _name(n.name)
+
+    # =====================================================================
+    # Declaraciones
+    # =====================================================================
+    def visit(self, n: FuncDecl):
+        self.ltypes = {}
+        for parm in n.params:
+            self.ltypes[parm.slot] = parm.type
+        for decl in _declarations(n.body):
+            # Una variable redeclarada con otro tipo queda sin tipo conocido
+            if decl.slot in self.ltypes and self.ltypes[decl.slot] is not decl.type:
+                old = self.ltypes[decl.slot]
+                if getattr(old, 'name', None) != getattr(decl.type, 'name', None) or isinstance(old, ArrayType):
+                    self.ltypes[decl.slot] = None
+                    continue
+            self.ltypes.setdefault(decl.slot, decl.type)
+
+        params = [_name(parm.name) for parm in n.params]
+        self.emit(f"def {_name(n.name)}({', '.join(params)}):")
+        self.level += 1
+        stored = sorted({_name(t.name) for t in self._global_stores(n.body)})
+        if stored:
+            self.emit(f"global {', '.join(stored)}")
+        local_names = [_name(name) for name in n.locals[len(n.params):]]
+        tails = set(_tail_returns(n.body))
+        self.tailcall = (params, local_names) if tails else None
+        arrays = getattr(n, 'arrays', None)
+        if arrays is not None:
+            # Los arrays locales que no escapan (escape.py) vuelven al pool
+            # de la función al retornar
+            self.emit(' = '.join(local_names) + ' = None')
+            self.emit('try:')
+            self.level += 1
+        if self.tailcall:
+            self.emit('while True:')
+            self.level += 1
+        # Las variables locales empiezan en None, igual que los slots del frame
+        if local_names and (self.tailcall or arrays is None):
+            self.emit(' = '.join(local_names) + ' = None')
+        if True in tails:
+            self.emit('_tail = False')
+        self.level -= 1
+        self._block(n.body)
+        if self.tailcall:
+            self.level += 1
+            self.emit('return')
+            self.level -= 2
+        if arrays is not None:
+            names = ', '.join(_name(n.locals[slot]) for slot, _ in arrays)
+            self.emit('finally:')
+            self.level += 1
+            self.emit(f'_release({self.node(n)}, {names})')
+            self.level -= 2
+        self.tailcall = None
+        self.ltypes = {}
+
+    def _global_stores(self, body):
+        '''Identificadores globales que se asignan dentro de 'body'.'''
+        stack = list(body)
+        while stack:
+            n = stack.pop()
+            if isinstance(n, list):
+                stack.extend(n)
+            elif isinstance(n, (Assign, PreInc, PreDec)):
+                target = n.left if isinstance(n, Assign) else n.expr
+                if isinstance(target, Identifier) and target.scope == GLOBAL:
+                    yield target
+                stack.extend(vars(n).values())
+            elif isinstance(n, Node):
+                stack.extend(v for v in vars(n).values() if isinstance(v, (Node, list)))
+
+    def visit(self, n: VarDecl):
+        if isinstance(n.type, ArrayType) and n.type.size:
+            sizes = ', '.join(self._expr(size) for size in array_sizes(n.type))
+            if getattr(n, 'pool', None) is not None:
+                value = f'_pooled({self.node(n)}, ({sizes},), {self._target(n)})'
+            else:
+                value = f'_new_array({self.node(n)}, {sizes})'
+        elif isinstance(n.type, SimpleType):
+            value = repr(default_value(n.type))
+        else:
+            value = 'None'
+        self.emit(f'{self._target(n)} = {value}')
+
+    def visit(self, n: VarDeclInit):
+        if isinstance(n.init, list):
+            items = ', '.join(self._expr(item) for item in n.init)
+            value = f'_init_array({self.node(n)}, [{items}])'
+        elif n.init:
+            value = self._expr(n.init)
+        else:
+            value = 'None'
+        self.emit(f'{self._target(n)} = {value}')
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def visit(self, n: Block):
+        for stmt in n.body:
+            self._stmt(stmt)
+
+    def visit(self, n: PrintStmt):
+        self.emit(f'_print({self._expr(n.expr)})')
+
+    def visit(self, n: ExprStmt):
+        self._stmt(n.expr)
+
+    def visit(self, n: IfStmt):
+        self.emit(f'if {self._cond(n.cond)}:')
+        self._block(n.then_branch)
+        if n.else_branch:
+            self.emit('else:')
+            self._block(n.else_branch)
+
+    def visit(self, n: WhileStmt):
+        self.emit(f'while {self._cond(n.cond)}:')
+        self.loops += 1
+        self._block(n.body)
+        self.loops -= 1
+        self._after_loop(n.body)
+
+    def visit(self, n: DoWhileStmt):
+        self.emit('while True:')
+        self.level += 1
+        self.loops += 1
+        self._stmt(n.body)
+        self.loops -= 1
+        self.emit(f'if not {self._cond(n.cond)}:')
+        self.emit('    break')
+        self.level -= 1
+        self._after_loop([n.body])
+
+    def visit(self, n: ForStmt):
+        if n.init:
+            self._stmt(n.init)
+        cond = self._cond(n.cond) if n.cond else 'True'
+        self.emit(f'while {cond}:')
+        body = list(n.body)
+        if n.step:
+            body.append(n.step)
+        self.loops += 1
+        self._block(body)
+        self.loops -= 1
+        self._after_loop(n.body)
+
+    def _after_loop(self, body):
+        '''
+        Después de un ciclo con llamadas en posición de cola: si salió por
+        una de ellas, sale del ciclo externo o repite la función.
+        '''
+        if self.tailcall and True in _tail_returns(body, True):
+            self.emit('if _tail:')
+            self.emit('    break' if self.loops else '    continue')
+
+    def visit(self, n: ReturnStmt):
+        if getattr(n, 'tail', False) and self.tailcall:
+            params, local_names = self.tailcall
+            if params:
+                args = ', '.join(self._expr(arg) for arg in n.expr.args)
+                self.emit(f"{', '.join(params)} = {args}")
+            if local_names:
+                self.emit(' = '.join(local_names) + ' = None')
+            if self.loops:
+                self.emit('_tail = True')
+                self.emit('break')
+            else:
+                self.emit('continue')
+        elif n.expr:
+            self.emit(f'return {self._expr(n.expr)}')
+        else:
+            self.emit('return')
+
+    def _assign_stmt(self, n):
+        target = n.left
+        value = self._expr(n.right)
+        if isinstance(target, Identifier):
+            self.emit(f'{self._target(target)} = {value}')
+        elif isinstance(target, ArrayAccess) and self._bit(target):
+            self._store_bit(target, n.right, value)
+        elif isinstance(target, ArrayAccess) and isinstance(target.array, Identifier):
+            # Python evalúa el valor antes que el índice, igual que el intérprete
+            arr = self._expr(target.array)
+            idx = self._expr(target.pos)
+            # Los arrays en memoria contigua (arrays.py) rechazan los valores
+            # que no pueden guardar: array_store reporta el error
+            self.emit('try:')
+            if getattr(target, 'unchecked', False):
+                # Índice dentro de los límites (bounds.py)
+                self.emit(f'    {arr}[(_i := {idx})] = (_v := {value})')
+            else:
+                self.emit(f'    {arr}[_i if 0 <= (_i := {idx}) < len({arr}) '
+                          f'else _bad_store({self.node(target)}, {arr}, _i)] = (_v := {value})')
+            self.emit('except (TypeError, OverflowError):')
+            self.emit(f'    _setitem(_v, {arr}, _i, {self.node(target)})')
+        elif isinstance(target, ArrayAccess) and len(index_chain(target)[1]) == 2:
+            # a[i][j] = valor: el desplazamiento en línea (ver visit(ArrayAccess))
+            root, (i, j) = index_chain(target)
+            ref = self.node(target)
+            # _r y _c: los índices pueden usar _i (ver visit(ArrayAccess))
+            self.emit(f'_v = {value}')
+            self.emit(f'_a = {self._expr(root)}')
+            self.emit(f'_r = {self._expr(i)}')
+            self.emit(f'_c = {self._expr(j)}')
+            self.emit('if (_a.__class__ is _Strided and len(_d := _a.dims) == 2 '
+                      'and 0 <= _r < _d[0] and 0 <= _c < _d[1]):')
+            self.emit('    try:')
+            self.emit('        _a.data[_a.offset + _r * _d[1] + _c] = _v')
+            self.emit('    except (TypeError, OverflowError):')
+            self.emit(f'        _strided_set(_v, _a, [_r, _c], {ref})')
+            self.emit('else:')
+            self.emit(f'    _strided_set(_v, _a, [_r, _c], {ref})')
+        else:
+            self.emit(self._assign_expr(n))
+
+    def _store_bit(self, target, right, value):
+        '''a[i] = valor sobre un BitArray: el bit en línea (ver arrays.BitArray).'''
+        arr = self._expr(target.array)
+        ref = self.node(target)
+        if isinstance(right, Boolean):
+            # El valor es una constante: sólo se calcula el índice
+            self.emit(f'_i = {self._expr(target.pos)}')
+            self.emit(f'if {arr}.__class__ is _BitArray and 0 <= _i < {arr}.size:')
+            if right.value:
+                self.emit(f'    {arr}.bits[_i >> 3] |= 1 << (_i & 7)')
+            else:
+                self.emit(f'    {arr}.bits[_i >> 3] &= ~(1 << (_i & 7)) & 0xFF')
+            self.emit('else:')
+            self.emit(f'    _setitem({value}, {arr}, _i, {ref})')
+            return
+        self.emit(f'_v = {value}')
+        self.emit(f'_i = {self._expr(target.pos)}')
+        self.emit(f'if {arr}.__class__ is _BitArray and 0 <= _i < {arr}.size and (_v is True or _v is False):')
+        self.emit('    if _v:')
+        self.emit(f'        {arr}.bits[_i >> 3] |= 1 << (_i & 7)')
+        self.emit('    else:')
+        self.emit(f'        {arr}.bits[_i >> 3] &= ~(1 << (_i & 7)) & 0xFF')
+        self.emit('else:')
+        self.emit(f'    _setitem(_v, {arr}, _i, {ref})')
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def _expr(self, n):
+        if isinstance(n, PrintStmt):
+            # 'print' usado como expresión: su valor es None
+            return f'_print({self._expr(n.expr)})'
+        return n.accept(self)
+
+    def visit(self, n: BinOper):
+        left = self._expr(n.left)
+        right = self._expr(n.right)
+        if not self.checked:
+            return f'_binop({self.node(n)}, {left}, {right})'
+        if n.oper in _OVERFLOW_OPS:
+            return self._int64(n, self._binary(n, left, right))
+        return self._binary(n, left, right)
+
+    def _binary(self, n, left, right):
+        if n.oper in _NATIVE_OPS or n.oper in _SHIFT_OPS:
+            return f'({left} {n.oper} {right})'
+        if n.oper == '^':
+            if self._is_int(n.right) and (self._is_int(n.left) or self._has_type(n.left, 'float')):
+                return f'_pow({left}, {right})'
+            return f'_binop({self.node(n)}, {left}, {right})'
+        if n.oper in ('/', '%') and self._is_int(n.left) and self._is_int(n.right):
+            pyop = '//' if n.oper == '/' else '%'
+            if isinstance(n.right, Literal) and n.right.value != 0:
+                expr = f'({left} {pyop} {right})'
+                # Sólo MIN / -1 se desborda
+                return self._int64(n, expr) if n.right.value == -1 and pyop == '//' else expr
+            if _is_simple(n.left) and _is_simple(n.right):
+                expr = f'({left} {pyop} {right} if {right} else _binop({self.node(n)}, {left}, {right}))'
+                return self._int64(n, expr) if pyop == '//' else expr
+        if n.oper in ('/', '%'):
+            return f'_binop({self.node(n)}, {left}, {right})'
+        return f'_fail({left}, {right}, {repr("Operador binario no implementado: " + n.oper)})'
+
+    def _int64(self, n, expr):
+        '''
+        expr (el valor de la operación n) reducido a 64 bits si es un
+        entero que no cabe, salvo que ranges.py haya acotado n.
+        '''
+        if getattr(n, 'bounded', False) or getattr(n, 'type', None) in ('float', 'string'):
+            return expr
+        if self._is_int(n):
+            return f'(_v if {INT_MIN} <= (_v := {expr}) <= {INT_MAX} else _overflow(_v))'
+        return f'_int({expr})'
+
+    def visit(self, n: LogicalOpExpr):
+        left = self._expr(n.left)
+        right = self._expr(n.right)
+        if n.oper not in ('||', '&&'):
+            return f'_fail({left}, {repr("Operador lógico no implementado: " + n.oper)})'
+        if self._is_bool(n.left) or self._is_int(n.left):
+            return f"({left} {'or' if n.oper == '||' else 'and'} {right})"
+        # Strings y arrays son verdaderos en B-Minor, no en Python
+        if n.oper == '||':
+            return f'(_t if _truthy(_t := {left}) else {right})'
+        return f'({right} if _truthy(_t := {left}) else _t)'
+
+    def visit(self, n: UnaryOper):
+        expr = self._expr(n.expr)
+        if not self.checked:
+            return f'_unop({self.node(n)}, {expr})'
+        if n.oper == '-':
+            return self._int64(n, f'(-{expr})')
+        if n.oper == '!':
+            if self._is_bool(n.expr) or self._is_int(n.expr):
+                return f'(not {expr})'
+            return f'(not _truthy({expr}))'
+        return f'_fail({expr}, {repr("Operador unario no implementado: " + n.oper)})'
+
+    def visit(self, n: Assign):
+        return self._assign_expr(n)
+
+    def _assign_expr(self, n):
+        target = n.left
+        value = self._expr(n.right)
+        if isinstance(target, Identifier):
+            return f'({self._target(target)} := {value})'
+        if isinstance(target, ArrayAccess) and isinstance(target.array, ArrayAccess):
+            root, idxs = index_chain(target)
+            return (f'_strided_set({value}, {self._expr(root)}, '
+                    f'[{", ".join(self._expr(idx) for idx in idxs)}], {self.node(target)})')
+        if isinstance(target, ArrayAccess) and getattr(target, 'unchecked', False):
+            return (f'_setitem_unchecked({value}, {self._expr(target.array)}, '
+                    f'{self._expr(target.pos)}, {self.node(target)})')
+        if isinstance(target, ArrayAccess):
+            return (f'_setitem({value}, {self._expr(target.array)}, '
+                    f'{self._expr(target.pos)}, {self.node(target)})')
+        return f'_fail({value}, "Target de asignación inválido", _runtime=True)'
+
+    def _incr(self, n, delta, message):
+        target = n.expr
+        post = isinstance(n, (PostInc, PostDec))
+        if isinstance(target, Identifier):
+            name = self._target(target)
+            if self._is_int(target) and getattr(n, 'bounded', False):
+                code = f'({name} := {name} {delta:+d})'
+            elif self._is_int(target):
+                # Sólo el extremo del rango se desborda
+                edge = INT_MAX if delta > 0 else INT_MIN
+                code = (f'({name} := {name} {delta:+d} if {name} != {edge} '
+                        f'else _overflow({name} {delta:+d}))')
+            else:
+                code = f'({name} := _incr_value({self.node(n)}, {name}, {delta}))'
+            # x++ / x--: la tupla lee la variable antes de modificarla
+            return f'({name}, {code})[0]' if post else code
+        if isinstance(target, ArrayAccess):
+            return (f'_incr_item({self.node(n)}, {self._expr(target.array)}, '
+                    f'{self._expr(target.pos)}, {delta}, {post})')
+        return f'_fail({repr(message)}, _runtime=True)'
+
+    def visit(self, n: PreInc):
+        return self._incr(n, 1, "Operando para '++' debe ser un l-value (variable o acceso a array)")
+
+    def visit(self, n: PreDec):
+        return self._incr(n, -1, "Operando para '--' debe ser un l-value")
+
+    def visit(self, n: Call):
+        func = self._expr(n.func)
+        args = ', '.join(self._expr(arg) for arg in n.args)
+        # Una llamada que se puede ejecutar durante la inicialización de
+        # los globales (resolve.py) se verifica: la función puede
+        # declararse más abajo y su variable seguir en None
+        if isinstance(n.func, Identifier) and n.func.scope == GLOBAL \
+                and not getattr(n, 'early', False):
+            decl = self.gtypes.get(n.func.slot)
+            if isinstance(decl, FuncDecl) and len(decl.params) == len(n.args):
+                return f'{func}({args})'
+            builtin = self.builtins.get(n.func.name)
+            if decl is None and builtin is not None and builtin.arity in (-1, len(n.args)):
+                return f'{func}({args})'
+        # Llamada dinámica: mismas verificaciones que el intérprete
+        return f'_callee({self.node(n)}, {func})({args})'
+
+    def visit(self, n: ArrayAccess):
+        if isinstance(n.array, ArrayAccess):
+            # a[i][j]...: un solo acceso al buffer (interp.strided_load)
+            root, idxs = index_chain(n)
+            ref = self.node(n)
+            if len(idxs) == 2:
+                # Matriz: el desplazamiento en línea, con temporales propios
+                # del sitio (los índices pueden tener otros accesos adentro)
+                k = len(self.nodes) - 1
+                a, d, i, j = f'_a{k}', f'_d{k}', f'_i{k}', f'_j{k}'
+                quiet = is_quiet(root) and all(is_quiet(idx) for idx in idxs)
+                root, i0, i1 = self._expr(root), self._expr(idxs[0]), self._expr(idxs[1])
+                if quiet:
+                    # Sin efectos: el camino lento las vuelve a evaluar
+                    return (f'({a}.data[{a}.offset + {i} * {d}[1] + {j}] '
+                            f'if ({a} := {root}).__class__ is _Strided and len({d} := {a}.dims) == 2 '
+                            f'and 0 <= ({i} := {i0}) < {d}[0] and 0 <= ({j} := {i1}) < {d}[1] '
+                            f'else _strided({ref}, {root}, [{i0}, {i1}]))')
+                return (f'({a}.data[{a}.offset + {i} * {d}[1] + {j}] '
+                        f'if (({a} := {root}), ({i} := {i0}), ({j} := {i1})) '
+                        f'and {a}.__class__ is _Strided '
+                        f'and len({d} := {a}.dims) == 2 and 0 <= {i} < {d}[0] and 0 <= {j} < {d}[1] '
+                        f'else _strided({ref}, {a}, [{i}, {j}]))')
+            return (f'_strided({ref}, {self._expr(root)}, '
+                    f'[{", ".join(self._expr(idx) for idx in idxs)}])')
+        arr = self._expr(n.array)
+        idx = self._expr(n.pos)
+        if self._bit(n) and is_quiet(n.pos):
+            # El bit en línea; el camino lento vuelve a evaluar el índice
+            return (f'({arr}.bits[_i >> 3] >> (_i & 7) & 1 == 1 '
+                    f'if {arr}.__class__ is _BitArray and 0 <= (_i := {idx}) < {arr}.size '
+                    f'else _load({self.node(n)}, {arr}, {idx}))')
+        if getattr(n, 'unchecked', False):
+            # Índice dentro de los límites (bounds.py)
+            return f'{arr}[{idx}]'
+        if isinstance(n.array, Identifier):
+            return (f'({arr}[_i] if 0 <= (_i := {idx}) < len({arr}) '
+                    f'else _load({self.node(n)}, {arr}, _i))')
+        return f'_load({self.node(n)}, {arr}, {idx})'
+
+    def visit(self, n: Identifier):
+        return self._target(n)
+
+    def visit(self, n: Literal):
+        return repr(n.value)
+
+
+# =====================================================================
+# Runtime del código generado
+# =====================================================================
+
+def _fail(*args, _runtime=False):
+    '''Operación que el intérprete no soporta (el último argumento es el mensaje).'''
+    if _runtime:
+        runtime_error(args[-1])
+    raise NotImplementedError(args[-1])
+
+def _bad_store(node, arr, idx):
+    # Sólo se llama cuando el índice no es válido: array_store reporta el error
+    array_store(node, arr, idx, None)
+
+def _setitem(value, arr, idx, node):
+    array_store(node, arr, idx, value)
+    return value
+
+def _setitem_unchecked(value, arr, idx, node):
+    # Índice dentro de los límites (bounds.py)
+    try:
+        arr[idx] = value
+    except (TypeError, OverflowError):
+        array_store(node, arr, idx, value)
+    return value
+
+def _strided_set(value, arr, idxs, node):
+    strided_store(node, arr, idxs, value)
+    return value
+
+def _release(func, *arrays):
+    # Arrays locales que no escapan (escape.py): vuelven a su pool
+    for (_, pool), arr in zip(func.arrays, arrays):
+        if arr is not None:
+            pool.release(arr)
+
+def _incr_value(node, value, delta):
+    check_numeric_operand(node, value)
+    return int_result(value + delta)
+
+def _incr_item(node, arr, idx, delta, post=False):
+    if not isinstance(arr, ARRAYS): runtime_error("Base no es array")
+    if not isinstance(idx, int): runtime_error("Índice no es entero")
+    value = arr[idx]
+    check_numeric_operand(node, value)
+    new = int_result(value + delta)
+    array_store(node.expr, arr, idx, new)
+    return value if post else new
+
+def _arity(func):
+    if hasattr(func, 'arity'):
+        return func.arity
+    code = getattr(func, '__code__', None)
+    return code.co_argcount if code else -1
+
+def _callee(node, func):
+    '''Verifica una llamada dinámica y retorna la función a llamar.'''
+    if not callable(func):
+        runtime_error("Intento de llamar a algo que no es una función " + str(node.func.name))
+    arity = _arity(func)
+    if arity != -1 and len(node.args) != arity:
+        runtime_error(f"Error de aridad: Se esperaban {arity} argumentos, pero se recibieron {len(node.args)}")
+    return func
+
+
+# Programas compilados que se conservan en la caché (se descarta el más antiguo)
+CODE_CACHE_LIMIT = 32
+
+_code_cache = {}
+
+def compile_source(source):
+    '''Compila el código fuente generado, con caché por hash del fuente.'''
+    key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    code = _code_cache.get(key)
+    if code is None:
+        if len(_code_cache) >= CODE_CACHE_LIMIT:
+            del _code_cache[next(iter(_code_cache))]
+        code = _code_cache[key] = compile(source, f'<bminor {key[:12]}>', 'exec')
+    return code
+
+
+class PythonEngine:
+    '''
+    Motor de ejecución con la misma interfaz que Interpreter.
+    '''
+    def __init__(self, options=None):
+        self.options = options or Options()
+        self.builtins = builtin_functions()
+
+    def error(self, node, message):
+        '''Reporta un error en tiempo de ejecución.'''
+        runtime_error(message)
+
+    def transpile(self, node: Program):
+        '''Retorna el código fuente Python del programa y sus nodos.'''
+        Resolver.resolve(node, self.builtins)
+        mark_program(node, self.options)
+        return PythonGenerator.generate(node, self.builtins, self.options.bits)
+
+    def namespace(self, nodes):
+        '''Entorno global del módulo generado.'''
+        ns = {
+            '__name__': '__bminor__',
+            '_n': nodes,
+            '_print': print_value,
+            '_truthy': _is_truthy,
+            '_binop': binary_op,
+            '_unop': unary_op,
+            '_pow': power,
+            '_int': int_result,
+            '_overflow': int_overflow,
+            '_load': array_load,
+            '_new_array': new_array,
+            '_pooled': pooled_array,
+            '_release': _release,
+            '_init_array': init_array,
+            '_bad_store': _bad_store,
+            '_setitem': _setitem,
+            '_setitem_unchecked': _setitem_unchecked,
+            '_Strided': Strided,
+            '_BitArray': BitArray,
+            '_strided': strided_load,
+            '_strided_set': _strided_set,
+            '_incr_value': _incr_value,
+            '_incr_item': _incr_item,
+            '_callee': _callee,
+            '_fail': _fail,
+        }
+        for name, builtin in self.builtins.items():
+            ns[_name(name)] = self._builtin(builtin)
+        return ns
+
+    def _builtin(self, builtin):
+        def call(*args):
+            return builtin(self, *args)
+        call.arity = builtin.arity
+        return call
+
+    def _memoized(self, func, cache):
+        '''Función generada cuyas llamadas pasan por el cache (memo.py).'''
+        memo = Memoized(lambda interp, *args: func(*args), cache)
+        def call(*args):
+            return memo(self, *args)
+        call.arity = func.__code__.co_argcount
+        return call
+
+    def interpret(self, node: Program):
+        try:
+            trap_overflow(self.options.trap)
+            source, nodes = self.transpile(node)
+            ns = self.namespace(nodes)
+            exec(compile_source(source), ns)
+            # Las llamadas (también las recursivas) buscan la función en
+            # los globales del módulo, así que basta con reemplazarla
+            for decl in node.body:
+                if isinstance(decl, FuncDecl) and getattr(decl, 'memo', None) is not None:
+                    ns[_name(decl.name)] = self._memoized(ns[_name(decl.name)], decl.memo)
+
+            main_func = ns.get(_name('main'))
+            if main_func and callable(main_func):
+                arity = _arity(main_func)
+                if arity != 0:
+                    self.error(None, f"La función 'main' debe definirse sin argumentos (esperado 0, pero tiene {arity})")
+                main_func()
+        except BminorExit:
+            pass # Error ya reportado
+        except Exception as e:
+            print(f"[Error Interno del Intérprete] {e}")
+            import traceback
+            traceback.print_exc()
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+    from checker import Check
+
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python3 pygen.py <filename>")
+
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    # Como interp.py: con el checker sin errores el código usa los tipos
+    Check.checker(ast, quiet=True, coerce=False)
+    source, _ = PythonEngine().transpile(ast)
+    sys.stdout.write(source)
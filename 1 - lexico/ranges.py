@@ -0,0 +1,320 @@
+'''
+Análisis de rangos de las operaciones enteras.
+
+'integer' es un entero de 64 bits con signo: los motores reducen a 64
+bits (o, con --overflow=trap, reportan como error) cada resultado de
++ - * / << '-' ++ y -- que se sale del rango (ver interp.int_result).
+Esa verificación sobra cuando se puede demostrar que el resultado
+siempre cabe, y este análisis lo hace con intervalos [lo, hi]:
+
+  - un literal es [v, v] y array_length(a) está en [0, 2^63 - 1],
+  - la variable i de un ciclo
+
+        for (i = s; i < E; i = i + k)       s <= i <= max(E) - 1
+        for (i = s; i >= E; i = i - k)      min(E) <= i <= s
+
+    (también con <=, >, ++i, --i y la variable a la derecha de la
+    comparación) tiene dentro del cuerpo el rango que le dan la
+    condición y el valor inicial, si el cuerpo no la modifica (no la
+    asigna, incrementa ni declara). La condición se acaba de cumplir al
+    entrar al cuerpo, así que la cota que da E vale siempre; la del
+    valor inicial s sólo si el paso k no es negativo y i + k no se
+    puede desbordar (entonces i sólo avanza hacia E),
+  - las demás variables pueden tener cualquier valor,
+  - + - * / << se calculan sobre los extremos de los intervalos, '%'
+    queda dentro del rango del divisor y '&' con un operando no
+    negativo dentro de ese operando.
+
+Una operación cuyo intervalo cabe en 64 bits se marca con
+n.bounded = True y los motores la ejecutan sin verificar el resultado;
+las demás dan un intervalo completo. Así, por ejemplo, el paso de un
+ciclo i < n, los índices i + 1 o i - 1 dentro de él y la mayoría de las
+cuentas con array_length no se verifican.
+
+Necesita los tipos del checker y la resolución de nombres (resolve.py):
+los motores lo aplican, junto con specialize.py, a los programas que
+pasaron el checker.
+
+usage:
+    python3 ranges.py <filename>
+'''
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from resolve import Resolver, LOCAL, GLOBAL
+from astutil import walk, subexpressions, assigned_name, FLIP, for_step
+
+INT_MIN, INT_MAX = -2**63, 2**63 - 1
+FULL = (INT_MIN, INT_MAX)
+
+# Operaciones que se pueden desbordar (y que los motores verifican)
+_CHECKED = ('+', '-', '*', '/', '<<')
+
+
+class RangeStats:
+    def __init__(self):
+        self.operations = 0         # operaciones enteras que se pueden desbordar
+        self.bounded = 0            # las que nunca se desbordan
+        self.loops = 0              # ciclos con la variable acotada en el cuerpo
+
+    @property
+    def total(self):
+        return self.bounded
+
+    def __str__(self):
+        return (f'ranges: {self.bounded} de {self.operations} operaciones enteras sin '
+                f'verificación de desbordamiento ({self.loops} ciclos con la variable acotada)')
+
+
+def _fits(r):
+    return INT_MIN <= r[0] and r[1] <= INT_MAX
+
+
+def _corners(oper, a, b):
+    '''Intervalo de a oper b tomando los extremos (oper monótona en cada operando).'''
+    values = [oper(x, y) for x in a for y in b]
+    return min(values), max(values)
+
+
+def _binary(oper, a, b):
+    '''Intervalo del resultado (sin reducir a 64 bits) de a oper b.'''
+    if oper == '+':
+        return a[0] + b[0], a[1] + b[1]
+    if oper == '-':
+        return a[0] - b[1], a[1] - b[0]
+    if oper == '*':
+        return _corners(lambda x, y: x * y, a, b)
+    if oper == '/':
+        # Por separado los divisores negativos y los positivos (0 es un error)
+        parts = [p for p in ((b[0], min(b[1], -1)), (max(b[0], 1), b[1])) if p[0] <= p[1]]
+        if not parts:
+            return FULL
+        ranges = [_corners(lambda x, y: x // y, a, p) for p in parts]
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+    if oper == '%':
+        # El resto tiene el signo del divisor y es menor que él en valor absoluto
+        lo, hi = min(b[0] + 1, 0), max(b[1] - 1, 0)
+        if a[0] >= 0 and b[0] > 0:
+            hi = min(hi, a[1])
+        return lo, hi
+    if oper == '<<':
+        if b[0] < 0 or b[1] > 63:
+            return None
+        return _corners(lambda x, y: x << y, a, b)
+    if oper == '>>':
+        if b[0] < 0:
+            return FULL
+        return _corners(lambda x, y: x >> y, a, (b[0], min(b[1], 64)))
+    if oper == '&':
+        if a[0] >= 0 and b[0] >= 0:
+            return 0, min(a[1], b[1])
+        if a[0] >= 0 or b[0] >= 0:
+            return 0, a[1] if a[0] >= 0 else b[1]
+    return FULL
+
+
+class IntegerRanges:
+    @classmethod
+    def mark(cls, program: Program, enabled=True):
+        '''
+        Marca 'bounded' en las operaciones enteras del programa (ya
+        verificado y resuelto) que no se pueden desbordar; si 'enabled'
+        es False ninguna queda marcada. Retorna un RangeStats.
+        '''
+        self = cls()
+        self.stats = RangeStats()
+        self.intervals = {}         # id(expresión) -> intervalo
+        self.length = None
+        if 'array_length' in program.globals and all(d.name != 'array_length' for d in program.body):
+            self.length = program.globals.index('array_length')
+        for n in walk(program.body):
+            if isinstance(n, (BinOper, UnaryOper, PreInc, PreDec)):
+                n.bounded = False
+        if not enabled:
+            return self.stats
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                self._block(decl.body or [], {})
+            else:
+                self._stmt(decl, {})
+        return self.stats
+
+    # =====================================================================
+    # Sentencias: 'env' tiene el intervalo de las variables de los
+    # ciclos que contienen a la sentencia (slot local -> intervalo)
+    # =====================================================================
+    def _block(self, stmts, env):
+        for stmt in stmts or []:
+            self._stmt(stmt, env)
+
+    def _stmt(self, n, env):
+        if isinstance(n, ForStmt):
+            self._loop(n, env)
+        elif isinstance(n, IfStmt):
+            self._expr(n.cond, env)
+            self._block(n.then_branch, env)
+            self._block(n.else_branch, env)
+        elif isinstance(n, WhileStmt):
+            self._expr(n.cond, env)
+            self._block(n.body, env)
+        elif isinstance(n, DoWhileStmt):
+            self._block(n.body if isinstance(n.body, list) else [n.body], env)
+            self._expr(n.cond, env)
+        elif isinstance(n, Block):
+            self._block(n.body, env)
+        elif isinstance(n, (PrintStmt, ExprStmt, ReturnStmt)):
+            self._expr(n.expr, env)
+        elif isinstance(n, VarDeclInit):
+            for e in n.init if isinstance(n.init, list) else [n.init]:
+                self._expr(e, env)
+        elif isinstance(n, VarDecl):
+            typ = n.type
+            while isinstance(typ, ArrayType):
+                self._expr(typ.size, env)
+                typ = typ.elem_type
+        else:
+            # Una expresión como sentencia (a = b, ++i, f(x))
+            self._expr(n, env)
+
+    def _loop(self, n, env):
+        self._expr(n.init, env)
+        self._expr(n.cond, env)
+        counter = self._counter(n, env)
+        if counter is None:
+            self._block(n.body, env)
+            self._expr(n.step, env)
+            return
+        slot, body, step = counter
+        self.stats.loops += 1
+        self._block(n.body, {**env, slot: body})
+        if step is not None:
+            # El paso no se desborda: i + k con i dentro del rango del cuerpo
+            self._bound(n.step if isinstance(n.step, (PreInc, PreDec)) else n.step.right, step)
+        self._expr(n.step, env)
+
+    def _counter(self, n, env):
+        '''
+        (slot, intervalo de i en el cuerpo, intervalo de i + k o None si
+        el paso se puede desbordar) de un ciclo sobre una variable local
+        entera i, o None.
+        '''
+        step = for_step(n.step) if n.step is not None else None
+        if step is None:
+            return None
+        var, inc, sign = step
+        if var.scope != LOCAL or getattr(var, 'type', None) != 'integer':
+            return None
+        cond = n.cond
+        if not isinstance(cond, BinOper) or cond.oper not in FLIP:
+            return None
+        if isinstance(cond.left, Identifier) and cond.left.scope == LOCAL and cond.left.slot == var.slot:
+            oper, bound = cond.oper, cond.right
+        elif isinstance(cond.right, Identifier) and cond.right.scope == LOCAL and cond.right.slot == var.slot:
+            oper, bound = FLIP[cond.oper], cond.left
+        else:
+            return None
+        if getattr(bound, 'type', None) != 'integer' or getattr(inc, 'type', None) != 'integer':
+            return None
+        # El cuerpo no modifica i
+        for node in walk(n.body):
+            if assigned_name(node) == var.name:
+                return None
+            if isinstance(node, (VarDecl, VarDeclInit)) and (node.name == var.name or node.slot == var.slot):
+                return None
+
+        e = self._expr(bound, env)
+        k = self._expr(inc, env)
+        k = k if sign > 0 else (-k[1], -k[0])
+        start = FULL
+        init = n.init
+        if isinstance(init, Assign) and isinstance(init.left, Identifier) \
+                and init.left.scope == LOCAL and init.left.slot == var.slot:
+            start = self.intervals.get(id(init.right), FULL)
+
+        if oper in ('<', '<='):
+            hi = e[1] - 1 if oper == '<' else e[1]
+            step = (INT_MIN, hi + k[1])
+            if k[0] < 0 or not _fits(step):
+                return var.slot, (INT_MIN, hi), None
+            return var.slot, (start[0], hi), (start[0] + k[0], hi + k[1])
+        lo = e[0] + 1 if oper == '>' else e[0]
+        step = (lo + k[0], INT_MAX)
+        if k[1] > 0 or not _fits(step):
+            return var.slot, (lo, INT_MAX), None
+        return var.slot, (lo, start[1]), (lo + k[0], start[1] + k[1])
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def _expr(self, n, env):
+        '''Intervalo de la expresión n (FULL si no es entera); marca las operaciones acotadas.'''
+        if n is None:
+            return FULL
+        if id(n) in self.intervals:
+            return self.intervals[id(n)]
+        kids = [self._expr(c, env) for c in subexpressions(n)]
+        r = FULL
+        if getattr(n, 'type', None) != 'integer':
+            pass
+        elif isinstance(n, Integer) and n.value.__class__ is int:
+            r = (n.value, n.value)
+        elif isinstance(n, Identifier):
+            if n.scope == LOCAL:
+                r = env.get(n.slot, FULL)
+        elif isinstance(n, BinOper) and n.right is not None:
+            r = _binary(n.oper, *kids)
+            if n.oper in _CHECKED:
+                r = self._bound(n, r)
+        elif isinstance(n, UnaryOper) and n.oper == '-':
+            r = self._bound(n, (-kids[0][1], -kids[0][0]))
+        elif isinstance(n, (PreInc, PreDec)):
+            d = 1 if isinstance(n, PreInc) else -1
+            r = self._bound(n, (kids[0][0] + d, kids[0][1] + d))
+            if isinstance(n, (PostInc, PostDec)):
+                r = kids[0]         # x++ y x-- valen el valor anterior
+        elif isinstance(n, Assign):
+            r = kids[1]
+        elif isinstance(n, Call) and isinstance(n.func, Identifier) and n.func.scope == GLOBAL \
+                and n.func.slot == self.length:
+            r = (0, INT_MAX)
+        self.intervals[id(n)] = r
+        return r
+
+    def _bound(self, n, r):
+        '''Marca la operación n si su intervalo r cabe en 64 bits; retorna su intervalo.'''
+        if id(n) in self.intervals:
+            return self.intervals[id(n)]
+        self.stats.operations += 1
+        if r is None or not _fits(r):
+            r = FULL
+        else:
+            n.bounded = True
+            self.stats.bounded += 1
+        self.intervals[id(n)] = r
+        return r
+
+
+def mark(program: Program):
+    '''
+    Verifica el programa, resuelve sus nombres y marca sus operaciones
+    enteras acotadas. Retorna un RangeStats (o None si el checker
+    reportó errores).
+    '''
+    from interp import builtin_functions
+    Check.checker(program)
+    if errors_detected():
+        return None
+    Resolver.resolve(program, builtin_functions())
+    return IntegerRanges.mark(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 ranges.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = mark(ast)
+    if stats is not None:
+        print(stats)
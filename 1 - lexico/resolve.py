@@ -0,0 +1,228 @@
+'''
+Resolución de nombres a slots.
+
+Antes de ejecutar un programa se recorre el AST una sola vez y cada
+nombre se convierte en una dirección fija:
+
+  - Los nombres globales (variables, funciones y built-ins) reciben
+    un slot en el frame global.
+  - Dentro de cada FuncDecl, los parámetros reciben los slots
+    0..k-1 y las variables locales los siguientes.
+
+Los resultados se anotan directamente en los nodos:
+
+  Identifier, VarDecl, VarDeclInit  -> .scope ('local' | 'global') y .slot
+  Param                             -> .slot
+  FuncDecl                          -> .slot (global), .nslots, .locals
+  Program                           -> .globals (nombres en orden de slot)
+  Call                              -> .early
+
+Una llamada con .early puede ejecutarse mientras se inicializan los
+globales: está en un inicializador o en una función que se llama
+(directa o indirectamente) desde uno. Si la función llamada se declara
+más abajo, su slot todavía está vacío; los motores que enlazan las
+llamadas al compilar verifican esas llamadas en ejecución, igual que el
+intérprete.
+
+Igual que el intérprete original, todas las variables de una función
+comparten un único alcance (los bloques no abren uno nuevo) y un nombre
+no declarado dentro de una función se convierte en una variable local.
+'''
+from model  import *
+from symtab import Symtab
+
+LOCAL  = 'local'
+GLOBAL = 'global'
+
+
+class Resolver(Visitor):
+
+    @classmethod
+    def resolve(cls, n: Program, builtins=()):
+        '''
+        Resuelve todo el programa y devuelve la tabla de símbolos
+        global (nombre -> slot).
+        '''
+        resolver = cls()
+        resolver.calls = {}     # función (None: globales) -> llamadas en su código
+        env = Symtab('global')
+        for name in builtins:
+            resolver._declare(name, env)
+
+        # Declarar primero todos los nombres globales para que las
+        # funciones puedan usar globales y funciones definidas después
+        for decl in n.body:
+            decl.scope = GLOBAL
+            decl.slot = resolver._declare(decl.name, env)
+
+        for decl in n.body:
+            decl.accept(resolver, env)
+
+        n.globals = list(env.entries)
+        resolver._mark_early(n)
+        return env
+
+    def _mark_early(self, n: Program):
+        '''
+        Marca .early en las llamadas que se pueden ejecutar durante la
+        inicialización de los globales.
+        '''
+        funcs = {decl.name for decl in n.body if isinstance(decl, FuncDecl)}
+        for calls in self.calls.values():
+            for call in calls:
+                call.early = False
+        work, seen = [None], set()
+        while work:
+            owner = work.pop()
+            for call in self.calls.get(owner, ()):
+                call.early = True
+                name = call.func.name
+                if call.func.scope == GLOBAL and name in funcs and name not in seen:
+                    seen.add(name)
+                    work.append(name)
+
+    def _declare(self, name, env: Symtab):
+        if name not in env.entries:
+            env.add(name, len(env.entries))
+        return env.entries[name]
+
+    def _bind(self, n, env: Symtab):
+        '''
+        Anota en el nodo el alcance y el slot del nombre n.name.
+        '''
+        if n.name in env.entries:
+            n.scope = GLOBAL if env.name == 'global' else LOCAL
+            n.slot = env.entries[n.name]
+        elif env.parent and n.name in env.parent.entries:
+            n.scope = GLOBAL
+            n.slot = env.parent.entries[n.name]
+        else:
+            n.scope = GLOBAL if env.name == 'global' else LOCAL
+            n.slot = self._declare(n.name, env)
+
+    # =====================================================================
+    # Declaraciones
+    # =====================================================================
+    def visit(self, n: FuncDecl, env: Symtab):
+        func_env = Symtab(n.name, env)
+        for parm in n.params:
+            parm.accept(self, func_env)
+        for stmt in n.body:
+            stmt.accept(self, func_env)
+        n.nslots = len(func_env.entries)
+        n.locals = list(func_env.entries)
+
+    def visit(self, n: Param, env: Symtab):
+        n.slot = self._declare(n.name, env)
+
+    def visit(self, n: VarDecl, env: Symtab):
+        n.type.accept(self, env)
+        n.scope = GLOBAL if env.name == 'global' else LOCAL
+        n.slot = self._declare(n.name, env)
+
+    def visit(self, n: VarDeclInit, env: Symtab):
+        n.type.accept(self, env)
+        if isinstance(n.init, list):
+            for item in n.init:
+                item.accept(self, env)
+        elif n.init:
+            n.init.accept(self, env)
+        n.scope = GLOBAL if env.name == 'global' else LOCAL
+        n.slot = self._declare(n.name, env)
+
+    def visit(self, n: SimpleType, env: Symtab):
+        pass
+
+    def visit(self, n: ArrayType, env: Symtab):
+        if n.size:
+            n.size.accept(self, env)
+        n.elem_type.accept(self, env)
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def visit(self, n: Block, env: Symtab):
+        for stmt in n.body:
+            stmt.accept(self, env)
+
+    def visit(self, n: IfStmt, env: Symtab):
+        n.cond.accept(self, env)
+        for stmt in n.then_branch:
+            stmt.accept(self, env)
+        if n.else_branch:
+            for stmt in n.else_branch:
+                stmt.accept(self, env)
+
+    def visit(self, n: IfCond, env: Symtab):
+        n.cond.accept(self, env)
+
+    def visit(self, n: WhileStmt, env: Symtab):
+        n.cond.accept(self, env)
+        for stmt in n.body:
+            stmt.accept(self, env)
+
+    def visit(self, n: DoWhileStmt, env: Symtab):
+        n.body.accept(self, env)
+        n.cond.accept(self, env)
+
+    def visit(self, n: ForStmt, env: Symtab):
+        if n.init:
+            n.init.accept(self, env)
+        if n.cond:
+            n.cond.accept(self, env)
+        if n.step:
+            n.step.accept(self, env)
+        for stmt in n.body:
+            stmt.accept(self, env)
+
+    def visit(self, n: ReturnStmt, env: Symtab):
+        if n.expr:
+            n.expr.accept(self, env)
+
+    def visit(self, n: ExprStmt, env: Symtab):
+        n.expr.accept(self, env)
+
+    def visit(self, n: PrintStmt, env: Symtab):
+        if n.expr:
+            n.expr.accept(self, env)
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: BinOper, env: Symtab):
+        n.left.accept(self, env)
+        if n.right is not None:
+            n.right.accept(self, env)
+
+    def visit(self, n: LogicalOpExpr, env: Symtab):
+        n.left.accept(self, env)
+        n.right.accept(self, env)
+
+    def visit(self, n: UnaryOper, env: Symtab):
+        n.expr.accept(self, env)
+
+    def visit(self, n: Assign, env: Symtab):
+        n.right.accept(self, env)
+        n.left.accept(self, env)
+
+    def visit(self, n: PreInc, env: Symtab):
+        n.expr.accept(self, env)
+
+    def visit(self, n: PreDec, env: Symtab):
+        n.expr.accept(self, env)
+
+    def visit(self, n: Call, env: Symtab):
+        self.calls.setdefault(None if env.name == 'global' else env.name, []).append(n)
+        n.func.accept(self, env)
+        for arg in n.args:
+            arg.accept(self, env)
+
+    def visit(self, n: ArrayAccess, env: Symtab):
+        n.array.accept(self, env)
+        n.pos.accept(self, env)
+
+    def visit(self, n: Identifier, env: Symtab):
+        self._bind(n, env)
+
+    def visit(self, n: Literal, env: Symtab):
+        pass
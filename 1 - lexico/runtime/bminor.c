@@ -0,0 +1,365 @@
+/* bminor.c
+ *
+ * Implementación del runtime de B-Minor (ver bminor.h).
+ */
+#include <ctype.h>
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "bminor.h"
+
+/* ===================================================================
+ * Errores
+ * =================================================================== */
+
+void bm_error(const char *message)
+{
+    printf("[Error de Runtime] %s\n", message);
+    fflush(stdout);
+    exit(0);
+}
+
+void bm_internal(const char *message)
+{
+    printf("[Error Interno del Intérprete] %s\n", message);
+    fflush(stdout);
+    exit(0);
+}
+
+void bm_load_range(bm_int idx, bm_int len)
+{
+    char message[96];
+    snprintf(message, sizeof message, "Índice de array fuera de límites (%lld para tamaño %lld)",
+             (long long)idx, (long long)len);
+    bm_error(message);
+}
+
+void bm_store_range(bm_int idx)
+{
+    char message[64];
+    snprintf(message, sizeof message, "Índice de array fuera de límites (%lld)", (long long)idx);
+    bm_error(message);
+}
+
+void bm_store_base(const char *lineno)
+{
+    char message[96];
+    snprintf(message, sizeof message, "Base de acceso a array no es un array %s", lineno);
+    bm_error(message);
+}
+
+static void *bm_alloc(size_t size)
+{
+    void *p = malloc(size ? size : 1);
+    if (p == NULL)
+        bm_internal("Memoria insuficiente");
+    return p;
+}
+
+/* ===================================================================
+ * Arrays
+ * =================================================================== */
+
+bm_array *bm_new_array(bm_int size, int elemsize, const char *name)
+{
+    bm_array *a;
+    if (size < 0) {
+        char message[128];
+        snprintf(message, sizeof message, "Tamaño del array '%s' no puede ser negativo (%lld)",
+                 name, (long long)size);
+        bm_error(message);
+    }
+    a = bm_alloc(sizeof *a);
+    a->len = size;
+    a->data = calloc(size ? (size_t)size : 1, (size_t)elemsize);
+    if (a->data == NULL)
+        bm_internal("Memoria insuficiente");
+    return a;
+}
+
+bm_array *bm_new_string_array(bm_int size, const char *name)
+{
+    bm_array *a = bm_new_array(size, sizeof(bm_string), name);
+    bm_int i;
+    for (i = 0; i < size; i++)
+        ((bm_string *)a->data)[i] = "";
+    return a;
+}
+
+bm_array *bm_array_from(bm_int size, int elemsize, const void *items)
+{
+    bm_array *a = bm_new_array(size, elemsize, "");
+    memcpy(a->data, items, (size_t)size * (size_t)elemsize);
+    return a;
+}
+
+bm_int bm_array_length(const bm_array *a)
+{
+    if (a == NULL)
+        bm_error("Error en built-in 'builtin_array_length': object of type 'NoneType' has no len()");
+    return a->len;
+}
+
+/* ===================================================================
+ * print
+ * =================================================================== */
+
+void bm_print_int(bm_int value)
+{
+    printf("%lld", (long long)value);
+}
+
+/* Igual que repr() de Python: el menor número de dígitos que
+ * reconstruye el mismo double, en notación científica si el exponente
+ * es menor que -4 o mayor o igual que 16. */
+void bm_print_float(bm_float value)
+{
+    char buf[40], digits[24];
+    int prec, exp, ndigits, i;
+    char *p;
+
+    if (isnan(value)) {
+        fputs("nan", stdout);
+        return;
+    }
+    if (isinf(value)) {
+        fputs(value < 0 ? "-inf" : "inf", stdout);
+        return;
+    }
+    for (prec = 0; prec < 17; prec++) {
+        snprintf(buf, sizeof buf, "%.*e", prec, value);
+        if (strtod(buf, NULL) == value)
+            break;
+    }
+
+    /* buf = [-]d.ddde[+-]xx */
+    p = buf;
+    if (*p == '-') {
+        putchar('-');
+        p++;
+    }
+    ndigits = 0;
+    for (; *p != 'e'; p++)
+        if (*p != '.')
+            digits[ndigits++] = *p;
+    exp = atoi(p + 1);
+    while (ndigits > 1 && digits[ndigits - 1] == '0')
+        ndigits--;
+    digits[ndigits] = '\0';
+
+    if (exp < -4 || exp >= 16) {
+        putchar(digits[0]);
+        if (ndigits > 1)
+            printf(".%s", digits + 1);
+        printf("e%c%02d", exp < 0 ? '-' : '+', exp < 0 ? -exp : exp);
+    } else if (exp < 0) {
+        fputs("0.", stdout);
+        for (i = -1; i > exp; i--)
+            putchar('0');
+        fputs(digits, stdout);
+    } else {
+        for (i = 0; i <= exp; i++)
+            putchar(i < ndigits ? digits[i] : '0');
+        putchar('.');
+        if (ndigits > exp + 1)
+            fputs(digits + exp + 1, stdout);
+        else
+            putchar('0');
+    }
+}
+
+void bm_print_bool(bm_bool value)
+{
+    fputs(value ? "True" : "False", stdout);
+}
+
+void bm_print_char(bm_char c)
+{
+    uint32_t u = (uint32_t)c;
+    if (u < 0x80) {
+        putchar(u);
+    } else if (u < 0x800) {
+        putchar(0xC0 | (u >> 6));
+        putchar(0x80 | (u & 0x3F));
+    } else if (u < 0x10000) {
+        putchar(0xE0 | (u >> 12));
+        putchar(0x80 | ((u >> 6) & 0x3F));
+        putchar(0x80 | (u & 0x3F));
+    } else {
+        putchar(0xF0 | (u >> 18));
+        putchar(0x80 | ((u >> 12) & 0x3F));
+        putchar(0x80 | ((u >> 6) & 0x3F));
+        putchar(0x80 | (u & 0x3F));
+    }
+}
+
+/* Las secuencias '\n' y '\t' escritas literalmente en el string se
+ * imprimen como salto de línea y tabulador. */
+void bm_print_string(bm_string s)
+{
+    for (; *s; s++) {
+        if (s[0] == '\\' && s[1] == 'n') {
+            putchar('\n');
+            s++;
+        } else if (s[0] == '\\' && s[1] == 't') {
+            putchar('\t');
+            s++;
+        } else {
+            putchar(*s);
+        }
+    }
+}
+
+/* ===================================================================
+ * Strings y aritmética
+ * =================================================================== */
+
+bm_string bm_concat(bm_string a, bm_string b)
+{
+    size_t la = strlen(a), lb = strlen(b);
+    char *s = bm_alloc(la + lb + 1);
+    memcpy(s, a, la);
+    memcpy(s + la, b, lb + 1);
+    return s;
+}
+
+bm_bool bm_streq(bm_string a, bm_string b)
+{
+    return strcmp(a, b) == 0;
+}
+
+/* Resto con el signo del divisor, como el operador % de Python */
+bm_float bm_fmod(bm_float a, bm_float b)
+{
+    bm_float r;
+    if (b == 0)
+        bm_error("Módulo por cero");
+    r = fmod(a, b);
+    if (r != 0) {
+        if ((r < 0) != (b < 0))
+            r += b;
+    } else {
+        r = copysign(0.0, b);
+    }
+    return r;
+}
+
+/* Los productos se hacen sin signo: el resultado se reduce a 64 bits en
+ * cada paso, igual que interp.ipow */
+bm_int bm_ipow(bm_int base, bm_int exp)
+{
+    uint64_t b = (uint64_t)base, result = 1;
+    if (exp < 0)
+        bm_error("Exponente negativo en una potencia entera");
+    while (exp) {
+        if (exp & 1)
+            result *= b;
+        exp >>= 1;
+        if (exp)
+            b *= b;
+    }
+    return (bm_int)result;
+}
+
+/* La misma secuencia de productos que interp.fpow */
+bm_float bm_fpow(bm_float base, bm_int exp)
+{
+    uint64_t n = exp < 0 ? 0 - (uint64_t)exp : (uint64_t)exp;
+    bm_float result = 1.0;
+    while (n) {
+        if (n & 1)
+            result *= base;
+        n >>= 1;
+        if (n)
+            base *= base;
+    }
+    if (exp < 0) {
+        if (result == 0)
+            bm_error("División por cero");
+        return 1.0 / result;
+    }
+    return result;
+}
+
+/* ===================================================================
+ * Built-ins (read_int, read_float, read_string)
+ * =================================================================== */
+
+/* Lee una línea de la entrada estándar sin el '\n' final, como input() */
+static char *bm_input(const char *builtin)
+{
+    size_t cap = 64, len = 0;
+    char *line;
+    int c;
+
+    fflush(stdout);
+    c = getchar();
+    if (c == EOF) {
+        char message[96];
+        snprintf(message, sizeof message, "Error en built-in '%s': EOF when reading a line", builtin);
+        bm_error(message);
+    }
+    line = bm_alloc(cap);
+    while (c != EOF && c != '\n') {
+        if (len + 1 == cap)
+            line = realloc(line, cap *= 2);
+        line[len++] = (char)c;
+        c = getchar();
+    }
+    line[len] = '\0';
+    return line;
+}
+
+/* Quita los espacios al inicio y al final (como str.strip) */
+static char *bm_strip(char *s)
+{
+    char *end;
+    while (isspace((unsigned char)*s))
+        s++;
+    end = s + strlen(s);
+    while (end > s && isspace((unsigned char)end[-1]))
+        *--end = '\0';
+    return s;
+}
+
+bm_int bm_read_int(void)
+{
+    char *line = bm_input("builtin_read_int");
+    char *s = bm_strip(line), *p = s;
+    bm_int value = 0;
+
+    /* int() de Python: signo opcional y sólo dígitos; si no, 0 */
+    if (*p == '+' || *p == '-')
+        p++;
+    if (isdigit((unsigned char)*p)) {
+        while (isdigit((unsigned char)*p))
+            p++;
+        if (*p == '\0')
+            value = strtoll(s, NULL, 10);
+    }
+    free(line);
+    return value;
+}
+
+bm_float bm_read_float(void)
+{
+    char *line = bm_input("builtin_read_float");
+    char *s = bm_strip(line), *end;
+    bm_float value = 0.0;
+
+    /* float() de Python no acepta la notación hexadecimal de strtod */
+    if (*s != '\0' && strpbrk(s, "xX") == NULL) {
+        value = strtod(s, &end);
+        if (*end != '\0')
+            value = 0.0;
+    }
+    free(line);
+    return value;
+}
+
+bm_string bm_read_string(void)
+{
+    return bm_input("builtin_read_string");
+}
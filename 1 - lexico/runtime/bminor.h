@@ -0,0 +1,147 @@
+/* bminor.h
+ *
+ * Runtime de B-Minor para el código C generado por cgen.py.
+ *
+ * Los tipos de B-Minor se representan así:
+ *
+ *     integer  -> bm_int    (int64_t)
+ *     float    -> bm_float  (double)
+ *     boolean  -> bm_bool   (bool)
+ *     char     -> bm_char   (código Unicode del carácter)
+ *     string   -> bm_string (const char *, UTF-8)
+ *     array    -> bm_array *
+ *
+ * Los arrays se pasan por referencia, igual que las listas del
+ * intérprete. Las operaciones y los mensajes de error son los mismos
+ * que los del intérprete (interp.py): los errores se escriben en la
+ * salida estándar y el programa termina con código 0.
+ *
+ * Este archivo sólo incluye stdint.h y stdbool.h para que los
+ * prototipos de funciones externas del programa (por ejemplo
+ * 'puts: function void (s: string);') no choquen con los de libc.
+ */
+#ifndef BMINOR_H
+#define BMINOR_H
+
+#include <stdint.h>
+#include <stdbool.h>
+
+typedef int64_t     bm_int;
+typedef double      bm_float;
+typedef bool        bm_bool;
+typedef int32_t     bm_char;
+typedef const char *bm_string;
+
+typedef struct bm_array {
+    int64_t len;
+    void   *data;
+} bm_array;
+
+/* Errores: escriben el mensaje y terminan el programa */
+void bm_error(const char *message);
+void bm_internal(const char *message);
+void bm_load_range(bm_int idx, bm_int len);
+void bm_store_range(bm_int idx);
+void bm_store_base(const char *lineno);
+
+/* Arrays */
+bm_array *bm_new_array(bm_int size, int elemsize, const char *name);
+bm_array *bm_new_string_array(bm_int size, const char *name);
+bm_array *bm_array_from(bm_int size, int elemsize, const void *items);
+bm_int    bm_array_length(const bm_array *a);
+
+/* print */
+void bm_print_int(bm_int value);
+void bm_print_float(bm_float value);
+void bm_print_bool(bm_bool value);
+void bm_print_char(bm_char value);
+void bm_print_string(bm_string value);
+
+/* Strings */
+bm_string bm_concat(bm_string a, bm_string b);
+bm_bool   bm_streq(bm_string a, bm_string b);
+
+/* Built-ins */
+bm_int    bm_read_int(void);
+bm_float  bm_read_float(void);
+bm_string bm_read_string(void);
+
+/* Verificación de límites de a[i]: retorna i */
+static inline bm_int bm_load_index(const bm_array *a, bm_int i)
+{
+    if (a == 0)
+        bm_error("Base de acceso a array no es un array");
+    if (i < 0 || i >= a->len)
+        bm_load_range(i, a->len);
+    return i;
+}
+
+static inline bm_int bm_store_index(const bm_array *a, bm_int i, const char *lineno)
+{
+    if (a == 0)
+        bm_store_base(lineno);
+    if (i < 0 || i >= a->len)
+        bm_store_range(i);
+    return i;
+}
+
+/* ++a[i] y --a[i] no verifican límites en el intérprete: los índices
+ * negativos cuentan desde el final, como en las listas de Python. */
+static inline bm_int bm_incr_index(const bm_array *a, bm_int i)
+{
+    if (a == 0)
+        bm_error("Base no es array");
+    if (i < 0)
+        i += a->len;
+    if (i < 0 || i >= a->len)
+        bm_internal("list index out of range");
+    return i;
+}
+
+#define BM_LOAD(T, a, i)      (((T *)(a)->data)[bm_load_index((a), (i))])
+#define BM_STORE(T, a, i, ln) (((T *)(a)->data)[bm_store_index((a), (i), (ln))])
+#define BM_INCR(T, a, i)      (((T *)(a)->data)[bm_incr_index((a), (i))])
+
+/* División y módulo con la semántica del intérprete (Python): la
+ * división entera redondea hacia abajo y el resto tiene el signo del
+ * divisor. */
+static inline bm_int bm_idiv(bm_int a, bm_int b)
+{
+    bm_int q;
+    if (b == 0)
+        bm_error("División por cero");
+    if (b == -1)
+        return (bm_int)(0 - (uint64_t)a);
+    q = a / b;
+    if ((a % b != 0) && ((a < 0) != (b < 0)))
+        q--;
+    return q;
+}
+
+static inline bm_int bm_imod(bm_int a, bm_int b)
+{
+    bm_int r;
+    if (b == 0)
+        bm_error("Módulo por cero");
+    if (b == -1)
+        return 0;
+    r = a % b;
+    if (r != 0 && ((r < 0) != (b < 0)))
+        r += b;
+    return r;
+}
+
+static inline bm_float bm_fdiv(bm_float a, bm_float b)
+{
+    if (b == 0)
+        bm_error("División por cero");
+    return a / b;
+}
+
+bm_float bm_fmod(bm_float a, bm_float b);
+
+/* Potencia por cuadrados sucesivos (operador '^'); el exponente es entero */
+bm_int bm_ipow(bm_int base, bm_int exp);
+bm_float bm_fpow(bm_float base, bm_int exp);
+
+#endif
@@ -0,0 +1,209 @@
+'''
+Especialización de operadores según los tipos del checker.
+
+En un programa verificado sin errores, los tipos de los operandos de
+cada operación ya se conocen (typesys.check_binop los aceptó), así que
+en ejecución no hace falta volver a preguntar por ellos. Esta pasada
+asocia a cada BinOper, UnaryOper y LogicalOpExpr la implementación para
+sus tipos en el atributo 'impl':
+
+  - BinOper:       impl(left, right) -> valor
+  - UnaryOper:     impl(value) -> valor
+  - LogicalOpExpr: impl(left) -> True si 'left' ya es el resultado
+                   (cortocircuito) y el operando derecho no se evalúa
+
+Casi todas son funciones del módulo operator (int+int, float<float,
+...); la división y el módulo conservan la verificación del divisor y
+sus mensajes, y '^' usa interp.power. Las operaciones enteras que se
+pueden salir de 64 bits (+ - * / << y '-' unario) usan una versión que
+reduce el resultado con interp.int_overflow, salvo las que ranges.py
+marcó con n.bounded. Las operaciones que el intérprete rechaza en
+ejecución (por ejemplo '<' entre chars) quedan con impl None y van por
+el camino genérico de interp.py, de modo que la salida no cambia.
+
+Los motores tree y closure la aplican por defecto a los programas que
+pasaron el checker (Program.checked).
+
+usage:
+    python3 specialize.py <filename>
+'''
+import operator
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from interp  import runtime_error, power, int_overflow, INT_MIN, INT_MAX
+from astutil import walk
+
+_NUMERIC = ('integer', 'float')
+
+
+def _idiv(left, right):
+    if right == 0:
+        runtime_error("División por cero")
+    return left // right
+
+def _fdiv(left, right):
+    if right == 0:
+        runtime_error("División por cero")
+    return left / right
+
+def _mod(left, right):
+    if right == 0:
+        runtime_error("Módulo por cero")
+    return left % right
+
+
+# Versiones que verifican el rango de 64 bits del resultado
+def _add64(left, right):
+    value = left + right
+    if INT_MIN <= value <= INT_MAX:
+        return value
+    return int_overflow(value)
+
+def _sub64(left, right):
+    value = left - right
+    if INT_MIN <= value <= INT_MAX:
+        return value
+    return int_overflow(value)
+
+def _mul64(left, right):
+    value = left * right
+    if INT_MIN <= value <= INT_MAX:
+        return value
+    return int_overflow(value)
+
+def _div64(left, right):
+    if right == 0:
+        runtime_error("División por cero")
+    value = left // right
+    if value <= INT_MAX:
+        return value
+    return int_overflow(value)      # INT_MIN / -1
+
+def _shl64(left, right):
+    value = left << right
+    if INT_MIN <= value <= INT_MAX:
+        return value
+    return int_overflow(value)
+
+def _neg64(value):
+    if value != INT_MIN:
+        return -value
+    return int_overflow(-value)
+
+
+def _binary_table():
+    table = {}
+    arith = {'+': operator.add, '-': operator.sub, '*': operator.mul, '%': _mod,
+             '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+             '==': operator.eq, '!=': operator.ne}
+    for left in _NUMERIC:
+        for right in _NUMERIC:
+            for oper, impl in arith.items():
+                table[oper, left, right] = impl
+            table['/', left, right] = _idiv if left == right == 'integer' else _fdiv
+    for typ in ('boolean', 'char', 'string'):
+        table['==', typ, typ] = operator.eq
+        table['!=', typ, typ] = operator.ne
+    table['+', 'string', 'string'] = operator.add
+    table['^', 'integer', 'integer'] = power
+    table['^', 'float', 'integer'] = power
+    table['<<', 'integer', 'integer'] = operator.lshift
+    table['>>', 'integer', 'integer'] = operator.rshift
+    table['&', 'integer', 'integer'] = operator.and_
+    return table
+
+# (operador, tipo izquierdo, tipo derecho) -> impl(left, right)
+_BINARY = _binary_table()
+
+# (operador, tipo) -> impl(value)
+_UNARY = {
+    ('-', 'integer'): operator.neg,
+    ('-', 'float'):   operator.neg,
+    ('!', 'boolean'): operator.not_,
+}
+
+# impl -> versión para las operaciones enteras que no están acotadas
+_CHECKED = {
+    operator.add: _add64,
+    operator.sub: _sub64,
+    operator.mul: _mul64,
+    _idiv: _div64,
+    operator.lshift: _shl64,
+    operator.neg: _neg64,
+}
+
+# (operador, tipo izquierdo, tipo derecho) -> impl(left): con booleanos,
+# '&&' termina si 'left' es falso y '||' si es verdadero
+_LOGICAL = {
+    ('&&', 'boolean', 'boolean'): operator.not_,
+    ('||', 'boolean', 'boolean'): operator.truth,
+}
+
+
+class SpecializeStats:
+    def __init__(self):
+        self.specialized = 0        # operaciones con una implementación por tipos
+        self.generic = 0            # operaciones que siguen por el camino genérico
+
+    @property
+    def total(self):
+        return self.specialized
+
+    def __str__(self):
+        return (f'specialize: {self.specialized} operaciones especializadas '
+                f'({self.generic} genéricas)')
+
+
+class Specializer:
+    @classmethod
+    def specialize(cls, program: Program):
+        '''
+        Anota 'impl' en cada operación del programa (ya verificado).
+        Retorna un SpecializeStats.
+        '''
+        stats = SpecializeStats()
+        for n in walk(program.body):
+            if isinstance(n, BinOper) and n.right is not None:
+                n.impl = _BINARY.get((n.oper, _type(n.left), _type(n.right)))
+            elif isinstance(n, LogicalOpExpr):
+                n.impl = _LOGICAL.get((n.oper, _type(n.left), _type(n.right)))
+            elif isinstance(n, UnaryOper):
+                n.impl = _UNARY.get((n.oper, _type(n.expr)))
+            else:
+                continue
+            if _type(n) == 'integer' and not getattr(n, 'bounded', False):
+                n.impl = _CHECKED.get(n.impl, n.impl)
+            if n.impl is None:
+                stats.generic += 1
+            else:
+                stats.specialized += 1
+        return stats
+
+
+def _type(n):
+    return getattr(n, 'type', None)
+
+
+def specialize(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, lo especializa.
+    Retorna un SpecializeStats (o None si el checker reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return Specializer.specialize(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 specialize.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    stats = specialize(ast)
+    if stats is not None:
+        print(stats)
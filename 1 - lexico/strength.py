@@ -0,0 +1,196 @@
+'''
+Reducción de fuerza sobre el AST verificado.
+
+Se ejecuta después de Check.checker (necesita los tipos anotados) y
+reemplaza operaciones caras por otras equivalentes más baratas, con la
+misma semántica en todos los motores y back-ends:
+
+  - Potencias con exponente literal: x^0 es 1 (o 1.0), x^1 es x, x^2
+    es x*x y x^3 es (x*x)*x cuando x es una variable (leerla dos veces
+    es lo mismo que leerla una). El resultado es idéntico al de
+    interp.power: los floats se multiplican en el mismo orden.
+
+  - Enteros por potencias de dos: x * 2^k es x << k, x / 2^k es x >> k
+    y x % 2^k es x & (2^k - 1). La división y el módulo de B-Minor
+    redondean hacia abajo, igual que el desplazamiento aritmético y la
+    máscara en complemento a dos, así que también valen para x < 0.
+
+  - Identidades: x*1, 1*x, x+0, 0+x, x-0 y x/1 enteros, x*1.0 y x/1.0
+    son x; x*0 y x%1 enteros son 0; x*2.0 es x+x.
+
+Los operadores '<<', '>>' y '&' no tienen sintaxis en B-Minor: sólo los
+genera esta pasada. Lo que se elimina (x en x*0, x^0) tiene que ser una
+expresión sin efectos que no pueda fallar.
+
+usage:
+    python3 strength.py <filename>
+'''
+from copy import deepcopy
+
+from model   import *
+from checker import Check
+from errors  import errors_detected
+from astutil import is_quiet, CHILD_FIELDS
+
+
+class StrengthStats:
+    def __init__(self):
+        self.powers = 0             # potencias reemplazadas por productos
+        self.shifts = 0             # '*', '/', '%' enteros por desplazamientos y máscaras
+        self.identities = 0         # operaciones neutras eliminadas
+
+    @property
+    def total(self):
+        return self.powers + self.shifts + self.identities
+
+    def __str__(self):
+        return (f'strength: {self.total} operaciones reducidas ({self.powers} potencias, '
+                f'{self.shifts} desplazamientos, {self.identities} identidades)')
+
+
+def _int(n, value=None):
+    '''True si n es un literal entero (con el valor dado).'''
+    return (isinstance(n, Literal) and n.type == 'integer'
+            and not isinstance(n.value, bool) and (value is None or n.value == value))
+
+
+def _float(n, value):
+    return isinstance(n, Literal) and n.type == 'float' and n.value == value
+
+
+def _log2(n):
+    '''k si n es el literal entero 2^k (k >= 1), o None.'''
+    if _int(n) and n.value > 1 and n.value & (n.value - 1) == 0:
+        return n.value.bit_length() - 1
+    return None
+
+
+def _binop(oper, left, right, typ, lineno):
+    n = BinOper(oper, left, right)
+    n.type = typ
+    n.lineno = lineno
+    return n
+
+
+def _const(value, typ, lineno):
+    lit = Integer(value) if typ == 'integer' else Float(value)
+    lit.lineno = lineno
+    return lit
+
+
+class StrengthReducer:
+    @classmethod
+    def reduce(cls, program: Program):
+        '''Reduce las operaciones del programa (ya verificado). Retorna un StrengthStats.'''
+        reducer = cls()
+        reducer.stats = StrengthStats()
+        for decl in program.body:
+            if isinstance(decl, FuncDecl):
+                if not decl.prototype:
+                    decl.body = reducer._rewrite(decl.body)
+            else:
+                reducer._rewrite(decl)
+        return reducer.stats
+
+    def _rewrite(self, n):
+        if isinstance(n, list):
+            return [self._rewrite(e) for e in n]
+        for field in CHILD_FIELDS.get(type(n), ()):
+            child = getattr(n, field)
+            if child is not None:
+                setattr(n, field, self._rewrite(child))
+        if isinstance(n, VarDeclInit):
+            n.value = n.init
+        if isinstance(n, BinOper) and n.right is not None and n.type in ('integer', 'float'):
+            return self._reduce(n)
+        return n
+
+    def _reduce(self, n):
+        '''Expresión equivalente a la operación n, o n si no se reduce.'''
+        a, b, typ = n.left, n.right, n.type
+        line = getattr(n, 'lineno', None)
+        stats = self.stats
+
+        if n.oper == '^':
+            if not _int(b) or not 0 <= b.value <= 3:
+                return n
+            if b.value == 0:
+                if not is_quiet(a):
+                    return n
+                stats.powers += 1
+                return _const(1 if typ == 'integer' else 1.0, typ, line)
+            if b.value == 1:
+                stats.powers += 1
+                return a
+            if not isinstance(a, Identifier):
+                return n
+            stats.powers += 1
+            square = _binop('*', a, deepcopy(a), typ, line)
+            if b.value == 2:
+                return square
+            return _binop('*', square, deepcopy(a), typ, line)
+
+        if typ == 'float':
+            # El operando que queda tiene que ser float (int * 1.0 es un float)
+            if n.oper in ('*', '/') and _float(b, 1.0) and a.type == 'float':
+                stats.identities += 1
+                return a
+            if n.oper == '*' and _float(a, 1.0) and b.type == 'float':
+                stats.identities += 1
+                return b
+            if (n.oper == '*' and _float(b, 2.0) and a.type == 'float'
+                    and isinstance(a, Identifier)):
+                stats.identities += 1
+                return _binop('+', a, deepcopy(a), typ, line)
+            return n
+
+        # Enteros
+        if n.oper in ('*', '+') and _int(a, 1 if n.oper == '*' else 0):
+            stats.identities += 1
+            return b
+        if ((n.oper == '*' and _int(b, 1)) or (n.oper in ('+', '-') and _int(b, 0))
+                or (n.oper == '/' and _int(b, 1))):
+            stats.identities += 1
+            return a
+        if n.oper == '*' and (_int(a, 0) or _int(b, 0)) and is_quiet(a) and is_quiet(b):
+            stats.identities += 1
+            return _const(0, typ, line)
+        if n.oper == '%' and _int(b, 1) and is_quiet(a):
+            stats.identities += 1
+            return _const(0, typ, line)
+        if n.oper == '*':
+            if _log2(b) is not None:
+                stats.shifts += 1
+                return _binop('<<', a, _const(_log2(b), typ, line), typ, line)
+            if _log2(a) is not None:
+                stats.shifts += 1
+                return _binop('<<', b, _const(_log2(a), typ, line), typ, line)
+        elif n.oper == '/' and _log2(b) is not None:
+            stats.shifts += 1
+            return _binop('>>', a, _const(_log2(b), typ, line), typ, line)
+        elif n.oper == '%' and _log2(b) is not None:
+            stats.shifts += 1
+            return _binop('&', a, _const(b.value - 1, typ, line), typ, line)
+        return n
+
+
+def reduce(program: Program):
+    '''
+    Verifica el programa y, si no tiene errores de tipo, reduce la fuerza
+    de sus operaciones. Retorna un StrengthStats (o None si el checker
+    reportó errores).
+    '''
+    Check.checker(program)
+    if errors_detected():
+        return None
+    return StrengthReducer.reduce(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 strength.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    print(reduce(ast))
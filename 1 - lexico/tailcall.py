@@ -0,0 +1,104 @@
+'''
+Reconocimiento de llamadas recursivas en posición de cola.
+
+Una sentencia 'return f(a1, ..., ak);' dentro de la función f es una
+llamada en posición de cola a sí misma si, después de la resolución de
+nombres (resolve.py):
+
+  - 'f' se resuelve al global de la función (no hay un parámetro o una
+    variable local que lo oculte),
+  - ese global no se asigna en ninguna parte del programa ni se declara
+    con otra definición (sólo con prototipos),
+  - la cantidad de argumentos es la de los parámetros.
+
+El resultado se guarda en el atributo 'tail' (True o False) de cada
+ReturnStmt y la cantidad de estas
+llamadas en el atributo 'tailcalls' de cada FuncDecl. Los motores ejecutan
+estas llamadas sin crear un frame nuevo: evalúan los argumentos, limpian
+las variables locales del frame actual, copian los argumentos en los
+parámetros y vuelven al comienzo del cuerpo. Así la profundidad de la
+pila no crece con la recursión (test/bench/tail.bminor recorre un
+millón de niveles).
+
+usage:
+    python3 tailcall.py <filename>
+'''
+from model   import *
+from resolve import Resolver, GLOBAL
+from astutil import walk, assigned_name
+
+
+class TailCallStats:
+    def __init__(self):
+        self.calls = {}             # función -> llamadas en posición de cola
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def __str__(self):
+        lines = [f'tailcall: {self.total} llamadas en posición de cola en {len(self.calls)} funciones']
+        for name, count in self.calls.items():
+            lines.append(f'  {name}: {count}')
+        return '\n'.join(lines)
+
+
+class TailCalls:
+    @classmethod
+    def mark(cls, program: Program, enabled=True):
+        '''
+        Anota 'tail' en cada ReturnStmt del programa (ya resuelto); si
+        'enabled' es False ninguno queda marcado. Retorna un TailCallStats.
+        '''
+        stats = TailCallStats()
+        funcs = {}
+        for decl in program.body:
+            if isinstance(decl, FuncDecl) and decl.prototype:
+                continue
+            # Un nombre con dos definiciones no se marca
+            funcs[decl.slot] = decl if decl.slot not in funcs else None
+
+        # Globales que el programa reasigna
+        assigned = set()
+        for n in walk(program.body):
+            if assigned_name(n) is None:
+                continue
+            target = n.expr if isinstance(n, (PreInc, PreDec)) else n.left
+            if target.scope == GLOBAL:
+                assigned.add(target.slot)
+
+        for func in funcs.values():
+            if not isinstance(func, FuncDecl):
+                continue
+            func.tailcalls = 0
+            for n in walk(func.body):
+                if not isinstance(n, ReturnStmt):
+                    continue
+                n.tail = False
+                if not enabled or func.slot in assigned:
+                    continue
+                call = n.expr
+                if (isinstance(call, Call) and isinstance(call.func, Identifier)
+                        and call.func.scope == GLOBAL and call.func.slot == func.slot
+                        and len(call.args) == len(func.params)):
+                    n.tail = True
+                    func.tailcalls += 1
+                    stats.calls[func.name] = stats.calls.get(func.name, 0) + 1
+        return stats
+
+
+def mark(program: Program):
+    '''Resuelve los nombres del programa y marca sus llamadas en posición de cola.'''
+    from interp import builtin_functions
+    Resolver.resolve(program, builtin_functions())
+    return TailCalls.mark(program)
+
+
+if __name__ == '__main__':
+    import sys
+    from parser import parse
+
+    if len(sys.argv) != 2:
+        raise SystemExit('Usage: python3 tailcall.py <filename>')
+    ast = parse(open(sys.argv[1], encoding='utf-8').read())
+    print(mark(ast))
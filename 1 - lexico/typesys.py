@@ -88,6 +88,54 @@ _unary_ops = {
 	('!', 'boolean') : 'boolean',
 }
 
+# ---------------------------------------------------------------------
+# Operadores que el checker acepta además de los de las tablas de
+# arriba. Cada grupo es un cambio del lenguaje (lo que antes era un
+# error de tipo ahora es un programa válido) y tiene sus casos en
+# test/checker/good01.bminor y bad07.bminor.
+# ---------------------------------------------------------------------
+
+# Operadores de la especificación que faltaban: '^' (el exponente es
+# siempre integer) y ++/-- (prefijo y postfijo) sobre números
+_spec_ops = {
+	('integer', '^', 'integer') : 'integer',
+	('float', '^', 'integer')   : 'float',
+}
+
+_spec_unary_ops = {
+	('++', 'integer') : 'integer',
+	('--', 'integer') : 'integer',
+	('++', 'float')   : 'float',
+	('--', 'float')   : 'float',
+}
+
+# Lo que el intérprete siempre permitió en ejecución: aritmética y
+# comparaciones entre integer y float (el resultado es float, como en
+# C), '%' con floats (fmod con el signo del divisor) e igualdad entre
+# strings. La asignación sigue siendo estricta: un integer no se guarda
+# en un float (salvo un literal, ver checker._coerce).
+_mixed_ops = {}
+for _a, _b in (('integer', 'float'), ('float', 'integer'), ('float', 'float')):
+	for _op in ('+', '-', '*', '/', '%'):
+		_mixed_ops[_a, _op, _b] = 'float'
+	if _a != _b:
+		for _op in ('<', '<=', '>', '>=', '==', '!='):
+			_mixed_ops[_a, _op, _b] = 'boolean'
+_mixed_ops['string', '==', 'string'] = 'boolean'
+_mixed_ops['string', '!=', 'string'] = 'boolean'
+
+# Desplazamientos y máscara entre enteros: no tienen sintaxis, sólo los
+# genera strength.py al reducir '*', '/' y '%' por potencias de dos
+_internal_ops = {
+	('integer', '<<', 'integer') : 'integer',
+	('integer', '>>', 'integer') : 'integer',
+	('integer', '&', 'integer')  : 'integer',
+}
+
+for _table in (_spec_ops, _mixed_ops, _internal_ops):
+	_bin_ops.update(_table)
+_unary_ops.update(_spec_unary_ops)
+
 # Check if a binary operator is supported. Returns the
 # result type or None (if not supported). Type checker
 # uses this function.
@@ -107,4 +155,19 @@ def check_binop(op, left_type, right_type):
 	return _bin_ops.get((left_type, op, right_type))
 
 def check_unaryop(op, operand_type):
-	return _unary_ops.get((op, operand_type))
\ No newline at end of file
+	return _unary_ops.get((op, operand_type))
+
+# Los arrays se nombran 'array[<tipo del elemento>]'. 'array' a secas
+# (sin elemento) es el tipo del parámetro de array_length: acepta
+# cualquier array.
+
+def array_type(elem):
+	return f'array[{elem}]' if elem else 'array'
+
+def is_array(name):
+	return isinstance(name, str) and (name == 'array' or name.startswith('array['))
+
+def elem_type(name):
+	if isinstance(name, str) and name.startswith('array['):
+		return name[6:-1]
+	return None
@@ -0,0 +1,1181 @@
+'''
+Compilador a bytecode y máquina virtual de pila para B-Minor.
+
+El AST resuelto (ver resolve.py) se traduce a un arreglo plano de
+instrucciones por función. Cada instrucción ocupa dos posiciones del
+arreglo: el código de operación y su argumento. Además cada función
+tiene:
+
+  - consts: el pool de constantes (literales, valores por defecto).
+  - nodes:  los nodos del AST que las instrucciones necesitan para
+            reportar errores con la misma semántica del intérprete.
+
+La VM ejecuta el bytecode con un ciclo de despacho y una pila de
+operandos. Las formas de sentencia más frecuentes se compilan como una
+sola superinstrucción que lee sus operandos (constantes o variables)
+directamente, sin pasar por la pila:
+
+    UPDATE_VAR       x = x + k, x = x - k
+    STORE_INDEX_VAR  a[i] = expr
+    CMP_JUMP         i < N (y las demás comparaciones) como condición
+    INCR_VAR         ++n, --n, n++, n-- como sentencia
+    INDEX_JUMP       a[i] como condición (if (a[i]) ...)
+
+Cada una verifica en ejecución el caso común (números, arrays con
+índice válido) y si no se cumple aplica la semántica del intérprete.
+
+Los resultados enteros de ADD, SUB, MUL, DIV, NEG, INC, DEC, SHL y de
+las superinstrucciones que no caben en 64 bits van por interp.binary_op
+(o int_overflow), que los reduce o reporta el desbordamiento. Las sumas
+y restas entre enteros que ranges.py acotó se compilan como ADD_INT y
+SUB_INT, que no verifican ni los tipos ni el rango, y las
+superinstrucciones y FOR_STEP llevan en su tupla si su operación está
+acotada. Con la opción 'bits' (arrays.py) los accesos a arrays de
+boolean se compilan como INDEX_BIT y STORE_INDEX_BIT, y STORE_INDEX_VAR
+e INDEX_JUMP llevan en su tupla si el array es un BitArray: leen y
+escriben el bit en línea, sin llamar a los métodos de BitArray. Las llamadas entre funciones B-Minor no usan la pila de
+Python: la VM mantiene su propia pila de llamadas, de modo que la
+profundidad de recursión de un programa no depende del límite de
+recursión de Python. Las llamadas de una función a sí misma en posición
+de cola (tailcall.py) se compilan como TAIL_CALL, que reutiliza el frame
+actual y vuelve al comienzo del código, de modo que tampoco crece la
+pila de llamadas de la VM.
+
+usage:
+    python3 vm.py [--dis] <filename>
+'''
+from rich    import print
+from model   import *
+from frame   import Frame, FramePool
+from resolve import Resolver, LOCAL, GLOBAL
+from loops   import counted_loop
+from memo    import memoized
+from arrays  import ARRAYS, BitArray, Strided
+from interp  import (BminorExit, _is_truthy, runtime_error, check_numeric_operand,
+                     binary_op, unary_op, array_load, array_store, default_value,
+                     new_array, pooled_array, init_array, array_sizes, index_chain, strided_load,
+                     strided_store, print_value, preload_image, builtin_functions, BuiltinFunction,
+                     int_overflow, int_result, INT_MIN, INT_MAX,
+                     Options, mark_program, trap_overflow)
+
+# =====================================================================
+# Instrucciones
+# =====================================================================
+OPNAMES = [
+    'LOAD_LOCAL', 'STORE_LOCAL', 'LOAD_GLOBAL', 'STORE_GLOBAL', 'CONST',
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD',
+    'EQ', 'NE', 'LT', 'GT', 'LE', 'GE',
+    'JUMP', 'JUMP_IF_FALSE', 'JUMP_IF_TRUE',
+    'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+    'INDEX', 'STORE_INDEX', 'INC', 'DEC', 'INC_INDEX', 'DEC_INDEX',
+    'CALL', 'RETURN', 'RETURN_NONE',
+    'POP', 'DUP', 'NEG', 'NOT', 'UNARY',
+    'PRINT', 'NEW_ARRAY', 'BUILD_ARRAY', 'CHECK_CALLABLE', 'ERROR', 'FAIL',
+    'FOR_STEP',
+    'UPDATE_VAR', 'STORE_INDEX_VAR', 'CMP_JUMP', 'INCR_VAR', 'INDEX_JUMP',
+    'TAIL_CALL', 'BINARY', 'SHL', 'SHR', 'AND', 'INDEX_N', 'STORE_INDEX_N',
+    'INDEX_UNCHECKED', 'STORE_INDEX_UNCHECKED', 'NEW_POOLED', 'ADD_INT', 'SUB_INT',
+    'INDEX_BIT', 'STORE_INDEX_BIT',
+]
+
+(LOAD_LOCAL, STORE_LOCAL, LOAD_GLOBAL, STORE_GLOBAL, CONST,
+ ADD, SUB, MUL, DIV, MOD,
+ EQ, NE, LT, GT, LE, GE,
+ JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE,
+ JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP,
+ INDEX, STORE_INDEX, INC, DEC, INC_INDEX, DEC_INDEX,
+ CALL, RETURN, RETURN_NONE,
+ POP, DUP, NEG, NOT, UNARY,
+ PRINT, NEW_ARRAY, BUILD_ARRAY, CHECK_CALLABLE, ERROR, FAIL,
+ FOR_STEP,
+ UPDATE_VAR, STORE_INDEX_VAR, CMP_JUMP, INCR_VAR, INDEX_JUMP,
+ TAIL_CALL, BINARY, SHL, SHR, AND, INDEX_N, STORE_INDEX_N,
+ INDEX_UNCHECKED, STORE_INDEX_UNCHECKED, NEW_POOLED, ADD_INT, SUB_INT,
+ INDEX_BIT, STORE_INDEX_BIT) = range(len(OPNAMES))
+
+# Superinstrucciones y la forma que reemplazan. Su argumento es el índice
+# de una tupla (o lista) en el pool de constantes; los operandos son pares
+# (tipo, valor) con tipo 0 para una constante, 1 para un slot local y 2
+# para uno global
+SUPER_PATTERNS = {
+    UPDATE_VAR:      'x = x + k',
+    STORE_INDEX_VAR: 'a[i] = expr',
+    CMP_JUMP:        'i < N',
+    INCR_VAR:        '++n / --n',
+    INDEX_JUMP:      'if (a[i])',
+}
+
+# Superinstrucciones de salto: el destino es el último elemento de su lista
+_FUSED_JUMPS = {CMP_JUMP, INDEX_JUMP}
+
+_BINOPS = {
+    '+': ADD, '-': SUB, '*': MUL, '/': DIV, '%': MOD,
+    '==': EQ, '!=': NE, '<': LT, '>': GT, '<=': LE, '>=': GE,
+    # '^' no tiene instrucción propia (interp.binary_op); '<<', '>>' y '&'
+    # sólo los genera strength.py, siempre entre enteros
+    '^': BINARY, '<<': SHL, '>>': SHR, '&': AND,
+}
+
+# Instrucciones para las operaciones entre enteros que ranges.py acotó
+_BOUNDED = {'+': ADD_INT, '-': SUB_INT}
+
+_JUMPS = {JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP}
+
+# Instrucciones cuyo argumento es un índice en la tabla de nodos
+_NODE_ARGS = {ADD, SUB, MUL, DIV, MOD, EQ, NE, LT, GT, LE, GE, INDEX, STORE_INDEX,
+              INC, DEC, INC_INDEX, DEC_INDEX, CALL, NEG, UNARY, NEW_ARRAY,
+              CHECK_CALLABLE, BUILD_ARRAY, BINARY, SHL, SHR, AND,
+              INDEX_UNCHECKED, STORE_INDEX_UNCHECKED, NEW_POOLED, ADD_INT, SUB_INT,
+              INDEX_BIT, STORE_INDEX_BIT}
+
+# Nodos que se compilan como sentencias (no dejan valor en la pila)
+_STATEMENTS = (Statement, IfStmt, ForStmt, ReturnStmt, Block, FuncDecl, VarDeclInit)
+
+_NUM = frozenset({int, float})
+
+_COMPARISONS = {'==', '!=', '<', '>', '<=', '>='}
+
+
+class CodeObject:
+    '''
+    Código de una función (o de la inicialización global '<module>').
+    '''
+    def __init__(self, name, nparams=0, nlocals=0, varnames=()):
+        self.name = name
+        self.nparams = nparams
+        self.nlocals = nlocals
+        self.varnames = list(varnames)
+        self.code = []
+        self.consts = []
+        self.nodes = []
+
+    def emit(self, op, arg=0):
+        '''Agrega una instrucción y retorna su posición.'''
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def const(self, value):
+        '''Índice de 'value' en el pool de constantes.'''
+        for i, c in enumerate(self.consts):
+            # repr distingue 0.0 de -0.0
+            if c.__class__ is value.__class__ and c == value and repr(c) == repr(value):
+                return i
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def node(self, n):
+        self.nodes.append(n)
+        return len(self.nodes) - 1
+
+    def label(self):
+        '''Posición de la siguiente instrucción.'''
+        return len(self.code)
+
+    def patch(self, pos, target):
+        if self.code[pos] in _FUSED_JUMPS:
+            self.consts[self.code[pos + 1]][-1] = target
+        else:
+            self.code[pos + 1] = target
+
+    def fused(self, op, desc):
+        '''Agrega una superinstrucción con el descriptor 'desc' y retorna su posición.'''
+        self.consts.append(desc)
+        return self.emit(op, len(self.consts) - 1)
+
+
+class VMFunction:
+    '''
+    Valor de una función B-Minor compilada a bytecode.
+    '''
+    def __init__(self, code, arrays=None):
+        self.code = code
+        self.pool = FramePool(code.nlocals, arrays=arrays)
+
+    @property
+    def arity(self) -> int:
+        return self.code.nparams
+
+    def __call__(self, interp, *args):
+        return interp.execute(self, args)
+
+    def __repr__(self):
+        return f'<function {self.code.name}>'
+
+
+# =====================================================================
+# Compilador AST -> bytecode
+# =====================================================================
+
+class BytecodeCompiler(Visitor):
+    '''
+    Genera el bytecode de cada función. Las expresiones dejan exactamente
+    un valor en la pila; las sentencias la dejan como la encontraron.
+    '''
+    def __init__(self, gnames, options):
+        self.gnames = gnames    # slot global -> nombre (para el desensamblador)
+        self.options = options
+        self.code = None
+        self.functions = []     # VMFunction en orden de declaración
+        self.known = set()      # slots globales que contienen funciones o built-ins
+        self.fused = {op: 0 for op in SUPER_PATTERNS}   # superinstrucción -> sitios
+
+    @classmethod
+    def compile(cls, n: Program, builtins=(), options=None):
+        '''
+        Retorna el CodeObject de la inicialización global, la lista de
+        funciones compiladas y las superinstrucciones generadas por forma.
+        '''
+        compiler = cls(n.globals, options or Options())
+        compiler.known = {decl.slot for decl in n.body if isinstance(decl, FuncDecl)}
+        compiler.known |= {n.globals.index(name) for name in builtins}
+        module = compiler.code = CodeObject('<module>')
+        # Los globales de la imagen inicial (peval.py) no se inicializan aquí
+        preset = {id(decl) for decl, _ in getattr(n, 'image', ())}
+        for decl in n.body:
+            if id(decl) not in preset:
+                compiler._stmt(decl)
+        module.emit(RETURN_NONE)
+        return module, compiler.functions, compiler.fused
+
+    # =====================================================================
+    # Utilidades
+    # =====================================================================
+    def _stmt(self, n):
+        if isinstance(n, Assign):
+            self._assign(n, keep=False)
+        elif isinstance(n, (PreInc, PreDec)) and self._incr_var(n):
+            pass
+        elif isinstance(n, _STATEMENTS):
+            n.accept(self)
+        else:
+            self._expr(n)
+            self.code.emit(POP)
+
+    def _expr(self, n):
+        n.accept(self)
+        if isinstance(n, _STATEMENTS):
+            # 'print' puede aparecer como expresión: su valor es None
+            self.code.emit(CONST, self.code.const(None))
+
+    def _block(self, stmts):
+        for stmt in stmts:
+            self._stmt(stmt)
+
+    def _load(self, n):
+        self.code.emit(LOAD_LOCAL if n.scope == LOCAL else LOAD_GLOBAL, n.slot)
+
+    def _store(self, n):
+        self.code.emit(STORE_LOCAL if n.scope == LOCAL else STORE_GLOBAL, n.slot)
+
+    def _operand(self, e, sign=1):
+        '''
+        Operando (tipo, valor) de una superinstrucción, o None si 'e' no
+        es un literal ni una variable.
+        '''
+        if isinstance(e, Literal):
+            return (0, e.value if sign == 1 else sign * e.value)
+        if isinstance(e, Identifier):
+            return (1 if e.scope == LOCAL else 2, e.slot)
+        return None
+
+    def _bits(self, n):
+        '''True si el acceso n es a un array de boolean guardado en un BitArray (Options.bits).'''
+        return self.options.bits and getattr(n, 'type', None) == 'boolean'
+
+    def _fuse(self, op, desc):
+        self.fused[op] += 1
+        return self.code.fused(op, desc)
+
+    def _jump(self, cond, when, target=0):
+        '''
+        Salta a 'target' si la veracidad de 'cond' es 'when'. Retorna la
+        posición del salto (para code.patch).
+        '''
+        code = self.code
+        if self.options.superinstructions and isinstance(cond, BinOper) and cond.right is not None \
+                and cond.oper in _COMPARISONS:
+            left, right = self._operand(cond.left), self._operand(cond.right)
+            if left is not None and right is not None:
+                return self._fuse(CMP_JUMP, [left, right, _BINOPS[cond.oper], when,
+                                             code.node(cond), target])
+        if self.options.superinstructions and isinstance(cond, ArrayAccess):
+            array, pos = self._operand(cond.array), self._operand(cond.pos)
+            if array is not None and pos is not None:
+                return self._fuse(INDEX_JUMP, [array, pos, when, code.node(cond),
+                                               getattr(cond, 'unchecked', False),
+                                               self._bits(cond), target])
+        self._expr(cond)
+        return code.emit(JUMP_IF_TRUE if when else JUMP_IF_FALSE, target)
+
+    # =====================================================================
+    # Declaraciones
+    # =====================================================================
+    def visit(self, n: FuncDecl):
+        outer = self.code
+        code = self.code = CodeObject(n.name, len(n.params), n.nslots, n.locals)
+        self._block(n.body)
+        code.emit(RETURN_NONE)
+        self.code = outer
+
+        func = VMFunction(code, getattr(n, 'arrays', None))
+        self.functions.append(func)
+        outer.emit(CONST, outer.const(memoized(func, n)))
+        self._store(n)
+
+    def visit(self, n: VarDecl):
+        code = self.code
+        if isinstance(n.type, ArrayType) and n.type.size:
+            for size in array_sizes(n.type):
+                self._expr(size)
+            # Un array que no escapa (escape.py) toma un buffer del pool de la función
+            code.emit(NEW_POOLED if getattr(n, 'pool', None) is not None else NEW_ARRAY, code.node(n))
+        else:
+            value = default_value(n.type) if isinstance(n.type, SimpleType) else None
+            code.emit(CONST, code.const(value))
+        self._store(n)
+
+    def visit(self, n: VarDeclInit):
+        code = self.code
+        if isinstance(n.init, list):
+            for item in n.init:
+                self._expr(item)
+            code.emit(BUILD_ARRAY, code.node(n))
+        elif n.init:
+            self._expr(n.init)
+        else:
+            code.emit(CONST, code.const(None))
+        self._store(n)
+
+    # =====================================================================
+    # Sentencias
+    # =====================================================================
+    def visit(self, n: Block):
+        self._block(n.body)
+
+    def visit(self, n: PrintStmt):
+        self._expr(n.expr)
+        self.code.emit(PRINT)
+
+    def visit(self, n: ExprStmt):
+        self._stmt(n.expr)
+
+    def visit(self, n: IfStmt):
+        code = self.code
+        jfalse = self._jump(n.cond, False)
+        self._block(n.then_branch)
+        if n.else_branch:
+            jend = code.emit(JUMP)
+            code.patch(jfalse, code.label())
+            self._block(n.else_branch)
+            code.patch(jend, code.label())
+        else:
+            code.patch(jfalse, code.label())
+
+    def visit(self, n: WhileStmt):
+        code = self.code
+        top = code.label()
+        jend = self._jump(n.cond, False)
+        self._block(n.body)
+        code.emit(JUMP, top)
+        code.patch(jend, code.label())
+
+    def visit(self, n: DoWhileStmt):
+        code = self.code
+        top = code.label()
+        self._stmt(n.body)
+        self._jump(n.cond, True, top)
+
+    def visit(self, n: ForStmt):
+        code = self.code
+        if n.init:
+            self._stmt(n.init)
+        loop = counted_loop(n) if self.options.counted else None
+        if loop is not None and loop.var.scope == LOCAL:
+            self._counted(n, loop)
+            return
+        top = code.label()
+        jend = None
+        if n.cond:
+            jend = self._jump(n.cond, False)
+        self._block(n.body)
+        if n.step:
+            self._stmt(n.step)
+        code.emit(JUMP, top)
+        if jend is not None:
+            code.patch(jend, code.label())
+
+    def _counted(self, n, loop):
+        '''
+        Ciclo contado (loops.py) con la condición al final:
+
+                JUMP cond
+            top:
+                cuerpo
+                FOR_STEP d      ; enteros: paso, comparación y salto a top o a end
+                paso            ; otros valores: el paso y la condición normales
+            cond:
+                condición
+                JUMP_IF_TRUE top
+            end:
+
+        'd' es la tupla (slot, límite, paso, signo, comparación, top, end,
+        acotado); el límite y el paso son pares (tipo, valor) con tipo 0
+        para una constante, 1 para un slot local y 2 para uno global. Si
+        el paso no está acotado (ranges.py) y se sale de 64 bits, se
+        ejecutan el paso y la condición normales.
+        '''
+        code = self.code
+        jcond = code.emit(JUMP)
+        top = code.label()
+        self._block(n.body)
+        fstep = code.emit(FOR_STEP)
+        self._stmt(n.step)
+        code.patch(jcond, code.label())
+        self._jump(n.cond, True, top)
+
+        step = n.step if isinstance(n.step, (PreInc, PreDec)) else n.step.right
+        desc = (loop.var.slot, self._operand(loop.bound), self._operand(loop.step, loop.sign),
+                loop.sign, _BINOPS[loop.oper], top, code.label(), getattr(step, 'bounded', False))
+        code.consts.append(desc)
+        code.patch(fstep, len(code.consts) - 1)
+
+    def visit(self, n: ReturnStmt):
+        if getattr(n, 'tail', False):
+            # Llamada a sí misma en posición de cola: sólo los argumentos
+            for arg in n.expr.args:
+                self._expr(arg)
+            self.code.emit(TAIL_CALL, len(n.expr.args))
+        elif n.expr:
+            self._expr(n.expr)
+            self.code.emit(RETURN)
+        else:
+            self.code.emit(RETURN_NONE)
+
+    # =====================================================================
+    # Expresiones
+    # =====================================================================
+    def visit(self, n: BinOper):
+        code = self.code
+        self._expr(n.left)
+        self._expr(n.right)
+        if n.oper in _BOUNDED and getattr(n, 'bounded', False):
+            # Enteros que no se desbordan (ranges.py)
+            code.emit(_BOUNDED[n.oper], code.node(n))
+        elif n.oper in _BINOPS:
+            code.emit(_BINOPS[n.oper], code.node(n))
+        else:
+            code.emit(FAIL, code.const(f"Operador binario no implementado: {n.oper}"))
+
+    def visit(self, n: LogicalOpExpr):
+        code = self.code
+        self._expr(n.left)
+        if n.oper == '||':
+            jump = code.emit(JUMP_IF_TRUE_OR_POP)
+        elif n.oper == '&&':
+            jump = code.emit(JUMP_IF_FALSE_OR_POP)
+        else:
+            code.emit(FAIL, code.const(f"Operador lógico no implementado: {n.oper}"))
+            return
+        self._expr(n.right)
+        code.patch(jump, code.label())
+
+    def visit(self, n: UnaryOper):
+        code = self.code
+        self._expr(n.expr)
+        if n.oper == '-':
+            code.emit(NEG, code.node(n))
+        elif n.oper == '!':
+            code.emit(NOT)
+        else:
+            code.emit(UNARY, code.node(n))
+
+    def visit(self, n: Assign):
+        self._assign(n, keep=True)
+
+    def _assign(self, n, keep):
+        code = self.code
+        target = n.left
+        if not keep and self.options.superinstructions and self._fused_assign(n):
+            return
+        self._expr(n.right)
+        if keep:
+            code.emit(DUP)
+        if isinstance(target, Identifier):
+            self._store(target)
+        elif isinstance(target, ArrayAccess) and isinstance(target.array, ArrayAccess):
+            code.emit(STORE_INDEX_N, self._index_chain(target))
+        elif isinstance(target, ArrayAccess):
+            self._expr(target.array)
+            self._expr(target.pos)
+            if self._bits(target):
+                code.emit(STORE_INDEX_BIT, code.node(target))
+            else:
+                code.emit(STORE_INDEX_UNCHECKED if getattr(target, 'unchecked', False) else STORE_INDEX,
+                          code.node(target))
+        else:
+            code.emit(ERROR, code.const("Target de asignación inválido"))
+
+    def _fused_assign(self, n):
+        '''
+        'x = x + k', 'x = x - k' y 'a[i] = expr' como sentencia. Retorna
+        False si la asignación no tiene esa forma.
+        '''
+        target, value = n.left, n.right
+        if isinstance(target, Identifier):
+            if not (isinstance(value, BinOper) and value.oper in ('+', '-')
+                    and isinstance(value.left, Identifier) and value.right is not None
+                    and (value.left.scope, value.left.slot) == (target.scope, target.slot)):
+                return False
+            k = self._operand(value.right)
+            if k is None:
+                return False
+            var = self._operand(target)
+            self._fuse(UPDATE_VAR, (var, k, value.oper == '+', self.code.node(value),
+                                    getattr(value, 'bounded', False)))
+            return True
+        if isinstance(target, ArrayAccess) and not isinstance(target.array, ArrayAccess):
+            array, pos = self._operand(target.array), self._operand(target.pos)
+            if array is None or pos is None:
+                return False
+            self._expr(value)
+            self._fuse(STORE_INDEX_VAR, (array, pos, self.code.node(target),
+                                         getattr(target, 'unchecked', False),
+                                         self._bits(target)))
+            return True
+        return False
+
+    def _incr_var(self, n):
+        '''++n / --n (o n++ / n--) como sentencia. Retorna False si n no es una variable.'''
+        if not (self.options.superinstructions and isinstance(n.expr, Identifier)):
+            return False
+        self._fuse(INCR_VAR, (self._operand(n.expr), 1 if isinstance(n, PreInc) else -1,
+                              self.code.node(n), getattr(n, 'bounded', False)))
+        return True
+
+    def _incr(self, n, op, op_index, message):
+        code = self.code
+        target = n.expr
+        if isinstance(target, Identifier):
+            # x++ / x--: la copia que queda en la pila es el valor anterior
+            post = isinstance(n, (PostInc, PostDec))
+            self._load(target)
+            if post:
+                code.emit(DUP)
+            code.emit(op, code.node(n))
+            if not post:
+                code.emit(DUP)
+            self._store(target)
+        elif isinstance(target, ArrayAccess):
+            self._expr(target.array)
+            self._expr(target.pos)
+            code.emit(op_index, code.node(n))
+        else:
+            code.emit(ERROR, code.const(message))
+
+    def visit(self, n: PreInc):
+        self._incr(n, INC, INC_INDEX, "Operando para '++' debe ser un l-value (variable o acceso a array)")
+
+    def visit(self, n: PreDec):
+        self._incr(n, DEC, DEC_INDEX, "Operando para '--' debe ser un l-value")
+
+    def visit(self, n: Call):
+        code = self.code
+        self._expr(n.func)
+        # Si el destino no es una función conocida se verifica antes de
+        # evaluar los argumentos, igual que el intérprete. Una llamada que
+        # se puede ejecutar durante la inicialización de los globales
+        # (resolve.py) también: la función puede declararse más abajo
+        if not (isinstance(n.func, Identifier) and n.func.scope == GLOBAL
+                and n.func.slot in self.known and not getattr(n, 'early', False)):
+            code.emit(CHECK_CALLABLE, code.node(n))
+        for arg in n.args:
+            self._expr(arg)
+        code.emit(CALL, code.node(n))
+
+    def visit(self, n: ArrayAccess):
+        if isinstance(n.array, ArrayAccess):
+            self.code.emit(INDEX_N, self._index_chain(n))
+            return
+        self._expr(n.array)
+        self._expr(n.pos)
+        if self._bits(n):
+            self.code.emit(INDEX_BIT, self.code.node(n))
+            return
+        # Índice dentro de los límites (bounds.py): sin verificaciones
+        self.code.emit(INDEX_UNCHECKED if getattr(n, 'unchecked', False) else INDEX,
+                       self.code.node(n))
+
+    def _index_chain(self, n):
+        '''
+        Emite la raíz y los índices de a[i][j]... y retorna el argumento
+        de INDEX_N / STORE_INDEX_N: la constante (cantidad de índices, nodo).
+        '''
+        root, idxs = index_chain(n)
+        self._expr(root)
+        for idx in idxs:
+            self._expr(idx)
+        return self.code.const((len(idxs), self.code.node(n)))
+
+    def visit(self, n: Identifier):
+        self._load(n)
+
+    def visit(self, n: Literal):
+        self.code.emit(CONST, self.code.const(n.value))
+
+
+# =====================================================================
+# Desensamblador
+# =====================================================================
+
+def disassemble(code: CodeObject, gnames=()):
+    '''Retorna el listado legible del bytecode de 'code'.'''
+    lines = [f'== {code.name} (params: {code.nparams}, locals: {code.nlocals}, '
+             f'consts: {len(code.consts)}) ==']
+    targets = {code.code[pc + 1] for pc in range(0, len(code.code), 2) if code.code[pc] in _JUMPS}
+    targets |= {code.consts[code.code[pc + 1]][-1] for pc in range(0, len(code.code), 2)
+                if code.code[pc] in _FUSED_JUMPS}
+    if TAIL_CALL in code.code[0::2]:
+        targets.add(0)
+    for pc in range(0, len(code.code), 2):
+        op, arg = code.code[pc], code.code[pc + 1]
+        note = ''
+        if op in (LOAD_LOCAL, STORE_LOCAL):
+            note = code.varnames[arg] if arg < len(code.varnames) else ''
+        elif op in (LOAD_GLOBAL, STORE_GLOBAL):
+            note = gnames[arg] if arg < len(gnames) else ''
+        elif op in (CONST, ERROR, FAIL, FOR_STEP, INDEX_N, STORE_INDEX_N):
+            note = repr(code.consts[arg])
+        elif op in SUPER_PATTERNS:
+            note = f'{SUPER_PATTERNS[op]}: {code.consts[arg]!r}'
+        elif op in _JUMPS:
+            note = f'-> {arg}'
+        elif op in _NODE_ARGS:
+            n = code.nodes[arg]
+            if isinstance(n, Call):
+                note = f'{getattr(n.func, "name", "?")}/{len(n.args)}'
+            elif hasattr(n, 'oper'):
+                note = n.oper
+            elif hasattr(n, 'name'):
+                note = n.name
+        mark = '>>' if pc in targets else '  '
+        lines.append(f'{mark}{pc:5d}  {OPNAMES[op]:<22}{arg:<5d} {note}'.rstrip())
+    return '\n'.join(lines)
+
+
+# =====================================================================
+# Máquina virtual
+# =====================================================================
+
+class VM:
+    '''
+    Motor de ejecución con la misma interfaz que Interpreter.
+    '''
+    def __init__(self, options=None):
+        self.options = options or Options()
+        self.globals = None
+        self.builtins = builtin_functions()
+        self.fused = {}                     # superinstrucción -> sitios en el bytecode
+        self.hits = [0] * len(OPNAMES)      # superinstrucción -> veces ejecutada
+
+    def error(self, node, message):
+        '''Reporta un error en tiempo de ejecución.'''
+        runtime_error(message)
+
+    def superinstructions(self):
+        '''
+        Resumen por forma: (forma, sitios, ejecuciones) de cada
+        superinstrucción del último programa ejecutado.
+        '''
+        return [(pattern, self.fused.get(op, 0), self.hits[op])
+                for op, pattern in SUPER_PATTERNS.items()]
+
+    def load(self, node: Program):
+        '''
+        Resuelve y compila el programa. Retorna la tabla de símbolos
+        global, el código de inicialización y las funciones.
+        '''
+        env = Resolver.resolve(node, self.builtins)
+        mark_program(node, self.options)
+        self.globals = Frame(len(node.globals))
+        for name, func in self.builtins.items():
+            self.globals.slots[env.get(name)] = func
+        preload_image(node, self.globals.slots)
+        module, functions, self.fused = BytecodeCompiler.compile(node, self.builtins, self.options)
+        return env, module, functions
+
+    def interpret(self, node: Program):
+        try:
+            trap_overflow(self.options.trap)
+            env, module, functions = self.load(node)
+            self.execute(VMFunction(module), ())
+
+            main_func = None
+            if env.get('main') is not None:
+                main_func = self.globals.slots[env.get('main')]
+
+            if main_func and callable(main_func):
+                arity = getattr(main_func, 'arity', 0)
+                if arity != 0:
+                    self.error(None, f"La función 'main' debe definirse sin argumentos (esperado 0, pero tiene {arity})")
+                main_func(self)
+        except BminorExit:
+            pass # Error ya reportado
+        except Exception as e:
+            print(f"[Error Interno del Intérprete] {e}")
+            import traceback
+            traceback.print_exc()
+
+    def execute(self, func: VMFunction, args):
+        '''
+        Ejecuta 'func' con los argumentos dados hasta que retorne. Las
+        llamadas a otras funciones B-Minor se resuelven dentro de este
+        mismo ciclo usando la pila de llamadas 'frames'.
+        '''
+        gslots = self.globals.slots
+        hits = self.hits
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+
+        pool = func.pool
+        frame = pool.acquire()
+        slots = frame.slots
+        slots[:len(args)] = args
+        code = func.code.code
+        consts = func.code.consts
+        nodes = func.code.nodes
+        pc = 0
+        lo, hi = INT_MIN, INT_MAX
+
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+
+            if op == LOAD_LOCAL:
+                push(slots[arg])
+            elif op == CONST:
+                push(consts[arg])
+            elif op == STORE_LOCAL:
+                slots[arg] = pop()
+            elif op == CMP_JUMP:
+                hits[CMP_JUMP] += 1
+                (lk, l), (rk, r), cmp, when, node, target = consts[arg]
+                if lk:
+                    l = slots[l] if lk == 1 else gslots[l]
+                if rk:
+                    r = slots[r] if rk == 1 else gslots[r]
+                if cmp == EQ:
+                    v = l == r
+                elif cmp == NE:
+                    v = l != r
+                elif l.__class__ not in _NUM or r.__class__ not in _NUM:
+                    v = binary_op(nodes[node], l, r)
+                elif cmp == LT:
+                    v = l < r
+                elif cmp == LE:
+                    v = l <= r
+                elif cmp == GT:
+                    v = l > r
+                else:
+                    v = l >= r
+                if v is when:
+                    pc = target
+            elif op == UPDATE_VAR:
+                hits[UPDATE_VAR] += 1
+                (xk, x), (kk, k), add, node, bounded = consts[arg]
+                if kk:
+                    k = slots[k] if kk == 1 else gslots[k]
+                v = slots[x] if xk == 1 else gslots[x]
+                if v.__class__ in _NUM and k.__class__ in _NUM:
+                    v = v + k if add else v - k
+                    if not (bounded or lo <= v <= hi) and v.__class__ is int:
+                        v = int_overflow(v)
+                else:
+                    v = binary_op(nodes[node], v, k)
+                if xk == 1:
+                    slots[x] = v
+                else:
+                    gslots[x] = v
+            elif op == LOAD_GLOBAL:
+                push(gslots[arg])
+            elif op == JUMP_IF_FALSE:
+                v = pop()
+                if v is False or (v is not True and not _is_truthy(v)):
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == CALL:
+                node = nodes[arg]
+                nargs = len(node.args)
+                base = len(stack) - nargs
+                callee = stack[base - 1]
+                if callee.__class__ is VMFunction:
+                    if nargs != callee.code.nparams:
+                        runtime_error(f"Error de aridad: Se esperaban {callee.arity} argumentos, pero se recibieron {nargs}")
+                    # Guardar el estado del llamador y entrar a la función
+                    frames.append((code, consts, nodes, pc, pool, frame, base - 1))
+                    pool = callee.pool
+                    frame = pool.acquire()
+                    slots = frame.slots
+                    slots[:nargs] = stack[base:]
+                    del stack[base - 1:]
+                    code = callee.code.code
+                    consts = callee.code.consts
+                    nodes = callee.code.nodes
+                    pc = 0
+                else:
+                    args = stack[base:]
+                    del stack[base - 1:]
+                    if hasattr(callee, 'arity') and callee.arity != -1:
+                        if nargs != callee.arity:
+                            runtime_error(f"Error de aridad: Se esperaban {callee.arity} argumentos, pero se recibieron {nargs}")
+                    push(callee(self, *args))
+            elif op == TAIL_CALL:
+                # Los argumentos reemplazan a los slots del frame actual
+                base = len(stack) - arg
+                args = stack[base:]
+                del stack[base:]
+                slots[:] = pool._blank
+                slots[:arg] = args
+                pc = 0
+            elif op == FOR_STEP:
+                var, (bkind, stop), (skind, k), sign, cmp, top, end, bounded = consts[arg]
+                if bkind:
+                    stop = slots[stop] if bkind == 1 else gslots[stop]
+                if skind:
+                    k = slots[k] if skind == 1 else gslots[k]
+                    if k.__class__ is int:
+                        k *= sign
+                i = slots[var]
+                if i.__class__ is int and stop.__class__ is int and k.__class__ is int \
+                        and (bounded or lo <= i + k <= hi):
+                    i += k
+                    slots[var] = i
+                    if cmp == LT:
+                        pc = top if i < stop else end
+                    elif cmp == LE:
+                        pc = top if i <= stop else end
+                    elif cmp == GT:
+                        pc = top if i > stop else end
+                    else:
+                        pc = top if i >= stop else end
+            elif op == STORE_INDEX_VAR:
+                hits[STORE_INDEX_VAR] += 1
+                (ak, arr), (ik, idx), node, unchecked, bits = consts[arg]
+                if ak:
+                    arr = slots[arr] if ak == 1 else gslots[arr]
+                if ik:
+                    idx = slots[idx] if ik == 1 else gslots[idx]
+                v = pop()
+                if bits and arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size:
+                    if v is True:
+                        arr.bits[idx >> 3] |= 1 << (idx & 7)
+                    elif v is False:
+                        arr.bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+                    else:
+                        array_store(nodes[node], arr, idx, v)
+                elif unchecked or (idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr)):
+                    try:
+                        arr[idx] = v
+                    except (TypeError, OverflowError):
+                        array_store(nodes[node], arr, idx, v)
+                else:
+                    array_store(nodes[node], arr, idx, v)
+            elif op == INDEX_JUMP:
+                hits[INDEX_JUMP] += 1
+                (ak, arr), (ik, idx), when, node, unchecked, bits, target = consts[arg]
+                if ak:
+                    arr = slots[arr] if ak == 1 else gslots[arr]
+                if ik:
+                    idx = slots[idx] if ik == 1 else gslots[idx]
+                if bits and arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size:
+                    v = arr.bits[idx >> 3] >> (idx & 7) & 1 == 1
+                elif unchecked or (idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr)):
+                    v = arr[idx]
+                else:
+                    v = array_load(nodes[node], arr, idx)
+                if v is not True and v is not False:
+                    v = _is_truthy(v)
+                if v is when:
+                    pc = target
+            elif op == INCR_VAR:
+                hits[INCR_VAR] += 1
+                (xk, x), delta, node, bounded = consts[arg]
+                v = slots[x] if xk == 1 else gslots[x]
+                if v.__class__ not in _NUM:
+                    check_numeric_operand(nodes[node], v)
+                v += delta
+                if not (bounded or lo <= v <= hi) and v.__class__ is int:
+                    v = int_overflow(v)
+                if xk == 1:
+                    slots[x] = v
+                else:
+                    gslots[x] = v
+            elif op == RETURN or op == RETURN_NONE:
+                result = pop() if op == RETURN else None
+                pool.release(frame)
+                if not frames:
+                    return result
+                code, consts, nodes, pc, pool, frame, base = frames.pop()
+                slots = frame.slots
+                del stack[base:]
+                push(result)
+            elif op == ADD:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l + r
+                    stack[-1] = v if lo <= v <= hi or v.__class__ is float else int_overflow(v)
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == ADD_INT:
+                r = pop()
+                stack[-1] += r
+            elif op == SUB:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l - r
+                    stack[-1] = v if lo <= v <= hi or v.__class__ is float else int_overflow(v)
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == SUB_INT:
+                r = pop()
+                stack[-1] -= r
+            elif op == MUL:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    v = l * r
+                    stack[-1] = v if lo <= v <= hi or v.__class__ is float else int_overflow(v)
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == LT:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    stack[-1] = l < r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == GT:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    stack[-1] = l > r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == LE:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    stack[-1] = l <= r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == GE:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM:
+                    stack[-1] = l >= r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == EQ:
+                r = pop()
+                stack[-1] = stack[-1] == r
+            elif op == NE:
+                r = pop()
+                stack[-1] = stack[-1] != r
+            elif op == DIV:
+                r = pop(); l = stack[-1]
+                if l.__class__ is int and r.__class__ is int and r:
+                    v = l // r
+                    stack[-1] = v if v <= hi else int_overflow(v)
+                elif l.__class__ in _NUM and r.__class__ in _NUM and r:
+                    stack[-1] = l / r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == MOD:
+                r = pop(); l = stack[-1]
+                if l.__class__ in _NUM and r.__class__ in _NUM and r:
+                    stack[-1] = l % r
+                else:
+                    stack[-1] = binary_op(nodes[arg], l, r)
+            elif op == INDEX:
+                idx = pop(); arr = stack[-1]
+                if idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr):
+                    stack[-1] = arr[idx]
+                else:
+                    stack[-1] = array_load(nodes[arg], arr, idx)
+            elif op == INDEX_BIT:
+                idx = pop(); arr = stack[-1]
+                if arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size:
+                    stack[-1] = arr.bits[idx >> 3] >> (idx & 7) & 1 == 1
+                elif idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr):
+                    stack[-1] = arr[idx]
+                else:
+                    stack[-1] = array_load(nodes[arg], arr, idx)
+            elif op == INDEX_UNCHECKED:
+                idx = pop()
+                stack[-1] = stack[-1][idx]
+            elif op == STORE_INDEX_UNCHECKED:
+                idx = pop(); arr = pop(); v = pop()
+                try:
+                    arr[idx] = v
+                except (TypeError, OverflowError):
+                    array_store(nodes[arg], arr, idx, v)
+            elif op == STORE_INDEX_BIT:
+                idx = pop(); arr = pop(); v = pop()
+                if arr.__class__ is BitArray and idx.__class__ is int and 0 <= idx < arr.size \
+                        and (v is True or v is False):
+                    if v:
+                        arr.bits[idx >> 3] |= 1 << (idx & 7)
+                    else:
+                        arr.bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+                else:
+                    array_store(nodes[arg], arr, idx, v)
+            elif op == STORE_INDEX:
+                idx = pop(); arr = pop(); v = pop()
+                if idx.__class__ is int and arr.__class__ in ARRAYS and 0 <= idx < len(arr):
+                    try:
+                        arr[idx] = v
+                    except (TypeError, OverflowError):
+                        array_store(nodes[arg], arr, idx, v)
+                else:
+                    array_store(nodes[arg], arr, idx, v)
+            elif op == STORE_GLOBAL:
+                gslots[arg] = pop()
+            elif op == POP:
+                pop()
+            elif op == DUP:
+                push(stack[-1])
+            elif op == JUMP_IF_TRUE:
+                v = pop()
+                if v is True or (v is not False and _is_truthy(v)):
+                    pc = arg
+            elif op == INC or op == DEC:
+                v = stack[-1]
+                if v.__class__ not in _NUM:
+                    check_numeric_operand(nodes[arg], v)
+                v = v + 1 if op == INC else v - 1
+                stack[-1] = v if lo <= v <= hi or v.__class__ is not int else int_overflow(v)
+            elif op == JUMP_IF_FALSE_OR_POP:
+                v = stack[-1]
+                if v is False or (v is not True and not _is_truthy(v)):
+                    pc = arg
+                else:
+                    pop()
+            elif op == JUMP_IF_TRUE_OR_POP:
+                v = stack[-1]
+                if v is True or (v is not False and _is_truthy(v)):
+                    pc = arg
+                else:
+                    pop()
+            elif op == INC_INDEX or op == DEC_INDEX:
+                idx = pop(); arr = pop()
+                if not isinstance(arr, ARRAYS): runtime_error("Base no es array")
+                if not isinstance(idx, int): runtime_error("Índice no es entero")
+                old = arr[idx]
+                check_numeric_operand(nodes[arg], old)
+                v = int_result(old + 1 if op == INC_INDEX else old - 1)
+                array_store(nodes[arg], arr, idx, v)
+                push(old if isinstance(nodes[arg], (PostInc, PostDec)) else v)
+            elif op == NEG:
+                v = stack[-1]
+                stack[-1] = -v if v.__class__ in _NUM and v != lo else unary_op(nodes[arg], v)
+            elif op == NOT:
+                v = stack[-1]
+                stack[-1] = (not v) if (v is True or v is False) else not _is_truthy(v)
+            elif op == SHL:
+                r = pop()
+                v = stack[-1] << r
+                stack[-1] = v if lo <= v <= hi else int_overflow(v)
+            elif op == SHR:
+                r = pop()
+                stack[-1] >>= r
+            elif op == AND:
+                r = pop()
+                stack[-1] &= r
+            elif op == BINARY:
+                r = pop()
+                stack[-1] = binary_op(nodes[arg], stack[-1], r)
+            elif op == UNARY:
+                stack[-1] = unary_op(nodes[arg], stack[-1])
+            elif op == PRINT:
+                print_value(pop())
+            elif op == NEW_ARRAY:
+                node = nodes[arg]
+                k = len(array_sizes(node.type))
+                if k == 1:
+                    stack[-1] = new_array(node, stack[-1])
+                else:
+                    sizes = stack[-k:]
+                    del stack[-k:]
+                    push(new_array(node, *sizes))
+            elif op == NEW_POOLED:
+                node = nodes[arg]
+                k = len(array_sizes(node.type))
+                sizes = tuple(stack[-k:])
+                del stack[-k:]
+                push(pooled_array(node, sizes, slots[node.slot]))
+            elif op == INDEX_N:
+                k, node = consts[arg]
+                if k == 2:
+                    j = pop(); i = pop(); arr = stack[-1]
+                    if (arr.__class__ is Strided and i.__class__ is int and j.__class__ is int
+                            and len(arr.dims) == 2 and 0 <= i < arr.dims[0] and 0 <= j < arr.dims[1]):
+                        stack[-1] = arr.data[arr.offset + i * arr.dims[1] + j]
+                    else:
+                        stack[-1] = strided_load(nodes[node], arr, [i, j])
+                else:
+                    idxs = stack[-k:]
+                    del stack[-k:]
+                    stack[-1] = strided_load(nodes[node], stack[-1], idxs)
+            elif op == STORE_INDEX_N:
+                k, node = consts[arg]
+                idxs = stack[-k:]
+                del stack[-k:]
+                arr = pop(); v = pop()
+                strided_store(nodes[node], arr, idxs, v)
+            elif op == BUILD_ARRAY:
+                node = nodes[arg]
+                items = stack[len(stack) - len(node.init):]
+                del stack[len(stack) - len(node.init):]
+                push(init_array(node, items))
+            elif op == CHECK_CALLABLE:
+                if not callable(stack[-1]):
+                    node = nodes[arg]
+                    runtime_error("Intento de llamar a algo que no es una función " + str(node.func.name))
+            elif op == ERROR:
+                runtime_error(consts[arg])
+            elif op == FAIL:
+                raise NotImplementedError(consts[arg])
+            else:
+                raise RuntimeError(f'Instrucción desconocida {op}')
+
+
+def dis(node: Program):
+    '''Retorna el desensamblado de todo el programa.'''
+    vm = VM()
+    env, module, functions = vm.load(node)
+    parts = [disassemble(module, node.globals)]
+    parts += [disassemble(func.code, node.globals) for func in functions]
+    return '\n\n'.join(parts)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from parser import parse
+
+    argparser = argparse.ArgumentParser(description='bminor bytecode VM')
+    argparser.add_argument('file', help='programa a ejecutar')
+    argparser.add_argument('--dis', action='store_true', help='mostrar el bytecode en lugar de ejecutar')
+    argparser.add_argument('--stats', action='store_true',
+                           help='mostrar en stderr los sitios y ejecuciones de cada superinstrucción')
+    args = argparser.parse_args()
+
+    ast = parse(open(args.file, encoding='utf-8').read())
+    if args.dis:
+        # Sin rich: los corchetes de las notas ('a[i]') no son markup
+        sys.stdout.write(dis(ast) + '\n')
+    else:
+        vm = VM()
+        vm.interpret(ast)
+        if args.stats:
+            for pattern, sites, hits in vm.superinstructions():
+                sys.stderr.write(f'{pattern:<14}{sites:>6} sitios {hits:>12} ejecuciones\n')